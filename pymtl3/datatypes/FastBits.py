@@ -0,0 +1,428 @@
+"""
+========================================================================
+FastBits.py
+========================================================================
+Width-specialized pure-Python Bits. Every BitsN class is generated by a
+factory so that its methods have the bitwidth, the mask and the bounds
+precomputed in their closure. The common cases (an operand of the same BitsN
+class or an in-range int) are handled by a few type checks without any
+exception handling or table lookups, and results are created as BitsN
+objects without going through __init__. Everything else falls back to
+the generic methods of PythonBits.Bits, so the semantics and the error
+messages are exactly the same.
+
+Set PYMTL_BITS=fast to use these classes as the BitsN types of PyMTL.
+
+With the flyweight cache of PythonBits on (PYMTL_BITS_CACHE), the
+comparisons return one of two shared Bits1 instances. The other results
+keep their own BitsN class and are not cached.
+
+Date   : Oct 16, 2026
+"""
+import operator
+
+from .PythonBits import Bits, _cache_nbits, _guard_flyweights, object_new
+
+_new = object_new
+_bits_types = {}
+
+def _new_bits( nbits, uint ):
+  ret = object_new( _bits_types.get( nbits ) or mk_bits( nbits ) )
+  ret._nbits = nbits
+  ret._uint  = uint & ((1 << nbits) - 1)
+  return ret
+
+def _reflected( rop, op, s, other ):
+  # Python tries the reflected method of a subclass first, so a generic
+  # Bits on the left has to go through its forward method instead.
+  if isinstance( other, Bits ):
+    return op( other, s )
+  return rop( s, other )
+
+_b1_cache = None
+
+def _mk_cached_cmp( BitsN, M, op, generic ):
+  def cmp( s, other ):
+    t = other.__class__
+    if t is BitsN:
+      other = other._uint
+    elif t is not int or not 0 <= other <= M:
+      return generic( s, other )
+    return _b1_cache[ op( s._uint, other ) ]
+  cmp.__name__ = generic.__name__
+  return cmp
+
+def _mk_bits_class( N ):
+  M  = (1 << N) - 1
+  lo = -(1 << (N - 1))
+  B1 = _bits_types.get( 1 )
+  class BitsN( Bits ):
+    __slots__ = ()
+    nbits = N
+
+    def __init__( s, v=0, *, trunc_int=False ):
+      t = v.__class__
+      if t is int:
+        if trunc_int or lo <= v <= M:
+          s._nbits = N
+          s._uint  = v & M
+          return
+      elif t is BitsN:
+        s._nbits = N
+        s._uint  = v._uint
+        return
+      Bits.__init__( s, N, v, trunc_int )
+
+    def __imatmul__( s, v ):
+      t = v.__class__
+      if t is BitsN:
+        s._uint = v._uint
+        return s
+      if t is int and lo <= v <= M:
+        s._uint = v & M
+        return s
+      return Bits.__imatmul__( s, v )
+
+    def __ilshift__( s, v ):
+      t = v.__class__
+      if t is BitsN:
+        s._next = v._uint
+        return s
+      if t is int and lo <= v <= M:
+        s._next = v & M
+        return s
+      return Bits.__ilshift__( s, v )
+
+    def clone( s ):
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint
+      return ret
+
+    def __deepcopy__( s, memo ):
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint
+      return ret
+
+    def __getitem__( s, idx ):
+      t = idx.__class__
+      if t is int:
+        if 0 <= idx < N:
+          ret = _new( B1 )
+          ret._nbits = 1
+          ret._uint  = (s._uint >> idx) & 1
+          return ret
+      elif t is slice:
+        start, stop = idx.start, idx.stop
+        if start.__class__ is int and stop.__class__ is int and \
+           0 <= start < stop <= N and idx.step is None:
+          return _new_bits( stop - start, s._uint >> start )
+      return Bits.__getitem__( s, idx )
+
+    def __setitem__( s, idx, v ):
+      t = idx.__class__
+      if t is int:
+        if 0 <= idx < N:
+          t = v.__class__
+          if t is B1 or ( t is int and -1 <= v <= 1 ):
+            s._uint = (s._uint & ~(1 << idx)) | ((int(v) & 1) << idx)
+            return
+      elif t is slice:
+        start, stop = idx.start, idx.stop
+        if start.__class__ is int and stop.__class__ is int and \
+           0 <= start < stop <= N and idx.step is None:
+          nbits = stop - start
+          t = v.__class__
+          if t is _bits_types.get( nbits ):
+            v = v._uint
+          elif t is not int or not ( -(1 << (nbits - 1)) <= v < (1 << nbits) ):
+            return Bits.__setitem__( s, idx, v )
+          s._uint = (s._uint & ~((1 << stop) - (1 << start))) | \
+                    ((v & ((1 << nbits) - 1)) << start)
+          return
+      return Bits.__setitem__( s, idx, v )
+
+    def __invert__( s ):
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = ~s._uint & M
+      return ret
+
+    def __add__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__add__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = (s._uint + other) & M
+      return ret
+
+    def __radd__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__radd__, Bits.__add__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = (other + s._uint) & M
+      return ret
+
+    def __sub__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__sub__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = (s._uint - other) & M
+      return ret
+
+    def __rsub__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__rsub__, Bits.__sub__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = (other - s._uint) & M
+      return ret
+
+    def __mul__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__mul__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = (s._uint * other) & M
+      return ret
+
+    def __rmul__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__rmul__, Bits.__mul__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = (other * s._uint) & M
+      return ret
+
+    def __and__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__and__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint & other
+      return ret
+
+    def __rand__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__rand__, Bits.__and__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = other & s._uint
+      return ret
+
+    def __or__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__or__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint | other
+      return ret
+
+    def __ror__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__ror__, Bits.__or__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = other | s._uint
+      return ret
+
+    def __xor__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__xor__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint ^ other
+      return ret
+
+    def __rxor__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__rxor__, Bits.__xor__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = other ^ s._uint
+      return ret
+
+    def __floordiv__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__floordiv__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint // other
+      return ret
+
+    def __rfloordiv__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__rfloordiv__, Bits.__floordiv__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = other // s._uint
+      return ret
+
+    def __mod__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__mod__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint % other
+      return ret
+
+    def __rmod__( s, other ):
+      if other.__class__ is not int or not 0 <= other <= M:
+        return _reflected( Bits.__rmod__, Bits.__mod__, s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = other % s._uint
+      return ret
+
+    def __lshift__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__lshift__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = (s._uint << other) & M if other < N else 0
+      return ret
+
+    def __rshift__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__rshift__( s, other )
+      ret = _new( BitsN )
+      ret._nbits = N
+      ret._uint  = s._uint >> other
+      return ret
+
+    # Bool results are kept as is like PythonBits does
+    def __eq__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__eq__( s, other )
+      ret = _new( B1 )
+      ret._nbits = 1
+      ret._uint  = s._uint == other
+      return ret
+
+    def __ne__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__ne__( s, other )
+      ret = _new( B1 )
+      ret._nbits = 1
+      ret._uint  = s._uint != other
+      return ret
+
+    def __lt__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__lt__( s, other )
+      ret = _new( B1 )
+      ret._nbits = 1
+      ret._uint  = s._uint < other
+      return ret
+
+    def __le__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__le__( s, other )
+      ret = _new( B1 )
+      ret._nbits = 1
+      ret._uint  = s._uint <= other
+      return ret
+
+    def __gt__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__gt__( s, other )
+      ret = _new( B1 )
+      ret._nbits = 1
+      ret._uint  = s._uint > other
+      return ret
+
+    def __ge__( s, other ):
+      t = other.__class__
+      if t is BitsN:
+        other = other._uint
+      elif t is not int or not 0 <= other <= M:
+        return Bits.__ge__( s, other )
+      ret = _new( B1 )
+      ret._nbits = 1
+      ret._uint  = s._uint >= other
+      return ret
+
+    # Defining __eq__ resets __hash__ to None
+    __hash__ = Bits.__hash__
+
+  if N == 1:
+    B1 = BitsN
+
+  if _cache_nbits:
+    global _b1_cache
+    if N == 1:
+      _b1_cache = ( _new( BitsN ), _new( BitsN ) )
+      for v, b in enumerate( _b1_cache ):
+        b._nbits = 1
+        b._uint  = v
+      _guard_flyweights( BitsN, lambda b: _b1_cache[ b._uint ] is b )
+
+    for name in ( "__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__" ):
+      setattr( BitsN, name, _mk_cached_cmp( BitsN, M, getattr( operator, name ),
+                                            getattr( Bits, name ) ) )
+
+  BitsN.__name__ = BitsN.__qualname__ = f"Bits{N}"
+  return BitsN
+
+def mk_bits( nbits ):
+  """ Return the width-specialized BitsN class. """
+  nbits = int(nbits)
+  if nbits < 1 or nbits >= 1024:
+    raise ValueError( f"Only support 1 <= nbits < 1024, not {nbits}" )
+  try:
+    return _bits_types[ nbits ]
+  except KeyError:
+    # Bits1 is used by comparisons and bit indexing of every BitsN
+    if nbits != 1 and 1 not in _bits_types:
+      mk_bits( 1 )
+    # Make the classes picklable
+    cls = _bits_types[ nbits ] = globals()[ f"Bits{nbits}" ] = _mk_bits_class( nbits )
+    return cls
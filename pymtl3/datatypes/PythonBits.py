@@ -4,9 +4,20 @@ Bits.py
 ========================================================================
 Pure-Python implementation of fixed-bitwidth data type.
 
+PYMTL_BITS_CACHE=N (N <= 16) turns on a flyweight cache of all Bits of
+at most N bits: the operators return shared instances for such results
+instead of allocating a new Bits every time, e.g. the Bits1 results of
+comparisons. The shared instances are immutable. @= and <<= on a shared
+instance rebind the variable to a new Bits, which is what Python does
+with the return value of an in-place operator anyway, and item
+assignment raises a TypeError. The values of signals and bitstruct
+fields are created by the BitsN constructors and clone(), so they are
+never shared and @=/<<= keep mutating them in place.
+
 Author : Shunning Jiang
 Date   : Oct 31, 2017
 """
+import os
 
 # lower <= value <= upper
 _upper = [ 0,  1 ]
@@ -23,6 +34,10 @@ def _new_valid_bits( nbits, uint ):
   ret._uint  = uint
   return ret
 
+# Operators create their results with _new_result_bits, which returns a
+# shared instance if the flyweight cache is on (see the bottom of this
+# file)
+
 class Bits:
   __slots__ = ( "_nbits", "_uint", "_next" )
 
@@ -139,14 +154,14 @@ class Bits:
 
       # Bypass check
       nbits = stop - start
-      return _new_valid_bits( stop-start, (self._uint >> start) & _upper[nbits] )
+      return _new_result_bits( stop-start, (self._uint >> start) & _upper[nbits] )
 
     i = int(idx)
     if i >= self._nbits or i < 0:
       raise IndexError( f"Invalid access: [{i}] in a Bits{self._nbits} instance" )
 
     # Bypass check
-    return _new_valid_bits( 1, (self._uint >> i) & 1 )
+    return _new_result_bits( 1, (self._uint >> i) & 1 )
 
   def __setitem__( self, idx, v ):
     sv = int(self._uint)
@@ -206,14 +221,14 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '+' (add) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, (self._uint + other._uint) & _upper[nbits] )
+      return _new_result_bits( nbits, (self._uint + other._uint) & _upper[nbits] )
     except AttributeError:
       other = int(other)
       up = _upper[ nbits ]
       if other < 0 or other > up:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(up)}" )
-      return _new_valid_bits( nbits, (self._uint + other) & up )
+      return _new_result_bits( nbits, (self._uint + other) & up )
 
   def __radd__( self, other ):
     return self.__add__( other )
@@ -224,14 +239,14 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '-' (sub) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, (self._uint - other._uint) & _upper[nbits] )
+      return _new_result_bits( nbits, (self._uint - other._uint) & _upper[nbits] )
     except AttributeError:
       other = int(other)
       up = _upper[ nbits ]
       if other < 0 or other > up:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(up)}" )
-      return _new_valid_bits( nbits, (self._uint - other) & up )
+      return _new_result_bits( nbits, (self._uint - other) & up )
 
   def __rsub__( self, other ):
     nbits = self._nbits
@@ -241,7 +256,7 @@ class Bits:
     if other < 0 or other > up:
       raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                         f"Suggestion: 0 <= x <= {hex(up)}" )
-    return _new_valid_bits( nbits, (other - self._uint) & up )
+    return _new_result_bits( nbits, (other - self._uint) & up )
 
   def __mul__( self, other ):
     nbits = self._nbits
@@ -249,14 +264,14 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '*' (mul) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, (self._uint * other._uint) & _upper[nbits] )
+      return _new_result_bits( nbits, (self._uint * other._uint) & _upper[nbits] )
     except AttributeError:
       other = int(other)
       up = _upper[ nbits ]
       if other < 0 or other > up:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(up)}" )
-      return _new_valid_bits( nbits, (self._uint * other) & up)
+      return _new_result_bits( nbits, (self._uint * other) & up)
 
   def __rmul__( self, other ):
     return self.__mul__( other )
@@ -268,13 +283,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '&' (and) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, self._uint & other._uint )
+      return _new_result_bits( nbits, self._uint & other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( nbits, self._uint & other )
+      return _new_result_bits( nbits, self._uint & other )
 
   def __rand__( self, other ):
     return self.__and__( other )
@@ -286,13 +301,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '|' (or) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, self._uint | other._uint )
+      return _new_result_bits( nbits, self._uint | other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( nbits, self._uint | other )
+      return _new_result_bits( nbits, self._uint | other )
 
   def __ror__( self, other ):
     return self.__or__( other )
@@ -303,13 +318,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of  '^' (xor) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, self._uint ^ other._uint )
+      return _new_result_bits( nbits, self._uint ^ other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ self._nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( nbits, self._uint ^ other )
+      return _new_result_bits( nbits, self._uint ^ other )
 
   def __rxor__( self, other ):
     return self.__xor__( other )
@@ -320,13 +335,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '//' (div) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, (self._uint // other._uint) & _upper[nbits] )
+      return _new_result_bits( nbits, (self._uint // other._uint) & _upper[nbits] )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ self._nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( nbits, self._uint // other )
+      return _new_result_bits( nbits, self._uint // other )
 
   def __rfloordiv__( self, other ):
     nbits = self._nbits
@@ -335,7 +350,7 @@ class Bits:
     if other < 0 or other > up:
       raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                         f"Suggestion: 0 <= x <= {hex(up)}" )
-    return _new_valid_bits( nbits, other // self._uint )
+    return _new_result_bits( nbits, other // self._uint )
 
   def __mod__( self, other ):
     nbits = self._nbits
@@ -343,13 +358,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '%' (mod) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, (self._uint % other._uint) & _upper[nbits] )
+      return _new_result_bits( nbits, (self._uint % other._uint) & _upper[nbits] )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( nbits, self._uint % other )
+      return _new_result_bits( nbits, self._uint % other )
 
   def __rmod__( self, other ):
     nbits = self._nbits
@@ -358,11 +373,11 @@ class Bits:
     if other < 0 or other > up:
       raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                         f"Suggestion: 0 <= x <= {hex(up)}" )
-    return _new_valid_bits( nbits, other % self._uint )
+    return _new_result_bits( nbits, other % self._uint )
 
   def __invert__( self ):
     nbits = self._nbits
-    return _new_valid_bits( nbits, ~self._uint & _upper[nbits] )
+    return _new_result_bits( nbits, ~self._uint & _upper[nbits] )
 
   def __lshift__( self, other ):
     nbits = self._nbits
@@ -372,16 +387,16 @@ class Bits:
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
       uint = other._uint
       if uint >= nbits:
-        return _new_valid_bits( self._nbits, 0 )
-      return _new_valid_bits( nbits, (self._uint << uint) & _upper[nbits] )
+        return _new_result_bits( self._nbits, 0 )
+      return _new_result_bits( nbits, (self._uint << uint) & _upper[nbits] )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
       if other >= nbits:
-        return _new_valid_bits( self._nbits, 0 )
-      return _new_valid_bits( nbits, (self._uint << other) & _upper[nbits] )
+        return _new_result_bits( self._nbits, 0 )
+      return _new_result_bits( nbits, (self._uint << other) & _upper[nbits] )
 
   def __rshift__( self, other ):
     nbits = self._nbits
@@ -389,13 +404,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '>>' (rshift) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( nbits, self._uint >> other._uint )
+      return _new_result_bits( nbits, self._uint >> other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( nbits, self._uint >> other )
+      return _new_result_bits( nbits, self._uint >> other )
 
   def __eq__( self, other ):
     nbits = self._nbits
@@ -403,17 +418,17 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '==' (eq) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( 1, self._uint == other._uint )
+      return _new_result_bits( 1, self._uint == other._uint )
     except AttributeError:
       try:
         other = int(other)
       except:
-        return _new_valid_bits( 1, 0 )
+        return _new_result_bits( 1, 0 )
 
       if other < 0 or other > _upper[ nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( 1, self._uint == other )
+      return _new_result_bits( 1, self._uint == other )
 
   def __ne__( self, other ):
     nbits = self._nbits
@@ -421,17 +436,17 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '!=' (ne) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( 1, self._uint != other._uint )
+      return _new_result_bits( 1, self._uint != other._uint )
     except AttributeError:
       try:
         other = int(other)
       except:
-        return _new_valid_bits( 1, 1 )
+        return _new_result_bits( 1, 1 )
 
       if other < 0 or other > _upper[ nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ nbits ])}" )
-      return _new_valid_bits( 1, self._uint != other )
+      return _new_result_bits( 1, self._uint != other )
 
   def __lt__( self, other ):
     nbits = self._nbits
@@ -439,13 +454,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '<' (lt) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( 1, self._uint < other._uint )
+      return _new_result_bits( 1, self._uint < other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ self._nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{self._nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ self._nbits ])}" )
-      return _new_valid_bits( 1, self._uint < other )
+      return _new_result_bits( 1, self._uint < other )
 
   def __le__( self, other ):
     nbits = self._nbits
@@ -453,13 +468,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '<=' (le) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( 1, self._uint <= other._uint )
+      return _new_result_bits( 1, self._uint <= other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ self._nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{self._nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ self._nbits ])}" )
-      return _new_valid_bits( 1, self._uint <= other )
+      return _new_result_bits( 1, self._uint <= other )
 
   def __gt__( self, other ):
     nbits = self._nbits
@@ -467,13 +482,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '>' (gt) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( 1, self._uint > other._uint )
+      return _new_result_bits( 1, self._uint > other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ self._nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{self._nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ self._nbits ])}" )
-      return _new_valid_bits( 1, self._uint > other )
+      return _new_result_bits( 1, self._uint > other )
 
   def __ge__( self, other ):
     nbits = self._nbits
@@ -481,13 +496,13 @@ class Bits:
       if other.nbits != nbits:
         raise ValueError( f"Operands of '>=' (ge) operation must have matching bitwidth, "\
                           f"but here Bits{nbits} != Bits{other.nbits}.\n" )
-      return _new_valid_bits( 1, self._uint >= other._uint )
+      return _new_result_bits( 1, self._uint >= other._uint )
     except AttributeError:
       other = int(other)
       if other < 0 or other > _upper[ self._nbits ]:
         raise ValueError( f"Integer {hex(other)} is not a valid binop operand with Bits{self._nbits}!\n"
                           f"Suggestion: 0 <= x <= {hex(_upper[ self._nbits ])}" )
-      return _new_valid_bits( 1, self._uint >= other )
+      return _new_result_bits( 1, self._uint >= other )
 
   def __bool__( self ):
     return self._uint != 0
@@ -529,3 +544,64 @@ class Bits:
   def hex( self ):
     str = "{:x}".format(int(self._uint)).zfill(((self._nbits-1)//4)+1)
     return "0x"+str
+
+#-------------------------------------------------------------------------
+# Flyweight cache
+#-------------------------------------------------------------------------
+
+_cache_nbits = int( os.getenv( "PYMTL_BITS_CACHE" ) or 0 )
+if not 0 <= _cache_nbits <= 16:
+  raise ValueError( f"PYMTL_BITS_CACHE={_cache_nbits} is not between 0 and 16" )
+
+def _guard_flyweights( cls, is_flyweight ):
+  """ Make the in-place operators of cls leave the shared instances
+  alone: @= and <<= work on a new copy and item assignment raises. The
+  shared instances are exactly of class cls, so the values of signals,
+  which are of a BitsN subclass in most cases, skip the lookup. """
+  imatmul  = cls.__imatmul__
+  ilshift  = cls.__ilshift__
+  setitem  = cls.__setitem__
+
+  def _copy( b ):
+    ret = object_new( cls )
+    ret._nbits = b._nbits
+    ret._uint  = b._uint
+    return ret
+
+  def __imatmul__( self, v ):
+    if self.__class__ is cls and is_flyweight( self ):
+      self = _copy( self )
+    return imatmul( self, v )
+
+  def __ilshift__( self, v ):
+    if self.__class__ is cls and is_flyweight( self ):
+      self = _copy( self )
+    return ilshift( self, v )
+
+  def __setitem__( self, idx, v ):
+    if self.__class__ is cls and is_flyweight( self ):
+      raise TypeError( f"Cannot assign to a slice of the shared Bits{self._nbits} "
+                       f"instance {self!r} (PYMTL_BITS_CACHE={_cache_nbits}).\n"
+                       f"- Suggestion: make a copy with x = x.clone() first" )
+    setitem( self, idx, v )
+
+  cls.__imatmul__ = __imatmul__
+  cls.__ilshift__ = __ilshift__
+  cls.__setitem__ = __setitem__
+
+if _cache_nbits:
+  _bits_cache = [ () ] + [ tuple( _new_valid_bits( n, v ) for v in range( 1 << n ) )
+                           for n in range( 1, _cache_nbits + 1 ) ]
+
+  def _new_cached_bits( nbits, uint ):
+    if nbits <= _cache_nbits:
+      return _bits_cache[ nbits ][ uint ]
+    return _new_valid_bits( nbits, uint )
+
+  def _is_flyweight( b ):
+    nbits = b._nbits
+    return nbits <= _cache_nbits and _bits_cache[ nbits ][ b._uint ] is b
+
+  _guard_flyweights( Bits, _is_flyweight )
+
+_new_result_bits = _new_cached_bits if _cache_nbits else _new_valid_bits
@@ -1,4 +1,18 @@
+from .bits_codecs import BitsCodec, get_codec
 from .bits_import import *
 from .bits_import import _bitwidths
-from .bitstructs import bitstruct, is_bitstruct_class, is_bitstruct_inst, mk_bitstruct
+from .bitstructs import (
+    bitstruct,
+    is_bitstruct_class,
+    is_bitstruct_inst,
+    is_packed_bitstruct_class,
+    mk_bitstruct,
+)
 from .helpers import clog2, concat, reduce_and, reduce_or, reduce_xor, sext, trunc, zext
+from .numpy_helpers import (
+    bits_from_numpy,
+    bits_to_numpy,
+    numpy_dtype,
+    pack_bits,
+    unpack_bits,
+)
@@ -0,0 +1,206 @@
+"""
+========================================================================
+bits_codecs.py
+========================================================================
+Specialized converters between the values of a Bits or bitstruct type
+and the integer of their to_bits(). get_codec( Type ) generates the
+converters once per type and caches them, so every consumer that
+marshals values every cycle (the Verilator import wrappers, VCD
+generation, the exchange of multi-process simulation) reuses the same
+code.
+
+The converters of a bitstruct are straight-line code that shifts and
+masks the integers of all (nested) fields, without the intermediate Bits
+objects of to_bits() and from_bits(). For example, with the pure-Python
+Bits, the converters of a bitstruct with fields x (Bits4) and
+y ([Bits8, Bits8]) look like the following:
+
+  def to_int( x ):
+    return ((x.x._uint & 0xf) << 16) | (x.y[0]._uint & 0xff) | ((x.y[1]._uint & 0xff) << 8)
+
+  def from_int( v ):
+    return _t1( (v >> 16) & 0xf, [ _t0( v & 0xff ), _t0( (v >> 8) & 0xff ) ] )
+
+A codec has the following attributes:
+
+- to_int( x ) and from_int( v ) convert from/to the integer.
+- to_bytes( x ) and from_bytes( b ) convert from/to nbytes little-endian
+  bytes.
+- to_buffer( x, buf ) and from_buffer( buf ) convert from/to the layout
+  of a Verilator port in a cffi buffer: buf[0] holds the whole value of
+  at most 64 bits, and a wider value is split into 32-bit words with
+  the least significant one in buf[0].
+
+Date   : Oct 17, 2026
+"""
+from pymtl3.extra.pypy import custom_exec
+
+from . import PythonBits
+from .bits_import import *
+from .bitstructs import _FIELDS, is_bitstruct_class, is_packed_bitstruct_class
+
+
+class BitsCodec:
+  __slots__ = ( "Type", "nbits", "nbytes", "to_int", "from_int",
+                "to_bytes", "from_bytes", "to_buffer", "from_buffer" )
+
+  def __repr__( self ):
+    return f"BitsCodec({self.Type.__qualname__})"
+
+_codecs = {}
+
+def get_codec( Type ):
+  """ Return the cached codec of a Bits or bitstruct type. """
+  try:
+    return _codecs[ Type ]
+  except ( KeyError, TypeError ):
+    pass
+
+  if not isinstance( Type, type ) or not ( issubclass( Type, Bits ) or is_bitstruct_class( Type ) ):
+    raise TypeError( f"Expect a Bits or bitstruct type, not {Type}" )
+
+  codec = _codecs[ Type ] = _mk_codec( Type )
+  return codec
+
+#-------------------------------------------------------------------------
+# Code generation
+#-------------------------------------------------------------------------
+
+def _field_nbits( type_ ):
+  if isinstance( type_, list ):
+    return len(type_) * _field_nbits( type_[0] )
+  return type_.nbits
+
+# The integer of a pure-Python Bits is an attribute
+if Bits is PythonBits.Bits:
+  def _int( path ):
+    return f"{path}._uint"
+else:
+  def _int( path ):
+    return f"int({path})"
+
+def _shl( expr, lo ):
+  return f"({expr} << {lo})" if lo else expr
+
+def _shr( lo ):
+  return f"(v >> {lo})" if lo else "v"
+
+class _CodeGen:
+  """ Generate the to_int/from_int expressions of a type. The types that
+  the expressions refer to are collected in _globals. """
+
+  def __init__( s ):
+    s._globals = {}
+    s.names    = {}
+
+  def name( s, type_ ):
+    try:
+      return s.names[ type_ ]
+    except KeyError:
+      name = s.names[ type_ ] = f"_t{len(s.names)}"
+      s._globals[ name ] = type_
+      return name
+
+  def to_int_terms( s, type_, path, lo ):
+    """ Return the terms of the value at path whose lsb is lo. The terms
+    are ORed together. """
+
+    if isinstance( type_, list ):
+      w = _field_nbits( type_[0] )
+      terms = []
+      for i in range(len(type_)):
+        terms += s.to_int_terms( type_[0], f"{path}[{i}]", lo + i*w )
+      return terms
+
+    if is_packed_bitstruct_class( type_ ):
+      return [ _shl( f"{path}._v", lo ) ]
+
+    if is_bitstruct_class( type_ ):
+      terms = []
+      hi = lo + type_.nbits
+      for name, typ in getattr( type_, _FIELDS ).items():
+        hi -= _field_nbits( typ )
+        terms += s.to_int_terms( typ, f"{path}.{name}", hi )
+      return terms
+
+    return [ _shl( f"({_int( path )} & {(1 << type_.nbits) - 1:#x})", lo ) ]
+
+  def from_int_expr( s, type_, lo, as_int=False ):
+    """ Return the expression that creates the value whose lsb is lo in
+    v. The generated __init__ of a bitstruct converts the ints of its
+    Bits fields, so these are passed as ints. """
+
+    if isinstance( type_, list ):
+      w = _field_nbits( type_[0] )
+      elems = [ s.from_int_expr( type_[0], lo + i*w ) for i in range(len(type_)) ]
+      return f"[ {', '.join(elems)} ]"
+
+    mask = f"{(1 << type_.nbits) - 1:#x}"
+
+    if is_packed_bitstruct_class( type_ ):
+      return f"{s.name( type_ )}._from_int( {_shr( lo )} & {mask} )"
+
+    if is_bitstruct_class( type_ ):
+      args = []
+      hi = lo + type_.nbits
+      for typ in getattr( type_, _FIELDS ).values():
+        hi -= _field_nbits( typ )
+        args.append( s.from_int_expr( typ, hi, as_int=True ) )
+      return f"{s.name( type_ )}( {', '.join(args)} )"
+
+    if as_int:
+      return f"{_shr( lo )} & {mask}"
+    return f"{s.name( type_ )}( {_shr( lo )} & {mask} )"
+
+def _mk_codec( Type ):
+  nbits  = Type.nbits
+  nbytes = (nbits + 7) >> 3
+  gen    = _CodeGen()
+
+  if is_packed_bitstruct_class( Type ):
+    to_int   = "x._v"
+    from_int = f"{gen.name( Type )}._from_int( v )"
+  elif is_bitstruct_class( Type ):
+    to_int   = " | ".join( gen.to_int_terms( Type, "x", 0 ) )
+    from_int = gen.from_int_expr( Type, 0 )
+  else:
+    to_int   = "int( x )"
+    from_int = f"{gen.name( Type )}( v )"
+
+  if nbits <= 64:
+    to_buffer   = [ f"buf[0] = {to_int}" ]
+    from_buffer = [ "v = buf[0]" ]
+  else:
+    nwords      = (nbits + 31) >> 5
+    to_buffer   = [ f"v = {to_int}" ] + \
+                  [ f"buf[{i}] = {_shr( i*32 )} & 0xffffffff" for i in range(nwords) ]
+    from_buffer = [ f"v = {' | '.join( _shl( f'buf[{i}]', i*32 ) for i in range(nwords) )}" ]
+
+  src = "\n".join( [
+    "def to_int( x ):",
+    f"  return {to_int}",
+    "def from_int( v ):",
+    f"  return {from_int}",
+    "def to_bytes( x ):",
+    f"  return ({to_int}).to_bytes( {nbytes}, 'little' )",
+    "def from_bytes( b ):",
+    "  v = _from_bytes( b, 'little' )",
+    f"  return {from_int}",
+    "def to_buffer( x, buf ):",
+    *[ f"  {x}" for x in to_buffer ],
+    "def from_buffer( buf ):",
+    *[ f"  {x}" for x in from_buffer ],
+    f"  return {from_int}",
+  ] )
+
+  _globals = dict( gen._globals, _from_bytes=int.from_bytes )
+  _locals  = {}
+  custom_exec( compile( src, filename=f"codec_{Type.__name__}", mode="exec" ), _globals, _locals )
+
+  codec = BitsCodec()
+  codec.Type   = Type
+  codec.nbits  = nbits
+  codec.nbytes = nbytes
+  for name in ( "to_int", "from_int", "to_bytes", "from_bytes", "to_buffer", "from_buffer" ):
+    setattr( codec, name, _locals[ name ] )
+  return codec
@@ -6,7 +6,8 @@ Import RPython Bits from PyPy mamba module if the environment variable
 that forces the use of Python Bits is set, and there is actually an
 importable Bits in mamba module. Otherwise import the Pure-Python
 implementation in Bits.py. Then generate a bunch of fixed-width BitsN
-types for PyMTL use.
+types for PyMTL use. PYMTL_BITS=fast selects the width-specialized
+pure-Python BitsN types in FastBits.py instead.
 
 Author : Shunning Jiang
 Date   : Aug 23, 2018
@@ -34,6 +35,14 @@ class Bits{0}(Bits):
     return super().__init__( {0}, v, trunc_int )
 _bits_types[{0}] = b{0} = Bits{0}
 """
+elif os.getenv("PYMTL_BITS") == "fast":
+  from .FastBits import mk_bits as _mk_fast_bits
+  from .PythonBits import Bits
+
+  # print("[env: PYMTL_BITS=fast] Use width-specialized Python Bits")
+  bits_template = """
+_bits_types[{0}] = b{0} = Bits{0} = _mk_fast_bits({0})
+"""
 else:
   try:
     from mamba import Bits
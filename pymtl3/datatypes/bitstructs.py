@@ -45,6 +45,15 @@ class Pixel:
   def __str__( self ):
     return f'({self.r},{self.g},{self.b})'
 
+@bitstruct( packed=True ) and mk_bitstruct( ..., packed=True ) create a
+packed bitstruct that stores all fields in a single integer laid out the
+same way as to_bits(). Its fields are properties that shift and mask the
+integer, so to_bits, from_bits and clone don't touch the fields at all.
+Reading a field returns a new value (like slicing a Bits), so a packed
+bitstruct can only be modified by assigning to its fields, e.g.
+msg.data = 3 instead of msg.data[0:8] @= 3. Packed bitstructs are meant
+for CL/FL messages and cannot be the type of an RTL signal.
+
 Author : Yanghui Ou, Shunning Jiang
   Date : Oct 19, 2019
 """
@@ -83,6 +92,14 @@ def is_bitstruct_class(cls):
   """Returns True if obj is a dataclass ."""
   return isinstance(cls, type) and hasattr(cls, _FIELDS)
 
+# Packed bitstructs have this attribute set to True
+
+_PACKED = '__bitstruct_packed__'
+
+def is_packed_bitstruct_class( cls ):
+  """Returns True if cls is a packed bitstruct."""
+  return is_bitstruct_class( cls ) and getattr( cls, _PACKED, False )
+
 def get_bitstruct_inst_all_classes( obj ):
   # list: put all types together
   if isinstance( obj, list ):
@@ -246,43 +263,61 @@ def _mk_repr_fn( fields ):
 #-------------------------------------------------------------------------
 # _mk_eq_fn
 #-------------------------------------------------------------------------
-# Creates a __eq__ function based on fields. By default it just compares
-# each field. For example, if fields contains two field x (Bits4) and y
-# (Bits4), _mk_eq_fn will return a function that looks like the
-# following:
+# Creates a __eq__ function based on fields. Two bitstructs are compared
+# by their canonical integer, i.e. the integer of to_bits() computed by
+# the cached codec of the class (see bits_codecs.py) without creating any
+# Bits object. If a field doesn't hold a Bits (e.g. an int was assigned to
+# it), we fall back to comparing each field. For example, if fields
+# contains two field x (Bits4) and y (Bits4), _mk_eq_fn will return a
+# function that looks like the following:
 #
 # def __eq__( self, other ):
-#   if other.__class__ is self.__class__:
+#   if other.__class__ is not self.__class__:
+#     return False
+#   try:
+#     return _key( self ) == _key( other )
+#   except ( AttributeError, TypeError ):
 #     return (self.x,self.y,) == (other.x,other.y,)
-#   else:
-#     raise NotImplemented
 
-def _mk_eq_fn( fields ):
+def _mk_eq_fn( fields, key ):
   self_tuple  = _mk_tuple_str( 'self', fields )
   other_tuple = _mk_tuple_str( 'other', fields )
   return _create_fn(
     '__eq__',
     [ 'self', 'other' ],
-    [ f'return (other.__class__ is self.__class__) and {self_tuple} == {other_tuple}' ]
+    [ 'if other.__class__ is not self.__class__:',
+      '  return False',
+      'try:',
+      '  return _key( self ) == _key( other )',
+      'except ( AttributeError, TypeError ):',
+      f'  return {self_tuple} == {other_tuple}' ],
+    _globals={ '_key': key },
   )
 
 #-------------------------------------------------------------------------
 # _mk_hash_fn
 #-------------------------------------------------------------------------
-# Creates a __hash__ function based on fields. By default it just hashes
-# all fields. For example, if fields contains two field x (Bits4) and y
-# (Bits4), _mk_hash_fn will return a function that looks like the
-# following:
+# Creates a __hash__ function that hashes the canonical integer, which is
+# consistent with __eq__. For example, if fields contains two field x
+# (Bits4) and y (Bits4), _mk_hash_fn will return a function that looks
+# like the following:
 #
 # def __hash__( self ):
-#   return hash((self.x,self.y,))
+#   try:
+#     return hash( _key( self ) )
+#   except ( AttributeError, TypeError ):
+#     return hash((self.x,self.y,))
 
-def _mk_hash_fn( fields ):
+def _mk_hash_fn( fields, key ):
   self_tuple = _mk_tuple_str( 'self', fields )
   return _create_fn(
     '__hash__',
     [ 'self' ],
-    [ f'return hash({self_tuple})' ]
+    [ 'try:',
+      '  return hash( _key( self ) )',
+      'except ( AttributeError, TypeError ):',
+      f'  return hash({self_tuple})' ],
+    _globals={ '_key': key },
   )
 
 #--------------------------PyMTL3 specific--------------------------------
@@ -518,6 +553,189 @@ def _mk_from_bits_fns( fields, total_nbits ):
                      [ "assert cls.nbits == other.nbits, f'LHS bitstruct {cls.nbits}-bit <> RHS other {other.nbits}-bit'",
                        "other = other.to_bits()",
                        f"return cls({','.join(from_bits_strs)})" ], _globals )
+#--------------------------Packed bitstruct-----------------------------
+
+#-------------------------------------------------------------------------
+# _mk_packed_codec
+#-------------------------------------------------------------------------
+# Returns ( decode, encode ) of a field type in a packed bitstruct.
+# decode( v ) creates the value from the lowest bits of the integer v, and
+# encode( x ) returns the value x as an integer. The bits of a list are
+# laid out in the same way as to_bits, i.e. x[0] takes the lowest bits.
+
+def _mk_packed_codec( type_ ):
+
+  if isinstance( type_, list ):
+    n = len(type_)
+    elem_decode, elem_encode = _mk_packed_codec( type_[0] )
+    w = _get_field_nbits( type_[0] )
+
+    def decode( v ):
+      return [ elem_decode( v >> (i*w) ) for i in range(n) ]
+
+    def encode( x ):
+      if len(x) != n:
+        raise ValueError( f"Expect a list of {n} elements, not {len(x)}" )
+      v = 0
+      for i in range(n):
+        v |= elem_encode( x[i] ) << (i*w)
+      return v
+
+    return decode, encode
+
+  nbits = type_.nbits
+  mask  = (1 << nbits) - 1
+
+  if is_bitstruct_class( type_ ):
+    if is_packed_bitstruct_class( type_ ):
+      from_int = type_._from_int
+      def decode( v ):
+        return from_int( v & mask )
+    else:
+      def decode( v ):
+        return type_.from_bits( Bits( nbits, v & mask ) )
+
+    def encode( x ):
+      if x.__class__ is not type_:
+        raise TypeError( f"Expect a {type_.__name__} bitstruct, not {x!r}" )
+      return int( x.to_bits() )
+
+    return decode, encode
+
+  def decode( v ):
+    return type_( v & mask )
+
+  def encode( x ):
+    if x.__class__ is int and 0 <= x <= mask:
+      return x
+    return int( type_( x ) )
+
+  return decode, encode
+
+def _get_field_nbits( type_ ):
+  if isinstance( type_, list ):
+    return len(type_) * _get_field_nbits( type_[0] )
+  return type_.nbits
+
+#-------------------------------------------------------------------------
+# _mk_packed_fns
+#-------------------------------------------------------------------------
+# Creates all methods and field properties of a packed bitstruct. The
+# first field takes the highest bits, as in to_bits. For example, if the
+# fields are x (Bits4) and y (Bits8), the property of x looks like the
+# following:
+#
+# def _get_x( self ):
+#   return _type_x( (self._v >> 8) & 0xf )
+#
+# def _set_x( self, x ):
+#   if x.__class__ is not int or not 0 <= x <= 0xf:
+#     x = int( _type_x( x ) )
+#   self._v = (self._v & ~0xf00) | (x << 8)
+#
+# and __init__ looks like the following:
+#
+# def __init__( s, x = 0, y = 0 ):
+#   if x.__class__ is not int or not 0 <= x <= 0xf:
+#     x = int( _type_x( x ) )
+#   ...
+#   s._v = (x << 8) | y
+
+def _mk_packed_fns( self_name, fields ):
+  total_nbits = sum( _get_field_nbits( type_ ) for type_ in fields.values() )
+
+  _globals = { '_Bits': Bits }
+  props = {}
+  init_strs = []
+  init_vals = []
+
+  lo = total_nbits
+  for name, type_ in fields.items():
+    nbits = _get_field_nbits( type_ )
+    lo   -= nbits
+    mask  = (1 << nbits) - 1
+
+    if isinstance( type_, list ) or is_bitstruct_class( type_ ):
+      _globals[ f'_dec_{name}' ], _globals[ f'_enc_{name}' ] = _mk_packed_codec( type_ )
+      get_strs  = [ f'return _dec_{name}( self._v >> {lo} )' ]
+      conv_strs = [ f'x = _enc_{name}( x )' ]
+      init_strs.append( f'{name} = 0 if {name} is None else _enc_{name}( {name} )' )
+
+    else:
+      _globals[ f'_type_{name}' ] = type_
+      get_strs  = [ f'return _type_{name}( (self._v >> {lo}) & {mask:#x} )' ]
+      conv_strs = [ f'if x.__class__ is not int or not 0 <= x <= {mask:#x}:',
+                    f'  x = int( _type_{name}( x ) )' ]
+      init_strs += [ f'if {name}.__class__ is not int or not 0 <= {name} <= {mask:#x}:',
+                     f'  {name} = int( _type_{name}( {name} ) )' ]
+
+    init_vals.append( f'({name} << {lo})' if lo else name )
+
+    props[ name ] = property(
+      _create_fn( f'_get_{name}', [ 'self' ], get_strs, _globals ),
+      _create_fn( f'_set_{name}', [ 'self', 'x' ],
+                  conv_strs + [ f'self._v = (self._v & {~(mask << lo)}) | (x << {lo})' ], _globals ),
+    )
+
+  fns = {}
+
+  fns['__init__'] = _create_fn( '__init__',
+    [ self_name ] + [ _mk_init_arg( *field ) for field in fields.items() ],
+    init_strs + [ f"{self_name}._v = {' | '.join(init_vals)}" ], _globals )
+
+  fns['_from_int'] = classmethod( _create_fn( '_from_int', [ 'cls', 'v' ],
+    [ 'ret = _new( cls )', 'ret._v = v', 'return ret' ], { '_new': object.__new__ } ) )
+
+  fns['__eq__'] = _create_fn( '__eq__', [ 'self', 'other' ],
+    [ 'return (other.__class__ is self.__class__) and self._v == other._v' ] )
+
+  fns['__hash__'] = _create_fn( '__hash__', [ 'self' ], [ 'return hash(self._v)' ] )
+
+  fns['to_bits'] = _create_fn( 'to_bits', [ 'self' ],
+    [ f'return _Bits( {total_nbits}, self._v )' ], _globals )
+
+  fns['from_bits'] = classmethod( _create_fn( 'from_bits', [ 'cls', 'other' ],
+    [ "assert cls.nbits == other.nbits, f'LHS bitstruct {cls.nbits}-bit <> RHS other {other.nbits}-bit'",
+      "return cls._from_int( int( other.to_bits() ) )" ] ) )
+
+  fns['clone'] = _create_fn( 'clone', [ 'self' ],
+    [ 'return self._from_int( self._v )' ] )
+
+  fns['__deepcopy__'] = _create_fn( '__deepcopy__', [ 'self', 'memo' ],
+    [ 'return self._from_int( self._v )' ] )
+
+  fns['__imatmul__'] = _create_fn( '__imatmul__', [ 'self', 'other' ],
+    [ 'if self.__class__ is not other.__class__:',
+      '  other = self.__class__.from_bits( other.to_bits() )',
+      'self._v = other._v',
+      'return self' ] )
+
+  fns['__ilshift__'] = _create_fn( '__ilshift__', [ 'self', 'other' ],
+    [ 'if self.__class__ is not other.__class__:',
+      '  other = self.__class__.from_bits( other.to_bits() )',
+      'self._next = other._v',
+      'return self' ] )
+
+  fns['_flip'] = _create_fn( '_flip', [ 'self' ], [ 'self._v = self._next' ] )
+
+  return total_nbits, props, fns
+
+#-------------------------------------------------------------------------
+# _mk_packed_class
+#-------------------------------------------------------------------------
+# Recreates cls with __slots__ so that a packed bitstruct only holds the
+# integer. This is what dataclass( slots=True ) does.
+
+def _mk_packed_class( cls ):
+  cls_dict = dict( cls.__dict__ )
+  cls_dict.pop( '__dict__', None )
+  cls_dict.pop( '__weakref__', None )
+  cls_dict['__slots__'] = ( '_v', '_next' )
+
+  new_cls = type(cls)( cls.__name__, cls.__bases__, cls_dict )
+  new_cls.__qualname__ = cls.__qualname__
+  return new_cls
+
 #-------------------------------------------------------------------------
 # _check_valid_array
 #-------------------------------------------------------------------------
@@ -590,7 +808,7 @@ def _get_self_name( fields ):
 _bitstruct_hash_cache = {}
 
 def _process_class( cls, add_init=True, add_str=True, add_repr=True,
-                    add_hash=True ):
+                    add_hash=True, packed=False ):
 
   # Get annotations of the class
   cls_annotations = cls.__dict__.get('__annotations__', {})
@@ -609,6 +827,8 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
     return x
 
   reserved_fields = ['to_bits', 'from_bits', 'nbits']
+  if packed:
+    reserved_fields += ['_v', '_next', '_from_int']
   for x in reserved_fields:
     assert x not in cls.__dict__, f"Currently a bitstruct cannot have {reserved_fields}, but "\
                                   f"{x} is provided as {cls.__dict__[x]}"
@@ -622,16 +842,23 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
     hashable_fields[ a_name ] = _convert_list_to_tuple( a_type )
 
   cls._hash = _hash = hash( (cls.__name__, *tuple(hashable_fields.items()),
-                             add_init, add_str, add_repr, add_hash) )
+                             add_init, add_str, add_repr, add_hash, packed) )
 
   if _hash in _bitstruct_hash_cache:
     return _bitstruct_hash_cache[ _hash ]
 
+  if packed:
+    cls = _mk_packed_class( cls )
+
   _bitstruct_hash_cache[ _hash ] = cls
 
   # Stamp the special attribute so that translation pass can identify it
   # as bit struct.
   setattr( cls, _FIELDS, fields )
+  setattr( cls, _PACKED, packed )
+
+  if packed:
+    return _process_packed_class( cls, fields, add_init, add_str, add_repr, add_hash )
 
   # Add methods to the class
 
@@ -652,25 +879,6 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
     if not '__repr__' in cls.__dict__:
       cls.__repr__ = _mk_repr_fn( fields )
 
-  # Create __eq__. There is no need for a __ne__ method as python will
-  # call __eq__ and negate it.
-  # NOTE: if user overwrites __eq__ it may lead to different behavior for
-  # the translated verilog as in the verilog world two bit structs are
-  # equal only if all the fields are equal. We always try to add __eq__
-
-  if not '__eq__' in cls.__dict__:
-    cls.__eq__ = _mk_eq_fn( fields )
-  else:
-    w_msg = ( f'Overwriting {cls.__qualname__}\'s __eq__ may cause the '
-              'translated verilog behaves differently from PyMTL '
-              'simulation.')
-    warnings.warn( w_msg )
-
-  # Create __hash__.
-  if add_hash:
-    if not '__hash__' in cls.__dict__:
-      cls.__hash__ = _mk_hash_fn( fields )
-
   # Shunning: add __ilshift__ and _flip for update_ff
   assert not '__ilshift__' in cls.__dict__ and not '_flip' in cls.__dict__
 
@@ -693,6 +901,37 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
   from_bits = _mk_from_bits_fns( fields, cls.nbits )
   cls.from_bits = classmethod(from_bits)
 
+  # __eq__ and __hash__ use the codec, which needs nbits and the fields
+
+  from .bits_codecs import get_codec
+  key = get_codec( cls ).to_int
+
+  # Create __eq__. There is no need for a __ne__ method as python will
+  # call __eq__ and negate it.
+  # NOTE: if user overwrites __eq__ it may lead to different behavior for
+  # the translated verilog as in the verilog world two bit structs are
+  # equal only if all the fields are equal. We always try to add __eq__
+
+  if not '__eq__' in cls.__dict__:
+    cls.__eq__ = _mk_eq_fn( fields, key )
+  else:
+    w_msg = ( f'Overwriting {cls.__qualname__}\'s __eq__ may cause the '
+              'translated verilog behaves differently from PyMTL '
+              'simulation.')
+    warnings.warn( w_msg )
+
+  # Create __hash__.
+  if add_hash:
+    if not '__hash__' in cls.__dict__:
+      cls.__hash__ = _mk_hash_fn( fields, key )
+
+  _add_get_field_type( cls )
+
+  # TODO: maybe add a to_bits and from bits function.
+
+  return cls
+
+def _add_get_field_type( cls ):
   assert not 'get_field_type' in cls.__dict__
 
   def get_field_type( cls, name ):
@@ -702,7 +941,35 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
 
   cls.get_field_type = classmethod(get_field_type)
 
-  # TODO: maybe add a to_bits and from bits function.
+def _process_packed_class( cls, fields, add_init, add_str, add_repr, add_hash ):
+
+  for name in [ '__ilshift__', '_flip', 'clone', '__deepcopy__', '__imatmul__' ]:
+    assert name not in cls.__dict__
+
+  cls.nbits, props, fns = _mk_packed_fns( _get_self_name(fields), fields )
+
+  for name, prop in props.items():
+    setattr( cls, name, prop )
+
+  if not add_init or '__init__' in cls.__dict__:
+    del fns['__init__']
+  if add_str and not '__str__' in cls.__dict__:
+    cls.__str__ = _mk_str_fn( fields )
+  if add_repr and not '__repr__' in cls.__dict__:
+    cls.__repr__ = _mk_repr_fn( fields )
+
+  if '__eq__' in cls.__dict__:
+    del fns['__eq__']
+    warnings.warn( f'Overwriting {cls.__qualname__}\'s __eq__ may cause the '
+                   'translated verilog behaves differently from PyMTL '
+                   'simulation.' )
+  if not add_hash or '__hash__' in cls.__dict__:
+    del fns['__hash__']
+
+  for name, fn in fns.items():
+    setattr( cls, name, fn )
+
+  _add_get_field_type( cls )
 
   return cls
 
@@ -712,10 +979,11 @@ def _process_class( cls, add_init=True, add_str=True, add_repr=True,
 # The actual class decorator. We add a * in the argument list so that the
 # following argument can only be used as keyword arguments.
 
-def bitstruct( _cls=None, *, add_init=True, add_str=True, add_repr=True, add_hash=True ):
+def bitstruct( _cls=None, *, add_init=True, add_str=True, add_repr=True, add_hash=True,
+               packed=False ):
 
   def wrap( cls ):
-    return _process_class( cls, add_init, add_str, add_repr )
+    return _process_class( cls, add_init, add_str, add_repr, packed=packed )
 
   # Called as @bitstruct(...)
   if _cls is None:
@@ -731,7 +999,7 @@ def bitstruct( _cls=None, *, add_init=True, add_str=True, add_repr=True, add_has
 # TODO: should we add base parameters to support inheritence?
 
 def mk_bitstruct( cls_name, fields, *, namespace=None, add_init=True,
-                   add_str=True, add_repr=True, add_hash=True ):
+                   add_str=True, add_repr=True, add_hash=True, packed=False ):
 
   # copy namespace since  will mutate it
   namespace = {} if namespace is None else namespace.copy()
@@ -750,4 +1018,4 @@ def mk_bitstruct( cls_name, fields, *, namespace=None, add_init=True,
   namespace['__annotations__'] = annos
   cls = types.new_class( cls_name, (), {}, lambda ns: ns.update( namespace ) )
   return bitstruct( cls, add_init=add_init, add_str=add_str,
-                    add_repr=add_repr, add_hash=add_hash )
+                    add_repr=add_repr, add_hash=add_hash, packed=packed )
@@ -0,0 +1,253 @@
+"""
+========================================================================
+numpy_helpers.py
+========================================================================
+Bulk conversion between NumPy arrays and lists of Bits/bitstructs.
+
+- numpy_dtype( Type ) returns the dtype of an array of Type values. A
+  BitsN type of N <= 64 maps to the smallest unsigned integer type that
+  holds N bits, and a wider one to N/8 (rounded up) little-endian bytes.
+  A bitstruct maps to a structured dtype with the same field names,
+  where list fields become subarrays and nested bitstructs become nested
+  structured dtypes.
+
+- bits_to_numpy( Type, values ) and bits_from_numpy( Type, array )
+  convert a list of Type values to such an array and back. Every field
+  is converted as a whole column, so there is no per-element dispatch on
+  the field types.
+
+- pack_bits( Type, values ) and unpack_bits( Type, buffer ) convert
+  between a list of values and a byte buffer in which every value takes
+  Type.nbits/8 (rounded up) little-endian bytes of its to_bits(). This
+  is handy to stream test vectors of wide messages from/to files.
+
+NumPy is only imported when one of these functions is called.
+
+Date   : Oct 17, 2026
+"""
+from .bits_import import *
+from .bitstructs import is_bitstruct_class, is_packed_bitstruct_class
+
+
+def _import_numpy():
+  try:
+    import numpy as np
+  except ImportError:
+    raise ImportError( "Bulk Bits conversion requires NumPy. Please install it with pip install numpy." )
+  return np
+
+def _nbytes( nbits ):
+  return (nbits + 7) >> 3
+
+def _uint_dtype( np, nbits ):
+  for dtype in ( np.uint8, np.uint16, np.uint32, np.uint64 ):
+    if nbits <= np.dtype( dtype ).itemsize * 8:
+      return np.dtype( dtype )
+  return None
+
+def _check_type( Type ):
+  if not isinstance( Type, type ) or not ( issubclass( Type, Bits ) or is_bitstruct_class( Type ) ):
+    raise TypeError( f"Expect a Bits or bitstruct type, not {Type}" )
+
+#-------------------------------------------------------------------------
+# numpy_dtype
+#-------------------------------------------------------------------------
+
+def _field_dtype( np, type_ ):
+  if isinstance( type_, list ):
+    shape = []
+    while isinstance( type_, list ):
+      shape.append( len(type_) )
+      type_ = type_[0]
+    return ( _field_dtype( np, type_ ), tuple(shape) )
+
+  if is_bitstruct_class( type_ ):
+    return np.dtype( [ ( name, _field_dtype( np, typ ) )
+                       for name, typ in type_.__bitstruct_fields__.items() ] )
+
+  dtype = _uint_dtype( np, type_.nbits )
+  if dtype is None:
+    return np.dtype( ( np.uint8, _nbytes( type_.nbits ) ) )
+  return dtype
+
+def numpy_dtype( Type ):
+  """ Return the NumPy dtype of an array of Type values. """
+  _check_type( Type )
+  np = _import_numpy()
+  dtype = _field_dtype( np, Type )
+  return np.dtype( dtype ) if isinstance( dtype, tuple ) else dtype
+
+#-------------------------------------------------------------------------
+# bits_to_numpy
+#-------------------------------------------------------------------------
+
+def _wide_to_bytes( nbits, ints ):
+  nbytes = _nbytes( nbits )
+  return b"".join( [ x.to_bytes( nbytes, "little" ) for x in ints ] )
+
+def _fill_column( np, type_, values, out ):
+  """ Write the list of values of type_ into out, an array whose first
+  dimension has len(values) elements. """
+
+  if isinstance( type_, list ):
+    for i in range(len(type_)):
+      _fill_column( np, type_[0], [ x[i] for x in values ], out[:, i] )
+
+  elif is_bitstruct_class( type_ ):
+    for name, typ in type_.__bitstruct_fields__.items():
+      _fill_column( np, typ, [ getattr( x, name ) for x in values ], out[name] )
+
+  else:
+    nbits = type_.nbits
+    ints  = [ int(x) for x in values ]
+    if _uint_dtype( np, nbits ) is None:
+      out[...] = np.frombuffer( _wide_to_bytes( nbits, ints ), dtype=np.uint8 ).reshape( out.shape )
+    else:
+      out[...] = np.array( ints, dtype=out.dtype )
+
+def bits_to_numpy( Type, values ):
+  """ Return a NumPy array of numpy_dtype( Type ) with the values. """
+  _check_type( Type )
+  np = _import_numpy()
+
+  values = list( values )
+  out = np.zeros( len(values), dtype=numpy_dtype( Type ) )
+  _fill_column( np, Type, values, out )
+  return out
+
+#-------------------------------------------------------------------------
+# bits_from_numpy
+#-------------------------------------------------------------------------
+# The generated __init__ of a bitstruct converts the ints of its Bits
+# fields, so we pass the ints instead of creating the Bits objects twice.
+
+def _read_ints( np, nbits, arr ):
+  """ Return the list of Python ints in arr, an array of numpy_dtype of a
+  BitsN type or of the to_bits() values of a bitstruct. """
+  if arr.ndim == 2 and arr.dtype == np.uint8:
+    # Wide values as little-endian bytes
+    nbytes = arr.shape[1]
+    data   = np.ascontiguousarray( arr ).tobytes()
+    return [ int.from_bytes( data[i:i+nbytes], "little" )
+             for i in range( 0, len(data), nbytes ) ]
+
+  if arr.ndim != 1 or arr.dtype.kind not in "iub":
+    raise ValueError( f"Cannot convert an array of {arr.dtype} with shape {arr.shape} "
+                      f"to {nbits}-bit values" )
+  return arr.tolist()
+
+def _from_ints( type_, ints, as_int=False ):
+  """ Return the list of type_ values whose to_bits() are ints. """
+
+  if isinstance( type_, list ):
+    n = len(type_)
+    w = _field_nbits( type_[0] )
+    mask = (1 << w) - 1
+    columns = [ _from_ints( type_[0], [ (v >> (i*w)) & mask for v in ints ] ) for i in range(n) ]
+    return [ list(x) for x in zip( *columns ) ]
+
+  if is_bitstruct_class( type_ ):
+    if is_packed_bitstruct_class( type_ ):
+      from_int = type_._from_int
+      mask     = (1 << type_.nbits) - 1
+      for v in ints:
+        if not 0 <= v <= mask:
+          raise ValueError( f"Value {hex(v)} is too wide for {type_.__qualname__}" )
+      return [ from_int( v ) for v in ints ]
+
+    for v in ints:
+      if v >> type_.nbits:
+        raise ValueError( f"Value {hex(v)} is too wide for {type_.__qualname__}" )
+
+    columns = []
+    lo = type_.nbits
+    for typ in type_.__bitstruct_fields__.values():
+      w    = _field_nbits( typ )
+      lo  -= w
+      mask = (1 << w) - 1
+      columns.append( _from_ints( typ, [ (v >> lo) & mask for v in ints ], as_int=True ) )
+    return [ type_( *x ) for x in zip( *columns ) ]
+
+  if as_int:
+    return ints
+  return [ type_( x ) for x in ints ]
+
+def _field_nbits( type_ ):
+  if isinstance( type_, list ):
+    return len(type_) * _field_nbits( type_[0] )
+  return type_.nbits
+
+def _read_column( np, type_, arr, as_int=False ):
+  """ Return the list of type_ values in arr, an array whose first
+  dimension is the index of the value. """
+
+  if isinstance( type_, list ):
+    columns = [ _read_column( np, type_[0], arr[:, i] ) for i in range(len(type_)) ]
+    return [ list(x) for x in zip( *columns ) ]
+
+  if is_bitstruct_class( type_ ):
+    names = arr.dtype.names
+    if names is None:
+      # A plain integer array of the to_bits() values
+      return _from_ints( type_, _read_ints( np, type_.nbits, arr ) )
+
+    columns = []
+    for name, typ in type_.__bitstruct_fields__.items():
+      if name not in names:
+        raise ValueError( f"The structured array has no field '{name}' of {type_.__qualname__}" )
+      columns.append( _read_column( np, typ, arr[name], as_int=True ) )
+    return [ type_( *x ) for x in zip( *columns ) ]
+
+  ints = _read_ints( np, type_.nbits, arr )
+  if as_int:
+    return ints
+  return [ type_( x ) for x in ints ]
+
+def bits_from_numpy( Type, arr ):
+  """ Return the list of Type values in the array. For a bitstruct Type,
+  the array is either a structured array with the fields of Type or an
+  array of the to_bits() values. """
+  _check_type( Type )
+  np = _import_numpy()
+  return _read_column( np, Type, np.asarray( arr ) )
+
+#-------------------------------------------------------------------------
+# pack_bits/unpack_bits
+#-------------------------------------------------------------------------
+
+def pack_bits( Type, values ):
+  """ Return the bytes of the to_bits() values, each of which takes
+  Type.nbits/8 (rounded up) little-endian bytes. """
+  _check_type( Type )
+  np = _import_numpy()
+
+  nbits  = Type.nbits
+  nbytes = _nbytes( nbits )
+  ints   = [ int( x.to_bits() ) for x in values ]
+
+  if nbits > 64:
+    return _wide_to_bytes( nbits, ints )
+
+  arr = np.array( ints, dtype="<u8" ).view( np.uint8 ).reshape( -1, 8 )
+  return arr[:, :nbytes].tobytes()
+
+def unpack_bits( Type, buf ):
+  """ Return the list of Type values in a buffer created by pack_bits. """
+  _check_type( Type )
+  np = _import_numpy()
+
+  nbits  = Type.nbits
+  nbytes = _nbytes( nbits )
+
+  data = np.frombuffer( buf, dtype=np.uint8 )
+  if data.size % nbytes:
+    raise ValueError( f"The buffer of {data.size} bytes is not a multiple of "
+                      f"{nbytes} bytes for {Type.__name__}" )
+  data = data.reshape( -1, nbytes )
+
+  if nbits <= 64:
+    arr = np.zeros( ( len(data), 8 ), dtype=np.uint8 )
+    arr[:, :nbytes] = data
+    data = arr.view( "<u8" ).reshape( -1 )
+
+  return _from_ints( Type, _read_ints( np, nbits, data ) )
@@ -0,0 +1,108 @@
+#=========================================================================
+# FastBits_test.py
+#=========================================================================
+# Compare the width-specialized Bits against the generic Python Bits.
+#
+# Date   : Oct 16, 2026
+
+import operator
+import pickle
+import random
+from copy import deepcopy
+
+import pytest
+
+from ..FastBits import mk_bits
+from ..PythonBits import Bits
+
+_binops = [ operator.add, operator.sub, operator.mul, operator.and_,
+            operator.or_, operator.xor, operator.floordiv, operator.mod,
+            operator.lshift, operator.rshift ]
+
+_cmpops = [ operator.eq, operator.ne, operator.lt, operator.le, operator.gt, operator.ge ]
+
+def _generic( x ):
+  return Bits( x.nbits, int(x) ) if isinstance( x, Bits ) else x
+
+def _call( f, *args ):
+  try:
+    ret = f( *args )
+  except TypeError:
+    # The message contains the class name
+    return TypeError
+  except Exception as e:
+    return type(e), str(e)
+  if isinstance( ret, Bits ):
+    return ret.nbits, int(ret)
+  return ret
+
+def _operands( nbits, rng ):
+  up = (1 << nbits) - 1
+  return [ 0, 1, up, rng.randrange( up + 1 ), -1, up + 1, nbits, None ]
+
+@pytest.mark.parametrize( "nbits", [ 1, 2, 7, 16, 32, 33, 64, 100 ] )
+def test_binops_match_python_bits( nbits ):
+  rng = random.Random( nbits )
+  F   = mk_bits( nbits )
+
+  for _ in range(20):
+    a = rng.randrange( 1 << nbits )
+    for b in _operands( nbits, rng ):
+      for op in _binops + _cmpops:
+        if b is None:
+          args = [ ( F(a), F(a // 2 + 1) ), ( Bits(nbits, a), Bits(nbits, a // 2 + 1) ) ]
+        else:
+          args = [ ( F(a), b ), ( Bits(nbits, a), b ) ]
+        # Same width, generic Bits and wider Bits operands
+        for x, y in args + [ ( F(a), Bits(nbits, a) ),
+                             ( F(a), mk_bits(nbits + 1)(a) ) ]:
+          assert _call( op, x, y ) == _call( op, _generic( x ), _generic( y ) )
+
+        # Python tries the reflected method of the subclass first
+        if op not in _cmpops:
+          y = mk_bits(nbits + 1)(a)
+          assert _call( op, Bits(nbits, a), y ) == _call( op, Bits(nbits, a), _generic( y ) )
+        if b is not None:
+          assert _call( op, b, F(a) ) == _call( op, b, Bits(nbits, a) )
+
+    assert _call( operator.invert, F(a) ) == _call( operator.invert, Bits(nbits, a) )
+
+@pytest.mark.parametrize( "nbits", [ 1, 5, 16, 64 ] )
+def test_assign_and_index_match_python_bits( nbits ):
+  rng = random.Random( nbits )
+  F   = mk_bits( nbits )
+  up  = (1 << nbits) - 1
+
+  for v in [ 0, up, -1, -(1 << (nbits-1)), -(1 << (nbits-1)) - 1, up + 1,
+             F(up), mk_bits(nbits+1)(1), Bits(nbits, 1), True ]:
+    for method in [ "__imatmul__", "__ilshift__" ]:
+      x, y = F(3 & up), Bits( nbits, 3 & up )
+      assert _call( getattr( x, method ), v ) == _call( getattr( y, method ), v )
+      assert ( x._uint, getattr( x, "_next", None ) ) == ( y._uint, getattr( y, "_next", None ) )
+
+    assert _call( F, v ) == _call( Bits, nbits, v )
+
+  for _ in range(50):
+    a = rng.randrange( up + 1 )
+    i = rng.randrange( -1, nbits + 1 )
+    j = rng.randrange( -1, nbits + 2 )
+    for idx in [ i, slice( i, j ), slice( None, j ), slice( i, j, 1 ), Bits( 8, i & 0xff ) ]:
+      assert _call( operator.getitem, F(a), idx ) == _call( operator.getitem, Bits(nbits, a), idx )
+
+      for v in [ 0, 1, -1, 2, rng.randrange( up + 1 ), mk_bits(1)(1),
+                 mk_bits( max( 1, j - i ) )(0) ]:
+        x, y = F(a), Bits( nbits, a )
+        assert _call( operator.setitem, x, idx, v ) == _call( operator.setitem, y, idx, v )
+        assert x._uint == y._uint
+
+def test_result_types():
+  B8 = mk_bits( 8 )
+  x  = B8( 0x5a )
+  assert type( x + 1 ) is B8
+  assert type( x[0:4] ) is mk_bits( 4 )
+  assert type( x[2] ) is mk_bits( 1 )
+  assert type( x == 0x5a ) is mk_bits( 1 )
+  assert type( x.clone() ) is B8 and type( deepcopy( x ) ) is B8
+  assert B8.__name__ == "Bits8" and x.nbits == 8
+  assert hash( x ) == hash( Bits( 8, 0x5a ) )
+  assert pickle.loads( pickle.dumps( x ) ) == x
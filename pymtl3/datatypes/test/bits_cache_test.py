@@ -0,0 +1,121 @@
+#=========================================================================
+# bits_cache_test.py
+#=========================================================================
+# The flyweight cache is set up when PythonBits is imported, so we load
+# private copies of PythonBits and FastBits with PYMTL_BITS_CACHE set.
+#
+# Date   : Oct 17, 2026
+
+import importlib.util
+import os
+import sys
+from copy import deepcopy
+
+import pytest
+
+from .. import FastBits, PythonBits
+
+
+def _load( module, name ):
+  spec = importlib.util.spec_from_file_location( name, module.__file__ )
+  mod  = importlib.util.module_from_spec( spec )
+  spec.loader.exec_module( mod )
+  return mod
+
+@pytest.fixture
+def cached( monkeypatch ):
+  monkeypatch.setenv( "PYMTL_BITS_CACHE", "4" )
+  pb = _load( PythonBits, "pymtl3.datatypes._PythonBits_cached" )
+  # The relative import of FastBits picks up the cached PythonBits
+  monkeypatch.setitem( sys.modules, "pymtl3.datatypes.PythonBits", pb )
+  fb = _load( FastBits, "pymtl3.datatypes._FastBits_cached" )
+  return pb, fb
+
+@pytest.mark.skipif( bool( os.getenv( "PYMTL_BITS_CACHE" ) ), reason="PYMTL_BITS_CACHE is set" )
+def test_cache_off_by_default():
+  assert PythonBits._new_result_bits is PythonBits._new_valid_bits
+  a = PythonBits.Bits( 4, 3 )
+  assert ( a + a ) is not ( a + a )
+
+def test_bad_cache_size( monkeypatch ):
+  monkeypatch.setenv( "PYMTL_BITS_CACHE", "17" )
+  with pytest.raises( ValueError ):
+    _load( PythonBits, "pymtl3.datatypes._PythonBits_bad" )
+
+def test_shared_results( cached ):
+  pb, _ = cached
+  Bits = pb.Bits
+  a, b = Bits( 4, 3 ), Bits( 4, 5 )
+
+  assert ( a + b ) is ( b + a )
+  assert ( a == b ) is ( a != a )
+  assert ( a < b ) is ( b > a )
+  assert ( a == b ) == 0 and ( a < b ) == 1
+
+  # Wide results are not shared
+  c, d = Bits( 8, 3 ), Bits( 8, 5 )
+  assert ( c + d ) is not ( c + d )
+  assert ( c + d ) == 8
+
+  # Constructors, clone and deepcopy always return new objects
+  x = a + b
+  assert Bits( 4, 8 ) is not x
+  assert x.clone() is not x and x.clone() == x
+  assert deepcopy( x ) is not x
+
+def test_inplace_on_shared_result( cached ):
+  pb, _ = cached
+  Bits = pb.Bits
+  a = Bits( 4, 3 )
+
+  x = a + a
+  y = x
+  x @= 1
+  assert x == 1 and y == 6
+  assert ( a + a ) is y and ( a + a ) == 6
+
+  x = a + a
+  x <<= 2
+  assert x._next == 2 and not hasattr( y, "_next" )
+
+  x = a + a
+  with pytest.raises( TypeError ):
+    x[0] = 1
+  assert ( a + a ) == 6
+
+  x = x.clone()
+  x[0] = 1
+  assert x == 7
+
+def test_inplace_on_storage( cached ):
+  pb, _ = cached
+  Bits = pb.Bits
+  a = Bits( 4, 3 )
+
+  # A signal value is created by a constructor and mutated in place
+  x = Bits( 4 )
+  y = x
+  x @= a + a
+  assert y is x and y == 6
+  y[0] = 1
+  assert x == 7
+
+def test_fast_bits_comparisons( cached ):
+  _, fb = cached
+  B4 = fb.mk_bits( 4 )
+  B1 = fb.mk_bits( 1 )
+  a, b = B4( 3 ), B4( 5 )
+
+  assert ( a < b ) is ( b > a ) is ( a != 5 )
+  assert ( a == b ) is ( a >= 4 )
+  assert type( a < b ) is B1 and ( a < b ) == 1 and ( a == b ) == 0
+
+  x = a == b
+  x @= 1
+  assert x == 1 and ( a == b ) == 0
+  with pytest.raises( TypeError ):
+    ( a == b )[0] = 1
+
+  # Other results keep their own class and are not shared
+  assert ( a + b ) is not ( a + b )
+  assert type( a + b ) is B4
@@ -0,0 +1,86 @@
+"""
+==========================================================================
+bits_codecs_test.py
+==========================================================================
+Test cases for the specialized converters of Bits and bitstructs.
+
+Date : Oct 17, 2026
+"""
+
+import random
+
+import pytest
+
+from ..bits_codecs import get_codec
+from ..bits_import import *
+from ..bitstructs import bitstruct
+
+
+@bitstruct
+class Point:
+  x: Bits4
+  y: Bits12
+
+@bitstruct( packed=True )
+class PackedPoint:
+  x: Bits4
+  y: Bits12
+
+@bitstruct
+class Msg:
+  type_  : Bits3
+  data   : Bits100
+  points : [ Point, Point ]
+  mask   : [ [ Bits1 ] * 3 ] * 2
+  pp     : PackedPoint
+
+def _random_values( Type, n=50 ):
+  rng = random.Random( Type.nbits )
+  for _ in range(n):
+    v = rng.getrandbits( Type.nbits )
+    if issubclass( Type, Bits ):
+      yield v, Type( v )
+    else:
+      yield v, Type.from_bits( Bits( Type.nbits, v ) )
+
+@pytest.mark.parametrize( "Type", [ Bits1, Bits32, Bits64, Bits100, Point, PackedPoint, Msg ] )
+def test_roundtrip( Type ):
+  codec = get_codec( Type )
+  assert codec.nbits == Type.nbits
+  assert codec.nbytes == (Type.nbits + 7) // 8
+
+  for v, x in _random_values( Type ):
+    assert codec.to_int( x ) == v
+    assert codec.from_int( v ) == x
+    assert codec.to_bytes( x ) == v.to_bytes( codec.nbytes, "little" )
+    assert codec.from_bytes( codec.to_bytes( x ) ) == x
+
+    nwords = (Type.nbits + 31) // 32
+    buf = [ 0 ] * nwords
+    codec.to_buffer( x, buf )
+    if Type.nbits <= 64:
+      assert buf[0] == v
+    else:
+      assert buf == [ (v >> (32*i)) & 0xffffffff for i in range(nwords) ]
+    assert codec.from_buffer( buf ) == x
+
+def test_from_int_creates_fields():
+  codec = get_codec( Msg )
+  msg = codec.from_int( (1 << Msg.nbits) - 1 )
+  assert type( msg.data ) is Bits100 and msg.data == Bits100( -1 )
+  assert type( msg.points[1] ) is Point and msg.points[1].y == 0xfff
+  assert type( msg.mask[1][2] ) is Bits1
+  assert type( msg.pp ) is PackedPoint
+
+  # Every call creates new objects
+  assert codec.from_int( 0 ).points is not codec.from_int( 0 ).points
+
+def test_cached():
+  assert get_codec( Msg ) is get_codec( Msg )
+  assert get_codec( Bits8 ) is not get_codec( Bits9 )
+
+def test_bad_type():
+  with pytest.raises( TypeError ):
+    get_codec( int )
+  with pytest.raises( TypeError ):
+    get_codec( Bits8( 0 ) )
@@ -19,6 +19,7 @@ from ..bitstructs import (
     get_bitstruct_inst_all_classes,
     is_bitstruct_class,
     is_bitstruct_inst,
+    is_packed_bitstruct_class,
     mk_bitstruct,
 )
 
@@ -604,3 +605,125 @@ def test_imatmul_ilshift():
   assert c == B(0x1234567890abcd0f,[A(2),A(3),A(4)], A(5) )
   c._flip()
   assert c.to_bits() == Bits164(0xf0dcba09876543210005000400030002)
+
+#-------------------------------------------------------------------------
+# Packed bitstructs
+#-------------------------------------------------------------------------
+
+def _mk_packed_and_unpacked( packed ):
+
+  @bitstruct( packed=packed )
+  class A:
+    x: Bits16
+
+  B = mk_bitstruct( "B", {
+    'x': Bits100,
+    'y': [ A ] * 3,
+    'z': A,
+    'w': [ [ Bits4 ] * 2 ] * 2,
+  }, packed=packed )
+
+  return A, B
+
+def test_packed_same_layout():
+  A, B = _mk_packed_and_unpacked( False )
+  PA, PB = _mk_packed_and_unpacked( True )
+
+  assert not is_packed_bitstruct_class( B )
+  assert is_packed_bitstruct_class( PB ) and is_bitstruct_class( PB )
+  assert PB.__slots__ == ( '_v', '_next' )
+  assert PB.nbits == B.nbits == 180
+
+  b  = B( 0x1234567890abcd0f, [A(2),A(3),A(4)], A(5), [[b4(1),b4(2)],[b4(3),b4(4)]] )
+  pb = PB( 0x1234567890abcd0f, [PA(2),PA(3),PA(4)], PA(5), [[b4(1),b4(2)],[b4(3),b4(4)]] )
+
+  assert pb.to_bits() == b.to_bits()
+  assert PB.from_bits( b.to_bits() ) == pb
+  assert B.from_bits( pb.to_bits() ) == b
+  assert str(pb) == str(b)
+
+  assert pb.x == Bits100(0x1234567890abcd0f)
+  assert pb.y[1] == PA(3)
+  assert pb.z.x == 5
+  assert pb.w[1][0] == b4(3)
+
+def test_packed_fields():
+  PA, PB = _mk_packed_and_unpacked( True )
+
+  pb = PB()
+  assert pb.to_bits() == 0
+  assert pb.y == [ PA(), PA(), PA() ]
+
+  pb.x = 3
+  pb.y = [ PA(1), PA(2), PA(3) ]
+  pb.z = PA(0xffff)
+  pb.w = [ [b4(0xf),b4(0xe)], [b4(0xd),b4(0xc)] ]
+  assert pb == PB( 3, [PA(1),PA(2),PA(3)], PA(0xffff), [[b4(0xf),b4(0xe)],[b4(0xd),b4(0xc)]] )
+
+  # Augmented assignments write the field back
+  pb.x @= 4
+  assert pb.x == 4 and isinstance( pb.x, Bits100 )
+
+  # Fields are read as new values
+  pb.x[0:4] @= 5
+  assert pb.x == 4
+  y = pb.y
+  y[0] = PA(5)
+  assert pb.y[0] == PA(1)
+
+  with pytest.raises( ValueError ):
+    pb.y = [ PA(1), PA(2) ]
+  with pytest.raises( ValueError ):
+    pb.w = [ [b4(0)] * 2 ]
+  with pytest.raises( ValueError ):
+    PA( 0x10000 )
+  with pytest.raises( TypeError ):
+    pb.z = Bits16(1)
+
+def test_packed_copy_and_assign():
+  PA, PB = _mk_packed_and_unpacked( True )
+
+  pb = PB( 1, [PA(2),PA(3),PA(4)], PA(5) )
+  pc = pb.clone()
+  assert pc == pb and pc is not pb and hash(pc) == hash(pb)
+  pc.x = 2
+  assert pc != pb and pb.x == 1
+
+  pc @= pb
+  assert pc == pb
+  pc @= Bits180(0)
+  assert pc == PB()
+
+  pc <<= pb
+  assert pc == PB()
+  pc._flip()
+  assert pc == pb
+
+def test_packed_rtl_signal():
+  PA, _ = _mk_packed_and_unpacked( True )
+  with pytest.raises( AssertionError ):
+    InPort( PA )
+
+def test_eq_hash_canonical_int():
+  A, B = _mk_packed_and_unpacked( False )
+
+  b = B( 0x1234, [A(2),A(3),A(4)], A(5), [[b4(1),b4(2)],[b4(3),b4(4)]] )
+  c = b.clone()
+  assert b == c and hash(b) == hash(c)
+  assert len( { b, c, B() } ) == 2
+
+  # Every nested field takes part in the comparison
+  c.w[1][0] @= 0
+  assert b != c
+  c.w[1][0] @= 3
+  c.y[2].x @= 0
+  assert b != c
+
+  # Different classes with the same layout are not equal
+  A2 = mk_bitstruct( "A2", { 'x': Bits16 } )
+  assert A(1) != A2(1)
+
+  # A field that holds an int is compared field by field
+  c = b.clone()
+  c.x = 0x1234
+  assert b == c and c == b
@@ -0,0 +1,106 @@
+"""
+==========================================================================
+numpy_helpers_test.py
+==========================================================================
+Test cases for the bulk NumPy conversion of Bits and bitstructs.
+
+Date : Oct 17, 2026
+"""
+
+import pytest
+
+from ..bits_import import *
+from ..bitstructs import bitstruct, mk_bitstruct
+from ..numpy_helpers import (
+    bits_from_numpy,
+    bits_to_numpy,
+    numpy_dtype,
+    pack_bits,
+    unpack_bits,
+)
+
+np = pytest.importorskip("numpy")
+
+@bitstruct
+class Point:
+  x: Bits4
+  y: Bits12
+
+@bitstruct
+class Msg:
+  type_  : Bits3
+  data   : Bits100
+  points : [ Point, Point ]
+  mask   : [ [ Bits1 ] * 3 ] * 2
+
+def _mk_msgs( n ):
+  return [ Msg( i % 8, (i << 80) | i, [ Point( i % 16, i ), Point( 15, 4095 - i ) ],
+                [ [ b1(i & 1), b1(0), b1(1) ], [ b1(0), b1(1), b1(i & 1) ] ] )
+           for i in range(n) ]
+
+def test_dtype():
+  assert numpy_dtype( Bits1 ) == np.uint8
+  assert numpy_dtype( Bits17 ) == np.uint32
+  assert numpy_dtype( Bits64 ) == np.uint64
+  assert numpy_dtype( Bits65 ).subdtype == ( np.dtype(np.uint8), (9,) )
+
+  dtype = numpy_dtype( Msg )
+  assert dtype.names == ( 'type_', 'data', 'points', 'mask' )
+  assert dtype['points'].subdtype[0].names == ( 'x', 'y' )
+  assert dtype['mask'].shape == ( 2, 3 )
+
+  with pytest.raises( TypeError ):
+    numpy_dtype( int )
+
+def test_bits_roundtrip():
+  values = [ Bits12(x) for x in range(0, 4096, 7) ]
+  arr = bits_to_numpy( Bits12, values )
+  assert arr.dtype == np.uint16
+  assert arr.tolist() == [ int(x) for x in values ]
+  assert bits_from_numpy( Bits12, arr ) == values
+
+  # Wide values
+  values = [ Bits100( (x << 90) | x ) for x in range(100) ]
+  arr = bits_to_numpy( Bits100, values )
+  assert arr.shape == ( 100, 13 )
+  assert bits_from_numpy( Bits100, arr ) == values
+
+  with pytest.raises( ValueError ):
+    bits_from_numpy( Bits4, np.array([ 16 ]) )
+
+def test_bitstruct_roundtrip():
+  msgs = _mk_msgs( 50 )
+  arr = bits_to_numpy( Msg, msgs )
+  assert arr['points']['y'][3].tolist() == [ 3, 4092 ]
+  assert arr['mask'][1].tolist() == [ [ 1, 0, 1 ], [ 0, 1, 1 ] ]
+  assert bits_from_numpy( Msg, arr ) == msgs
+
+  # Fill a structured array with NumPy and convert it in bulk
+  arr = np.zeros( 4, dtype=numpy_dtype( Point ) )
+  arr['x'] = np.arange( 4 )
+  arr['y'] = np.arange( 4 ) * 1000
+  assert bits_from_numpy( Point, arr ) == [ Point( i, i*1000 ) for i in range(4) ]
+
+  # Integer array of to_bits()
+  assert bits_from_numpy( Point, np.array([ 0x1002, 0xf003 ]) ) == [ Point(1, 2), Point(15, 3) ]
+
+def test_packed_bitstruct():
+  PPoint = mk_bitstruct( "PPoint", { 'x': Bits4, 'y': Bits12 }, packed=True )
+  values = [ PPoint( i % 16, i ) for i in range(100) ]
+  assert bits_from_numpy( PPoint, bits_to_numpy( PPoint, values ) ) == values
+
+def test_pack_unpack():
+  values = [ Bits12(x) for x in range(0, 4096, 7) ]
+  buf = pack_bits( Bits12, values )
+  assert len(buf) == 2 * len(values)
+  assert buf[:4] == bytes([ 0, 0, 7, 0 ])
+  assert unpack_bits( Bits12, buf ) == values
+
+  msgs = _mk_msgs( 20 )
+  buf = pack_bits( Msg, msgs )
+  assert len(buf) == 20 * 18
+  assert buf[:18] == msgs[0].to_bits().uint().to_bytes( 18, "little" )
+  assert unpack_bits( Msg, buf ) == msgs
+
+  with pytest.raises( ValueError ):
+    unpack_bits( Msg, buf[:-1] )
@@ -0,0 +1,183 @@
+"""
+========================================================================
+AstCache.py
+========================================================================
+An opt-in persistent cache of the source code, AST, and extracted
+read/write/call names of update blocks and functions. Within a process
+ComponentLevel2 already caches this information in the class object;
+this cache keeps it on disk so that a regression of many short runs
+doesn't re-parse the same source files over and over again.
+
+The cache is disabled by default. Set PYMTL_AST_CACHE to a directory to
+enable it, and optionally PYMTL_AST_CACHE_SIZE to the maximum size of
+the directory in bytes (256MB by default). The least recently used
+entries are evicted when the directory grows beyond that size.
+
+There is one cache file for each source file. A cache file is only used
+if the path, the modification time and the size of the source file, the
+Python version, and the cache format all match.
+
+Date   : Oct 16, 2026
+"""
+import atexit
+import hashlib
+import os
+import pickle
+import sys
+
+_FORMAT_VERSION = 1
+_DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+_cache_dir = None
+_max_size  = _DEFAULT_MAX_SIZE
+
+# path -> (cache file name, source key, { (name, lineno): pickled entry })
+_files = {}
+_dirty = set()
+
+def enable( cache_dir, max_size=_DEFAULT_MAX_SIZE ):
+  global _cache_dir, _max_size
+  os.makedirs( cache_dir, exist_ok=True )
+  _cache_dir = cache_dir
+  _max_size  = max_size
+  _files.clear()
+  _dirty.clear()
+
+def disable():
+  global _cache_dir
+  flush()
+  _cache_dir = None
+  _files.clear()
+
+def is_enabled():
+  return _cache_dir is not None
+
+def _get_file( func ):
+  """ Load the cache file of the source file of func. """
+  path = func.__code__.co_filename
+  try:
+    return _files[ path ]
+  except KeyError:
+    pass
+
+  try:
+    st = os.stat( path )
+  except OSError: # e.g. <string>
+    _files[ path ] = None
+    return None
+
+  src_key  = ( path, st.st_mtime_ns, st.st_size, sys.version, _FORMAT_VERSION )
+  filename = os.path.join( _cache_dir,
+               hashlib.sha1( repr( (path, sys.version) ).encode() ).hexdigest() + ".pkl" )
+
+  entries = {}
+  try:
+    with open( filename, 'rb' ) as f:
+      key, data = pickle.load( f )
+    if key == src_key:
+      entries = data
+      os.utime( filename ) # mark as recently used
+  except Exception:
+    pass
+
+  ret = _files[ path ] = ( filename, src_key, entries )
+  return ret
+
+def lookup( func ):
+  """ Return the cached (name_info, name_rd, name_wr, name_fc) of func or
+  None if it is not cached. """
+  if _cache_dir is None:
+    return None
+
+  f = _get_file( func )
+  if f is None:
+    return None
+
+  # Each entry is kept pickled so that every lookup gets its own copy of
+  # the AST just like a fresh parse
+  blob = f[2].get( ( func.__name__, func.__code__.co_firstlineno ) )
+  if blob is None:
+    return None
+  try:
+    return pickle.loads( blob )
+  except Exception:
+    return None
+
+def store( func, info, rd, wr, fc ):
+  if _cache_dir is None:
+    return
+
+  f = _get_file( func )
+  if f is None:
+    return
+  try:
+    blob = pickle.dumps( ( info, rd, wr, fc ), protocol=pickle.HIGHEST_PROTOCOL )
+  except Exception:
+    return
+  f[2][ ( func.__name__, func.__code__.co_firstlineno ) ] = blob
+  _dirty.add( func.__code__.co_filename )
+
+def flush():
+  """ Write back all updated cache files and evict old entries. """
+  if _cache_dir is None or not _dirty:
+    return
+
+  for path in _dirty:
+    filename, src_key, entries = _files[ path ]
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    try:
+      with open( tmp, 'wb' ) as f:
+        pickle.dump( ( src_key, entries ), f, protocol=pickle.HIGHEST_PROTOCOL )
+      os.replace( tmp, filename )
+    except Exception:
+      try:    os.remove( tmp )
+      except OSError: pass
+
+  _dirty.clear()
+  evict()
+
+def evict():
+  """ Remove the least recently used cache files until the total size is
+  within the limit. """
+  if _cache_dir is None:
+    return
+
+  files = []
+  total = 0
+  for name in os.listdir( _cache_dir ):
+    if not name.endswith( ".pkl" ):
+      continue
+    try:
+      st = os.stat( os.path.join( _cache_dir, name ) )
+    except OSError:
+      continue
+    files.append( ( st.st_mtime_ns, st.st_size, name ) )
+    total += st.st_size
+
+  for _, size, name in sorted( files ):
+    if total <= _max_size:
+      break
+    try:
+      os.remove( os.path.join( _cache_dir, name ) )
+    except OSError:
+      pass
+    total -= size
+
+def clear():
+  """ Remove all cache files. """
+  _files.clear()
+  _dirty.clear()
+  if _cache_dir is None:
+    return
+  for name in os.listdir( _cache_dir ):
+    if name.endswith( ".pkl" ):
+      try:
+        os.remove( os.path.join( _cache_dir, name ) )
+      except OSError:
+        pass
+
+if os.environ.get( "PYMTL_AST_CACHE" ):
+  enable( os.environ["PYMTL_AST_CACHE"],
+          int( os.environ.get( "PYMTL_AST_CACHE_SIZE", _DEFAULT_MAX_SIZE ) ) )
+
+atexit.register( flush )
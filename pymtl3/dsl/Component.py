@@ -8,6 +8,7 @@ Author : Yanghui Ou
   Date : Apr 6, 2019
 """
 
+from . import ElaborationProfiler
 from .ComponentLevel1 import ComponentLevel1
 from .ComponentLevel7 import ComponentLevel7
 from .Connectable import (
@@ -107,9 +108,20 @@ class Component( ComponentLevel7 ):
       return list(ret)
 
   def _flush_pending_value_connections( s ):
+    """ Bring all_value_nets up to date. If we know which signals are
+    touched by the mutations, only the affected nets are recomputed.
+    Return the list of changed nets, or None if all nets are recomputed
+    from scratch. """
+    ret = []
     if s._dsl._has_pending_value_connections:
-      s._dsl.all_value_nets = s._resolve_value_connections()
+      dirty = s._dsl._dirty_value_signals
+      if dirty:
+        ret = s._update_value_connections( dirty )
+      else:
+        s._dsl.all_value_nets = s._resolve_value_connections()
+        ret = None
       s._dsl._has_pending_value_connections = False
+    return ret
 
   def _flush_pending_method_connections( s ):
     if s._dsl._has_pending_method_connections:
@@ -178,7 +190,7 @@ class Component( ComponentLevel7 ):
                   obj._dsl.param_tree = ParamTreeNode()
                 obj._dsl.param_tree.merge( node )
 
-      obj._dsl.full_name = ( parent._dsl.full_name + "." + u_name )
+      obj._dsl.full_name = None
 
       # store the name/indices
       obj._dsl._my_name     = name
@@ -206,6 +218,7 @@ class Component( ComponentLevel7 ):
 
     top._dsl.all_components    |= added_components
     top._dsl.all_signals       |= added_signals
+    top._dsl._dirty_value_signals |= added_signals
     top._dsl.all_method_ports  |= added_method_ports
 
     top._dsl.all_named_objects |= added_components
@@ -391,6 +404,7 @@ class Component( ComponentLevel7 ):
             # If other will be removed, we don't need to remove it here ..
             if other not in removed_connectables and other not in removed_consts:
               top._dsl.all_adjacency[other].remove( x )
+              top._dsl._dirty_value_signals.add( other )
               if isinstance( other, Const ):
                 other = other._dsl.const
               saved_connections.append( (other, "top"+repr(x)[1:]) ) # other is from outside
@@ -404,18 +418,22 @@ class Component( ComponentLevel7 ):
               parent._dsl.adjacency[other].remove( x )
           del parent._dsl.adjacency[x]
 
+      # Full names are computed from the parent chain, so fix them
+      # before detaching the objects
       for x in removed_components:
+        x._dsl.full_name = x._dsl.full_name
         del x._dsl.parent_obj
         del x._dsl.elaborate_top
       for x in removed_connectables:
+        x._dsl.full_name = "<deleted>"+x._dsl.full_name
         del x._dsl.parent_obj
         del x._dsl.elaborate_top
-        x._dsl.full_name = "<deleted>"+x._dsl.full_name
       for y in removed_consts:
         del y._dsl.parent_obj
 
       # We don't break nets anymore. Instead, we set the flags to true so
       # that the next get_xxx_net will immediately recollect nets.
+      top._dsl._dirty_value_signals |= removed_signals
       top._dsl._has_pending_value_connections = True
       top._dsl._has_pending_method_connections = True
 
@@ -445,7 +463,8 @@ class Component( ComponentLevel7 ):
     except:
       pass
 
-    super().elaborate()
+    with ElaborationProfiler.phase( s, "elaborate" ):
+      super().elaborate()
 
     # try:
       # import pypyjit
@@ -677,6 +696,19 @@ class Component( ComponentLevel7 ):
   # TODO test everything below and figure out whether we need to delete
   # a normal component
 
+  def _check_replaced_component( top, parent, new_obj, changed_nets ):
+    # Only the update blocks of the new components and the parent can see
+    # the replaced component, so we don't need to check the whole design
+    # again unless all nets were recomputed.
+    if changed_nets is None:
+      top.check()
+      return
+
+    blks = set( parent._dsl.upblks )
+    for c in new_obj._collect_all_single( lambda x: isinstance( x, Component ) ):
+      blks |= c._dsl.upblks
+    top._check_valid_dsl_code( blks, changed_nets )
+
   def replace_component( top, foo, cls, check=True ):
     top._check_called_at_elaborate_top( "replace_component" )
 
@@ -696,10 +728,10 @@ class Component( ComponentLevel7 ):
                         saved_upblk_reads, saved_upblk_writes, saved_upblk_calls,
                         saved_func_reads, saved_func_writes, saved_func_calls)
 
-    top._flush_pending_value_connections()
+    changed_nets = top._flush_pending_value_connections()
     top._flush_pending_method_connections()
     if check:
-      top.check()
+      top._check_replaced_component( parent, new_obj, changed_nets )
 
   def replace_component_with_obj( top, foo, new_obj, check=True ):
     top._check_called_at_elaborate_top( "replace_component" )
@@ -718,10 +750,10 @@ class Component( ComponentLevel7 ):
                         saved_upblk_reads, saved_upblk_writes, saved_upblk_calls,
                         saved_func_reads, saved_func_writes, saved_func_calls)
 
-    top._flush_pending_value_connections()
+    changed_nets = top._flush_pending_value_connections()
     top._flush_pending_method_connections()
     if check:
-      top.check()
+      top._check_replaced_component( parent, new_obj, changed_nets )
 
   def add_value_port( top, parent, name, o ):
     top._check_called_at_elaborate_top( "add_port" )
@@ -829,6 +861,8 @@ class Component( ComponentLevel7 ):
 
       top._dsl.all_adjacency[o1].add(o2)
       top._dsl.all_adjacency[o2].add(o1)
+      top._dsl._dirty_value_signals.add(o1)
+      top._dsl._dirty_value_signals.add(o2)
       top._dsl._has_pending_value_connections = True
 
   def add_connections( s, *args ):
@@ -847,8 +881,15 @@ class Component( ComponentLevel7 ):
         raise InvalidConnectionError( "\n- In connect_pair, when connecting {}-th argument to {}-th argument\n{}\n " \
               .format( (i<<1)+1, (i<<1)+2 , e ) )
 
+    # Only mark the endpoints of new connections as dirty
+    all_adjacency = top._dsl.all_adjacency
+    dirty         = top._dsl._dirty_value_signals
     for x, adjs in s._dsl.adjacency.items():
-      top._dsl.all_adjacency[x].update( adjs )
+      old = all_adjacency[x]
+      if not adjs <= old:
+        dirty.add( x )
+        dirty.update( adjs - old )
+        old.update( adjs )
 
   # TODO implement everything below and test them
 
@@ -20,7 +20,7 @@ from collections import defaultdict
 
 from pymtl3.datatypes import Bits, is_bitstruct_class
 
-from . import AstHelper
+from . import AstCache, AstHelper, ElaborationProfiler, ParallelElaboration
 from .ComponentLevel1 import ComponentLevel1
 from .Connectable import Connectable, Const, InPort, Interface, OutPort, Signal, Wire
 from .ConstraintTypes import RD, WR, U, ValueConstraint
@@ -67,7 +67,7 @@ class ComponentLevel2( ComponentLevel1 ):
 
     return inst
 
-  def _cache_func_meta( s, func, is_update_ff, given=None ):
+  def _cache_func_meta( s, func, is_update_ff, given=None, extracted=None ):
     """ Convention: the source of a function/update block across different
     instances should be the same. You can construct different functions
     based on the condition, but please use different names. This not only
@@ -94,12 +94,24 @@ class ComponentLevel2( ComponentLevel1 ):
       _src, _ast, _line, _file = given
 
       name_info[ name ] = ( True, _src, _line, _file, _ast )
+
+      # The names extracted from a block with the same AST can be reused
+      if extracted is not None:
+        name_rd[ name ], name_wr[ name ], name_fc[ name ] = extracted
+        return
+
       name_rd[ name ]   = _rd = []
       name_wr[ name ]   = _wr = []
       name_fc[ name ]   = _fc = []
       AstHelper.extract_reads_writes_calls( s, func, _ast, _rd, _wr, _fc )
 
     elif name not in name_info:
+      # Check the persistent cache before parsing the source
+      cached = AstCache.lookup( func )
+      if cached is not None:
+        name_info[ name ], name_rd[ name ], name_wr[ name ], name_fc[ name ] = cached
+        return
+
       _src, _line = inspect.getsourcelines( func )
       _src = "".join( _src )
       _ast = ast.parse( compiled_re.sub( r'\2', _src ) )
@@ -110,6 +122,8 @@ class ComponentLevel2( ComponentLevel1 ):
       name_fc[ name ]   = _fc   = []
       AstHelper.extract_reads_writes_calls( s, func, _ast, _rd, _wr, _fc )
 
+      AstCache.store( func, name_info[ name ], _rd, _wr, _fc )
+
   def _elaborate_read_write_func( s ):
 
     # We have parsed AST to extract every read/write variable name.
@@ -383,15 +397,25 @@ class ComponentLevel2( ComponentLevel1 ):
         del s._dsl.all_upblk_writes[k]
         del s._dsl.all_upblk_calls[k]
 
-  def _check_upblk_writes( s ):
+  # The checks below only look at the given update blocks if blks is
+  # not None. This is used to only check the affected part of the design
+  # after mutation APIs such as replace_component.
+
+  def _check_upblk_writes( s, blks=None ):
 
     write_upblks = defaultdict(set)
     for blk, writes in s._dsl.all_upblk_writes.items():
       for wr in writes:
         write_upblks[ wr ].add( blk )
 
-    for obj, wr_blks in write_upblks.items():
-      wr_blks = list(wr_blks)
+    # Conflicts can involve any other block, but we only need to check
+    # the signals written by the given blocks
+    objs = write_upblks
+    if blks is not None:
+      objs = { x for blk in blks for x in s._dsl.all_upblk_writes.get( blk, () ) }
+
+    for obj in objs:
+      wr_blks = list(write_upblks[obj])
 
       if len(wr_blks) > 1:
         raise MultiWriterError( \
@@ -425,10 +449,16 @@ class ComponentLevel2( ComponentLevel1 ):
               repr(x), wrx_blks[0].__name__,
               repr(obj), wr_blks[0].__name__ ) )
 
-  def _check_port_in_upblk( s ):
+  def _check_port_in_upblk( s, blks=None ):
+
+    all_upblk_reads  = s._dsl.all_upblk_reads
+    all_upblk_writes = s._dsl.all_upblk_writes
+    if blks is not None:
+      all_upblk_reads  = { x: all_upblk_reads.get( x, () )  for x in blks }
+      all_upblk_writes = { x: all_upblk_writes.get( x, () ) for x in blks }
 
     # Check read first
-    for blk, reads in s._dsl.all_upblk_reads.items():
+    for blk, reads in all_upblk_reads.items():
 
       blk_hostobj = s._dsl.all_upblk_hostobj[ blk ]
 
@@ -451,7 +481,7 @@ class ComponentLevel2( ComponentLevel1 ):
                     blk.__name__, repr(blk_hostobj), type(blk_hostobj).__name__ ) )
 
     # Then check write
-    for blk, writes in s._dsl.all_upblk_writes.items():
+    for blk, writes in all_upblk_writes.items():
 
       blk_hostobj = s._dsl.all_upblk_hostobj[ blk ]
 
@@ -507,9 +537,9 @@ class ComponentLevel2( ComponentLevel1 ):
                     blk.__name__, repr(blk_hostobj), type(blk_hostobj).__name__ ) )
 
   # TODO rename
-  def _check_valid_dsl_code( s ):
-    s._check_upblk_writes()
-    s._check_port_in_upblk()
+  def _check_valid_dsl_code( s, blks=None, nets=None ):
+    s._check_upblk_writes( blks )
+    s._check_port_in_upblk( blks )
 
   #-----------------------------------------------------------------------
   # Construction-time APIs
@@ -614,18 +644,26 @@ class ComponentLevel2( ComponentLevel1 ):
   # Override
   def elaborate( s ):
     # Don't directly use the base class elaborate anymore
-    s._elaborate_construct()
+    with ElaborationProfiler.phase( s, "construct" ):
+      s._elaborate_construct()
 
     # First elaborate all functions to spawn more named objects
-    for c in s._collect_all_single( lambda s: isinstance( s, ComponentLevel2 ) ):
-      c._elaborate_read_write_func()
-
-    s._elaborate_collect_all_named_objects()
-
-    s._elaborate_declare_vars()
-    s._elaborate_collect_all_vars()
-
-    s._check_valid_dsl_code()
+    with ElaborationProfiler.phase( s, "read_write_func" ):
+      components = s._collect_all_single( lambda s: isinstance( s, ComponentLevel2 ) )
+      if not ParallelElaboration.elaborate_read_write_func( s, components ):
+        for c in components:
+          c._elaborate_read_write_func()
+
+    with ElaborationProfiler.phase( s, "collect_all_named_objects" ):
+      s._elaborate_collect_all_named_objects()
+
+    with ElaborationProfiler.phase( s, "declare_vars" ):
+      s._elaborate_declare_vars()
+    with ElaborationProfiler.phase( s, "collect_all_vars" ):
+      s._elaborate_collect_all_vars()
+
+    with ElaborationProfiler.phase( s, "check_valid_dsl_code" ):
+      s._check_valid_dsl_code()
 
   #-----------------------------------------------------------------------
   # Post-elaborate public APIs (can only be called after elaboration)
@@ -13,13 +13,17 @@ Author : Shunning Jiang
 Date   : Jan 29, 2020
 """
 import ast
+import copy
+import heapq
 import inspect
 import linecache
 from collections import defaultdict
 
 from pymtl3.datatypes import Bits, is_bitstruct_inst
 from pymtl3.extra.pypy import custom_exec
+from pymtl3.extra.rename_code import rename_code
 
+from . import ElaborationProfiler
 from .ComponentLevel1 import ComponentLevel1
 from .ComponentLevel2 import ComponentLevel2, compiled_re
 from .Connectable import (
@@ -45,6 +49,10 @@ from .NamedObject import NamedObject
 from .Placeholder import Placeholder
 
 
+# A constant is only in one net so it is its own key
+def _get_top_level_signal( x ):
+  return x._dsl.top_level_signal if isinstance( x, Signal ) else x
+
 def connect( o1, o2 ):
   host, o1_connectable, o2_connectable = _connect_check( o1, o2, internal=False )
   host._connect_dispatch( o1, o2, o1_connectable, o2_connectable )
@@ -73,8 +81,11 @@ class ComponentLevel3( ComponentLevel2 ):
 
   # The following three methods should only be called when types are
   # already checked
-  def _create_assign_lambda( s, o, lamb ):
-    assert isinstance( o, Signal ), "You can only assign(//=) a lambda function to a Wire/InPort/OutPort."
+  def _compile_assign_lambda( s, lamb, rel_name, blk_name ):
+    """ Compile the update block for "s<rel_name> //= lamb". Return a
+    function that creates the block from the closure of a lambda with the
+    same code, the source of the lambda, and the ( source, AST, line,
+    file ) of the block for _cache_func_meta. """
 
     srcs, line = inspect.getsourcelines( lamb )
 
@@ -89,7 +100,7 @@ class ComponentLevel3( ComponentLevel2 ):
     # Shunning: here we need to use ast from repr(o), because root.target
     # can be "m.in_" in some cases where we actually know what m is but the
     # source code still captures "m"
-    lhs, rhs = ast.parse( f"s{repr(o)[len(repr(s)):]}" ).body[0].value, root.value
+    lhs, rhs = ast.parse( f"s{rel_name}" ).body[0].value, root.value
     lhs.ctx = ast.Store()
     # We expect the lambda to have no argument:
     # {'args': [], 'vararg': None, 'kwonlyargs': [], 'kw_defaults': [], 'kwarg': None, 'defaults': []}
@@ -104,7 +115,6 @@ class ComponentLevel3( ComponentLevel2 ):
     # error message, we set the line number of update block
     # Shunning: bugfix:
 
-    blk_name = "_lambda__{}".format( repr(o).replace(".","_").replace("[", "_").replace("]", "_").replace(":", "_") )
     lambda_upblk = ast.FunctionDef(
       name=blk_name,
       args=ast.arguments(args=[], vararg=None, kwonlyargs=[], kw_defaults=[], posonlyargs=[], kwarg=None, defaults=[]),
@@ -183,7 +193,44 @@ class ComponentLevel3( ComponentLevel2 ):
 
     dict_local = {}
     custom_exec( compile(new_root, blk_name, "exec"), lamb.__globals__, dict_local )
-    blk = dict_local[ 'closure' ]( lamb.__closure__ )
+
+    return dict_local[ 'closure' ], src, \
+           ( "".join(srcs), lambda_upblk_module, line, inspect.getsourcefile( lamb ) )
+
+  def _create_assign_lambda( s, o, lamb ):
+    assert isinstance( o, Signal ), "You can only assign(//=) a lambda function to a Wire/InPort/OutPort."
+
+    rel_name = repr(o)[len(repr(s)):]
+    blk_name = "_lambda__{}".format( repr(o).replace(".","_").replace("[", "_").replace("]", "_").replace(":", "_") )
+
+    # All instances of a class assign the same lambdas to the same
+    # targets, so we compile and analyze the block of each ( lambda,
+    # target ) once per class. The other instances only bind the closure
+    # of their own lambda and rename the block.
+    cls = s.__class__
+    try:
+      templates = cls._lambda_templates
+    except AttributeError:
+      templates = cls._lambda_templates = {}
+
+    key = ( lamb.__code__, rel_name )
+    template = templates.get( key )
+
+    if template is None:
+      closure, src, given = s._compile_assign_lambda( lamb, rel_name, blk_name )
+      blk = closure( lamb.__closure__ )
+      extracted = None
+    else:
+      closure, src, given, extracted = template
+      blk = closure( lamb.__closure__ )
+
+      blk.__code__ = rename_code( blk.__code__, blk_name, blk_name )
+      blk.__name__ = blk.__qualname__ = blk_name
+
+      _src, _ast, _line, _file = given
+      funcdef = copy.copy( _ast.body[0] )
+      funcdef.name = blk_name
+      given = ( _src, ast.Module( body=[ funcdef ], type_ignores=[] ), _line, _file )
 
     # Add the source code to linecache for the compiled function
 
@@ -202,8 +249,11 @@ class ComponentLevel3( ComponentLevel2 ):
     # So the cache call here is just to reuse the existing interface to
     # register the AST/src of the generated block for elaborate or passes
     # to use.
-    s._cache_func_meta( blk, is_update_ff=False,
-      given=("".join(srcs), lambda_upblk_module, line, inspect.getsourcefile( lamb )) )
+    s._cache_func_meta( blk, is_update_ff=False, given=given, extracted=extracted )
+
+    if template is None:
+      templates[ key ] = ( closure, src, given,
+                           ( cls._name_rd[ blk_name ], cls._name_wr[ blk_name ], cls._name_fc[ blk_name ] ) )
     return blk
 
   def _connect_signal_const( s, o1, o2 ):
@@ -346,29 +396,41 @@ class ComponentLevel3( ComponentLevel2 ):
 
   @staticmethod
   def _floodfill_nets( signal_list, adjacency ):
-    """ Floodfill to find out connected nets. Return a list of sets. """
-
+    """ Find out the connected nets of the signals in signal_list. Return
+    a list of sets in the order of their first signal in signal_list.
+
+    Signals get integer ids in the order we reach them, so that every net
+    occupies a contiguous range of ids in objs and the id of a signal
+    tells both whether it is visited and which net it belongs to. Each
+    signal only follows its connections to signals with larger ids. A
+    connection to a signal that already has a larger id closes a loop,
+    since that signal was reached from another signal of the same net. """
+
+    ids  = {}
+    objs = []
     nets = []
-    visited = set()
-    pred    = {} # detect cycle that has >=3 nodes
+    n    = 0
+
     for obj in signal_list:
-      # If obj has adjacent signals
-      if obj in adjacency and obj not in visited:
-        net = set()
-        Q   = [ obj ]
-        while Q:
-          u = Q.pop()
-          visited.add( u )
-          net.add( u )
-          for v in adjacency[u]:
-            if v not in visited:
-              pred[v] = u
-              Q.append( v )
-            elif v is not pred[u]:
+      if obj in adjacency and obj not in ids:
+        i = start = n
+        ids[ obj ] = n
+        objs.append( obj )
+        n += 1
+
+        while i < n:
+          for v in adjacency[ objs[i] ]:
+            j = ids.get( v )
+            if j is None:
+              ids[ v ] = n
+              objs.append( v )
+              n += 1
+            elif j > i:
               raise InvalidConnectionError(repr(v)+" is in a connection loop.")
-        if len(net) == 1:
-          continue
-        nets.append( net )
+          i += 1
+
+        if n - start > 1:
+          nets.append( set( objs[start:] ) )
     return nets
 
   def _resolve_value_connections( s ):
@@ -396,7 +458,68 @@ class ComponentLevel3( ComponentLevel2 ):
 
     # First of all, bfs the "forest" to find out all nets
 
-    nets = s._floodfill_nets( s._dsl.all_signals, s._dsl.all_adjacency )
+    with ElaborationProfiler.phase( s, "floodfill_nets" ):
+      nets = s._floodfill_nets( s._dsl.all_signals, s._dsl.all_adjacency )
+
+    s._dsl._dirty_value_signals = set()
+    return s._resolve_net_writers( nets )
+
+  def _update_value_connections( s, dirty ):
+    """ Incrementally update all_value_nets after the adjacency of the
+    signals in dirty has changed, e.g. after a component is replaced or
+    a connection is added. Return the list of new nets.
+
+    A net only takes its writer from another net through an ancestor or
+    a sibling slice of its members, which always share the same
+    top-level signal. Hence we only drop and re-resolve the nets that
+    are transitively linked to the dirty signals by top-level signals.
+    All other nets are kept as is. """
+
+    nets = s._dsl.all_value_nets
+    all_signals = s._dsl.all_signals
+
+    top_nets = defaultdict(list)
+    for i, (_, net) in enumerate( nets ):
+      for x in net:
+        top_nets[ _get_top_level_signal( x ) ].append( i )
+
+    tops    = { _get_top_level_signal( x ) for x in dirty }
+    stack   = list(tops)
+    dropped = set()
+    while stack:
+      for i in top_nets.get( stack.pop(), () ):
+        if i not in dropped:
+          dropped.add( i )
+          for x in nets[i][1]:
+            t = _get_top_level_signal( x )
+            if t not in tops:
+              tops.add( t )
+              stack.append( t )
+
+    # Deleted signals are not in all_signals anymore
+    roots = [ x for x in dirty if x in all_signals ]
+    for i in dropped:
+      roots.extend( x for x in nets[i][1] if x in all_signals )
+
+    new_nets = s._resolve_net_writers( s._floodfill_nets( roots, s._dsl.all_adjacency ) )
+
+    s._dsl.all_value_nets = [ x for i, x in enumerate( nets ) if i not in dropped ] + new_nets
+    s._dsl._dirty_value_signals = set()
+    return new_nets
+
+  def _resolve_net_writers( s, nets ):
+    """ Figure out the writer of each net. Return a list of
+    ( writer, set([signals]) ).
+
+    Most nets are resolved by a single pass over all nets. A net that is
+    still headless afterwards can only get its writer from its own
+    members, their ancestors and their sibling slices, all of which share
+    the same top-level signal. We index the headless nets by the
+    top-level signals of their members, so that a newly resolved net only
+    revisits the headless nets that share a top-level signal with it
+    instead of rescanning all of them. The nets are revisited in rounds
+    in the order of nets, which resolves them in the same order as
+    repeatedly scanning all headless nets would. """
 
     # Then figure out writers: all writes in upblks and their nest objects
 
@@ -425,20 +548,16 @@ class ComponentLevel3( ComponentLevel2 ):
            ( isinstance( member, OutPort ) and isinstance( host, Placeholder ) ):
           writer_prop[ member ] = True
 
-    headless = nets
-    headed   = []
-
     # Convention: we store a net in a tuple ( writer, set([readers]) )
     # The first element is writer; it should be None if there is no
     # writer. The second element is a set of signals including the writer.
 
-    while headless:
-      new_headless = []
-      wcount = len(writer_prop)
+    headed = []
 
-      # For each net, figure out the writer among all vars and their
-      # ancestors. Moreover, if x's ancestor has a writer in another net,
-      # x should be the writer of this net.
+    def resolve( net ):
+      # Figure out the writer among all vars and their ancestors.
+      # Moreover, if x's ancestor has a writer in another net, x should be
+      # the writer of this net.
       #
       # If there is a writer, propagate writer information to all readers
       # and readers' ancestors. The propagation is tricky: assume s.x.a
@@ -450,76 +569,102 @@ class ComponentLevel3( ComponentLevel2 ):
       # be a unpropagatable writer because we don't want x[5:15] to
       # propagate to x[12:17] later.
 
-      for net in headless:
-        has_writer = False
-
-        for v in net:
-          obj = None
-          try:
-            # Check if itself is a writer or a constant
-            if v in writer_prop or isinstance( v, Const ):
-              assert not has_writer
-              has_writer, writer = True, v
+      has_writer = False
 
-            else:
-              # Check if an ancestor is a propagatable writer
-              obj = v.get_parent_object()
-              while obj.is_signal():
-                if obj in writer_prop and writer_prop[ obj ]:
-                  assert not has_writer
-                  has_writer, writer = True, v
-                  break
-                obj = obj.get_parent_object()
-
-              # Check sibling slices
-              for obj in v.get_sibling_slices():
-                if obj.slice_overlap( v ):
-                  if obj in writer_prop and writer_prop[ obj ]:
-                    assert not has_writer
-                    has_writer, writer = True, v
-                    # Shunning: is breaking out of here enough? If we
-                    # don't break the loop, we might a list here storing
-                    # "why the writer became writer" and do some sibling
-                    # overlap checks when we enter the loop body later
-                    break
-
-          except AssertionError:
-            raise MultiWriterError( \
-            "Two-writer conflict \"{}\"{}, \"{}\" in the following net:\n - {}".format(
-              repr(v), "" if not obj else "(as \"{}\" is written somewhere else)".format( repr(obj) ),
-              repr(writer), "\n - ".join([repr(x) for x in net])) )
-
-        if not has_writer:
-          new_headless.append( net )
-          continue
-
-        # Child s.x.y of some propagatable s.x, or sibling of some
-        # propagatable s[a:b].
-        # This means that at least other variables are able to see s.x/s[a:b]
-        # so it doesn't matter if s.x.y is not in writer_prop
-        if writer not in writer_prop:
-          pass
-
-        for v in net:
-          if v != writer:
-            writer_prop[ v ] = True # The reader becomes new writer
+      for v in net:
+        obj = None
+        try:
+          # Check if itself is a writer or a constant
+          if v in writer_prop or isinstance( v, Const ):
+            assert not has_writer
+            has_writer, writer = True, v
 
+          else:
+            # Check if an ancestor is a propagatable writer
             obj = v.get_parent_object()
             while obj.is_signal():
-              if obj not in writer_prop:
-                writer_prop[ obj ] = False
+              if obj in writer_prop and writer_prop[ obj ]:
+                assert not has_writer
+                has_writer, writer = True, v
+                break
               obj = obj.get_parent_object()
 
-        headed.append( (writer, net) )
-
-      if wcount == len(writer_prop): # no more new writers
-        break
-      headless = new_headless
-
-    return headed + [ (None, x) for x in headless ]
+            # Check sibling slices
+            for obj in v.get_sibling_slices():
+              if obj.slice_overlap( v ):
+                if obj in writer_prop and writer_prop[ obj ]:
+                  assert not has_writer
+                  has_writer, writer = True, v
+                  # Shunning: is breaking out of here enough? If we
+                  # don't break the loop, we might a list here storing
+                  # "why the writer became writer" and do some sibling
+                  # overlap checks when we enter the loop body later
+                  break
 
-  def _check_port_in_nets( s ):
-    nets = s._dsl.all_value_nets
+        except AssertionError:
+          raise MultiWriterError( \
+          "Two-writer conflict \"{}\"{}, \"{}\" in the following net:\n - {}".format(
+            repr(v), "" if not obj else "(as \"{}\" is written somewhere else)".format( repr(obj) ),
+            repr(writer), "\n - ".join([repr(x) for x in net])) )
+
+      if not has_writer:
+        return False
+
+      for v in net:
+        if v != writer:
+          writer_prop[ v ] = True # The reader becomes new writer
+
+          obj = v.get_parent_object()
+          while obj.is_signal():
+            if obj not in writer_prop:
+              writer_prop[ obj ] = False
+            obj = obj.get_parent_object()
+
+      headed.append( (writer, net) )
+      return True
+
+    headless = [ i for i, net in enumerate( nets ) if not resolve( net ) ]
+    if not headless:
+      return headed
+
+    top_nets = defaultdict(list)
+    for i in headless:
+      for t in { _get_top_level_signal( x ) for x in nets[i] }:
+        top_nets[ t ].append( i )
+
+    # todo is a heap of the headless nets to visit in this round and
+    # wakeup is the set of those to visit in the next round. The first
+    # pass might have resolved the writer of any headless net.
+    todo     = headless
+    queued   = set( headless )
+    headless = set( headless )
+    wakeup   = set()
+
+    while todo:
+      i = heapq.heappop( todo )
+      queued.remove( i )
+
+      if resolve( nets[i] ):
+        headless.remove( i )
+
+        # Nets after this one are still visited in this round
+        for t in { _get_top_level_signal( x ) for x in nets[i] }:
+          for j in top_nets.get( t, () ):
+            if j in headless:
+              if j < i:
+                wakeup.add( j )
+              elif j not in queued:
+                heapq.heappush( todo, j )
+                queued.add( j )
+
+      if not todo and wakeup:
+        todo, queued, wakeup = sorted( wakeup ), wakeup, set()
+
+    return headed + [ (None, nets[i]) for i in sorted( headless ) ]
+
+  def _check_port_in_nets( s, nets=None ):
+    if nets is None:
+      nets = s._dsl.all_value_nets
 
     # The case of connection is very tricky because we put a single upblk
     # in the lowest common ancestor node and the "output port" chain is
@@ -741,10 +886,10 @@ class ComponentLevel3( ComponentLevel2 ):
         return
 
   # Override
-  def _check_valid_dsl_code( s ):
-    s._check_upblk_writes()
-    s._check_port_in_upblk()
-    s._check_port_in_nets()
+  def _check_valid_dsl_code( s, blks=None, nets=None ):
+    s._check_upblk_writes( blks )
+    s._check_port_in_upblk( blks )
+    s._check_port_in_nets( nets )
 
   #-----------------------------------------------------------------------
   # Construction-time APIs
@@ -775,14 +920,17 @@ class ComponentLevel3( ComponentLevel2 ):
   def _elaborate_declare_vars( s ):
     super()._elaborate_declare_vars()
     s._dsl.all_adjacency = defaultdict(set)
+    s._dsl._dirty_value_signals = set()
 
   # Override
   def _elaborate_collect_all_vars( s ):
     super()._elaborate_collect_all_vars()
-    s._dsl.all_value_nets = s._resolve_value_connections()
+    with ElaborationProfiler.phase( s, "resolve_value_connections" ):
+      s._dsl.all_value_nets = s._resolve_value_connections()
     s._dsl._has_pending_value_connections = False
 
-    s._check_valid_dsl_code()
+    with ElaborationProfiler.phase( s, "check_valid_dsl_code" ):
+      s._check_valid_dsl_code()
 
   #-----------------------------------------------------------------------
   # Post-elaborate public APIs (can only be called after elaboration)
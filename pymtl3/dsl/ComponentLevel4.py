@@ -61,10 +61,14 @@ class ComponentLevel4( ComponentLevel3 ):
       s._dsl.all_update_once   |= m._dsl.update_once
       s._dsl.all_M_constraints |= m._dsl.M_constraints
 
-  def _check_upblk_calls( s ):
+  def _check_upblk_calls( s, blks=None ):
     all_update_once = s._dsl.all_update_once
 
-    for blk, calls in s._dsl.all_upblk_calls.items():
+    all_upblk_calls = s._dsl.all_upblk_calls
+    if blks is not None:
+      all_upblk_calls = { x: all_upblk_calls.get( x, () ) for x in blks }
+
+    for blk, calls in all_upblk_calls.items():
       # if there is method call in normal update block we throw an error
       if blk not in all_update_once:
         method_calls = [ x for x in calls \
@@ -73,11 +77,11 @@ class ComponentLevel4( ComponentLevel3 ):
           raise UnmarkedUpdateOnceError( s._dsl.all_upblk_hostobj[ blk ], blk, method_calls )
 
   # Override
-  def _check_valid_dsl_code( s ):
-    s._check_upblk_writes()
-    s._check_port_in_upblk()
-    s._check_port_in_nets()
-    s._check_upblk_calls()
+  def _check_valid_dsl_code( s, blks=None, nets=None ):
+    s._check_upblk_writes( blks )
+    s._check_port_in_upblk( blks )
+    s._check_port_in_nets( nets )
+    s._check_upblk_calls( blks )
 
   #-----------------------------------------------------------------------
   # Construction-time APIs
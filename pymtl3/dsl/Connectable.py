@@ -7,10 +7,17 @@ Wires, ports, and interfaces, all inherited from Connectable.
 Author : Shunning Jiang
 Date   : Apr 16, 2018
 """
+import sys
 import types
 from collections import deque
 
-from pymtl3.datatypes import Bits, Bits1, is_bitstruct_class, mk_bits
+from pymtl3.datatypes import (
+    Bits,
+    Bits1,
+    is_bitstruct_class,
+    is_packed_bitstruct_class,
+    mk_bits,
+)
 
 from .errors import InvalidConnectionError
 from .NamedObject import DSLMetadata, NamedObject
@@ -148,12 +155,15 @@ class Signal( NamedObject, Connectable ):
       assert isinstance( Type, type ) and ( issubclass( Type, Bits ) or is_bitstruct_class(Type) ), \
               f"RTL signal can only be of Bits type or bitstruct type, not {Type}.\n" \
               f"Note: an integer is also accepted: Wire(32) is equivalent to Wire(Bits32))"
+      assert not is_packed_bitstruct_class(Type), \
+              f"RTL signal cannot be of packed bitstruct type {Type.__qualname__}.\n" \
+              f"Note: packed bitstructs are meant for CL/FL messages, use @bitstruct instead."
 
     s._dsl.Type = Type
     s._dsl.type_instance = None
 
     s._dsl.slice  = None # None -- not a slice of some wire by default
-    s._dsl.slices = {}
+    s._dsl.slices = None # created with the first slice
     s._dsl.top_level_signal = s
 
     s._dsl.needs_double_buffer = False
@@ -213,8 +223,7 @@ class Signal( NamedObject, Connectable ):
           xd.top_level_signal = sd.top_level_signal
           xd.elaborate_top = sd.elaborate_top
 
-          xd.my_name     = name + "".join([ f"[{y}]" for y in indices ])
-          xd.full_name   = f"{sd.full_name}.{name}"
+          xd.my_name     = sys.intern( name + "".join([ f"[{y}]" for y in indices ]) )
           xd._my_name    = name
           xd._my_indices = indices
 
@@ -264,10 +273,11 @@ class Signal( NamedObject, Connectable ):
 
       sl_str = f"[{start}:{stop}]"
 
-      xd.my_name   = f"{sd.my_name}{sl_str}"
-      xd.full_name = f"{sd.full_name}{sl_str}"
+      xd.my_name   = sys.intern( f"{sd.my_name}{sl_str}" )
 
       xd.slice       = slice( start, stop )
+      if sd.slices is None:
+        sd.slices = {}
       top_signal.__dict__[ sl_tuple ] = sd.slices[ sl_tuple ] = x
 
     return top_signal.__dict__[ sl_tuple ]
@@ -0,0 +1,254 @@
+"""
+========================================================================
+ElaborationProfiler.py
+========================================================================
+An instrumentation mode that records the wall time, the peak memory and
+the number of elaborated objects (components, signals, nets, update
+blocks, constraints) of every elaboration phase and every pass applied
+to a component.
+
+Usage:
+
+  with ElaborationProfiler( trace_memory=True ) as prof:
+    top = Top()
+    top.elaborate()
+    top.apply( DefaultPassGroup() )
+
+  print( prof.format_table() )
+  prof.to_json( "elab_profile.json" )
+
+Setting PYMTL_ELAB_PROFILE to a file name profiles the whole process and
+dumps the JSON report to that file (and the table to stderr) at exit.
+Set PYMTL_ELAB_PROFILE_MEMORY=1 to also trace the peak memory.
+
+Peak memory is measured with tracemalloc, which slows down elaboration
+noticeably, so it is only enabled with trace_memory=True. The peak of
+a phase is measured by resetting the traced peak when the phase starts,
+which needs Python 3.9+. On older versions, the peak of a phase is the
+peak since tracing started. The maximum resident set size of the
+process is always recorded where available.
+
+Date   : Oct 16, 2026
+"""
+import atexit
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+  import resource
+except ImportError: # not available on Windows
+  resource = None
+
+# tracemalloc.reset_peak is new in Python 3.9
+_reset_peak = getattr( tracemalloc, "reset_peak", lambda: None )
+
+class _NullContext:
+  """ contextlib.nullcontext, which is new in Python 3.7 """
+
+  def __enter__( s ):
+    return None
+
+  def __exit__( s, exc_type, exc_value, tb ):
+    return False
+
+_current = None
+_null    = _NullContext()
+
+def phase( top, name ):
+  """ Return a context manager that profiles the given elaboration phase
+  of top, or a no-op one if no profiler is active. """
+  if _current is None:
+    return _null
+  return _Record( _current, top, name, "phase" )
+
+def profile_pass( pass_instance, top ):
+  """ Return a context manager that profiles applying pass_instance to
+  top, or a no-op one if no profiler is active. super().__call__ of a pass
+  is folded into the record of the pass itself. """
+  if _current is None:
+    return _null
+  stack = _current._stack
+  if stack and stack[-1].owner is pass_instance:
+    return _null
+  r = _Record( _current, top, pass_instance.__class__.__name__, "pass" )
+  r.owner = pass_instance
+  return r
+
+def _max_rss():
+  if resource is None:
+    return None
+  rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+  # Linux reports kilobytes, macOS reports bytes
+  return rss if sys.platform == "darwin" else rss * 1024
+
+def count_objects( top ):
+  """ Count the objects that are already elaborated in top. """
+  counts = {}
+  dsl = getattr( top, "_dsl", None )
+  if dsl is None:
+    return counts
+
+  for key, attr in ( ("components", "all_components"),
+                     ("signals",    "all_signals"),
+                     ("nets",       "all_value_nets"),
+                     ("upblks",     "all_upblks") ):
+    x = getattr( dsl, attr, None )
+    if x is not None:
+      counts[ key ] = len(x)
+
+  constraints = [ getattr( dsl, x, None ) for x in ( "all_U_U_constraints",
+                  "all_RD_U_constraints", "all_WR_U_constraints", "all_M_constraints" ) ]
+  if any( x is not None for x in constraints ):
+    counts["constraints"] = sum( len(x) for x in constraints if x is not None )
+
+  dag = getattr( top, "_dag", None )
+  if dag is not None:
+    if hasattr( dag, "genblks" ):
+      counts["genblks"] = len(dag.genblks)
+    if hasattr( dag, "all_constraints" ):
+      counts["dag_edges"] = len(dag.all_constraints)
+
+  return counts
+
+class _Record:
+
+  __slots__ = ( 'prof', 'top', 'owner', 'entry', 'start', 'child_peak' )
+
+  def __init__( s, prof, top, name, kind ):
+    s.prof  = prof
+    s.top   = top
+    s.owner = None
+    s.entry = { 'name': name, 'kind': kind, 'depth': len(prof._stack),
+                'top': top.__class__.__name__ }
+
+  def __enter__( s ):
+    prof = s.prof
+    prof.records.append( s.entry )
+
+    if prof.trace_memory:
+      # Fold the peak so far into the parent before resetting it
+      if prof._stack:
+        parent = prof._stack[-1]
+        parent.child_peak = max( parent.child_peak, tracemalloc.get_traced_memory()[1] )
+      _reset_peak()
+    s.child_peak = 0
+
+    prof._stack.append( s )
+    s.start = time.perf_counter()
+    return s
+
+  def __exit__( s, exc_type, exc_value, tb ):
+    elapsed = time.perf_counter() - s.start
+
+    prof = s.prof
+    prof._stack.pop()
+
+    entry = s.entry
+    entry['wall_time'] = elapsed
+
+    if prof.trace_memory:
+      peak = max( s.child_peak, tracemalloc.get_traced_memory()[1] )
+      entry['peak_memory'] = peak
+      if prof._stack:
+        parent = prof._stack[-1]
+        parent.child_peak = max( parent.child_peak, peak )
+      _reset_peak()
+    else:
+      entry['peak_memory'] = None
+
+    entry['max_rss'] = _max_rss()
+    entry['counts']  = count_objects( s.top )
+    if exc_type is not None:
+      entry['error'] = exc_type.__name__
+    return False
+
+class ElaborationProfiler:
+
+  def __init__( s, trace_memory=False ):
+    s.trace_memory = trace_memory
+    s.records = []
+    s._stack  = []
+    s._prev   = None
+    s._started_tracemalloc = False
+
+  def start( s ):
+    global _current
+    if s.trace_memory and not tracemalloc.is_tracing():
+      tracemalloc.start()
+      s._started_tracemalloc = True
+    s._prev  = _current
+    _current = s
+    return s
+
+  def stop( s ):
+    global _current
+    _current = s._prev
+    s._prev  = None
+    if s._started_tracemalloc:
+      tracemalloc.stop()
+      s._started_tracemalloc = False
+
+  def __enter__( s ):
+    return s.start()
+
+  def __exit__( s, exc_type, exc_value, tb ):
+    s.stop()
+    return False
+
+  #-----------------------------------------------------------------------
+  # Report
+  #-----------------------------------------------------------------------
+
+  def report( s ):
+    return {
+      'python'      : sys.version.split()[0],
+      'trace_memory': s.trace_memory,
+      'records'     : [ x for x in s.records if 'wall_time' in x ],
+    }
+
+  def to_json( s, filename=None, indent=2 ):
+    """ Return the report as a JSON string, and also write it to filename
+    if given. """
+    ret = json.dumps( s.report(), indent=indent )
+    if filename is not None:
+      with open( filename, 'w' ) as f:
+        f.write( ret )
+    return ret
+
+  def format_table( s ):
+    """ Return the report as a human-readable table. """
+    count_keys = [ "signals", "nets", "upblks", "constraints" ]
+
+    header = [ "phase/pass", "kind", "time(ms)", "peak(MB)", "rss(MB)" ] + count_keys
+    rows = []
+    for x in s.report()['records']:
+      counts = x['counts']
+      rows.append( [ "  " * x['depth'] + x['name'] + ( " !" if 'error' in x else "" ),
+                     x['kind'],
+                     f"{x['wall_time'] * 1000:.2f}",
+                     "-" if x['peak_memory'] is None else f"{x['peak_memory'] / 2**20:.2f}",
+                     "-" if x['max_rss'] is None else f"{x['max_rss'] / 2**20:.1f}" ] +
+                   [ str( counts[k] ) if k in counts else "-" for k in count_keys ] )
+
+    widths = [ max( len(r[i]) for r in rows + [header] ) for i in range(len(header)) ]
+
+    def fmt( row ):
+      return "  ".join( [ row[0].ljust( widths[0] ), row[1].ljust( widths[1] ) ] +
+                        [ row[i].rjust( widths[i] ) for i in range(2, len(row)) ] )
+
+    lines = [ fmt( header ), "  ".join( "-" * w for w in widths ) ]
+    lines.extend( fmt( r ) for r in rows )
+    return "\n".join( lines )
+
+if os.environ.get( "PYMTL_ELAB_PROFILE" ):
+  _env_profiler = ElaborationProfiler(
+    trace_memory=os.environ.get( "PYMTL_ELAB_PROFILE_MEMORY", "0" ) != "0" ).start()
+
+  def _dump_env_profile():
+    _env_profiler.to_json( os.environ["PYMTL_ELAB_PROFILE"] )
+    print( _env_profiler.format_table(), file=sys.stderr )
+
+  atexit.register( _dump_env_profile )
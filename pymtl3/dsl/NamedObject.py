@@ -19,13 +19,62 @@ Author : Shunning Jiang, Yanghui Ou
 Date   : Nov 3, 2018
 """
 import re
+import sys
 from collections import deque
 
 from .errors import FieldReassignError, NotElaboratedError
 
 
 class DSLMetadata:
-  pass
+  # The metadata of every named object and signal lives in slots, so a
+  # signal doesn't carry a dictionary of its own. Components and passes
+  # can still add more attributes, which go to a lazily created __dict__.
+  __slots__ = (
+    # NamedObject
+    'args', 'kwargs', 'constructed', 'param_tree', 'parent_obj', 'level',
+    'my_name', '_full_name', '_my_name', '_my_indices', 'elaborate_top',
+    'NamedObject_fields', 'host',
+    # Signal
+    'Type', 'type_instance', 'slice', 'slices', 'top_level_signal',
+    'needs_double_buffer', 'const',
+    '__dict__',
+  )
+
+  # The full name is only built from the parent chain when someone asks
+  # for it, e.g. repr or an error message, and then cached. Most signals
+  # of a large design are never printed.
+  @property
+  def full_name( self ):
+    try:
+      name = self._full_name
+      if name is not None:
+        return name
+    except AttributeError:
+      pass
+    name = self._full_name = self.parent_obj._dsl.full_name + self.get_name_suffix()
+    return name
+
+  @full_name.setter
+  def full_name( self, name ):
+    self._full_name = name
+
+  def get_name_suffix( self ):
+    """ Return what this object appends to the full name of its parent,
+    i.e. ".x", ".x[2]" or "[0:8]" for a slice. """
+    sl = getattr( self, 'slice', None )
+    if sl is not None:
+      return f"[{sl.start}:{sl.stop}]"
+    return "." + self.my_name
+
+def get_relative_name( obj, ancestor ):
+  """ Return the name of obj relative to ancestor, e.g. ".x[2].y[0:8]",
+  without building the full names of obj and its parents. """
+  suffixes = []
+  while obj is not ancestor:
+    d = obj._dsl
+    suffixes.append( d.get_name_suffix() )
+    obj = d.parent_obj
+  return "".join( reversed( suffixes ) )
 
 # Special data structure for constructing the parameter tree.
 class ParamTreeNode:
@@ -151,6 +200,8 @@ class NamedObject:
       # for common cases.
       if isinstance( obj, NamedObject ):
         fields = sd.NamedObject_fields
+        if fields is None:
+          fields = sd.NamedObject_fields = set()
         if name in fields:
           if getattr( s, name ) is obj:
             return
@@ -164,7 +215,7 @@ class NamedObject:
         ud.level      = sd.level + 1
 
         ud._my_name  = ud.my_name = name
-        ud.full_name = f"{sd.full_name}.{name}"
+        ud.full_name = None
 
         ud._my_indices = None
 
@@ -185,7 +236,8 @@ class NamedObject:
                     ud.param_tree = ParamTreeNode()
                   ud.param_tree.merge( node )
 
-        ud.NamedObject_fields = set()
+        # Most objects, e.g. all signals, never get a named child
+        ud.NamedObject_fields = None
 
         # Point u's top to my top
         top = ud.elaborate_top = sd.elaborate_top
@@ -201,6 +253,8 @@ class NamedObject:
 
       elif isinstance( obj, list ) and obj and isinstance( obj[0], (NamedObject, list) ):
         fields = sd.NamedObject_fields
+        if fields is None:
+          fields = sd.NamedObject_fields = set()
         if name in fields:
           if getattr( s, name ) is obj:
             return
@@ -220,8 +274,8 @@ class NamedObject:
             ud.level      = sd.level + 1
 
             ud._my_name  = name
-            ud.my_name   = u_name = name + "".join( [ f"[{x}]" for x in indices ] )
-            ud.full_name = f"{sd.full_name}.{u_name}"
+            ud.my_name   = u_name = sys.intern( name + "".join( [ f"[{x}]" for x in indices ] ) )
+            ud.full_name = None
 
             ud._my_indices = indices
 
@@ -242,7 +296,7 @@ class NamedObject:
                         ud.param_tree = ParamTreeNode()
                       ud.param_tree.merge( node )
 
-            ud.NamedObject_fields = set()
+            ud.NamedObject_fields = None
 
             # Point u's top to my top
             top = ud.elaborate_top = sd.elaborate_top
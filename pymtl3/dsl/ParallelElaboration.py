@@ -0,0 +1,240 @@
+"""
+========================================================================
+ParallelElaboration.py
+========================================================================
+Analyze the update blocks of large designs in a pool of worker
+processes.
+
+The read_write_func phase of elaboration turns the variable names
+extracted from the AST of every update block into signal objects. This
+is independent per component, so we split the components into chunks of
+neighbouring subtrees, fork a pool of workers that inherit the
+constructed hierarchy, and let each worker analyze one chunk. Workers
+send back the reads/writes/calls of every block and function encoded as
+indices into the list of named objects that existed before the fork.
+Slices and bitstruct fields spawned during the analysis are encoded by
+their parent and their slice range or field name, and are recreated in
+the parent process. The results are merged back in the order of the
+components' full names, so the metadata does not depend on which worker
+finishes first.
+
+Construction itself stays in the parent process. Update blocks and
+lambda connections are closures over the component and cannot be sent
+to or back from another process.
+
+If any worker fails, e.g. because an update block refers to a variable
+that doesn't exist, the whole phase is rerun serially so that the user
+sees exactly the error a serial elaboration would raise.
+
+Enable it with PYMTL_ELAB_JOBS=<number of workers> (or "auto" to use
+all CPUs), or by calling enable( jobs ). Designs with fewer than
+min_components components are always analyzed serially because forking
+costs more than it saves. Parallel elaboration relies on the fork start
+method and gc.freeze (Python 3.7+), and falls back to serial analysis
+where either is not available.
+
+Date   : Oct 16, 2026
+"""
+import gc
+import multiprocessing
+import os
+
+from .Connectable import Signal
+
+min_components = 64
+
+_jobs  = 0
+_state = None
+
+def enable( jobs=None ):
+  """ Analyze update blocks with the given number of worker processes.
+  None uses all CPUs. """
+  global _jobs
+  _jobs = jobs if jobs is not None else ( os.cpu_count() or 1 )
+
+def disable():
+  global _jobs
+  _jobs = 0
+
+def get_jobs():
+  return _jobs
+
+#-------------------------------------------------------------------------
+# Encoding
+#-------------------------------------------------------------------------
+# An object is encoded as
+# - its index in the list of named objects before the fork,
+# - ( parent code, start, stop ) for a slice,
+# - ( parent code, field name, indices ) for a bitstruct field, or
+# - ( "func", name ) for a function defined with @s.func.
+
+def _encode( obj, index ):
+  i = index.get( id(obj) )
+  if i is not None:
+    return i
+  if isinstance( obj, Signal ):
+    d = obj._dsl
+    parent = _encode( d.parent_obj, index )
+    if d.slice is not None:
+      return ( parent, d.slice.start, d.slice.stop )
+    return ( parent, d._my_name, tuple( d._my_indices ) )
+  return ( "func", obj.__name__ )
+
+def _encode_set( objs, index ):
+  codes = []
+  new   = []
+  for x in objs:
+    i = index.get( id(x) )
+    if i is None:
+      new.append( _encode( x, index ) )
+    else:
+      codes.append( i )
+  # New objects are created in the parent in this order
+  if new:
+    new.sort( key=repr )
+    codes.extend( new )
+  return codes
+
+def _decode( code, objs, c ):
+  if code.__class__ is int:
+    return objs[ code ]
+  if len(code) == 2:
+    return c._dsl.name_func[ code[1] ]
+
+  parent = _decode( code[0], objs, c )
+  if code[1].__class__ is int:
+    return parent[ code[1]:code[2] ]
+
+  x = getattr( parent, code[1] )
+  for i in code[2]:
+    x = x[i]
+  return x
+
+#-------------------------------------------------------------------------
+# Workers
+#-------------------------------------------------------------------------
+
+def _encode_component( c, index ):
+  cd = c._dsl
+  funcs  = { name: ( _encode_set( cd.func_reads [ func ], index ),
+                     _encode_set( cd.func_writes[ func ], index ),
+                     _encode_set( cd.func_calls [ func ], index ) )
+             for name, func in cd.name_func.items() }
+  upblks = { name: ( _encode_set( cd.upblk_reads [ blk ], index ),
+                     _encode_set( cd.upblk_writes[ blk ], index ),
+                     _encode_set( cd.upblk_calls [ blk ], index ) )
+             for name, blk in cd.name_upblk.items() }
+  return funcs, upblks
+
+def _worker( i ):
+  components, chunks, index = _state
+  ret = []
+  try:
+    for j in chunks[i]:
+      c = components[j]
+      c._elaborate_read_write_func()
+      ret.append( ( j, *_encode_component( c, index ) ) )
+  except Exception:
+    return None
+  return ret
+
+def _decode_component( c, funcs, upblks, objs ):
+  cd = c._dsl
+
+  def decode_set( codes ):
+    return { _decode( x, objs, c ) for x in codes }
+
+  cd.func_reads  = {}
+  cd.func_writes = {}
+  cd.func_calls  = {}
+  for name, ( rd, wr, fc ) in funcs.items():
+    func = cd.name_func[ name ]
+    cd.func_reads [ func ] = decode_set( rd )
+    cd.func_writes[ func ] = decode_set( wr )
+    cd.func_calls [ func ] = decode_set( fc )
+
+  cd.upblk_reads  = {}
+  cd.upblk_writes = {}
+  cd.upblk_calls  = {}
+  for name, ( rd, wr, fc ) in upblks.items():
+    blk = cd.name_upblk[ name ]
+    cd.upblk_reads [ blk ] = decode_set( rd )
+    cd.upblk_writes[ blk ] = writes = decode_set( wr )
+    cd.upblk_calls [ blk ] = decode_set( fc )
+
+    # The serial analysis marks the signals written in update_ff
+    if blk in cd.update_ff:
+      for x in writes:
+        x._dsl.needs_double_buffer = True
+
+#-------------------------------------------------------------------------
+# Partitioning
+#-------------------------------------------------------------------------
+
+def _get_weight( c ):
+  return 1 + len( c._dsl.name_upblk ) + len( c._dsl.name_func )
+
+def _partition( components, nchunks ):
+  """ Split the components, sorted by full name, into nchunks contiguous
+  chunks of about the same number of blocks. Components of one subtree
+  have the same prefix and stay in the same chunk where possible. """
+  weights = [ _get_weight( c ) for c in components ]
+  total   = sum( weights )
+
+  chunks = [ [] for _ in range(nchunks) ]
+  acc = 0
+  for j, w in enumerate( weights ):
+    chunks[ min( nchunks - 1, acc * nchunks // total ) ].append( j )
+    acc += w
+  return [ x for x in chunks if x ]
+
+#-------------------------------------------------------------------------
+# Entry point
+#-------------------------------------------------------------------------
+
+def elaborate_read_write_func( top, components ):
+  """ Run _elaborate_read_write_func of the given components of top in
+  parallel. Return False if the components should be analyzed serially
+  instead. """
+  global _state
+
+  if _jobs <= 1 or len(components) < min_components or not hasattr( gc, "freeze" ):
+    return False
+  try:
+    ctx = multiprocessing.get_context( "fork" )
+  except ValueError:
+    return False
+
+  components = sorted( components, key=lambda x: x._dsl.full_name )
+  objs  = list( top._collect_all_single() )
+  index = { id(x): i for i, x in enumerate( objs ) }
+  chunks = _partition( components, _jobs )
+
+  _state = ( components, chunks, index )
+  # Move everything to the permanent generation so that the garbage
+  # collector of the workers doesn't write to, and thus copy, every page
+  # of the inherited hierarchy. This also keeps the collector of the
+  # parent from repeatedly traversing the hierarchy while we decode.
+  gc.freeze()
+  try:
+    with ctx.Pool( len(chunks) ) as pool:
+      results = pool.map( _worker, range( len(chunks) ), chunksize=1 )
+    _state = None
+
+    if any( x is None for x in results ):
+      # Reproduce the error of the serial analysis
+      for c in components:
+        c._elaborate_read_write_func()
+      return True
+
+    for ret in results:
+      for j, funcs, upblks in ret:
+        _decode_component( components[j], funcs, upblks, objs )
+  finally:
+    gc.unfreeze()
+    _state = None
+  return True
+
+_env_jobs = os.environ.get( "PYMTL_ELAB_JOBS" )
+if _env_jobs:
+  enable( None if _env_jobs == "auto" else int( _env_jobs ) )
@@ -0,0 +1,123 @@
+"""
+========================================================================
+AstCache_test.py
+========================================================================
+
+Date   : Oct 16, 2026
+"""
+import ast
+import os
+
+import pytest
+
+from pymtl3.datatypes import Bits32
+
+from .. import AstCache
+from ..Component import Component
+from ..ComponentLevel1 import update
+from ..ComponentLevel2 import update_ff
+from ..Connectable import InPort, OutPort, Wire
+
+
+class A( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Bits32 )
+    s.out = OutPort( Bits32 )
+    s.tmp = Wire( Bits32 )
+
+    @update
+    def upA():
+      s.tmp @= s.in_ + 1
+
+    @update_ff
+    def upB():
+      s.out <<= s.tmp
+
+def _clear_class_cache( cls ):
+  for x in [ '_name_info', '_name_rd', '_name_wr', '_name_fc' ]:
+    if x in cls.__dict__:
+      delattr( cls, x )
+
+@pytest.fixture( autouse=True )
+def restore_cache():
+  # Keep the cache that may have been enabled through PYMTL_AST_CACHE
+  cache_dir, max_size = AstCache._cache_dir, AstCache._max_size
+  yield
+  if cache_dir is not None:
+    AstCache.enable( cache_dir, max_size )
+  _clear_class_cache( A )
+
+def _metadata( m ):
+  reads, writes, calls = m.get_all_upblk_metadata()
+  return { blk.__name__: ( { repr(x) for x in reads[blk] }, { repr(x) for x in writes[blk] } )
+           for blk in reads }
+
+def test_cache_hit( tmp_path, monkeypatch ):
+  AstCache.enable( str(tmp_path) )
+  try:
+    _clear_class_cache( A )
+    a = A()
+    a.elaborate()
+    ref = _metadata( a )
+    AstCache.flush()
+    assert len( os.listdir( tmp_path ) ) == 1
+
+    # Emulate a new process: nothing is parsed if the cache hits
+    AstCache.enable( str(tmp_path) )
+    _clear_class_cache( A )
+
+    def no_parse( *args, **kwargs ):
+      raise AssertionError( "ast.parse should not be called" )
+    monkeypatch.setattr( ast, "parse", no_parse )
+
+    b = A()
+    b.elaborate()
+    assert _metadata( b ) == ref
+    assert A._name_info['upA'][1].strip().startswith( "@update" )
+  finally:
+    AstCache.disable()
+
+def test_cache_invalidated_by_mtime( tmp_path ):
+  AstCache.enable( str(tmp_path) )
+  try:
+    _clear_class_cache( A )
+    A().elaborate()
+    AstCache.flush()
+
+    AstCache.enable( str(tmp_path) )
+    _clear_class_cache( A )
+    filename, src_key, entries = AstCache._get_file( A.construct )
+    assert entries
+
+    # Bump the mtime of the source file in the recorded key
+    AstCache._files.clear()
+    st = os.stat( __file__ )
+    os.utime( __file__, ns=( st.st_atime_ns, st.st_mtime_ns + 1000 ) )
+    try:
+      assert not AstCache._get_file( A.construct )[2]
+    finally:
+      os.utime( __file__, ns=( st.st_atime_ns, st.st_mtime_ns ) )
+  finally:
+    AstCache.disable()
+
+def test_eviction( tmp_path ):
+  for i in range(5):
+    with open( tmp_path / f"{i}.pkl", "wb" ) as f:
+      f.write( b"x" * 100 )
+    os.utime( tmp_path / f"{i}.pkl", ns=( i, i ) )
+
+  AstCache.enable( str(tmp_path), max_size=250 )
+  try:
+    AstCache.evict()
+    assert sorted( os.listdir( tmp_path ) ) == [ "3.pkl", "4.pkl" ]
+  finally:
+    AstCache.disable()
+
+def test_disabled( tmp_path ):
+  AstCache.disable()
+  _clear_class_cache( A )
+  A().elaborate()
+  AstCache.flush()
+  assert AstCache.lookup( A.construct ) is None
+  assert not os.listdir( tmp_path )
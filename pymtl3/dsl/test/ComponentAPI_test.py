@@ -405,6 +405,115 @@ def test_connect_upblk_orders():
   assert u[1].__name__ == "up_ff"
   assert u[2].__name__ == "up_out2"
 
+# The following tests check that the nets that are incrementally updated
+# after mutation APIs are the same as the ones resolved from scratch
+
+def _assert_nets_match_full_resolve( top ):
+  incremental = { (w, frozenset(net)) for w, net in top.get_all_value_nets() }
+  full        = { (w, frozenset(net)) for w, net in top._resolve_value_connections() }
+  assert incremental == full
+
+def test_incremental_nets_replace_list():
+
+  class TopWrap( Component ):
+    def construct( s ):
+      s.in_    = InPort( Bits32 )
+      s.foobar = Foo_shamt_list_wrap( 32 )
+      s.foobar.in_ //= s.in_
+
+  foo_wrap = TopWrap()
+  foo_wrap.elaborate()
+  nnets = len( foo_wrap.get_all_value_nets() )
+
+  for i in [ 3, 0, 4, 1, 2 ]:
+    foo_wrap.replace_component( foo_wrap.foobar.inner[i], Real_shamt )
+    _assert_nets_match_full_resolve( foo_wrap )
+
+  foo_wrap.replace_component( foo_wrap.foobar.inner[2], Real_shamt2 )
+  _assert_nets_match_full_resolve( foo_wrap )
+  assert len( foo_wrap.get_all_value_nets() ) == nnets
+
+  simple_sim_pass( foo_wrap )
+  foo_wrap.in_ = Bits32(4)
+  foo_wrap.tick()
+  assert foo_wrap.foobar.out[2] == 6
+  assert foo_wrap.foobar.out[3] == 32
+
+def test_incremental_nets_slices_and_fields():
+
+  @bitstruct
+  class Pair:
+    a: Bits16
+    b: Bits16
+
+  class Inner( Placeholder, Component ):
+    def construct( s ):
+      s.in_ = InPort ( Bits32 )
+      s.out = OutPort( Bits32 )
+
+  class RealInner( Component ):
+    def construct( s ):
+      s.in_ = InPort ( Bits32 )
+      s.out = OutPort( Bits32 )
+      @update
+      def up_real():
+        s.out @= s.in_ + 1
+
+  class Top( Component ):
+    def construct( s ):
+      s.in_  = InPort( Bits32 )
+      s.out  = OutPort( Bits16 )
+      s.pair = Wire( Pair )
+      s.x    = Wire( Bits32 )
+      s.y    = Wire( Bits32 )
+
+      s.inner = Inner()
+      s.inner.in_ //= s.in_
+      # The writer of the nets of s.y and s.pair.b is only known after
+      # the net of s.inner.out[0:16] is resolved
+      s.x[0:16]  //= s.inner.out[0:16]
+      s.x[16:32] //= s.in_[0:16]
+      s.y        //= s.x
+      s.pair.b   //= s.y[8:24]
+      s.pair.a   //= 7
+      s.out      //= s.pair.b
+
+  top = Top()
+  top.elaborate()
+  top.replace_component( top.inner, RealInner )
+  _assert_nets_match_full_resolve( top )
+
+  simple_sim_pass( top )
+  top.in_ = Bits32(0x1234)
+  top.tick()
+  assert top.out == 0x3412
+
+def test_incremental_nets_add_connection():
+
+  class Top( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits32 )
+      s.out = OutPort( Bits32 )
+      s.w   = Wire( Bits32 )
+      s.inner = Real_shamt( 2 )
+      s.inner.out //= s.out
+
+  top = Top()
+  top.elaborate()
+  top.add_connection( top.in_, top.w )
+  top.add_connection( top.w, top.inner.in_ )
+
+  # Only the affected nets are recomputed
+  changed = top._flush_pending_value_connections()
+  assert changed is not None
+  assert { frozenset(net) for _, net in changed } == { frozenset([ top.in_, top.w, top.inner.in_ ]) }
+  _assert_nets_match_full_resolve( top )
+
+  simple_sim_pass( top )
+  top.in_ = Bits32(3)
+  top.tick()
+  assert top.out == 12
+
 # def test_garbage_collection():
 
   # class X( Component ):
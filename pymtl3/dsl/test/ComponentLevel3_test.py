@@ -6,6 +6,8 @@ ComponentLevel3_test.py
 Author : Shunning Jiang
 Date   : Dec 25, 2017
 """
+import sys
+import types
 from collections import deque
 
 from pymtl3.datatypes import Bits1, Bits8, Bits10, Bits32, bitstruct, clog2, mk_bits
@@ -20,6 +22,7 @@ from pymtl3.dsl.errors import (
     PyMTLDeprecationError,
     UpblkFuncSameNameError,
 )
+from pymtl3.extra.rename_code import rename_code
 
 from .sim_utils import simple_sim_pass
 
@@ -944,6 +947,57 @@ def test_loop_with_temp_name_lambda():
   x.tick()
   assert x.out == [ 10, 11, 12, 13, 14 ]
 
+def test_lambda_template_shared_across_instances():
+
+  class Incr( ComponentLevel3 ):
+    def construct( s, x ):
+      s.in_ = InPort(Bits32)
+      s.out = OutPort(Bits32)
+      s.out //= lambda: s.in_ + x
+
+  class Top( ComponentLevel3 ):
+    def construct( s ):
+      s.in_ = InPort(Bits32)
+      s.out = [ OutPort(Bits32) for _ in range(4) ]
+
+      s.c = [ Incr(i) for i in range(4) ]
+      for i in range(4):
+        s.c[i].in_ //= s.in_
+        s.c[i].out //= s.out[i]
+
+  x = Top()
+  x.elaborate()
+
+  # The block is compiled once and each instance binds its own closure
+  assert len( Incr._lambda_templates ) == 1
+  blks = [ list( c._dsl.name_upblk.values() )[0] for c in x.c ]
+  assert [ blk.__name__ for blk in blks ] == [ f"_lambda__s_c_{i}__out" for i in range(4) ]
+  assert [ blk.__code__.co_name for blk in blks ] == [ blk.__name__ for blk in blks ]
+  assert len({ blk.__code__.co_code for blk in blks }) == 1
+
+  simple_sim_pass(x)
+  x.in_ = 10
+  x.tick()
+  assert x.out == [ 10, 11, 12, 13 ]
+
+def test_rename_code():
+  # Must work on every supported Python version, including the ones
+  # without CodeType.replace (3.6/3.7) or co_qualname (< 3.11)
+
+  def f( a, *, b=1 ):
+    c = a + b
+    return lambda: c
+
+  code = rename_code( f.__code__, "g", "<g>" )
+  assert code.co_name == "g" and code.co_filename == "<g>"
+  assert code.co_code == f.__code__.co_code
+  assert code.co_varnames == f.__code__.co_varnames
+  if sys.version_info >= (3, 11):
+    assert code.co_qualname == "g"
+
+  g = types.FunctionType( code, {} )
+  assert g( 1, b=1 )() == 2 and g( 1, b=3 )() == 4
+
 def test_invalid_in_out_loopback_at_self():
 
   class Comp( ComponentLevel3 ):
@@ -1028,3 +1082,47 @@ def test_slice_over_slice():
   a = A()
   a.elaborate()
   assert str(a._dsl.connect_order) == "[(s.out, s.in_[20:28])]"
+
+def test_connection_loop():
+
+  class Top( ComponentLevel3 ):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.w   = [ Wire( Bits8 ) for _ in range(3) ]
+      connect( s.in_,  s.w[0] )
+      connect( s.w[0], s.w[1] )
+      connect( s.w[1], s.w[2] )
+      connect( s.w[2], s.w[0] )
+
+  a = Top()
+  try:
+    a.elaborate()
+  except InvalidConnectionError as e:
+    print(e)
+    assert "connection loop" in str(e)
+    return
+  raise Exception("Should've thrown InvalidConnectionError")
+
+def test_slice_writer_chain():
+
+  # The writer of each net is only known after the net of the previous
+  # wire is resolved: s.w[k+1][8:16] is written by s.w[k][4:12], which
+  # becomes a writer because it overlaps s.w[k][8:16].
+  class Top( ComponentLevel3 ):
+    def construct( s, n=16 ):
+      s.out = OutPort( Bits8 )
+      s.w   = [ Wire( mk_bits(16) ) for _ in range(n) ]
+      for k in reversed(range(n-1)):
+        connect( s.w[k][4:12], s.w[k+1][8:16] )
+      connect( s.out, s.w[n-1][8:16] )
+
+      @update
+      def up_w():
+        s.w[0][8:16] @= 1
+
+  a = Top()
+  a.elaborate()
+
+  writers = { repr(x) for x, _ in a.get_all_value_nets() }
+  assert len( a.get_all_value_nets() ) == 15
+  assert writers == { f"s.w[{k}][4:12]" for k in range(15) }
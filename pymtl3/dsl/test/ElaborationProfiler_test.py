@@ -0,0 +1,101 @@
+#=========================================================================
+# ElaborationProfiler_test.py
+#=========================================================================
+#
+# Date   : Oct 16, 2026
+
+import json
+
+from pymtl3.datatypes import Bits32
+from pymtl3.dsl import *
+from pymtl3.passes.PassGroups import DefaultPassGroup
+
+from .. import ElaborationProfiler as ElabProf
+from ..ElaborationProfiler import ElaborationProfiler
+
+
+class Inner( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Bits32 )
+    s.out = OutPort( Bits32 )
+
+    @update
+    def up_inner():
+      s.out @= s.in_ + 1
+
+class Top( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Bits32 )
+    s.out = OutPort( Bits32 )
+    s.inners = [ Inner() for _ in range(3) ]
+
+    s.inners[0].in_ //= s.in_
+    for i in range(1, 3):
+      s.inners[i].in_ //= s.inners[i-1].out
+    s.out //= s.inners[2].out
+
+def test_phases_and_passes():
+  with ElaborationProfiler() as prof:
+    top = Top()
+    top.elaborate()
+    top.apply( DefaultPassGroup() )
+
+  assert ElabProf._current is None
+
+  records = prof.report()['records']
+  names = [ x['name'] for x in records ]
+  for x in [ 'elaborate', 'construct', 'read_write_func', 'resolve_value_connections',
+             'floodfill_nets', 'check_valid_dsl_code', 'DefaultPassGroup',
+             'GenDAGPass', 'DynamicSchedulePass', 'PrepareSimPass' ]:
+    assert x in names
+
+  elab = records[ names.index('elaborate') ]
+  assert elab['kind'] == 'phase' and elab['depth'] == 0
+  assert elab['counts']['components'] == 4
+  assert elab['counts']['upblks'] == 3
+  assert elab['counts']['nets'] == len( top.get_all_value_nets() )
+  assert elab['peak_memory'] is None
+
+  group = records[ names.index('DefaultPassGroup') ]
+  dag   = records[ names.index('GenDAGPass') ]
+  assert group['kind'] == dag['kind'] == 'pass'
+  assert dag['depth'] == group['depth'] + 1
+  assert dag['wall_time'] <= group['wall_time']
+  assert 'genblks' in dag['counts']
+
+  # The simulator still works
+  top.sim_reset()
+  top.in_ @= 10
+  top.sim_eval_combinational()
+  assert top.out == 13
+
+  # Nothing is recorded after the profiler stops
+  top2 = Top()
+  top2.elaborate()
+  assert len( prof.report()['records'] ) == len( records )
+
+def test_trace_memory_and_report( tmpdir ):
+  with ElaborationProfiler( trace_memory=True ) as prof:
+    top = Top()
+    top.apply( DefaultPassGroup() )
+
+  records = prof.report()['records']
+  parent = records[0]
+  assert parent['name'] == 'elaborate'
+  for x in records:
+    assert x['peak_memory'] > 0
+    if x['depth'] == 1 and x['kind'] == 'phase':
+      assert x['peak_memory'] <= parent['peak_memory']
+
+  filename = str( tmpdir.join( "profile.json" ) )
+  s = prof.to_json( filename )
+  with open( filename ) as f:
+    assert json.load( f ) == json.loads( s ) == prof.report()
+
+  table = prof.format_table()
+  lines = table.splitlines()
+  assert lines[0].split()[:3] == [ 'phase/pass', 'kind', 'time(ms)' ]
+  assert len(lines) == len(records) + 2
+  assert "    floodfill_nets" in table
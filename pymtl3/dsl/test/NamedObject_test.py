@@ -7,7 +7,7 @@ Author : Shunning Jiang
 Date   : Dec 23, 2017
 """
 from pymtl3.dsl.errors import FieldReassignError
-from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.dsl.NamedObject import NamedObject, get_relative_name
 
 
 class Chicken(NamedObject):
@@ -52,6 +52,27 @@ def test_NamedObject_normal():
   assert repr(x.dinner.chicken.protein)== "s.dinner.chicken.protein"
   print(x.dinner.chicken.protein)
 
+def test_NamedObject_lazy_full_name():
+
+  x = Human( nlunch=1, ndinner=3 )
+  x.elaborate()
+
+  protein = x.dinner[2].chicken.protein
+  assert protein._dsl._full_name is None
+  assert x.dinner[2]._dsl._full_name is None
+
+  assert get_relative_name( protein, x.dinner[2] ) == ".chicken.protein"
+  assert get_relative_name( protein, x ) == ".dinner[2].chicken.protein"
+  assert protein._dsl._full_name is None
+
+  # Computed once from the parent chain and cached
+  assert repr(protein) == "s.dinner[2].chicken.protein"
+  assert protein._dsl._full_name == "s.dinner[2].chicken.protein"
+  assert x.dinner[2]._dsl._full_name == "s.dinner[2]"
+
+  # Unelaborated objects don't have a name yet
+  assert not hasattr( Dog()._dsl, "full_name" )
+
 def test_NamedObject_list1():
 
   x = Human( nlunch=1, ndinner=5 )
@@ -0,0 +1,158 @@
+"""
+========================================================================
+ParallelElaboration_test.py
+========================================================================
+
+Date   : Oct 16, 2026
+"""
+import gc
+
+import pytest
+
+from pymtl3.datatypes import Bits4, Bits8, Bits16, bitstruct
+
+from .. import ParallelElaboration
+from ..Component import Component
+from ..ComponentLevel1 import update
+from ..ComponentLevel2 import update_ff
+from ..Connectable import InPort, OutPort, Wire
+from ..errors import VarNotDeclaredError
+
+
+@bitstruct
+class Pair:
+  a: Bits8
+  b: [ Bits4, Bits4 ]
+
+class Leaf( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Pair )
+    s.out = OutPort( Bits16 )
+    s.reg = Wire( Bits8 )
+
+    # s.in_.b, s.reg[0:4] and s.out[8:16] are only spawned when the update
+    # blocks are analyzed
+    @update
+    def up_out():
+      s.out[0:8]  @= s.reg
+      s.out[8:16] @= helper( s.in_.b[1] )
+
+    @update_ff
+    def up_reg():
+      s.reg <<= s.in_.a + s.reg[0:4]
+
+    @s.func
+    def helper( x ):
+      return s.in_.b[0] + x
+
+class Node( Component ):
+
+  def construct( s, nleaves=4 ):
+    s.in_  = InPort( Pair )
+    s.out  = OutPort( Bits16 )
+    s.leaf = [ Leaf() for _ in range(nleaves) ]
+
+    for x in s.leaf:
+      x.in_ //= s.in_
+
+    @update
+    def up_sum():
+      s.out @= 0
+      for x in s.leaf:
+        s.out @= s.out + x.out
+
+class Tree( Component ):
+
+  def construct( s, nnodes=8, bad=False ):
+    s.in_  = InPort( Pair )
+    s.out  = OutPort( Bits16 )
+    s.node = [ Node() for _ in range(nnodes) ]
+
+    for x in s.node:
+      x.in_ //= s.in_
+    s.out //= s.node[-1].out
+
+    if bad:
+      @update
+      def up_bad():
+        s.out @= s.nothing
+
+@pytest.fixture
+def parallel( monkeypatch ):
+  monkeypatch.setattr( ParallelElaboration, "min_components", 2 )
+  monkeypatch.setattr( ParallelElaboration, "_jobs", 2 )
+
+def _metadata( top ):
+  def names( objs ):
+    return sorted( x._dsl.full_name if hasattr( x, "_dsl" ) else x.__name__ for x in objs )
+
+  ret = {}
+  for c in top._dsl.all_components:
+    for blk in c.get_update_blocks():
+      ret[ f"{c._dsl.full_name}.{blk.__name__}" ] = ( names( c._dsl.upblk_reads[ blk ] ),
+                                                       names( c._dsl.upblk_writes[ blk ] ),
+                                                       names( c._dsl.upblk_calls[ blk ] ) )
+    for func in c._dsl.name_func.values():
+      ret[ f"{c._dsl.full_name}.{func.__name__}" ] = names( c._dsl.func_reads[ func ] )
+
+  nets = sorted( ( repr(writer), names( signals ) ) for writer, signals in top.get_all_value_nets() )
+  double = names( x for x in top._dsl.all_signals if x._dsl.needs_double_buffer )
+  return ret, nets, double
+
+@pytest.mark.skipif( not hasattr( gc, "freeze" ), reason="gc.freeze needs Python 3.7+" )
+def test_same_metadata_as_serial( parallel, monkeypatch ):
+  decoded = []
+  def decode_component( c, *args ):
+    decoded.append( c )
+    return _decode_component( c, *args )
+  _decode_component = ParallelElaboration._decode_component
+  monkeypatch.setattr( ParallelElaboration, "_decode_component", decode_component )
+
+  ref = Tree()
+  ParallelElaboration.disable()
+  ref.elaborate()
+
+  ParallelElaboration.enable( 2 )
+  top = Tree()
+  top.elaborate()
+
+  # All components were analyzed by the workers
+  assert len( decoded ) == len( top._dsl.all_components )
+
+  ret = _metadata( top )
+  assert ret == _metadata( ref )
+
+  # Spawned slices and fields are recreated in the parent process
+  leaf = top.node[3].leaf[1]
+  assert leaf.reg[0:4] in leaf._dsl.upblk_reads[ leaf._dsl.name_upblk['up_reg'] ]
+  assert leaf.in_.b[1] in leaf._dsl.upblk_reads[ leaf._dsl.name_upblk['up_out'] ]
+  assert top.node[3].leaf[1].reg._dsl.needs_double_buffer
+
+def test_error_is_raised_serially( parallel ):
+  with pytest.raises( VarNotDeclaredError ):
+    Tree( bad=True ).elaborate()
+
+def test_small_design_is_serial( monkeypatch ):
+  monkeypatch.setattr( ParallelElaboration, "_jobs", 2 )
+
+  def fail( *args ):
+    raise AssertionError( "should not fork" )
+  monkeypatch.setattr( ParallelElaboration, "_worker", fail )
+
+  Leaf().elaborate()
+
+def test_serial_without_gc_freeze( parallel, monkeypatch ):
+  if hasattr( gc, "freeze" ):
+    monkeypatch.delattr( gc, "freeze" )
+
+  def fail( *args ):
+    raise AssertionError( "should not fork" )
+  monkeypatch.setattr( ParallelElaboration, "_worker", fail )
+
+  top = Tree()
+  top.elaborate()
+  ref = Tree()
+  ParallelElaboration.disable()
+  ref.elaborate()
+  assert _metadata( top ) == _metadata( ref )
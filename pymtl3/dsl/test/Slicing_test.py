@@ -1029,3 +1029,37 @@ def test_multiple_write_same_slice_with_overlap():
     print("{} is thrown\n{}".format( e.__class__.__name__, e ))
     return
   raise Exception("Should've thrown MultiWriterError.")
+
+def test_compact_signal_metadata():
+
+  class Top( ComponentLevel3 ):
+    def construct( s ):
+      s.A = Wire( Bits32 )
+      s.B = [ Wire( Bits16 ) for _ in range(2) ]
+      s.B[0] //= s.A[0:16]
+      s.B[1] //= s.A[16:32]
+
+      @update
+      def up_A():
+        s.A @= 0
+
+  x = Top()
+  x.elaborate()
+
+  # Signals only use the slots of their metadata, and slice tables are
+  # only created for signals that are sliced
+  for sig in [ x.A, x.B[0], x.A[0:16] ]:
+    assert not hasattr( sig._dsl, "__dict__" ) or not sig._dsl.__dict__
+  assert x.B[0]._dsl.slices is None
+  assert x.B[0]._dsl.NamedObject_fields is None
+  assert x.A.get_sibling_slices() == []
+  assert x.A[0:16].get_sibling_slices() == [ x.A[16:32] ]
+
+  # Interned names are shared across instances
+  y = Top()
+  y.elaborate()
+  assert x.B[1]._dsl.my_name is y.B[1]._dsl.my_name
+
+  # Other metadata can still be attached
+  x.A._dsl.foo = 1
+  assert x.A._dsl.foo == 1
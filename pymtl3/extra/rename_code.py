@@ -0,0 +1,29 @@
+"""
+========================================================================
+rename_code.py
+========================================================================
+Give a code object compiled once from a shared template the name and
+file name of the block it is reused for.
+
+Date   : Oct 17, 2026
+"""
+import sys
+from types import CodeType
+
+
+def rename_code( code, name, filename ):
+  """ Return a copy of code with co_name (and co_qualname on 3.11+) set
+  to name and co_filename set to filename. """
+
+  if sys.version_info >= (3, 11):
+    return code.replace( co_name=name, co_qualname=name, co_filename=filename )
+
+  if sys.version_info >= (3, 8):
+    return code.replace( co_name=name, co_filename=filename )
+
+  # CodeType.replace doesn't exist before 3.8
+  return CodeType( code.co_argcount, code.co_kwonlyargcount, code.co_nlocals,
+                   code.co_stacksize, code.co_flags, code.co_code, code.co_consts,
+                   code.co_names, code.co_varnames, filename, name,
+                   code.co_firstlineno, code.co_lnotab, code.co_freevars,
+                   code.co_cellvars )
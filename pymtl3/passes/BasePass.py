@@ -7,6 +7,11 @@ An "abstract" base class for all passes.
 Author : Shunning Jiang
 Date   : Dec 17, 2017
 """
+from functools import wraps
+
+from pymtl3.dsl import ElaborationProfiler
+
+
 class PassMetadata:
   pass
 
@@ -16,3 +21,17 @@ class BasePass:
 
   def __call__( self, m ): # execute pass on model m
     pass
+
+  # Every pass is recorded by the elaboration profiler if it is active
+  def __init_subclass__( cls, **kwargs ):
+    super().__init_subclass__( **kwargs )
+
+    if '__call__' in cls.__dict__:
+      call = cls.__dict__['__call__']
+
+      @wraps( call )
+      def profiled_call( self, m, *args, **kwargs ):
+        with ElaborationProfiler.profile_pass( self, m ):
+          return call( self, m, *args, **kwargs )
+
+      cls.__call__ = profiled_call
@@ -1,10 +1,14 @@
 from .autotick.OpenLoopCLPass import OpenLoopCLPass
 from .BasePass import BasePass
+from .sim.BatchSimPass import BatchSimPass
 from .sim.DynamicSchedulePass import DynamicSchedulePass
+from .sim.EventDrivenSchedulePass import EventDrivenSchedulePass
 from .sim.GenDAGPass import GenDAGPass
+from .sim.MultiProcessSimPass import MultiProcessSimPass
 from .sim.PrepareSimPass import PrepareSimPass
 from .sim.SimpleSchedulePass import SimpleSchedulePass
 from .sim.SimpleTickPass import SimpleTickPass
+from .sim.WrapGeneratorPass import WrapGeneratorPass
 from .sim.WrapGreenletPass import WrapGreenletPass
 from .tracing.CLLineTracePass import CLLineTracePass
 from .tracing.LineTraceParamPass import LineTraceParamPass
@@ -25,14 +29,25 @@ class SimpleSimPass( BasePass ):
 
     PrepareSimPass(print_line_trace=False)( top )
 
+# Update blocks that call blocking methods are wrapped with greenlets by
+# default. blocking="generator" rewrites them into generators instead.
+# time_skip=True makes sim_tick skip the cycles in which all components
+# report that they are idle (see sim/TimeSkip.py).
 class DefaultPassGroup( BasePass ):
   def __init__( s, *, vcdwave=None, textwave=False,
-                      linetrace=False, reset_active_high=True ):
+                      linetrace=False, reset_active_high=True,
+                      blocking="greenlet", time_skip=False ):
 
     s.vcdwave = vcdwave
     s.textwave = textwave
     s.linetrace = linetrace
     s.reset_active_high = reset_active_high
+    s.time_skip = time_skip
+
+    if   blocking == "greenlet":  s.WrapPass = WrapGreenletPass
+    elif blocking == "generator": s.WrapPass = WrapGeneratorPass
+    else:
+      raise ValueError( f"blocking should be 'greenlet' or 'generator', not {blocking!r}" )
 
   def __call__( s, top ):
 
@@ -44,14 +59,67 @@ class DefaultPassGroup( BasePass ):
 
     LineTraceParamPass()( top )
     GenDAGPass()( top )
-    WrapGreenletPass()( top )
+    s.WrapPass()( top )
     CLLineTracePass()( top )
     DynamicSchedulePass()( top )
     VcdGenerationPass()( top )
     PrintTextWavePass()( top )
 
     PrepareSimPass(print_line_trace=s.linetrace,
-                   reset_active_high=s.reset_active_high)( top )
+                   reset_active_high=s.reset_active_high,
+                   time_skip=s.time_skip)( top )
+
+# EventDrivenPassGroup only re-evaluates the update blocks whose input
+# signals changed. It takes the same options as DefaultPassGroup.
+class EventDrivenPassGroup( DefaultPassGroup ):
+
+  def __call__( s, top ):
+
+    if s.vcdwave:
+      top.set_metadata( VcdGenerationPass.vcd_file_name, s.vcdwave )
+
+    if s.textwave:
+      top.set_metadata( PrintTextWavePass.enable, True )
+
+    LineTraceParamPass()( top )
+    GenDAGPass()( top )
+    s.WrapPass()( top )
+    CLLineTracePass()( top )
+    EventDrivenSchedulePass()( top )
+    VcdGenerationPass()( top )
+    PrintTextWavePass()( top )
+
+    PrepareSimPass(print_line_trace=s.linetrace,
+                   reset_active_high=s.reset_active_high,
+                   time_skip=s.time_skip)( top )
+
+# MultiProcessPassGroup simulates pure RTL designs in multiple processes.
+# The partitions are chosen based on MultiProcessSimPass.partition.
+class MultiProcessPassGroup( BasePass ):
+  def __init__( s, *, nprocs=None, reset_active_high=True ):
+    s.nprocs = nprocs
+    s.reset_active_high = reset_active_high
+
+  def __call__( s, top ):
+    GenDAGPass()( top )
+    DynamicSchedulePass()( top )
+
+    MultiProcessSimPass(nprocs=s.nprocs,
+                        reset_active_high=s.reset_active_high)( top )
+
+# BatchPassGroup simulates nlanes independent copies of a pure RTL design
+# in lockstep. It requires NumPy.
+class BatchPassGroup( BasePass ):
+  def __init__( s, *, nlanes, reset_active_high=True ):
+    s.nlanes = nlanes
+    s.reset_active_high = reset_active_high
+
+  def __call__( s, top ):
+    GenDAGPass()( top )
+    DynamicSchedulePass()( top )
+
+    BatchSimPass(nlanes=s.nlanes,
+                 reset_active_high=s.reset_active_high)( top )
 
 class AutoTickSimPass( BasePass ):
   def __init__( s, print_line_trace=True ):
@@ -9,7 +9,6 @@
 # Date   : Apr 20, 2019
 """
 import os
-import random
 from collections import deque
 
 import py
@@ -20,6 +19,7 @@ from pymtl3.dsl.errors import UpblkCyclicError
 
 from ..BasePass import BasePass, PassMetadata
 from ..errors import PassOrderError
+from ..sim.BlockGraph import BlockGraph
 from ..sim.PrepareSimPass import PrepareSimPass
 from ..sim.SimpleSchedulePass import SimpleSchedulePass, dump_dag
 from ..sim.SimpleTickPass import SimpleTickPass
@@ -125,66 +125,15 @@ class OpenLoopCLPass( BasePass ):
     if 'MAMBA_DAG' in os.environ:
       dump_dag( top, V, E )
 
-    #---------------------------------------------------------------------
-    # Run Kosaraju's algorithm to shrink all strongly connected components
-    # (SCCs) into super nodes
-    #---------------------------------------------------------------------
-    # See passes/sim/DynamicSchedulePass.py
-    # TODO refactor this
-
-    PO = []
-
-    vertices = list(G.keys())
-    random.shuffle(vertices)
-    visited = set()
-
-    for u in vertices:
-      stack = [ (u, False) ]
-      while stack:
-        u, second_visit = stack.pop()
-
-        if second_visit:
-          PO.append( u )
-        elif u not in visited:
-          visited.add( u )
-          stack.append( (u, True) )
-          for v in reversed(G[u]):
-            stack.append( (v, False) )
-
-    RPO = PO[::-1]
-
-    # Second bfs on G_T to generate SCCs
-
-    SCCs  = []
-    v_SCC = {}
-    visited = set()
-
-    for u in RPO:
-      if u not in visited:
-        visited.add( u )
-        scc = set()
-        SCCs.append( scc )
-        Q = deque( [u] )
-        scc.add( u )
-        while Q:
-          u = Q.popleft()
-          v_SCC[u] = len(SCCs) - 1
-          for v in G_T[u]:
-            if v not in visited:
-              visited.add( v )
-              Q.append( v )
-              scc.add( v )
-
-    # Construct a new graph of SCCs
+    # Shrink all strongly connected components (SCCs) into super nodes
 
-    G_new = { i: set() for i in range(len(SCCs)) }
-    InD   = { i: 0     for i in range(len(SCCs)) }
+    graph = BlockGraph( V, E )
+    scc_ids, scc_of = graph.get_sccs()
+    SCCs = [ { graph.blocks[x] for x in scc } for scc in scc_ids ]
 
-    for (u, v) in E: # u -> v
-      scc_u, scc_v = v_SCC[u], v_SCC[v]
-      if scc_u != scc_v and scc_v not in G_new[ scc_u ]:
-        InD[ scc_v ] += 1
-        G_new[ scc_u ].add( scc_v )
+    scc_graph = graph.condense( scc_ids, scc_of )
+    G_new = { i: set( scc_graph.successors( i ) ) for i in range(len(SCCs)) }
+    InD   = dict( enumerate( scc_graph.in_degrees() ) )
 
     # Perform topological sort on SCCs
 
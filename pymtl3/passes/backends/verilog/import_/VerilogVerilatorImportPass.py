@@ -20,7 +20,13 @@ from itertools import cycle
 from textwrap import indent
 
 from pymtl3 import MetadataKey
-from pymtl3.datatypes import Bits, is_bitstruct_class, is_bitstruct_inst, mk_bits
+from pymtl3.datatypes import (
+    Bits,
+    get_codec,
+    is_bitstruct_class,
+    is_bitstruct_inst,
+    mk_bits,
+)
 from pymtl3.dsl import Component
 from pymtl3.dsl.errors import UnsetMetadataError
 from pymtl3.passes.BasePass import BasePass
@@ -901,43 +907,13 @@ m->{name}{sub} = {deference}model->{name}{sub};
   # Methods that generate python signal writes
   #-----------------------------------------------------------------------
 
-  def _gen_vector_write( s, d, lhs, rhs, dtype, pos ):
-    nbits = dtype.get_length()
-    l, r = pos, pos+nbits
-    if d == 'i':
-      ret = [ f"{rhs}[{l}:{r}] @= {lhs}" ]
-    else:
-      ret = [ f"{lhs} @= {rhs}[{l}:{r}]" ]
-    return ret, r
-
-  def _gen_struct_write( s, d, lhs, rhs, dtype, pos ):
-    ret = []
-    all_properties = reversed(list(dtype.get_all_properties().items()))
-    for name, field in all_properties:
-      _ret, pos = s._gen_write_dispatch( d, f"{lhs}.{name}", rhs, field, pos )
-      ret.extend( _ret )
-    return ret, pos
-
-  def _gen_packed_array_write( s, d, lhs, rhs, dtype, n_dim, pos ):
-    if not n_dim:
-      return s._gen_write_dispatch( d, lhs, rhs, dtype, pos )
-    # Recursively generate array
-    ret = []
-    for idx in range(n_dim[0]):
-      _ret, pos = s._gen_packed_array_write( d, f"{lhs}[{idx}]", rhs, dtype, n_dim[1:], pos )
-      ret.extend( _ret )
-    return ret, pos
-
-  def _gen_write_dispatch( s, d, lhs, rhs, dtype, pos ):
-    if isinstance( dtype, rdt.Vector ):
-      return s._gen_vector_write( d, lhs, rhs, dtype, pos )
-    elif isinstance( dtype, rdt.Struct ):
-      return s._gen_struct_write( d, lhs, rhs, dtype, pos )
-    elif isinstance( dtype, rdt.PackedArray ):
-      n_dim = dtype.get_dim_sizes()
-      sub_dtype = dtype.get_sub_dtype()
-      return s._gen_packed_array_write( d, lhs, rhs, sub_dtype, n_dim, pos )
-    assert False, f"unrecognized data type {dtype}!"
+  def _gen_struct_codec( s, dtype, symbols ):
+    # The cached codec of the bitstruct packs/unpacks all fields in one
+    # call instead of going through to_bits or slicing every field
+    codec_name = f"_codec_{dtype.get_name()}"
+    if codec_name not in symbols:
+      symbols[codec_name] = get_codec( dtype.get_class() )
+    return codec_name
 
   #-------------------------------------------------------------------------
   # gen_comb_input
@@ -955,16 +931,13 @@ m->{name}{sub} = {deference}model->{name}{sub};
 
   def gen_port_struct_input( s, lhs, rhs, mangled_rhs, dtype, symbols ):
     dtype_nbits = dtype.get_length()
-    # If the top-level signal is a struct, we add the datatype to symbol?
-    dtype_name = dtype.get_class().__name__
-    if dtype_name not in symbols:
-      symbols[dtype_name] = dtype.get_class()
+    codec_name  = s._gen_struct_codec( dtype, symbols )
 
     blocks   = [ '',
                  f's.{mangled_rhs} = Wire( {s._gen_bits_decl(dtype_nbits)} )',
                  '@update',
                  f'def istruct_{mangled_rhs}():',
-                 f'  s.{mangled_rhs} @= {rhs}' ]
+                 f'  s.{mangled_rhs} @= {codec_name}.to_int( {rhs} )' ]
 
     # We don't create a new struct if we are copying values from pymtl
     # land to verilator, i.e. this port is the input to the imported
@@ -1050,15 +1023,7 @@ m->{name}{sub} = {deference}model->{name}{sub};
 
   def gen_port_struct_output( s, lhs, mangled_lhs, rhs, dtype, symbols ):
     dtype_nbits = dtype.get_length()
-    # If the top-level signal is a struct, we add the datatype to symbol?
-    dtype_name = dtype.get_name()
-    if dtype_name not in symbols:
-      symbols[dtype_name] = dtype.get_class()
-
-    blocks   = [ '',
-                 f's.{mangled_lhs} = Wire( {s._gen_bits_decl(dtype_nbits)} )',
-                 '@update',
-                 f'def ostruct_{mangled_lhs}():' ]
+    codec_name  = s._gen_struct_codec( dtype, symbols )
 
     # We create a long Bits object to accept CFFI value for struct
     # the temporary wire name
@@ -1066,13 +1031,11 @@ m->{name}{sub} = {deference}model->{name}{sub};
     # We create a new struct if we are copying values from verilator
     # world to pymtl land and send it out through the output of this
     # component
-    body, pos = s._gen_struct_write( 'o', lhs, 's.'+mangled_lhs, dtype, 0 )
-    assert pos == dtype.get_length()
-
-    upblk_content = body
-    make_indent( upblk_content, 1 )
-
-    blocks += upblk_content
+    blocks   = [ '',
+                 f's.{mangled_lhs} = Wire( {s._gen_bits_decl(dtype_nbits)} )',
+                 '@update',
+                 f'def ostruct_{mangled_lhs}():',
+                 f'  {lhs} @= {codec_name}.from_int( int( s.{mangled_lhs} ) )' ]
 
     # We create a long Bits object tmp first
     # Then we load the full Bits to tmp
@@ -37,3 +37,8 @@ class PlaceholderConfigError( Exception ):
   """ Raised when a placeholder is incorrectly configured. """
   def __init__( self, obj, msg ):
     return super().__init__(f"Error while configuring {obj}:\n - {msg}")
+
+class CheckpointError( Exception ):
+  """ Raised when a simulator checkpoint cannot be saved or restored. """
+  def __init__( self, filename, msg ):
+    return super().__init__(f"Checkpoint {filename}: {msg}")
@@ -12,6 +12,7 @@ from queue import PriorityQueue
 
 from ..BasePass import BasePass, PassMetadata
 from ..errors import PassOrderError
+from ..sim.BlockGraph import get_block_graph
 from ..sim.SimpleSchedulePass import SimpleSchedulePass, check_schedule
 from .UnrollSimPass import UnrollSimPass
 
@@ -125,16 +126,9 @@ class HeuristicTopoPass( UnrollSimPass ):
 
     # Construct the intra-cycle graph based on normal update blocks
 
-    V   = top._dag.final_upblks - top.get_all_update_ff()
-    E   = set()
-    Es  = { v: [] for v in V }
-    InD = { v: 0  for v in V }
-
-    for (u, v) in top._dag.all_constraints: # u -> v
-      if u in V and v in V:
-        InD[v] += 1
-        Es[u].append( v )
-        E.add( (u, v) )
+    graph  = get_block_graph( top )
+    blocks = graph.blocks
+    InD    = graph.in_degrees()
 
     # Extract branchiness
 
@@ -153,20 +147,17 @@ class HeuristicTopoPass( UnrollSimPass ):
 
     top._sched.update_schedule = update_schedule = []
 
-    # Python3 doesn't have hash for functions
-    id_v = { id(v): v for v in V}
-
     Q = PriorityQueue(0)
-    for v in V:
+    for v in range(len(blocks)):
       if not InD[v]:
-        Q.put( (branchiness[ v ], id(v)) )
+        Q.put( (branchiness[ blocks[v] ], v) )
 
     while not Q.empty():
       br, u = Q.get()
-      update_schedule.append( id_v[u] )
-      for v in Es[id_v[u]]:
+      update_schedule.append( blocks[u] )
+      for v in graph.successors( u ):
         InD[v] -= 1
         if not InD[v]:
-          Q.put( (branchiness[ v ], id(v)) )
+          Q.put( (branchiness[ blocks[v] ], v) )
 
-    check_schedule( top, update_schedule, V, E, InD )
+    check_schedule( top, update_schedule, graph, InD )
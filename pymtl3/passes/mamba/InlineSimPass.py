@@ -0,0 +1,374 @@
+"""
+========================================================================
+InlineSimPass.py
+========================================================================
+Generate one "kernel" function for each schedule by inlining the bodies
+of update blocks and net blocks instead of calling them one by one like
+UnrollSimPass does. On CPython the overhead of calling many small
+functions and looking up the same s.x.y attribute chains again and again
+dominates the simulation time of RTL designs.
+
+The kernel is created by a factory function whose local variables hold
+every component, signal array and signal object referenced by the
+inlined blocks, so that each of them is looked up only once at code
+generation time. This is safe because after lock_in_simulation the
+signal objects never change; @= and <<= update them in place. The same
+goes for the functions, classes and modules that the blocks refer to.
+Any other free variable or global, e.g. a counter that another block
+rebinds with nonlocal, is read through its cell or the globals of the
+block every time the kernel runs.
+
+A block is only inlined if we have its AST and its body doesn't depend
+on having its own frame (e.g. return, nested functions, global/nonlocal
+or locals()). Otherwise the kernel just calls it.
+
+The kernel source is generated with ast.unparse, which is new in Python
+3.9. On older versions the pass falls back to the tick function of
+PrepareSimPass, which calls the blocks one by one.
+
+Date   : Oct 16, 2026
+"""
+import ast
+import builtins
+import copy
+import re
+import types
+from linecache import cache as line_cache
+
+from pymtl3.datatypes import Bits, is_bitstruct_inst
+from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.extra.pypy import custom_exec
+
+from ..sim.PrepareSimPass import PrepareSimPass
+
+
+class _CannotInline( Exception ):
+  pass
+
+_frame_dependent_nodes = ( ast.Return, ast.Yield, ast.YieldFrom, ast.Await,
+                           ast.Global, ast.Nonlocal, ast.Lambda, ast.FunctionDef,
+                           ast.AsyncFunctionDef, ast.ClassDef, ast.AsyncFor,
+                           ast.AsyncWith )
+
+_frame_dependent_calls = { 'locals', 'vars', 'eval', 'exec', 'super', 'dir' }
+
+_constant_types = ( type, types.FunctionType, types.BuiltinFunctionType,
+                    types.ModuleType )
+
+class _Binder:
+  """ Assign a name to every object that the kernel refers to. """
+
+  def __init__( s, known_names ):
+    s.known_names = known_names # id(obj) -> full name of signals
+    s.names = {} # id(obj) -> name
+    s.objs  = {} # name -> obj
+    s.descs = {} # name -> description
+
+  def bind( s, obj, desc ):
+    try:
+      return s.names[ id(obj) ]
+    except KeyError:
+      name = s.names[ id(obj) ] = f"_v{len(s.objs)}"
+      s.objs[ name ] = obj
+      if isinstance( obj, NamedObject ):
+        desc = repr(obj)
+      s.descs[ name ] = s.known_names.get( id(obj), desc )
+      return name
+
+class _BlockInliner( ast.NodeTransformer ):
+  """ Rename the local variables of a block and replace the free variables
+  and stable attribute chains with names bound by the binder. """
+
+  def __init__( s, func, prefix, binder, signal_values, desc ):
+    s.func     = func
+    s.prefix   = prefix
+    s.binder   = binder
+    s.locals   = set( func.__code__.co_varnames )
+    s.signal_values = signal_values
+    s.desc     = desc
+    s.shadowed = []
+
+    s.freevars = {}
+    for name, cell in zip( func.__code__.co_freevars, func.__closure__ or () ):
+      try:
+        cell.cell_contents
+      except ValueError: # empty cell
+        raise _CannotInline( f"free variable {name} is not bound" )
+      s.freevars[ name ] = cell
+
+  def is_stable( s, obj ):
+    """ Components, interfaces, signals and arrays of them never change
+    after lock_in_simulation. """
+    while isinstance( obj, list ) and obj:
+      obj = obj[0]
+    return isinstance( obj, NamedObject ) or id(obj) in s.signal_values
+
+  def is_constant( s, obj ):
+    """ Free variables and globals that refer to these objects are bound
+    at code generation time. """
+    return s.is_stable( obj ) or isinstance( obj, _constant_types )
+
+  def is_shadowed( s, name ):
+    return any( name in x for x in s.shadowed )
+
+  def visit_comprehension_node( s, node ):
+    targets = set()
+    for gen in node.generators:
+      for x in ast.walk( gen.target ):
+        if isinstance( x, ast.Name ):
+          targets.add( x.id )
+    s.shadowed.append( targets )
+    node = s.generic_visit( node )
+    s.shadowed.pop()
+    return node
+
+  visit_ListComp      = visit_comprehension_node
+  visit_SetComp       = visit_comprehension_node
+  visit_DictComp      = visit_comprehension_node
+  visit_GeneratorExp  = visit_comprehension_node
+
+  def visit_Name( s, node ):
+    name = node.id
+    if s.is_shadowed( name ):
+      return node
+
+    if name in s.locals:
+      return ast.copy_location( ast.Name( id=f"{s.prefix}{name}", ctx=node.ctx ), node )
+
+    if not isinstance( node.ctx, ast.Load ):
+      raise _CannotInline( f"{name} is not a local variable" )
+
+    if name in s.freevars:
+      cell = s.freevars[ name ]
+      obj  = cell.cell_contents
+      if not s.is_constant( obj ):
+        cell_name = s.binder.bind( cell, f"cell of {name} in {s.desc}" )
+        return ast.copy_location( ast.Attribute( value=ast.Name( id=cell_name, ctx=ast.Load() ),
+                                                 attr="cell_contents", ctx=ast.Load() ), node )
+    elif name in s.func.__globals__:
+      obj = s.func.__globals__[ name ]
+      if not s.is_constant( obj ):
+        globals_name = s.binder.bind( s.func.__globals__, f"globals of {s.desc}" )
+        return ast.copy_location( ast.Subscript( value=ast.Name( id=globals_name, ctx=ast.Load() ),
+                                                 slice=ast.Constant( name ), ctx=ast.Load() ), node )
+    elif hasattr( builtins, name ):
+      return node
+    else:
+      raise _CannotInline( f"cannot resolve {name}" )
+
+    return ast.copy_location( ast.Name( id=s.binder.bind( obj, f"{name} in {s.desc}" ),
+                                        ctx=ast.Load() ), node )
+
+  def resolve( s, node ):
+    """ Return the object that the expression (after renaming) refers to,
+    or raise KeyError if it is not a stable attribute chain. """
+    if isinstance( node, ast.Name ):
+      return s.binder.objs[ node.id ]
+
+    if isinstance( node, ast.Attribute ):
+      obj = s.resolve( node.value )
+      if not isinstance( obj, NamedObject ):
+        raise KeyError
+      try:
+        return getattr( obj, node.attr )
+      except AttributeError:
+        raise KeyError
+
+    if isinstance( node, ast.Subscript ):
+      obj = s.resolve( node.value )
+      if not isinstance( obj, list ) or not s.is_stable( obj ):
+        raise KeyError
+      idx = node.slice
+      if isinstance( idx, ast.Constant ):
+        idx = idx.value
+      else:
+        idx = s.resolve( idx )
+      if type(idx) is not int:
+        raise KeyError
+      try:
+        return obj[ idx ]
+      except IndexError:
+        raise KeyError
+
+    raise KeyError
+
+  def hoist( s, node ):
+    """ Replace the longest stable prefix of an attribute chain. """
+    try:
+      obj = s.resolve( node )
+    except KeyError:
+      return None
+    if not s.is_stable( obj ):
+      return None
+    return ast.copy_location( ast.Name( id=s.binder.bind( obj, f"{ast.unparse(node)} in {s.desc}" ),
+                                        ctx=ast.Load() ), node )
+
+  def visit_chain( s, node ):
+    node = s.generic_visit( node )
+    if isinstance( node.ctx, ast.Load ):
+      new_node = s.hoist( node )
+      if new_node is not None:
+        return new_node
+    return node
+
+  visit_Attribute = visit_chain
+  visit_Subscript = visit_chain
+
+  def visit_AugAssign( s, node ):
+    node = s.generic_visit( node )
+
+    # x.y @= z is x.y = x.y.__imatmul__( z ), but __imatmul__ and
+    # __ilshift__ update signals in place and return the signal itself.
+    target = node.target
+    if isinstance( node.op, (ast.MatMult, ast.LShift) ) and \
+       isinstance( target, (ast.Attribute, ast.Subscript) ):
+      load = copy.copy( target )
+      load.ctx = ast.Load()
+      try:
+        obj = s.resolve( load )
+      except KeyError:
+        return node
+
+      if id(obj) in s.signal_values:
+        method = "__imatmul__" if isinstance( node.op, ast.MatMult ) else "__ilshift__"
+        name   = s.binder.bind( obj, f"{ast.unparse(load)} in {s.desc}" )
+        return ast.copy_location( ast.Expr( value=ast.Call(
+          func=ast.Attribute( value=ast.Name( id=name, ctx=ast.Load() ), attr=method, ctx=ast.Load() ),
+          args=[ node.value ], keywords=[] ) ), node )
+
+    return node
+
+class InlineSimPass( PrepareSimPass ):
+
+  def __call__( self, top ):
+    self.top = top
+    self.num_kernels = 0
+    super().__call__( top )
+
+  def get_block_ast( self, blk ):
+    """ Return the FunctionDef of the given update block or net block, or
+    None if we don't have its source. """
+    top = self.top
+
+    genblk_src = getattr( top._dag, "genblk_src", {} )
+    if blk in genblk_src:
+      tree = ast.parse( genblk_src[ blk ] )
+
+    elif blk in top._dsl.all_upblks:
+      host = top.get_update_block_host_component( blk )
+      info = host.get_update_block_info( blk )
+      if info is None:
+        return None
+      is_lambda, _, line, filename, tree = info
+
+      # The AST is cached per class by name. Make sure it is really the
+      # source of this block.
+      if not is_lambda and ( blk.__code__.co_filename != filename or
+                             blk.__code__.co_firstlineno != line ):
+        return None
+    else:
+      return None
+
+    if not isinstance( tree, ast.Module ) or len(tree.body) != 1:
+      return None
+    tree = tree.body[0]
+    if not isinstance( tree, ast.FunctionDef ) or tree.name != blk.__name__:
+      return None
+    return copy.deepcopy( tree )
+
+  def inline_block( self, blk, prefix, binder ):
+    """ Return the inlined statements of blk, or None if blk has to be
+    called. """
+    if type(blk).__name__ != "function" or blk.__code__.co_argcount:
+      return None
+
+    tree = self.get_block_ast( blk )
+    if tree is None:
+      return None
+
+    for node in ast.walk( tree ):
+      if node is tree:
+        continue
+      if isinstance( node, _frame_dependent_nodes ):
+        return None
+      if isinstance( node, ast.Call ) and isinstance( node.func, ast.Name ) and \
+         node.func.id in _frame_dependent_calls:
+        return None
+
+    top = self.top
+    if blk in top._dsl.all_upblks:
+      desc = f"{blk.__name__} of {top.get_update_block_host_component( blk )!r}"
+    else:
+      desc = blk.__name__
+
+    inliner = _BlockInliner( blk, prefix, binder, self.signal_values, desc )
+    try:
+      body = [ inliner.visit( x ) for x in tree.body ]
+    except _CannotInline:
+      return None
+
+    return [ x for x in body if not isinstance( x, ast.Pass ) ]
+
+  # Override
+  def gen_tick_function( self, schedule ):
+    if not hasattr( ast, "unparse" ): # Python < 3.9
+      return super().gen_tick_function( schedule )
+
+    top = self.top
+
+    # Nets driven by constants may be locked in as python ints
+    self.signal_values = {}
+    for signal, x in top._sim.signal_object_mapping.items():
+      value = x[-1]
+      if isinstance( value, Bits ) or is_bitstruct_inst( value ):
+        self.signal_values.setdefault( id(value), repr(signal) )
+
+    binder = _Binder( self.signal_values )
+    lines  = []
+    num_inlined = 0
+
+    for i, blk in enumerate( schedule ):
+      # Bind the block first so that the binder is unchanged if we have
+      # to fall back to calling it
+      saved = ( dict(binder.names), dict(binder.objs), dict(binder.descs) )
+      body  = self.inline_block( blk, f"_{i}_", binder )
+
+      if body is None:
+        binder.names, binder.objs, binder.descs = saved
+        name = binder.bind( blk, getattr( blk, "__name__", repr(blk) ) )
+        lines.append( f"{name}()" )
+      else:
+        num_inlined += 1
+        if body:
+          lines.append( f"# {blk.__name__}" )
+          for stmt in body:
+            lines.extend( ast.unparse( stmt ).splitlines() )
+
+    kernel_id = self.num_kernels
+    self.num_kernels += 1
+
+    # Only keep the objects that are still referenced after hoisting
+    used  = set( re.findall( r"\b_v\d+\b", "\n".join( lines ) ) )
+    names = [ x for x in binder.objs if x in used ]
+
+    src = "def make_kernel( _objs ):\n"
+    for x in names:
+      src += f"  # {x}: {binder.descs[x]}\n"
+    if names:
+      src += f"  {', '.join( names )}, = _objs\n"
+    src += "  def kernel():\n    "
+    if all( x.startswith('#') for x in lines ):
+      lines.append( "pass" )
+    src += "\n    ".join( lines )
+    src += "\n  return kernel\n"
+
+    filename = f"Inlined kernel {kernel_id} of {top.__class__.__name__}"
+    _globals, _locals = {}, {}
+    custom_exec( compile( src, filename=filename, mode="exec" ), _globals, _locals )
+    line_cache[ filename ] = ( len(src), None, src.splitlines(), filename )
+
+    if not hasattr( top._sim, "inlined_kernels" ):
+      top._sim.inlined_kernels = []
+    top._sim.inlined_kernels.append( ( src, num_inlined, len(schedule) - num_inlined ) )
+
+    return _locals['make_kernel']( [ binder.objs[x] for x in names ] )
@@ -20,7 +20,7 @@ from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 from pymtl3.passes.errors import PassOrderError
 
-from ..sim.DynamicSchedulePass import kosaraju_scc
+from ..sim.BlockGraph import get_block_graph
 from ..sim.SimpleSchedulePass import SimpleSchedulePass, dump_dag
 from .HeuristicTopoPass import CountBranchesLoops
 from .UnrollSimPass import UnrollSimPass
@@ -179,24 +179,17 @@ class Mamba2020Pass( UnrollSimPass ):
 
     # Construct the intra-cycle graph based on normal update blocks
 
-    V   = top._dag.final_upblks - top.get_all_update_ff()
-
-    G   = { v: [] for v in V }
-    G_T = { v: [] for v in V } # transpose graph
-
-    E = set()
-    for (u, v) in top._dag.all_constraints: # u -> v
-      if u in V and v in V:
-        G  [u].append( v )
-        G_T[v].append( u )
-        E.add( (u, v) )
+    graph  = get_block_graph( top )
+    blocks = graph.blocks
 
     if 'MAMBA_DAG' in os.environ:
-      dump_dag( top, V, E )
+      dump_dag( top, blocks, graph.edges() )
 
-    # Compute SCC using Kosaraju's algorithm
+    # Compute SCCs and shrink them into super nodes
 
-    SCCs, G_new = kosaraju_scc( G, G_T )
+    scc_ids, scc_of = graph.get_sccs()
+    G_new = graph.condense( scc_ids, scc_of )
+    SCCs  = [ [ blocks[x] for x in scc ] for scc in scc_ids ]
 
     onces = top.get_all_update_once()
     # This function compiles a SCC block
@@ -235,20 +228,18 @@ class Mamba2020Pass( UnrollSimPass ):
       if scc_pred[i] is None:
         # We start bfs from the block that has the least number of input
         # edges in the SCC
-        InD = { v: 0 for v in scc }
-        for (u, v) in E: # u -> v
-          if u in scc and v in scc:
-            InD[ v ] += 1
+        InD = { blocks[v]: sum( scc_of[u] == i for u in graph.predecessors( v ) )
+                for v in scc_ids[i] }
         Q.append( max(InD, key=InD.get) )
 
       else:
         # We start bfs with the blocks that are successors of the
         # predecessor scc in the previous SCC-level topological sort.
-        pred = set( SCCs[ scc_pred[i] ] )
+        pred = scc_pred[i]
         # Sort by names for a fixed outcome
         for x in sorted( scc, key = lambda x: x.__name__ ):
-          for v in G_T[x]: # find reversed edges point back to pred SCC
-            if v in pred:
+          for v in graph.predecessors( graph.ids[x] ): # find reversed edges point back to pred SCC
+            if scc_of[v] == pred:
               Q.append( x )
 
       # Perform bfs to find a heuristic schedule
@@ -256,16 +247,18 @@ class Mamba2020Pass( UnrollSimPass ):
       while Q:
         u = Q.popleft()
         tmp_schedule.append( u )
-        for v in G[u]:
-          if v in scc and v not in visited:
+        for j in graph.successors( graph.ids[u] ):
+          v = blocks[j]
+          if scc_of[j] == i and v not in visited:
             Q.append( v )
             visited.add( v )
 
       variables = set()
-      for (u, v) in E:
+      for u in scc_ids[i]:
         # Collect all variables that triggers other blocks in the SCC
-        if u in scc and v in scc:
-          variables.update( constraint_objs[ (u, v) ] )
+        for v in graph.successors( u ):
+          if scc_of[v] == i:
+            variables.update( constraint_objs[ (blocks[u], blocks[v]) ] )
 
       if len(variables) == 0:
         raise UpblkCyclicError("There is a cyclic dependency without involving variables."
@@ -442,21 +435,18 @@ generated_block = wrapped_SCC_{0}
 
     # Perform topological sort on SCCs
 
-    InD = { i: 0 for i in range(len(SCCs)) }
+    InD = G_new.in_degrees()
     nontrivial_sccs   = set()
     trivial_loop_sccs = set()
 
-    for u, vs in G_new.items():
+    for u in range(len(SCCs)):
       # Preprocess some sets to mark non-trivial sccs and loop-only sccs
       # for later lookup
       if len(SCCs[u]) > 1:
         nontrivial_sccs.add( u )
-      elif self.only_loop_at_top[ list(SCCs[u])[0] ]:
+      elif self.only_loop_at_top[ SCCs[u][0] ]:
         trivial_loop_sccs.add( u )
 
-      for v in vs:
-        InD[ v ] += 1
-
     # Shunning: reuse this binary search from TraceBreakingPass. Not the
     # most efficient one. Ideally we want to use two heaps or a balanced
     # binary search tree ... TODO
@@ -501,7 +491,7 @@ generated_block = wrapped_SCC_{0}
     # refactored code ...
     def expand_node( u ):
       nonlocal cnt
-      for v in G_new[u]:
+      for v in G_new.successors( u ):
         InD[v] -= 1
         if not InD[v]:
           cnt += 1
@@ -1,4 +1,5 @@
 from ..BasePass import BasePass
+from ..sim.DynamicSchedulePass import DynamicSchedulePass
 from ..sim.GenDAGPass import GenDAGPass
 from ..sim.PrepareSimPass import PrepareSimPass
 from ..sim.SimpleSchedulePass import SimpleSchedulePass
@@ -6,6 +7,7 @@ from ..sim.WrapGreenletPass import WrapGreenletPass
 from ..tracing.CLLineTracePass import CLLineTracePass
 from ..tracing.LineTraceParamPass import LineTraceParamPass
 from .HeuristicTopoPass import HeuristicTopoPass
+from .InlineSimPass import InlineSimPass
 from .Mamba2020Pass import Mamba2020Pass
 from .UnrollSimPass import UnrollSimPass
 
@@ -24,6 +26,22 @@ class UnrollSim( BasePass ):
     UnrollSimPass(print_line_trace=s.print_line_trace,
                   reset_active_high=s.reset_active_high)( top )
 
+# InlineSim targets CPython. It generates one function per schedule with
+# the bodies of update blocks and net blocks inlined.
+class InlineSim( BasePass ):
+  def __init__( s, *, waveform=None, print_line_trace=True, reset_active_high=True ):
+    s.waveform = waveform
+    s.print_line_trace = print_line_trace
+    s.reset_active_high = reset_active_high
+
+  def __call__( s, top ):
+    top.elaborate()
+    GenDAGPass()( top )
+    WrapGreenletPass()( top )
+    DynamicSchedulePass()( top )
+    InlineSimPass(print_line_trace=s.print_line_trace,
+                  reset_active_high=s.reset_active_high)( top )
+
 class HeuTopoUnrollSim( BasePass ):
   def __init__( s, *, waveform=None, print_line_trace=True, reset_active_high=True ):
     s.waveform = waveform
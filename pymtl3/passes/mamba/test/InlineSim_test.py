@@ -0,0 +1,176 @@
+import sys
+
+import pytest
+
+from pymtl3.datatypes import Bits8, Bits32, bitstruct, zext
+from pymtl3.dsl import *
+from pymtl3.passes.PassGroups import DefaultPassGroup
+
+from ..PassGroups import InlineSim
+
+
+def _run( top, pass_group, inputs ):
+  top.apply( pass_group )
+  top.sim_reset()
+
+  outs = []
+  for x in inputs:
+    top.in_ @= x
+    top.sim_eval_combinational()
+    outs.append( ( int(top.out), int(top.out2) ) )
+    top.sim_tick()
+  return outs
+
+GAIN = 1
+
+# The kernels are generated with ast.unparse
+needs_unparse = pytest.mark.skipif( sys.version_info < (3, 9),
+                                    reason="InlineSimPass needs Python 3.9+" )
+
+@needs_unparse
+def test_very_deep_dag():
+
+  class Inner(Component):
+    def construct( s ):
+      s.in_ = InPort(Bits32)
+      s.out = OutPort(Bits32)
+
+      @update
+      def up():
+        s.out @= s.in_ + 1
+
+  class Top(Component):
+    def construct( s, N=2000 ):
+      s.inners = [ Inner() for i in range(N) ]
+      for i in range(N-1):
+        s.inners[i].out //= s.inners[i+1].in_
+
+      s.out = OutPort(Bits32)
+      @update_ff
+      def ff():
+        if s.reset:
+          s.out <<= 0
+        else:
+          s.out <<= s.out + s.inners[N-1].out
+
+  N = 2000
+  A = Top( N )
+
+  A.apply( InlineSim( print_line_trace=False ) )
+  A.sim_reset()
+
+  # Every update block is inlined into the kernels
+  for src, num_inlined, num_called in A._sim.inlined_kernels:
+    assert num_inlined > 0
+
+  T = 0
+  while T < 5:
+    assert A.out == T * N
+    A.sim_tick()
+    T += 1
+
+@needs_unparse
+def test_mixed_blocks():
+
+  @bitstruct
+  class SomeMsg:
+    a: Bits8
+    b: Bits32
+
+  class Top(Component):
+    def construct( s ):
+      s.in_  = InPort( Bits32 )
+      s.out  = OutPort( Bits32 )
+      s.out2 = OutPort( Bits32 )
+
+      s.msg  = Wire( SomeMsg )
+      s.regs = [ Wire( Bits32 ) for _ in range(4) ]
+      s.lo   = Wire( Bits8 )
+      s.idx  = Wire( 2 )
+      s.cnt  = Wire( Bits32 )
+      s.count = 0
+
+      s.lo //= s.in_[0:8]
+      s.msg.b //= s.in_
+
+      @update
+      def up_msg():
+        s.msg.a @= s.lo + 1
+
+      # Local variables, loops and comprehensions
+      @update
+      def up_out():
+        tmp = s.msg.b
+        for i in range(4):
+          tmp = tmp + s.regs[i]
+        s.out @= tmp + sum( [ int(x) for x in s.regs ] ) + zext( s.msg.a, 32 ) + s.cnt
+
+      # Python state is not hoisted
+      @update
+      def up_out2():
+        s.count += 1
+        s.out2 @= s.count
+
+      @update_ff
+      def up_regs():
+        s.idx <<= s.idx + 1
+        s.regs[s.idx] <<= s.in_
+
+      # Blocks with return are called instead of inlined
+      @update_ff
+      def up_early_return():
+        if s.reset:
+          return
+        s.cnt <<= s.cnt + 1
+
+  inputs = list(range(0, 300, 7))
+  ref = _run( Top(), DefaultPassGroup(), inputs )
+
+  top = Top()
+  assert _run( top, InlineSim( print_line_trace=False ), inputs ) == ref
+
+  # The kernel of sim_tick
+  src = top._sim.inlined_kernels[1][0]
+  assert "# up_regs" in src
+  assert "# up_early_return" not in src
+  assert ": up_early_return" in src
+  assert ".count += 1" in src
+
+@needs_unparse
+def test_rebound_free_variables():
+  global GAIN
+
+  class Top(Component):
+    def construct( s ):
+      s.in_  = InPort( Bits32 )
+      s.out  = OutPort( Bits32 )
+      s.out2 = OutPort( Bits32 )
+      k = 0
+
+      @update_ff
+      def up_k():
+        nonlocal k
+        k += 1
+
+      @update
+      def up_out():
+        s.out  @= s.in_ + k + GAIN
+        s.out2 @= zext( s.in_[0:8], 32 )
+
+  inputs = [ 1, 2, 3, 4 ]
+  ref = _run( Top(), DefaultPassGroup(), inputs )
+
+  top = Top()
+  assert _run( top, InlineSim( print_line_trace=False ), inputs ) == ref
+  assert top._sim.inlined_kernels[0][1] > 0
+
+  # Globals are read every time the kernel runs
+  top.in_ @= 0
+  top.sim_eval_combinational()
+  out = int( top.out )
+  GAIN = 100
+  try:
+    top.sim_eval_combinational()
+    assert top.out == out + 99
+  finally:
+    GAIN = 1
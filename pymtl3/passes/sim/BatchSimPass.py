@@ -0,0 +1,811 @@
+"""
+========================================================================
+BatchSimPass.py
+========================================================================
+Simulate N independent copies ("lanes") of the same pure RTL design in
+lockstep. The design is elaborated only once. Every signal is stored as
+a NumPy array of N values instead of N Bits objects, and every update
+block is executed once per cycle over all lanes.
+
+  top = Top()
+  top.apply( BatchPassGroup( nlanes=1024 ) )
+  top.sim_reset()
+  top.sim_set( top.in_, np.arange( 1024 ) )
+  top.sim_tick()
+  out = top.sim_get( top.out ) # uint64 array of 1024 values
+
+Update blocks are compiled from their behavioral RTLIR, so only the
+translatable subset is supported. Branches that depend on signal values
+become per-lane masks. Every signal has to be at most 64 bits wide. A
+bitstruct signal is stored as the integer value of its to_bits().
+
+NumPy is an optional dependency and is only imported when the pass is
+applied.
+
+Date   : Oct 16, 2026
+"""
+from linecache import cache as line_cache
+
+from pymtl3.datatypes import Bits, is_bitstruct_inst
+from pymtl3.dsl.Connectable import Const, MethodPort, Signal
+from pymtl3.dsl.errors import UpblkCyclicError
+from pymtl3.extra.pypy import custom_exec
+from pymtl3.passes.BasePass import BasePass, PassMetadata
+from pymtl3.passes.errors import ModelTypeError, PassOrderError, TranslationError
+from pymtl3.passes.rtlir.behavioral import BehavioralRTLIR as bir
+from pymtl3.passes.rtlir.behavioral import (
+    BehavioralRTLIRGenPass,
+    BehavioralRTLIRTypeCheckPass,
+)
+
+_MAX_NBITS = 64
+
+def _mask( nbits ):
+  return (1 << nbits) - 1
+
+def _nbits_of_type( T ):
+  if isinstance( T, list ):
+    return len(T) * _nbits_of_type( T[0] )
+  return T.nbits
+
+def _field_lsb( T, name, indices ):
+  """ Return the lsb of field name[indices] in bitstruct T. The first
+  field is the most significant one and x[0] of a list is the least
+  significant element, the same as to_bits(). """
+  lsb = T.nbits
+  for fname, ftype in T.__bitstruct_fields__.items():
+    lsb -= _nbits_of_type( ftype )
+    if fname == name:
+      break
+  for i in indices:
+    ftype = ftype[0]
+    lsb += i * _nbits_of_type( ftype )
+  return lsb
+
+def _to_int( obj ):
+  if is_bitstruct_inst( obj ):
+    return int( obj.to_bits() )
+  return int( obj )
+
+def _is_value( obj ):
+  return isinstance( obj, (int, Bits) ) or is_bitstruct_inst( obj )
+
+def _make_helpers( np, nlanes ):
+  u64 = np.uint64
+
+  def _select( idx, vals ):
+    if len(vals) <= 32:
+      return np.choose( idx.astype( np.intp ), vals, mode='clip' )
+    ret = np.zeros( nlanes, u64 )
+    for i, v in enumerate( vals ):
+      np.copyto( ret, v, where=( idx == i ) )
+    return ret
+
+  def _parity( x ):
+    for i in ( 32, 16, 8, 4, 2, 1 ):
+      x = x ^ ( x >> i )
+    return x & 1
+
+  def _div( a, b ):
+    with np.errstate( divide='ignore' ):
+      return np.floor_divide( a, b, dtype=u64 )
+
+  def _mod( a, b ):
+    with np.errstate( divide='ignore' ):
+      return np.remainder( a, b, dtype=u64 )
+
+  # Bits semantics: shifting by at least nbits yields zero
+  def _shl( a, b, nbits, mask ):
+    if type(b) is int:
+      return ( a << b ) & mask if b < nbits else a & 0
+    return np.where( b < nbits, ( u64(a) << np.minimum( b, 63 ) ) & mask, u64(0) )
+
+  def _shr( a, b, nbits ):
+    if type(b) is int:
+      return a >> b if b < nbits else a & 0
+    return np.where( b < nbits, u64(a) >> np.minimum( b, 63 ), u64(0) )
+
+  return { 'np': np, '_u64': u64, '_select': _select, '_parity': _parity,
+           '_div': _div, '_mod': _mod, '_shl': _shl, '_shr': _shr,
+           'UpblkCyclicError': UpblkCyclicError }
+
+class _BlockCompiler:
+  """ Compile the typed behavioral RTLIR of one update block into Python
+  statements over NumPy arrays.
+
+  An expression compiles to (src, dyn). A dynamic expression is an array
+  of nlanes uint64 values; a static one is a Python int that is the same
+  for all lanes (constants, parameters and loop variables). """
+
+  _binops = { bir.Add: '+', bir.Sub: '-', bir.Mult: '*', bir.Div: '//',
+              bir.Mod: '%', bir.Pow: '**', bir.ShiftLeft: '<<',
+              bir.ShiftRightLogic: '>>', bir.BitAnd: '&', bir.BitOr: '|',
+              bir.BitXor: '^' }
+  _unaryops = { bir.Invert: '~', bir.UAdd: '+', bir.USub: '-' }
+  _cmpops = { bir.Eq: '==', bir.NotEq: '!=', bir.Lt: '<', bir.LtE: '<=',
+              bir.Gt: '>', bir.GtE: '>=' }
+
+  def __init__( s, gen, blk, prefix ):
+    s.gen    = gen
+    s.blk    = blk
+    s.prefix = prefix
+    s.lines  = []
+    s.depth  = 0
+
+  def error( s, msg ):
+    raise TranslationError( s.blk, f"cannot be simulated in batch mode: {msg}" )
+
+  def emit( s, line ):
+    s.lines.append( "  " * s.depth + line )
+
+  def temp( s, src ):
+    name = s.gen.new_temp()
+    s.emit( f"{name} = {src}" )
+    return name
+
+  @staticmethod
+  def nbits( node ):
+    return node.Type.get_dtype().get_length()
+
+  def u64( s, v, dyn ):
+    return v if dyn else f"_u64({v})"
+
+  #-----------------------------------------------------------------------
+  # References to objects
+  #-----------------------------------------------------------------------
+  # ('sig', signal)
+  # ('obj', python object)               -- component, list or constant
+  # ('tmp', name, nbits)                 -- temporary variable
+  # ('bits', ref, lsb, lsb_dyn, nbits)   -- bit selection or slice
+  # ('choice', idx, idx_dyn, [refs])     -- index that is not known at
+  #                                         code generation time
+
+  def objref( s, obj ):
+    if isinstance( obj, Signal ):
+      return ( 'sig', obj )
+    return ( 'obj', obj )
+
+  def map_ref( s, ref, f ):
+    if ref[0] == 'choice':
+      return ( 'choice', ref[1], ref[2], [ s.map_ref( x, f ) for x in ref[3] ] )
+    return f( ref )
+
+  def resolve( s, node ):
+    if isinstance( node, bir.Base ):
+      return ( 'obj', node.base )
+
+    if isinstance( node, bir.FreeVar ):
+      return s.objref( node.obj )
+
+    if isinstance( node, bir.TmpVar ):
+      name = s.gen.tmpvar( ( s.blk, node.name ), s.nbits( node ) )
+      return ( 'tmp', name, s.nbits( node ) )
+
+    if isinstance( node, bir.Attribute ):
+      base = s.resolve( node.value )
+      def attr( ref ):
+        if ref[0] not in ( 'sig', 'obj' ):
+          s.error( f"attribute {node.attr} of an expression" )
+        return s.objref( getattr( ref[1], node.attr ) )
+      return s.map_ref( base, attr )
+
+    if isinstance( node, bir.Index ):
+      base = s.resolve( node.value )
+      idx, dyn = s.expr( node.idx )
+      if dyn:
+        idx = s.temp( idx )
+
+      def index( ref ):
+        if ref[0] == 'obj' and isinstance( ref[1], list ):
+          if not dyn:
+            try:
+              return s.objref( ref[1][ int( idx ) ] )
+            except ValueError: # loop variable
+              pass
+          return ( 'choice', idx, dyn, [ s.objref( x ) for x in ref[1] ] )
+        # Bit selection
+        return ( 'bits', ref, idx, dyn, 1 )
+
+      return s.map_ref( base, index )
+
+    if isinstance( node, bir.Slice ):
+      base = s.resolve( node.value )
+      if node.size is not None: # [base +: size]
+        lsb, dyn = s.expr( node.base )
+        if dyn:
+          lsb = s.temp( lsb )
+        nbits = node.size
+      else:
+        lsb, dyn = str( int( node.lower._value ) ), False
+        nbits = int( node.upper._value ) - int( node.lower._value )
+      return s.map_ref( base, lambda ref: ( 'bits', ref, lsb, dyn, nbits ) )
+
+    s.error( f"{node.__class__.__name__} is not a signal" )
+
+  def read( s, ref ):
+    kind = ref[0]
+
+    if kind == 'sig':
+      k, lsb, nbits = s.gen.view( ref[1] )
+      st = s.gen.storage( k )
+      if lsb == 0 and nbits == s.gen.widths[k]:
+        return st, True
+      return f"(({st} >> {lsb}) & {_mask(nbits)})", True
+
+    if kind == 'obj':
+      if not _is_value( ref[1] ):
+        s.error( f"{ref[1]!r} is not a value" )
+      return str( _to_int( ref[1] ) ), False
+
+    if kind == 'tmp':
+      return ref[1], True
+
+    if kind == 'bits':
+      lsb, ldyn = ref[2], ref[3]
+      if ref[1][0] == 'sig' and not ldyn and lsb.isdigit():
+        k, base, _ = s.gen.view( ref[1][1] )
+        return f"(({s.gen.storage(k)} >> {base + int(lsb)}) & {_mask(ref[4])})", True
+
+      v, vdyn = s.read( ref[1] )
+      if ldyn and not vdyn:
+        v = s.u64( v, vdyn )
+      return f"(({v} >> {lsb}) & {_mask(ref[4])})", vdyn or ldyn
+
+    if kind == 'choice':
+      vals = [ s.u64( *s.read( x ) ) for x in ref[3] ]
+      if ref[2]:
+        return f"_select({ref[1]}, ({', '.join(vals)},))", True
+      return f"({', '.join(vals)},)[{ref[1]}]", True
+
+    s.error( f"cannot read {kind}" )
+
+  def target( s, ref ):
+    """ Return (k, array, lsb, lsb_dyn, nbits, width) of an assignment
+    target, where k is the storage index or None. """
+    kind = ref[0]
+
+    if kind == 'sig':
+      k, lsb, nbits = s.gen.view( ref[1] )
+      return k, None, str(lsb), False, nbits, s.gen.widths[k]
+
+    if kind == 'tmp':
+      return None, ref[1], '0', False, ref[2], ref[2]
+
+    if kind == 'bits':
+      k, arr, lsb, ldyn, _, width = s.target( ref[1] )
+      if not ldyn and not ref[3]:
+        try:
+          lsb = str( int( lsb ) + int( ref[2] ) )
+        except ValueError: # loop variable
+          lsb = f"({lsb} + {ref[2]})"
+      else:
+        lsb = f"({lsb} + {ref[2]})"
+      return k, arr, lsb, ldyn or ref[3], ref[4], width
+
+    s.error( f"cannot assign to {kind}" )
+
+  def write( s, ref, v, vdyn, mask, blocking ):
+    if ref[0] == 'choice':
+      for i, x in enumerate( ref[3] ):
+        if ref[2]:
+          m = s.temp( f"{ref[1]} == {i}" )
+          if mask is not None:
+            s.emit( f"{m} &= {mask}" )
+          s.emit( f"if {m}.any():" )
+        else:
+          m = mask
+          s.emit( f"{'if' if i == 0 else 'elif'} {ref[1]} == {i}:" )
+        s.depth += 1
+        s.write( x, v, vdyn, m, blocking )
+        s.depth -= 1
+      return
+
+    k, arr, lsb, ldyn, nbits, width = s.target( ref )
+    if k is not None:
+      if blocking:
+        arr = s.gen.storage( k )
+        s.gen.written.add( k )
+      else:
+        arr = s.gen.next_storage( k )
+
+    if lsb == '0' and nbits == width:
+      if mask is None:
+        s.emit( f"{arr}[:] = {v}" )
+      else:
+        s.emit( f"np.copyto({arr}, {s.u64(v, vdyn)}, where={mask})" )
+      return
+
+    try:
+      lsb = int( lsb )
+      new = f"({arr} & {_mask(width) ^ (_mask(nbits) << lsb)}) | ({v} << {lsb})"
+    except ValueError:
+      # uint64 << int64 is float64 on NumPy 1.x, so shift by a uint64
+      lsb = s.temp( f"_u64({lsb})" )
+      new = f"({arr} & ~(_u64({_mask(nbits)}) << {lsb})) | ({s.u64(v, vdyn)} << {lsb})"
+
+    if mask is None:
+      s.emit( f"{arr}[:] = {new}" )
+    else:
+      s.emit( f"np.copyto({arr}, {new}, where={mask})" )
+
+  #-----------------------------------------------------------------------
+  # Expressions
+  #-----------------------------------------------------------------------
+
+  def expr( s, node ):
+    value = getattr( node, '_value', None )
+    if value is not None and _is_value( value ):
+      return str( _to_int( value ) & _mask( s.nbits( node ) ) ), False
+
+    if s.nbits( node ) > _MAX_NBITS:
+      s.error( f"{s.nbits(node)}-bit values are not supported" )
+
+    method = getattr( s, f"expr_{node.__class__.__name__}", None )
+    if method is None:
+      return s.read( s.resolve( node ) )
+    return method( node )
+
+  def expr_LoopVar( s, node ):
+    return f"{s.prefix}{node.name}", False
+
+  def expr_Concat( s, node ):
+    parts, dyn, lsb = [], False, 0
+    for x in reversed( node.values ):
+      v, d = s.expr( x )
+      parts.append( v if lsb == 0 else f"({v} << {lsb})" )
+      dyn |= d
+      lsb += s.nbits( x )
+    return f"({' | '.join( reversed(parts) )})", dyn
+
+  def expr_ZeroExt( s, node ):
+    return s.expr( node.value )
+
+  def expr_Truncate( s, node ):
+    v, d = s.expr( node.value )
+    return f"({v} & {_mask(node.nbits)})", d
+
+  expr_SizeCast = expr_Truncate
+
+  def expr_SignExt( s, node ):
+    v, d = s.expr( node.value )
+    old = s.nbits( node.value )
+    ext = _mask( node.nbits ) ^ _mask( old )
+    if d:
+      v = s.temp( v )
+    return f"({v} | (({v} >> {old-1}) * {ext}))", d
+
+  def expr_Reduce( s, node ):
+    v, d = s.expr( node.value )
+    if isinstance( node.op, bir.BitXor ):
+      return f"_parity({v})", d
+    if isinstance( node.op, bir.BitAnd ):
+      ret = f"({v} == {_mask( s.nbits( node.value ) )})"
+    else:
+      ret = f"({v} != 0)"
+    return ( f"{ret}.astype(_u64)", True ) if d else ( f"int{ret}", False )
+
+  def expr_StructInst( s, node ):
+    cls, parts, dyn = node.struct, [], False
+    for name, x in zip( cls.__bitstruct_fields__, node.values ):
+      v, d = s.expr( x )
+      lsb = _field_lsb( cls, name, [] )
+      parts.append( v if lsb == 0 else f"({v} << {lsb})" )
+      dyn |= d
+    return f"({' | '.join( parts )})", dyn
+
+  def expr_IfExp( s, node ):
+    c, cd = s.cond( node.cond )
+    b, bd = s.expr( node.body )
+    o, od = s.expr( node.orelse )
+    if not cd:
+      return f"({b} if {c} else {o})", bd or od
+    return f"np.where({c}, {s.u64(b, bd)}, {s.u64(o, od)})", True
+
+  def expr_UnaryOp( s, node ):
+    v, d = s.expr( node.operand )
+    if not d: # Python ints
+      return f"({s._unaryops[ type(node.op) ]}{v})", False
+
+    mask = _mask( s.nbits( node ) )
+    if isinstance( node.op, bir.Invert ):
+      return f"({v} ^ {mask})", d
+    if isinstance( node.op, bir.USub ):
+      return f"((0 - {v}) & {mask})", d
+    return v, d
+
+  def expr_BinOp( s, node ):
+    l, ld = s.expr( node.left )
+    r, rd = s.expr( node.right )
+    dyn   = ld or rd
+    nbits = s.nbits( node )
+    mask  = _mask( nbits )
+    op    = node.op
+
+    if not dyn: # Python ints, e.g. loop variables
+      return f"({l} {s._binops[ type(op) ]} {r})", False
+
+    if isinstance( op, bir.ShiftLeft ):
+      return f"_shl({l}, {r}, {nbits}, {mask})", dyn
+    if isinstance( op, bir.ShiftRightLogic ):
+      return f"_shr({l}, {r}, {nbits})", dyn
+    if isinstance( op, bir.Div ):
+      return f"_div({l}, {r})", dyn
+    if isinstance( op, bir.Mod ):
+      return f"_mod({l}, {r})", dyn
+
+    ret = f"({l} {s._binops[ type(op) ]} {r})"
+    if isinstance( op, (bir.Add, bir.Sub, bir.Mult, bir.Pow) ) and \
+       not ( dyn and nbits == _MAX_NBITS ):
+      ret = f"({ret} & {mask})"
+    return ret, dyn
+
+  def expr_Compare( s, node ):
+    c, d = s.cond( node )
+    return ( f"{c}.astype(_u64)", True ) if d else ( f"int{c}", False )
+
+  def cond( s, node ):
+    """ Return a bool array for dynamic conditions. """
+    if isinstance( node, bir.Compare ):
+      l, ld = s.expr( node.left )
+      r, rd = s.expr( node.right )
+      return f"({l} {s._cmpops[ type(node.op) ]} {r})", ld or rd
+    v, d = s.expr( node )
+    return ( f"({v} != 0)", True ) if d else ( v, False )
+
+  #-----------------------------------------------------------------------
+  # Statements
+  #-----------------------------------------------------------------------
+
+  def stmts( s, body, mask ):
+    start = len(s.lines)
+    for x in body:
+      method = getattr( s, f"stmt_{x.__class__.__name__}", None )
+      if method is None:
+        s.error( f"{x.__class__.__name__} statements are not supported" )
+      method( x, mask )
+    if len(s.lines) == start:
+      s.emit( "pass" )
+
+  def stmt_Assign( s, node, mask ):
+    v, d = s.expr( node.value )
+    targets = [ s.resolve( x ) for x in node.targets ]
+
+    # The value is used more than once
+    if d and ( len(targets) > 1 or any( x[0] == 'choice' for x in targets ) ):
+      v = s.temp( f"{v}.copy()" if v.isidentifier() else v )
+
+    for x in targets:
+      s.write( x, v, d, mask, node.blocking )
+
+  def stmt_If( s, node, mask ):
+    c, d = s.cond( node.cond )
+
+    if not d:
+      s.emit( f"if {c}:" )
+      s.depth += 1
+      s.stmts( node.body, mask )
+      s.depth -= 1
+      if node.orelse:
+        s.emit( "else:" )
+        s.depth += 1
+        s.stmts( node.orelse, mask )
+        s.depth -= 1
+      return
+
+    # Both branches are executed on the lanes that take them
+    c = s.temp( c )
+    for body, m in ( ( node.body, c ), ( node.orelse, f"~{c}" ) ):
+      if not body:
+        continue
+      m = s.temp( m if mask is None else f"{mask} & {m}" )
+      s.emit( f"if {m}.any():" )
+      s.depth += 1
+      s.stmts( body, m )
+      s.depth -= 1
+
+  def stmt_For( s, node, mask ):
+    bounds = []
+    for x in ( node.start, node.end, node.step ):
+      v, d = s.expr( x )
+      if d:
+        s.error( "the range of a for loop must not depend on signals" )
+      bounds.append( v )
+    s.emit( f"for {s.prefix}{node.var.name} in range({', '.join(bounds)}):" )
+    s.depth += 1
+    s.stmts( node.body, mask )
+    s.depth -= 1
+
+class BatchSimPass( BasePass ):
+
+  def __init__( self, nlanes, reset_active_high=True ):
+    assert nlanes > 0
+    assert reset_active_high in [ True, False ]
+
+    self.nlanes = nlanes
+    self.reset_active_high = reset_active_high
+
+  def __call__( self, top ):
+    if hasattr(top, "sim_reset"):
+      raise AttributeError( "Please rename the attribute top.sim_reset")
+    if not hasattr( top, "_sched" ):
+      raise PassOrderError( "_sched" )
+    if not hasattr( top._sched, "update_schedule" ):
+      raise PassOrderError( "update_schedule" )
+    if not hasattr( top._sched, "schedule_ff" ):
+      raise PassOrderError( "schedule_ff" )
+
+    try:
+      import numpy as np
+    except ImportError:
+      raise ImportError( "BatchSimPass requires NumPy. Please install it with pip install numpy." )
+
+    if top.get_all_object_filter( lambda x: isinstance( x, MethodPort ) ) or \
+       top.get_all_update_once():
+      raise ModelTypeError( "pure RTL designs" )
+
+    self.top = top
+    self.np  = np
+
+    top._sim = PassMetadata()
+    top._sim.nlanes = self.nlanes
+
+    self.gen_rtlir( top )
+    self.allocate_storages( top )
+    self.gen_sim_functions( top )
+
+  #-----------------------------------------------------------------------
+  # Storage
+  #-----------------------------------------------------------------------
+
+  def allocate_storages( self, top ):
+    """ Allocate one array for each group of top-level signals that
+    lock_in_simulation would point to the same Bits object. """
+    self.storage_of = {}
+    self.widths     = []
+    self.inits      = []
+    self.views      = {}
+    self.nexts      = {}
+    self.written    = set()
+    self.ntemps     = 0
+    self.nblocks    = 0
+    self.tmpvars    = {}
+
+    def new_storage( signal, init ):
+      nbits = _nbits_of_type( signal._dsl.Type )
+      if nbits > _MAX_NBITS:
+        raise ModelTypeError( f"designs whose signals are at most {_MAX_NBITS} bits wide, "
+                              f"but {signal!r} has {nbits} bits" )
+      self.widths.append( nbits )
+      self.inits.append( init )
+      return len(self.widths) - 1
+
+    # Map each net block to the writer of its net
+    self.net_writers = {}
+    for writer, signals in top.get_all_value_nets():
+      readers = [ x for x in signals if x is not writer ]
+      self.net_writers[ frozenset( map( id, readers ) ) ] = writer
+
+      tops = [ x for x in signals if not isinstance( x, Const ) and x.is_top_level_signal() ]
+      if not tops:
+        continue # whole net is slice
+      if isinstance( writer, Const ):
+        k = new_storage( tops[0], _to_int( writer._dsl.const ) )
+      elif writer.is_top_level_signal():
+        k = new_storage( writer, 0 )
+      else:
+        k = new_storage( tops[0], 0 )
+      for x in tops:
+        self.storage_of[ x ] = k
+
+    for x in top._dsl.all_signals:
+      if x.is_top_level_signal() and x not in self.storage_of:
+        self.storage_of[ x ] = new_storage( x, 0 )
+
+  def view( self, signal ):
+    """ Return (storage index, lsb, nbits) of a signal. """
+    try:
+      return self.views[ signal ]
+    except KeyError:
+      pass
+
+    sd = signal._dsl
+    if signal.is_top_level_signal():
+      k = self.storage_of[ signal ]
+      ret = ( k, 0, self.widths[k] )
+    elif sd.slice is not None:
+      k, lsb, _ = self.view( sd.parent_obj )
+      ret = ( k, lsb + sd.slice.start, sd.slice.stop - sd.slice.start )
+    else:
+      parent = sd.parent_obj
+      k, lsb, _ = self.view( parent )
+      ret = ( k, lsb + _field_lsb( parent._dsl.Type, sd._my_name, sd._my_indices or () ),
+              _nbits_of_type( sd.Type ) )
+
+    self.views[ signal ] = ret
+    return ret
+
+  def storage( self, k ):
+    return f"_s{k}"
+
+  def next_storage( self, k ):
+    self.nexts[k] = f"_n{k}"
+    return self.nexts[k]
+
+  def new_temp( self ):
+    self.ntemps += 1
+    return f"_x{self.ntemps}"
+
+  def tmpvar( self, key, nbits ):
+    try:
+      return self.tmpvars[ key ][0]
+    except KeyError:
+      name = f"_t{len(self.tmpvars)}"
+      self.tmpvars[ key ] = ( name, nbits )
+      return name
+
+  #-----------------------------------------------------------------------
+  # Code generation
+  #-----------------------------------------------------------------------
+
+  def gen_rtlir( self, top ):
+    self.rtlir = {}
+    for c in sorted( top._dsl.all_components, key=repr ):
+      if c.get_update_block_order():
+        c.apply( BehavioralRTLIRGenPass( top ) )
+        c.apply( BehavioralRTLIRTypeCheckPass( top ) )
+        self.rtlir.update( c.get_metadata( BehavioralRTLIRGenPass.rtlir_upblks ) )
+
+  def gen_blocks( self, blocks ):
+    top   = self.top
+    lines = []
+    scc_blocks = getattr( top._sched, "scc_blocks", {} )
+
+    for blk in blocks:
+      if blk in scc_blocks:
+        lines.extend( self.gen_scc( blk, scc_blocks[ blk ] ) )
+        continue
+
+      self.nblocks += 1
+      comp = _BlockCompiler( self, blk, f"_b{self.nblocks}_" )
+      if blk in top._dag.genblks:
+        self.gen_net_block( comp, blk )
+      elif blk in self.rtlir:
+        comp.emit( f"# {blk.__name__} of {top.get_update_block_host_component( blk )!r}" )
+        comp.stmts( self.rtlir[ blk ].body, None )
+      else:
+        raise ModelTypeError( f"pure RTL designs, but {blk.__name__} is not an update block" )
+      lines.extend( comp.lines )
+
+    return lines
+
+  def gen_net_block( self, comp, blk ):
+    # GenDAGPass may have merged the blocks of several nets into one
+    merged = getattr( self.top._dag, "merged_genblks", {} ).get( blk )
+    if merged is not None:
+      for x in merged:
+        self.gen_net_block( comp, x )
+      return
+
+    readers = self.top._dag.genblk_writes[ blk ]
+    writer  = self.net_writers[ frozenset( map( id, readers ) ) ]
+
+    if isinstance( writer, Const ):
+      # Top-level readers are initialized with the constant
+      v, d = str( _to_int( writer._dsl.const ) ), False
+      done = { self.view( x ) for x in readers if x.is_top_level_signal() }
+    else:
+      v, d = comp.read( comp.objref( writer ) )
+      if d and not v.isidentifier():
+        v = comp.temp( v )
+      done = { self.view( writer ) }
+
+    for x in readers:
+      view = self.view( x )
+      if view not in done:
+        done.add( view )
+        comp.write( comp.objref( x ), v, d, None, True )
+
+  def gen_scc( self, blk, blocks ):
+    """ Iterate the blocks of an SCC until the signals written by them
+    stop changing in every lane. """
+    saved = self.written
+    self.written = set()
+    body = self.gen_blocks( blocks )
+    written = sorted( self.written )
+    self.written = saved | self.written
+
+    names = ", ".join( x.__name__ for x in blocks )
+    lines = [ "_k = 0",
+              "while True:",
+              "  _k += 1",
+              "  if _k > 100:",
+             f"    raise UpblkCyclicError('Combinational loop detected at runtime in {{{names}}} after 100 iters!')" ]
+    lines += [ f"  _c{k} = _s{k}.copy()" for k in written ]
+    lines += [ "  " + x for x in body ]
+    if written:
+      lines.append( f"  if not ({' and '.join( f'np.array_equal(_c{k}, _s{k})' for k in written )}): continue" )
+    lines.append( "  break" )
+    return lines
+
+  def gen_sim_functions( self, top ):
+    np, N = self.np, self.nlanes
+
+    up_lines = self.gen_blocks( top._sched.update_schedule )
+    ff_lines = self.gen_blocks( top._sched.schedule_ff )
+    ff_lines += [ f"_s{k}[:] = {x}" for k, x in sorted( self.nexts.items() ) ]
+
+    storages = [ np.full( N, x, dtype=np.uint64 ) for x in self.inits ]
+    nexts    = { k: storages[k].copy() for k in self.nexts }
+    tmpvars  = [ np.zeros( N, dtype=np.uint64 ) for _ in self.tmpvars ]
+
+    names = [ f"_s{k}" for k in range(len(storages)) ] + \
+            [ x for _, x in sorted( self.nexts.items() ) ] + \
+            [ x for x, _ in self.tmpvars.values() ]
+    objs  = storages + [ x for _, x in sorted( nexts.items() ) ] + tmpvars
+
+    src = "def make_batch_sim( _objs ):\n"
+    if names:
+      src += f"  {', '.join( names )}, = _objs\n"
+    for name, lines in ( ( "up", up_lines ), ( "ff", ff_lines ) ):
+      src += f"  def {name}():\n"
+      src += "".join( f"    {x}\n" for x in lines or [ "pass" ] )
+    src += "  return up, ff\n"
+
+    filename = f"Batch simulation of {top.__class__.__name__}"
+    _globals = _make_helpers( np, N )
+    _locals  = {}
+    custom_exec( compile( src, filename=filename, mode="exec" ), _globals, _locals )
+    line_cache[ filename ] = ( len(src), None, src.splitlines(), filename )
+    up, ff = _locals['make_batch_sim']( objs )
+
+    top._sim.src      = src
+    top._sim.storages = storages
+    top._sim.simulated_cycles = 0
+
+    def sim_eval_combinational():
+      up()
+
+    def sim_tick():
+      up()
+      ff()
+      top._sim.simulated_cycles += 1
+      up()
+
+    def sim_cycle_count():
+      return top._sim.simulated_cycles
+
+    def sim_get( signal ):
+      k, lsb, nbits = self.view( signal )
+      return ( storages[k] >> np.uint64(lsb) ) & np.uint64( _mask(nbits) )
+
+    def sim_set( signal, values ):
+      k, lsb, nbits = self.view( signal )
+      if not isinstance( values, np.ndarray ) and _is_value( values ):
+        values = _to_int( values )
+      values = np.asarray( values ).astype( np.uint64 ) & np.uint64( _mask(nbits) )
+      arrays = [ storages[k] ] + ( [ nexts[k] ] if k in nexts else [] )
+      for x in arrays:
+        if lsb == 0 and nbits == self.widths[k]:
+          x[:] = values
+        else:
+          inv = np.uint64( _mask( self.widths[k] ) ^ ( _mask(nbits) << lsb ) )
+          x[:] = ( x & inv ) | ( values << np.uint64(lsb) )
+
+    active_high = int( self.reset_active_high )
+
+    def sim_reset():
+      sim_set( top.reset, active_high )
+      up()
+      for i in range(3):
+        ff()
+        top._sim.simulated_cycles += 1
+        if i == 2:
+          sim_set( top.reset, 1 - active_high )
+        up()
+
+    top.sim_eval_combinational = sim_eval_combinational
+    top.sim_tick        = sim_tick
+    top.sim_reset       = sim_reset
+    top.sim_cycle_count = sim_cycle_count
+    top.sim_get         = sim_get
+    top.sim_set         = sim_set
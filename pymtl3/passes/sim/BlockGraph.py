@@ -0,0 +1,201 @@
+"""
+========================================================================
+BlockGraph.py
+========================================================================
+A compact graph of the intra-cycle constraints between update blocks.
+
+GenDAGPass stores the constraints as a set of ( block, block ) tuples.
+The schedule passes used to turn this set into dicts of lists keyed by
+block objects, and then into more dicts for Kosaraju's algorithm. Here
+every block gets an integer id and the edges are stored in compressed
+sparse row (CSR) arrays in both directions, i.e. the successors of
+block i are succ[ succ_ptr[i]:succ_ptr[i+1] ] and its predecessors are
+pred[ pred_ptr[i]:pred_ptr[i+1] ].
+
+GenDAGPass builds the graph once as top._dag.block_graph. Schedule passes
+call get_block_graph( top ), which rebuilds the graph if a later pass
+(e.g. WrapGreenletPass) has replaced the blocks or the constraints.
+
+Date   : Oct 17, 2026
+"""
+from array import array
+
+
+def _mk_csr( n, pairs, k ):
+  """ Return ( ptr, adj ) of the CSR arrays of the edges in pairs indexed
+  by the k-th element of every pair. """
+  ptr = array( 'l', [0] ) * (n + 1)
+  for p in pairs:
+    ptr[ p[k] + 1 ] += 1
+  for i in range(n):
+    ptr[i + 1] += ptr[i]
+
+  adj  = array( 'l', [0] ) * len(pairs)
+  fill = ptr[:-1]
+  for p in pairs:
+    i = p[k]
+    adj[ fill[i] ] = p[1 - k]
+    fill[i] += 1
+  return ptr, adj
+
+class BlockGraph:
+  """ Directed graph over blocks, where blocks[i] is the block of id i
+  and ids maps a block back to its id. Edges whose ends are not both in
+  blocks are dropped. """
+
+  def __init__( s, blocks, edges ):
+    s.blocks = list( blocks )
+    s.ids    = ids = { x: i for i, x in enumerate( s.blocks ) }
+
+    pairs = set()
+    for (u, v) in edges:
+      i = ids.get( u )
+      if i is not None:
+        j = ids.get( v )
+        if j is not None:
+          pairs.add( (i, j) )
+
+    s._build( pairs )
+
+  @classmethod
+  def from_ids( cls, n, pairs ):
+    """ Create a graph of n vertices whose blocks are their own ids from
+    a collection of distinct ( id, id ) pairs. """
+    g = cls.__new__( cls )
+    g.blocks = range(n)
+    g.ids    = None
+    g._build( pairs )
+    return g
+
+  def _build( s, pairs ):
+    n = len(s.blocks)
+    s.num_edges = len(pairs)
+    s.succ_ptr, s.succ = _mk_csr( n, pairs, 0 )
+    s.pred_ptr, s.pred = _mk_csr( n, pairs, 1 )
+
+  def __len__( s ):
+    return len(s.blocks)
+
+  def successors( s, i ):
+    return s.succ[ s.succ_ptr[i]:s.succ_ptr[i + 1] ]
+
+  def predecessors( s, i ):
+    return s.pred[ s.pred_ptr[i]:s.pred_ptr[i + 1] ]
+
+  def in_degrees( s ):
+    ptr = s.pred_ptr
+    return [ ptr[i + 1] - ptr[i] for i in range( len(s.blocks) ) ]
+
+  def edges( s ):
+    """ Yield all edges as ( block, block ). """
+    blocks, ptr, succ = s.blocks, s.succ_ptr, s.succ
+    for i in range( len(blocks) ):
+      u = blocks[i]
+      for k in range( ptr[i], ptr[i + 1] ):
+        yield u, blocks[ succ[k] ]
+
+  #-----------------------------------------------------------------------
+  # Strongly connected components
+  #-----------------------------------------------------------------------
+
+  def get_sccs( s ):
+    """ Return ( sccs, scc_of ). sccs is the list of strongly connected
+    components as lists of ids in topological order, i.e. no edge goes
+    from a component to an earlier one, and scc_of[i] is the index of the
+    component of id i.
+
+    This is Tarjan's algorithm with an explicit stack of ( id, position
+    in its successors ), since a chain of a few thousand blocks would
+    exceed the recursion limit of CPython. """
+
+    n = len(s.blocks)
+    succ_ptr, succ = s.succ_ptr, s.succ
+
+    index    = array( 'l', [-1] ) * n
+    low      = array( 'l', [0] ) * n
+    on_stack = bytearray( n )
+    scc_of   = array( 'l', [-1] ) * n
+
+    stack = []
+    sccs  = []
+    count = 0
+
+    for root in range(n):
+      if index[root] >= 0:
+        continue
+
+      index[root] = low[root] = count
+      count += 1
+      stack.append( root )
+      on_stack[root] = 1
+      work = [ (root, succ_ptr[root]) ]
+
+      while work:
+        u, k = work[-1]
+        end  = succ_ptr[u + 1]
+
+        while k < end:
+          v  = succ[k]
+          k += 1
+          if index[v] < 0:
+            # Descend into v and come back to the k-th successor of u
+            work[-1] = (u, k)
+            index[v] = low[v] = count
+            count += 1
+            stack.append( v )
+            on_stack[v] = 1
+            work.append( (v, succ_ptr[v]) )
+            break
+          if on_stack[v] and index[v] < low[u]:
+            low[u] = index[v]
+
+        else:
+          work.pop()
+          if work:
+            p = work[-1][0]
+            if low[u] < low[p]:
+              low[p] = low[u]
+
+          if low[u] == index[u]:
+            scc = []
+            while True:
+              w = stack.pop()
+              on_stack[w] = 0
+              scc_of[w] = len(sccs)
+              scc.append( w )
+              if w == u:
+                break
+            sccs.append( scc )
+
+    # Tarjan's algorithm finds the components in reverse topological order
+    last = len(sccs) - 1
+    sccs.reverse()
+    for i in range(n):
+      scc_of[i] = last - scc_of[i]
+    return sccs, scc_of
+
+  def condense( s, sccs, scc_of ):
+    """ Return the graph of the components, whose ids are the indices in
+    sccs. """
+    ptr, succ = s.succ_ptr, s.succ
+    pairs = set()
+    for i in range( len(s.blocks) ):
+      a = scc_of[i]
+      for k in range( ptr[i], ptr[i + 1] ):
+        b = scc_of[ succ[k] ]
+        if a != b:
+          pairs.add( (a, b) )
+    return BlockGraph.from_ids( len(sccs), pairs )
+
+def get_block_graph( top ):
+  """ Return the graph of the constraints between the intra-cycle blocks
+  of top, i.e. all blocks except update_ff blocks. """
+  dag   = top._dag
+  graph = getattr( dag, "block_graph", None )
+  if graph is None or graph._upblks is not dag.final_upblks or \
+                      graph._constraints is not dag.all_constraints:
+    graph = BlockGraph( dag.final_upblks - top.get_all_update_ff(), dag.all_constraints )
+    graph._upblks      = dag.final_upblks
+    graph._constraints = dag.all_constraints
+    dag.block_graph = graph
+  return graph
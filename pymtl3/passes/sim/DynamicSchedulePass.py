@@ -5,21 +5,24 @@
 # Author : Shunning Jiang
 # Date   : Apr 19, 2019
 
+import linecache
 import os
 from collections import defaultdict, deque
 from copy import deepcopy
 
-import py
-
 from pymtl3.datatypes import Bits, is_bitstruct_class
+from pymtl3.dsl import MethodPort
 from pymtl3.dsl.errors import UpblkCyclicError
 from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 from pymtl3.passes.errors import PassOrderError
 
+from .BlockGraph import BlockGraph, get_block_graph
 from .SimpleSchedulePass import SimpleSchedulePass, dump_dag
-from .SimpleTickPass import SimpleTickPass
 
+# The maximum number of sweeps over the blocks of an SCC before we report
+# a combinational loop that doesn't converge
+max_scc_iters = int( os.environ.get( "PYMTL_SCC_MAX_ITERS", 100 ) )
 
 class DynamicSchedulePass( BasePass ):
   def __call__( self, top ):
@@ -40,33 +43,22 @@ class DynamicSchedulePass( BasePass ):
 
   def schedule_intra_cycle( self, top ):
 
-    # Construct the intra-cycle graph based on normal update blocks
-
-    V   = top._dag.final_upblks - top.get_all_update_ff()
-
-    G   = { v: [] for v in V }
-    G_T = { v: [] for v in V } # transpose graph
+    # The intra-cycle graph based on normal update blocks
 
-    E = set()
-    for (u, v) in top._dag.all_constraints: # u -> v
-      if u in V and v in V:
-        G  [u].append( v )
-        G_T[v].append( u )
-        E.add( (u, v) )
+    graph  = get_block_graph( top )
+    blocks = graph.blocks
 
     if 'MAMBA_DAG' in os.environ:
-      dump_dag( top, V, E )
+      dump_dag( top, blocks, graph.edges() )
 
-    # Compute SCC using Kosaraju's algorithm
+    # Compute SCCs and shrink them into super nodes
 
-    SCCs, G_new = kosaraju_scc( G, G_T )
+    SCCs, scc_of = graph.get_sccs()
+    G_new = graph.condense( SCCs, scc_of )
 
     # Perform topological sort on SCCs
 
-    InD = { i: 0 for i in range(len(SCCs)) }
-    for u, vs in G_new.items():
-      for v in vs:
-        InD[ v ] += 1
+    InD = G_new.in_degrees()
 
     scc_pred = {}
     scc_schedule = []
@@ -78,7 +70,7 @@ class DynamicSchedulePass( BasePass ):
     while Q:
       u = Q.pop()
       scc_schedule.append( u )
-      for v in G_new[u]:
+      for v in G_new.successors( u ):
         InD[v] -= 1
         if not InD[v]:
           Q.append( v )
@@ -96,12 +88,16 @@ class DynamicSchedulePass( BasePass ):
     # Put the graph schedule to _sched
     top._sched.update_schedule = schedule = []
 
+    # Map each generated SCC block to the blocks it wraps
+    top._sched.scc_blocks = {}
+
     scc_id = 0
     for i in scc_schedule:
       scc = SCCs[i]
       if len(scc) == 1:
-        schedule.append( list(scc)[0] )
+        schedule.append( blocks[ scc[0] ] )
       else:
+        scc_blks = [ blocks[x] for x in scc ]
 
         # For each non-trivial SCC, we need to figure out a intra-SCC
         # linear schedule that minimizes the time to re-execute this SCC
@@ -113,13 +109,13 @@ class DynamicSchedulePass( BasePass ):
         # footprint until all nodes are visited.
 
         # check update_once first
-        for x in scc:
+        for x in scc_blks:
           if x in onces:
             raise UpblkCyclicError("update_once blocks are not allowed to appear in a cycle. \n - " + \
                             "\n - ".join( [
                               f"{y.__name__} ({'@update_once' if y in onces else '@update'} " \
                               f"in 'top.{repr(top.get_update_block_host_component(y))[2:]}')"
-                              for y in scc] ))
+                              for y in scc_blks] ))
 
         tmp_schedule = []
         Q = deque()
@@ -127,225 +123,190 @@ class DynamicSchedulePass( BasePass ):
         if scc_pred[i] is None:
           # We start bfs from the block that has the least number of input
           # edges in the SCC
-          InD = { v: 0 for v in scc }
-          for (u, v) in E: # u -> v
-            if u in scc and v in scc:
-              InD[ v ] += 1
+          InD = { v: sum( scc_of[u] == i for u in graph.predecessors( v ) ) for v in scc }
           Q.append( max(InD, key=InD.get) )
 
         else:
           # We start bfs with the blocks that are successors of the
           # predecessor scc in the previous SCC-level topological sort.
-          pred = set( SCCs[ scc_pred[i] ] )
+          pred = scc_pred[i]
           # Sort by names for a fixed outcome
-          for x in sorted( scc, key = lambda x: x.__name__ ):
-            for v in G_T[x]: # find reversed edges point back to pred SCC
-              if v in pred:
+          for x in sorted( scc, key = lambda x: blocks[x].__name__ ):
+            for v in graph.predecessors( x ): # find reversed edges point back to pred SCC
+              if scc_of[v] == pred:
                 Q.append( x )
+                break
 
         # Perform bfs to find a heuristic schedule
         visited = set(Q)
         while Q:
           u = Q.popleft()
-          tmp_schedule.append( u )
-          for v in G[u]:
-            if v in scc and v not in visited:
+          tmp_schedule.append( blocks[u] )
+          for v in graph.successors( u ):
+            if scc_of[v] == i and v not in visited:
               Q.append( v )
               visited.add( v )
 
         scc_id += 1
+        scc_edges = [ (blocks[u], blocks[v]) for u in scc
+                      for v in graph.successors( u ) if scc_of[v] == i ]
+
         variables = set()
-        for (u, v) in E:
+        for e in scc_edges:
           # Collect all variables that triggers other blocks in the SCC
-          if u in scc and v in scc:
-            variables.update( constraint_objs[ (u, v) ] )
+          variables.update( constraint_objs[ e ] )
 
         if len(variables) == 0:
           raise UpblkCyclicError("There is a cyclic dependency without involving variables."
                           "Probably a loop that involves blocks that should be update_once:\n{}"\
-                          .format(", ".join( [ x.__name__ for x in scc] )))
-
-        # generate a loop for scc
-        # Shunning: we just simply loop over the whole SCC block
-        # TODO performance optimizations using Mamba techniques within a SCC block
-
-        def gen_wrapped_SCCblk( s, scc, src ):
-
-          # TODO mamba?
-          scc_tick_func = SimpleTickPass.gen_tick_function( scc )
-          _globals = { 's': s, 'scc_tick_func': scc_tick_func, 'deepcopy': deepcopy,
-                       'UpblkCyclicError': UpblkCyclicError }
-          _locals  = {}
-
-          custom_exec(py.code.Source( src ).compile(), _globals, _locals)
-          return _locals[ 'generated_block' ]
-
-        template = """
-def wrapped_SCC_{0}():
-  N = 0
-  while True:
-    N += 1
-    if N > 100:
-      raise UpblkCyclicError("Combinational loop detected at runtime in {{{3}}} after 100 iters!")
-    {1}
-    scc_tick_func()
-    {2}
-    # print( "SCC block{0} is executed", num_iters, "times" )
-    break
-generated_block = wrapped_SCC_{0}
-          """
-
-        copy_srcs  = []
-        check_srcs = []
-        # print_srcs = []
-
-        # clean up non-top variables if top is there. remove slices
-
-        final_variables = set()
-
-        for x in sorted( variables, key=repr ):
-          w = x.get_top_level_signal()
-          if w is x:
-            final_variables.add( x )
-            continue
-
-          # w is not x
-          if issubclass( w._dsl.Type, Bits ):
-            if w not in final_variables:
-              final_variables.add( w )
-          elif is_bitstruct_class( w._dsl.Type ):
-            if w not in final_variables:
-              final_variables.add( x )
-          else:
-            final_variables.add( x )
-
-        # group them by host component so that we create less bytecode
-
-        final_var_host = defaultdict(list)
-        for x in final_variables:
-          final_var_host[ x.get_host_component() ].append( x )
+                          .format(", ".join( [ x.__name__ for x in scc_blks] )))
 
-        # create a block of copy/check code for each host component. Need
-        # to allocate global var_id across different host components.
+        wrapped = self.gen_scc_block( top, scc_id, tmp_schedule, scc_edges )
+        top._sched.scc_blocks[ wrapped ] = tmp_schedule
+        schedule.append( wrapped )
 
-        var_id = 0
-        for host, var_list in final_var_host.items():
+  def gen_scc_block( self, top, scc_id, scc_schedule, scc_edges ):
+    """ Generate a block that iterates the blocks of an SCC until the
+    signals that trigger other blocks of the SCC stop changing.
 
-          copy_srcs .append( f"host={host!r}" )
-          check_srcs.append( f"host={host!r}" )
+    Instead of replaying the whole SCC until nothing changes, every block
+    has a dirty flag. The generated code sweeps over the blocks in the
+    order of scc_schedule and only runs the dirty ones. After a block
+    runs, we compare the signals it writes with their last values and
+    mark the blocks that read the changed ones as dirty. If an SCC edge
+    is not caused by a signal, e.g. an explicit constraint or a method
+    call, a change marks all blocks of the SCC dirty instead. """
 
-          sub_check_srcs = []
-
-          hostlen = len(repr(host))
-          for var in var_list:
-            var_id += 1
-            subname = repr(var)[hostlen+1:]
-            if issubclass( var._dsl.Type, Bits ):     copy_srcs.append( f"t{var_id}=host.{subname}.clone()" )
-            elif is_bitstruct_class( var._dsl.Type ): copy_srcs.append( f"t{var_id}=host.{subname}.clone()" )
-            else:                                     copy_srcs.append( f"t{var_id}=deepcopy(host.{subname})" )
-
-            sub_check_srcs.append( f"host.{subname} != t{var_id}" )
+    constraint_objs = top._dag.constraint_objs
+    upblk_calls     = top._dsl.all_upblk_calls
 
-          check_srcs.append( f"if { ' or '.join(sub_check_srcs)}: continue" )
+    # clean up non-top variables if top is there. remove slices
 
-        scc_block_src = template.format( scc_id, "; ".join( copy_srcs ), "\n    ".join( check_srcs ),
-                                         ", ".join( [ x.__name__ for x in scc] ) )
+    final_of        = {}
+    final_variables = set()
 
-        # print(scc_block_src)
-        schedule.append( gen_wrapped_SCCblk( top, tmp_schedule, scc_block_src ) )
+    for x in sorted( { x for e in scc_edges for x in constraint_objs[ e ] }, key=repr ):
+      w = x.get_top_level_signal()
+      if w is x:
+        f = x
+      elif issubclass( w._dsl.Type, Bits ):
+        f = w
+      elif is_bitstruct_class( w._dsl.Type ):
+        f = w if w in final_variables else x
+      else:
+        f = x
+      final_variables.add( f )
+      final_of[ x ] = f
+
+    blk_id = { x: k for k, x in enumerate( scc_schedule ) }
+
+    # We can only track the signals if every dependency in the SCC is
+    # caused by some signal
+
+    track = all( constraint_objs[ e ] for e in scc_edges ) and \
+            not any( isinstance( x, MethodPort ) for blk in scc_schedule
+                                                 for x in upblk_calls.get( blk, () ) )
+
+    var_writers = defaultdict(set)
+    var_readers = defaultdict(set)
+    for (u, v) in scc_edges:
+      for x in constraint_objs[ (u, v) ]:
+        var_writers[ final_of[x] ].add( blk_id[u] )
+        var_readers[ final_of[x] ].add( blk_id[v] )
+
+    # Refer to the host components of the variables through globals so
+    # that the generated code doesn't look them up every time
+
+    _globals = { 'deepcopy': deepcopy, 'raise_oscillation': _raise_oscillation }
+    host_name = {}
+
+    def get_ref( var ):
+      host = var.get_host_component()
+      if host not in host_name:
+        host_name[ host ] = name = f"h{len(host_name)}"
+        _globals[ name ] = host
+      return f"{host_name[ host ]}.{repr(var)[len(repr(host))+1:]}"
+
+    def get_copy( var, ref ):
+      if issubclass( var._dsl.Type, Bits ) or is_bitstruct_class( var._dsl.Type ):
+        return f"{ref}.clone()"
+      return f"deepcopy({ref})"
+
+    nblks     = len(scc_schedule)
+    variables = sorted( final_variables, key=repr )
+    blk_vars  = [ [] for _ in range(nblks) ]
+
+    copy_srcs = []
+    for j, var in enumerate( variables ):
+      ref = get_ref( var )
+      copy_srcs.append( f"  t{j} = {get_copy( var, ref )}" )
+      for k in var_writers[ var ]:
+        blk_vars[k].append( (j, var, ref) )
+
+    flags = [ f"d{k}" for k in range(nblks) ]
+
+    sweep_srcs = []
+    for k, blk in enumerate( scc_schedule ):
+      _globals[ f"blk{k}" ] = blk
+      sweep_srcs.append( f"    if d{k}:" )
+      sweep_srcs.append( f"      d{k} = False" )
+      sweep_srcs.append( f"      blk{k}() # {blk.__name__}" )
+      for j, var, ref in blk_vars[k]:
+        readers = sorted( var_readers[ var ] ) if track else range(nblks)
+        sweep_srcs.append( f"      if {ref} != t{j}:" )
+        sweep_srcs.append( f"        t{j} = {get_copy( var, ref )}" )
+        sweep_srcs.append( f"        {' = '.join( flags[r] for r in readers )} = True" )
+
+    _globals['scc_schedule']  = scc_schedule
+    _globals['scc_variables'] = variables
+
+    src = "\n".join([
+      f"def wrapped_SCC_{scc_id}():",
+      *copy_srcs,
+      f"  {' = '.join( flags )} = True",
+      "  N = 0",
+      f"  while {' or '.join( flags )}:",
+      "    N += 1",
+      f"    if N > {max_scc_iters}:",
+      f"      raise_oscillation( s, scc_schedule, scc_variables, {max_scc_iters} )",
+      *sweep_srcs,
+    ])
+
+    _globals['s'] = top
+    _locals  = {}
+    filename = f"wrapped_SCC_{scc_id}_{id(top)}"
+    custom_exec( compile( src, filename=filename, mode="exec" ), _globals, _locals )
+    linecache.cache[ filename ] = ( len(src), None, src.splitlines( keepends=True ), filename )
+    return _locals[ f"wrapped_SCC_{scc_id}" ]
+
+def _raise_oscillation( top, scc_schedule, variables, max_iters, nsweeps=4 ):
+  """ Run the blocks of an SCC that didn't converge a few more times and
+  raise an UpblkCyclicError that shows the signals that keep changing. """
+
+  names   = [ repr(x) for x in variables ]
+  history = []
+  for _ in range(nsweeps):
+    for blk in scc_schedule:
+      blk()
+    history.append( [ str( eval( x, { 's': top } ) ) for x in names ] )
+
+  changing = [ f" - {x}: {' -> '.join( h[j] for h in history )}"
+               for j, x in enumerate( names ) if len({ h[j] for h in history }) > 1 ]
+
+  msg = f"Combinational loop detected at runtime in {{{', '.join( x.__name__ for x in scc_schedule )}}} " \
+        f"after {max_iters} iters!"
+  if changing:
+    msg += f"\nThe following signals keep changing in the last {nsweeps} iterations:\n" + \
+           "\n".join( changing )
+  raise UpblkCyclicError( msg )
 
 def kosaraju_scc( G, G_T ):
-
-    #---------------------------------------------------------------------
-    # Run Kosaraju's algorithm to shrink all strongly connected components
-    # (SCCs) into super nodes
-    #---------------------------------------------------------------------
-
-    # First dfs on G to generate reverse post-order (RPO)
-    # Shunning: we emulate the system stack to implement non-recursive
-    # post-order DFS algorithm. At the beginning, I implemented a more
-    # succinct recursive DFS but it turned out that a 1500-depth chain in
-    # the graph will reach the CPython max recursion depth.
-    # https://docs.python.org/3/library/sys.html#sys.getrecursionlimit
-
-    PO = []
-
-    vertices = list(G.keys())
-    # random.shuffle(vertices)
-    visited = set()
-
-    # The commented algorithm loyally emulates the system stack by storing
-    # the loop index in each stack element and push only one new element
-    # to stack in every iteration. This is basically what recursive dfs
-    # does.
-    #
-    # for u in vertices:
-    #   if u not in visited:
-    #     stack = [ (u, False) ]
-    #     while stack:
-    #       u, idx = stack.pop()
-    #       visited.add( u )
-    #       if idx == len(G[u]):
-    #         PO.append( u )
-    #       else:
-    #         while idx < len(G[u]) and G[u][-idx] in visited:
-    #           idx += 1
-    #         if idx < len(G[u]):
-    #           stack.append( (u, idx) )
-    #           stack.append( (G[u][-idx], 0) )
-    #         else:
-    #           PO.append( u )
-
-    # The following algorithm push all adjacent elements to the stack at
-    # once and later check visited set to avoid redundant visit (instead
-    # of checking visited set when pushing element to the stack). I added
-    # a second_visit flag to add the node to post-order.
-
-    for u in vertices:
-      stack = [ (u, False) ]
-      while stack:
-        u, second_visit = stack.pop()
-
-        if second_visit:
-          PO.append( u )
-        elif u not in visited:
-          visited.add( u )
-          stack.append( (u, True) )
-          for v in reversed(G[u]):
-            stack.append( (v, False) )
-
-    RPO = PO[::-1]
-
-    # Second bfs on G_T to generate SCCs
-
-    SCCs  = []
-    v_SCC = {}
-    visited = set()
-
-    for u in RPO:
-      if u not in visited:
-        visited.add( u )
-        scc = set()
-        SCCs.append( scc )
-        Q = deque( [u] )
-        scc.add( u )
-        while Q:
-          u = Q.popleft()
-          v_SCC[u] = len(SCCs) - 1
-          for v in G_T[u]:
-            if v not in visited:
-              visited.add( v )
-              Q.append( v )
-              scc.add( v )
-
-    # Construct a new graph of SCCs
-
-    G_new = { i: set() for i in range(len(SCCs)) }
-
-    for u, vs in G.items():
-      for v in vs: # u -> v
-        scc_u, scc_v = v_SCC[u], v_SCC[v]
-        if scc_u != scc_v and scc_v not in G_new[ scc_u ]:
-          G_new[ scc_u ].add( scc_v )
-
-    return SCCs, G_new
+  """ Return the SCCs of the graph G, a dict of lists of successors, as a
+  list of sets of vertices in topological order, and the graph of SCCs as
+  a dict of sets. G_T is not needed anymore since the SCCs are computed
+  by BlockGraph. """
+  graph = BlockGraph( G.keys(), ( (u, v) for u, vs in G.items() for v in vs ) )
+  sccs, scc_of = graph.get_sccs()
+  G_new = graph.condense( sccs, scc_of )
+  return [ { graph.blocks[x] for x in scc } for scc in sccs ], \
+         { i: set( G_new.successors( i ) ) for i in range(len(sccs)) }
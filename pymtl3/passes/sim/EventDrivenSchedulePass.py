@@ -0,0 +1,296 @@
+"""
+========================================================================
+EventDrivenSchedulePass.py
+========================================================================
+An activity-driven variant of DynamicSchedulePass. We still compute the
+static linear schedule, but instead of calling every block in every
+evaluation, we generate a single function that only re-evaluates the
+blocks (or SCC blocks) whose input signals changed since their last
+execution.
+
+The sensitivity lists come from the read/write sets of update blocks
+(ComponentLevel2 metadata) and net blocks (top._dag.genblk_reads/writes).
+A block is only skipped if it is a pure function of the signals it
+reads, i.e. it doesn't call methods/functions through s, doesn't write
+non-signal python state, and doesn't read python state written by other
+blocks. All other blocks are "opaque" and always executed.
+
+Date   : Oct 16, 2026
+"""
+from collections import defaultdict
+from copy import deepcopy
+from linecache import cache as line_cache
+
+from pymtl3.datatypes import Bits, is_bitstruct_class
+from pymtl3.dsl.Connectable import Const, Signal
+from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.extra.pypy import custom_exec
+from pymtl3.passes.errors import PassOrderError
+
+from .DynamicSchedulePass import DynamicSchedulePass
+
+
+def _first_leaf( obj ):
+  while isinstance( obj, list ) and obj:
+    obj = obj[0]
+  return obj
+
+def _walk_name( host, obj_name ):
+  """ Resolve s.a.b[i].c from the cached AST names. Return None if the
+  name stays within the NamedObject hierarchy, otherwise the
+  (object id, attribute) pair at which it leaves the hierarchy. """
+  obj = host
+  for field, idx in obj_name[1:]:
+    # struct fields, slices or attributes of signals
+    if isinstance( obj, Signal ):
+      return None
+    try:
+      child = getattr( obj, field )
+    except Exception:
+      return ( id(obj), field )
+
+    for _ in idx:
+      if not isinstance( child, list ) or not child:
+        break
+      child = child[0]
+
+    if not isinstance( _first_leaf( child ), NamedObject ):
+      return ( id(obj), field )
+    obj = child
+  return None
+
+class EventDrivenSchedulePass( DynamicSchedulePass ):
+
+  def __call__( self, top ):
+    if not hasattr( top._dag, "genblk_reads" ):
+      raise PassOrderError( "genblk_reads" )
+
+    super().__call__( top )
+
+    self.schedule_event_driven( top )
+
+  def schedule_event_driven( self, top ):
+
+    top._sched.static_update_schedule = schedule = top._sched.update_schedule
+
+    #---------------------------------------------------------------------
+    # Collect the read/write sets of every block in the static schedule
+    #---------------------------------------------------------------------
+
+    upblk_reads, upblk_writes, upblk_calls = top.get_all_upblk_metadata()
+    genblk_reads  = top._dag.genblk_reads
+    genblk_writes = top._dag.genblk_writes
+    genblks       = top._dag.genblks
+    onces         = top.get_all_update_once()
+    greenlet_orig = { y: x for x, y in getattr( top._dag, "blk_greenlet_mapping", {} ).items() }
+    scc_blocks    = top._sched.scc_blocks
+
+    # Python attributes (not signals) written by update blocks. Any block
+    # that reads them has to be executed every time.
+    pyobj_writes = set()
+    blk_pyobj_reads = {}
+    opaque_blks     = set()
+
+    for blk in upblk_reads:
+      host = top.get_update_block_host_component( blk )
+      cls  = host.__class__
+      name = blk.__name__
+      try:
+        name_rd, name_wr, name_fc = cls._name_rd[name], cls._name_wr[name], cls._name_fc[name]
+      except (AttributeError, KeyError):
+        opaque_blks.add( blk )
+        continue
+
+      if blk in onces or upblk_calls.get( blk ):
+        opaque_blks.add( blk )
+
+      reads = set()
+      for obj_name, _, _ in name_rd:
+        if obj_name[0][0] == 's':
+          key = _walk_name( host, obj_name )
+          if key is not None:
+            reads.add( key )
+      blk_pyobj_reads[ blk ] = reads
+
+      for names, is_call in ( (name_wr, False), (name_fc, True) ):
+        for obj_name, _, _ in names:
+          if obj_name[0][0] == 's':
+            key = _walk_name( host, obj_name )
+            if key is not None:
+              pyobj_writes.add( key )
+              opaque_blks.add( blk )
+            elif is_call:
+              opaque_blks.add( blk )
+
+    for blk, reads in blk_pyobj_reads.items():
+      if not reads.isdisjoint( pyobj_writes ):
+        opaque_blks.add( blk )
+
+    # Signals in the same net share the same object after
+    # lock_in_simulation, so we only track one signal per net.
+    canonical = {}
+    for writer, signals in top.get_all_value_nets():
+      residence = None
+      if not isinstance( writer, Const ) and writer.is_top_level_signal():
+        residence = writer
+      for x in signals:
+        if isinstance( x, Signal ) and x.is_top_level_signal():
+          if residence is None:
+            residence = x
+          canonical[ x ] = residence
+
+    def get_canonical( x ):
+      x = x.get_top_level_signal()
+      return canonical.get( x, x )
+
+    def get_rw_sets( blk ):
+      """ Return (is_opaque, reads, writes) of a block in the schedule. """
+      if blk in scc_blocks:
+        opaque, reads, writes = False, set(), set()
+        for x in scc_blocks[ blk ]:
+          o, r, w = get_rw_sets( x )
+          opaque |= o
+          reads  |= r
+          if w is None: writes = None
+          elif writes is not None: writes |= w
+        return opaque, reads, writes
+
+      if blk in genblks:
+        # Top-level readers share the object of the writer so they are
+        # not actually written by the net block
+        reads = { get_canonical(x) for x in genblk_reads.get( blk, [] ) }
+        return False, reads, { get_canonical(x) for x in genblk_writes[ blk ] } - reads
+
+      orig = greenlet_orig.get( blk, blk )
+      if orig not in upblk_reads:
+        return True, set(), None
+
+      reads  = upblk_reads [ orig ]
+      writes = upblk_writes[ orig ]
+      opaque = ( orig is not blk ) or ( orig in opaque_blks ) or \
+               any( not isinstance( x, Signal ) for x in reads )
+
+      return opaque, { get_canonical(x) for x in reads  if isinstance( x, Signal ) }, \
+                     { get_canonical(x) for x in writes if isinstance( x, Signal ) }
+
+    units = [ get_rw_sets( blk ) for blk in schedule ]
+
+    #---------------------------------------------------------------------
+    # Build sensitivity lists
+    #---------------------------------------------------------------------
+
+    # readers[x] is the list of non-opaque blocks that read signal x
+    readers = defaultdict(list)
+    for i, (opaque, reads, _) in enumerate( units ):
+      if not opaque:
+        for x in reads:
+          readers[x].append( i )
+
+    # Signals that are written by update_ff blocks or not written by any
+    # block in the schedule (e.g., by the test harness or method calls)
+    # are sources. They are checked at the beginning of every evaluation
+    # and after every opaque block.
+    comb_writes = set()
+    for _, _, writes in units:
+      if writes:
+        comb_writes |= writes
+
+    ff_writes = set()
+    for blk in top.get_all_update_ff():
+      ff_writes |= { get_canonical(x) for x in upblk_writes[ blk ] }
+
+    sources = [ x for x in readers if x not in comb_writes or x in ff_writes ]
+
+    signal_id = {}
+    copy_srcs = []
+
+    def gen_check_src( x, indent, excluded=None ):
+      # Nothing to trigger
+      rds = [ j for j in readers.get( x, () ) if j != excluded ]
+      if not rds:
+        return []
+
+      if x not in signal_id:
+        k = signal_id[x] = len(signal_id)
+        if issubclass( x._dsl.Type, Bits ) or is_bitstruct_class( x._dsl.Type ):
+          copy_srcs.append( f"_last[{k}] = {x!r}.clone()" )
+        else:
+          copy_srcs.append( f"_last[{k}] = deepcopy({x!r})" )
+
+      k = signal_id[x]
+      if issubclass( x._dsl.Type, Bits ) or is_bitstruct_class( x._dsl.Type ):
+        copy = "x.clone()"
+      else:
+        copy = "deepcopy(x)"
+
+      return [ f"{indent}x = {x!r}",
+               f"{indent}if x != _last[{k}]:",
+               f"{indent}  _last[{k}] = {copy}",
+               f"{indent}  {' = '.join( [ f'_dirty[{j}]' for j in sorted(set(rds)) ] )} = True" ]
+
+    source_srcs = []
+    for x in sorted( sources, key=repr ):
+      source_srcs.extend( gen_check_src( x, "  " ) )
+
+    # Wrap the source check in a function if opaque blocks need to re-check
+    check_sources = "  check_sources()" if source_srcs else ""
+
+    body = []
+    for i, (opaque, _, writes) in enumerate( units ):
+      if opaque:
+        body.append( f"  blk{i}()" )
+        indent = "  "
+      else:
+        body.append( f"  if _dirty[{i}]:" )
+        body.append( f"    _dirty[{i}] = False" )
+        body.append( f"    blk{i}()" )
+        indent = "    "
+
+      if writes:
+        for x in sorted( writes, key=repr ):
+          body.extend( gen_check_src( x, indent, i ) )
+
+      # The writes of an opaque block may not be fully captured
+      if opaque and check_sources:
+        body.append( check_sources )
+
+    src = """
+def check_sources():
+  {}
+
+def snapshot():
+  {}
+
+def event_driven_eval():
+  if _fresh[0]:
+    _fresh[0] = False
+    snapshot()
+{}
+{}
+""".format( "\n".join( source_srcs ).strip() or "pass",
+            "\n  ".join( copy_srcs ) or "pass",
+            check_sources, "\n".join( body ) )
+
+    _globals = { f"blk{i}": blk for i, blk in enumerate( schedule ) }
+    _globals.update( {
+      's': top, 'deepcopy': deepcopy,
+      '_dirty': [ True ] * len(schedule),
+      '_last': [ None ] * len(signal_id),
+      '_fresh': [ True ],
+    } )
+    _locals = {}
+
+    filename = f"event-driven eval of {top.__class__.__name__}"
+    custom_exec( compile( src, filename=filename, mode="exec" ), _globals, _locals )
+    line_cache[ filename ] = ( len(src), None, src.splitlines(), filename )
+
+    _globals.update( _locals )
+
+    def event_driven_invalidate():
+      _globals['_fresh'][0] = True
+      _globals['_dirty'][:] = [ True ] * len(schedule)
+
+    top._sched.event_driven_invalidate = event_driven_invalidate
+    top._sched.event_driven_num_blocks = len(schedule)
+    top._sched.event_driven_num_opaque = sum( 1 for x in units if x[0] )
+    top._sched.update_schedule = [ _locals['event_driven_eval'] ]
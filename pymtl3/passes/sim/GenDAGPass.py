@@ -15,14 +15,60 @@ from pymtl3.datatypes import *
 from pymtl3.datatypes.bitstructs import get_bitstruct_inst_all_classes
 from pymtl3.dsl import *
 from pymtl3.dsl.errors import LeftoverPlaceholderError
+from pymtl3.dsl.NamedObject import get_relative_name
 from pymtl3.extra.pypy import custom_exec
+from pymtl3.extra.rename_code import rename_code
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 
+from .BlockGraph import get_block_graph
+
+# Net blocks of identical subtrees only differ in their names, so we
+# compile the code of each distinct body once and rename the function.
+_net_blk_code     = {}
+_net_blk_code_max = 4096
+
+def get_net_sharing( writer, signals ):
+  """ Return ( residence, members ) of a net. lock_in_simulation points
+  every signal in members to the value object of residence, so the net
+  block only has to copy the value to the rest of the net.
+
+  Every signal that is not a slice, i.e. a top-level signal or a
+  (nested) bitstruct field, can share the object. If the writer can't,
+  we pick a top-level signal, or a field if there is none, as the
+  residence and the net block writes the value to it. A constant writer
+  is only shared with top-level signals since it may be a plain int. """
+
+  if isinstance( writer, Const ):
+    return writer, [ x for x in signals if x is not writer and x.is_top_level_signal() ]
+
+  residence = None
+  if writer._dsl.slice is None:
+    residence = writer
+  else:
+    for x in signals:
+      if x.is_top_level_signal():
+        residence = x
+        break
+    else:
+      for x in signals:
+        if x._dsl.slice is None:
+          residence = x
+          break
+
+  if residence is None:
+    return None, [] # whole net is slice
+
+  return residence, [ x for x in signals if x is not residence and x._dsl.slice is None ]
+
 
 class GenDAGPass( BasePass ):
 
   def __call__( self, top ):
     top.check()
+
+    # After mutation APIs such as replace_component, GenDAGPass can be
+    # applied again. The net blocks of unchanged nets are then reused.
+    prev_net_genblks = getattr( getattr( top, "_dag", None ), "net_genblks", {} )
     top._dag = PassMetadata()
 
     placeholders = [ x for x in top._dsl.all_named_objects
@@ -31,35 +77,32 @@ class GenDAGPass( BasePass ):
     if placeholders:
       raise LeftoverPlaceholderError( placeholders )
 
-    self._generate_net_blocks( top )
+    self._generate_net_blocks( top, prev_net_genblks )
     self._process_value_constraints( top )
     self._process_methods( top )
+    self._merge_net_blocks( top )
 
-  def _generate_net_blocks( self, top ):
+    # Build the compact constraint graph shared by the schedule passes
+    get_block_graph( top )
+
+  def _generate_net_blocks( self, top, prev_net_genblks={} ):
     """ _generate_net_blocks:
     Each net is an update block. Readers are actually "written" here.
       >>> s.net_reader1 = s.net_writer
-      >>> s.net_reader2 = s.net_writer """
+      >>> s.net_reader2 = s.net_writer
+
+    prev_net_genblks maps ( writer, frozenset(signals) ) of the nets
+    from a previous run to ( block, source ), which are reused as is. """
 
     top._dag.genblks = set()
+    top._dag.net_genblks = {}
     top._dag.genblk_hostobj = {}
     top._dag.genblk_reads   = {}
     top._dag.genblk_writes  = {}
-    # top._dag.genblk_src     = {}
-
-    # Fall back to compiling one block at a time
-    # This is currently because there might be different structs with
-    # the same name but essentially different type. It requires name
-    # disambiguation to let them co-exist in closure. With block-by-block
-    # compilation, we minimize the effect.
-
-    # TODO see if directly compiling AST instead of source can be faster
-    def compile_net_blk( _globals, src, writer ):
-      _locals = {}
-      fname = f"Net (writer is {writer!r}"
-      custom_exec( compile( src, filename=fname, mode="exec"), _globals, _locals )
-      line_cache[ fname ] = (len(src), None, src.splitlines(), fname )
-      return list(_locals.values())[0]
+    top._dag.genblk_src     = {}
+    top._dag.genblk_copies  = {}
+
+    compile_net_blk = self._compile_net_blk
 
     for writer, signals in top.get_all_value_nets():
       if len(signals) == 1:
@@ -68,10 +111,11 @@ class GenDAGPass( BasePass ):
       all_readers = [ x for x in signals if x is not writer ]
       all_fanout  = len( all_readers )
 
-      # Here we remove every top-level signal from the reader list, but need to keep a shallow
-      # one as the delegate
+      # Here we remove every signal that shares the object of the writer
+      # from the reader list. If the writer is a slice, we keep the
+      # residence as the delegate
       #
-      # - writer: a,  reader: b, c
+      # - writer: a,  reader: b, c.f
       #   nothing
       # - writer: a,  reader: b[0], c
       #   # 1 selected_reader
@@ -80,7 +124,7 @@ class GenDAGPass( BasePass ):
       #   x = a[0]
       #   b[0] @= x
       #   c[0] @= x
-      # - writer: a[0],  reader: b, c
+      # - writer: a[0],  reader: b, c.f
       #   # 1 selected_reader
       #   b @= a[0]
       # - writer: a[0],  reader: b[0], c
@@ -92,81 +136,126 @@ class GenDAGPass( BasePass ):
       #   b[0] @= x
       #   c[0] @= x
 
-      readers = []
-      if isinstance( writer, Const ) or writer.is_top_level_signal():
-        for x in all_readers:
-          if not x.is_top_level_signal():
-            readers.append( x )
-      else:
-        residence = None
-        for x in all_readers:
-          if x.is_top_level_signal():
-            if residence is None:
-              residence = x
-              readers.append( x )
-            # skip other top signals
-          else:
-            readers.append( x )
+      _, shared = get_net_sharing( writer, signals )
+      shared    = set( shared )
+      readers   = [ x for x in all_readers if x not in shared ]
+      fanout    = len(readers)
 
-      fanout = len(readers)
+      key = ( writer, frozenset( signals ) )
+      if key in prev_net_genblks:
+        blk, gen_src = top._dag.net_genblks[ key ] = prev_net_genblks[ key ]
 
-      genblk_name = f"{writer!r}__{all_fanout}_{fanout}".replace( " ", "" ) \
-                      .replace( ".", "_" ).replace( ":", "_" ) \
-                      .replace( "[", "_" ).replace( "]", "_" ) \
-                      .replace( "(", "_" ).replace( ")", "_" ) \
-                      .replace( ",", "_" )
+      # If all signals share the same object, we still need to generate
+      # an empty block to convey the constraints using all_readers
+      elif fanout == 0:
+        genblk_name = self._get_genblk_name( writer, all_fanout, fanout )
+        gen_src = f"def {genblk_name}(): pass"
+        blk = compile_net_blk( {}, gen_src, writer )
+        top._dag.net_genblks[ key ] = ( blk, gen_src )
 
-      # If all signals are top-level, we still need to generate an empty
-      # to convey the constraints using all_readers
+      else:
+        genblk_name = self._get_genblk_name( writer, all_fanout, fanout )
+        _globals, gen_src = self._gen_net_blk_src( top, genblk_name, [ ( writer, readers ) ] )
+        blk = compile_net_blk( _globals, gen_src, writer )
+        top._dag.net_genblks[ key ] = ( blk, gen_src )
 
-      if fanout == 0:
-        blk = compile_net_blk( {}, f"""def {genblk_name}(): pass""", writer )
+      top._dag.genblks.add( blk )
+      top._dag.genblk_src[ blk ] = gen_src
+      if writer.is_signal():
+        top._dag.genblk_reads[ blk ] = [ writer ]
+      top._dag.genblk_writes[ blk ] = all_readers
+      top._dag.genblk_copies[ blk ] = [ ( writer, readers ) ] if fanout else []
 
-        top._dag.genblks.add( blk )
-        if writer.is_signal():
-          top._dag.genblk_reads[ blk ] = [ writer ]
-        top._dag.genblk_writes[ blk ] = all_readers
-        continue
-      # readers = all_readers
-      # fanout  = all_fanout
+    # Get the final list of update blocks
+    top._dag.final_upblks = top.get_all_update_blocks() | top._dag.genblks
 
-      wr_lca  = writer.get_host_component()
-      rd_lcas = [ x.get_host_component() for x in readers ]
+  # Fall back to compiling one block at a time
+  # This is currently because there might be different structs with
+  # the same name but essentially different type. It requires name
+  # disambiguation to let them co-exist in closure. With block-by-block
+  # compilation, we minimize the effect.
+
+  # TODO see if directly compiling AST instead of source can be faster
+  @staticmethod
+  def _compile_net_blk( _globals, src, writer ):
+    fname = f"Net (writer is {writer!r}"
+
+    start = src.index( "def " ) + 4
+    stop  = src.index( "(", start )
+    name  = src[start:stop]
+    body  = f"{src[:start]}_net_blk{src[stop:]}"
+
+    code = _net_blk_code.get( body )
+    if code is None:
+      if len(_net_blk_code) >= _net_blk_code_max:
+        _net_blk_code.clear()
+      code = _net_blk_code[ body ] = compile( body, filename="<net block>", mode="exec" )
+
+    _locals = {}
+    custom_exec( code, _globals, _locals )
+    blk = _locals[ "_net_blk" ]
+    blk.__code__ = rename_code( blk.__code__, name, fname )
+    blk.__name__ = blk.__qualname__ = name
+
+    line_cache[ fname ] = (len(src), None, src.splitlines(), fname )
+    return blk
+
+  @staticmethod
+  def _get_genblk_name( writer, all_fanout, fanout ):
+    return f"{writer!r}__{all_fanout}_{fanout}".replace( " ", "" ) \
+              .replace( ".", "_" ).replace( ":", "_" ) \
+              .replace( "[", "_" ).replace( "]", "_" ) \
+              .replace( "(", "_" ).replace( ")", "_" ) \
+              .replace( ",", "_" )
+
+  def _gen_net_blk_src( self, top, genblk_name, copies ):
+    """ Return ( globals, source ) of a block that copies the value of each
+    writer to its readers. copies is a list of ( writer, readers ). """
+
+    wr_lca  = None
+    rd_lcas = []
+    for writer, readers in copies:
+      if wr_lca is None:
+        wr_lca = writer.get_host_component()
+      else:
+        rd_lcas.append( writer.get_host_component() )
+      rd_lcas.extend( [ x.get_host_component() for x in readers ] )
 
-      # Find common ancestor: iteratively go to parent level and check if
-      # at the same level all objects' ancestors are the same
+    # Find common ancestor: iteratively go to parent level and check if
+    # at the same level all objects' ancestors are the same
 
-      mindep  = min( wr_lca.get_component_level(),
-                min( [ x.get_component_level() for x in rd_lcas ] ) )
+    mindep  = min( wr_lca.get_component_level(),
+              min( [ x.get_component_level() for x in rd_lcas ] ) )
 
-      # First navigate all objects to the same level deep
+    # First navigate all objects to the same level deep
 
-      for i in range( mindep, wr_lca.get_component_level() ):
-        wr_lca = wr_lca.get_parent_object()
+    for i in range( mindep, wr_lca.get_component_level() ):
+      wr_lca = wr_lca.get_parent_object()
 
-      for i, x in enumerate( rd_lcas ):
-        for j in range( mindep, x.get_component_level() ):
-          x = x.get_parent_object()
-        rd_lcas[i] = x
+    for i, x in enumerate( rd_lcas ):
+      for j in range( mindep, x.get_component_level() ):
+        x = x.get_parent_object()
+      rd_lcas[i] = x
 
-      # Then iteratively check if their ancestor is the same
+    # Then iteratively check if their ancestor is the same
 
-      while wr_lca is not top:
-        succeed = True
-        for x in rd_lcas:
-          if x is not wr_lca:
-            succeed = False
-            break
-        if succeed: break
+    while wr_lca is not top:
+      succeed = True
+      for x in rd_lcas:
+        if x is not wr_lca:
+          succeed = False
+          break
+      if succeed: break
 
-        # Bring up all objects for another level
-        wr_lca = wr_lca.get_parent_object()
-        for i in range( fanout ):
-          rd_lcas[i] = rd_lcas[i].get_parent_object()
+      # Bring up all objects for another level
+      wr_lca = wr_lca.get_parent_object()
+      for i in range( len(rd_lcas) ):
+        rd_lcas[i] = rd_lcas[i].get_parent_object()
 
-      lca_len = len( repr(wr_lca) )
-      _globals = {'s': wr_lca }
+    _globals = {'s': wr_lca }
 
+    body = []
+    for writer, readers in copies:
       if isinstance( writer, Const ) and type(writer._dsl.const) is not int:
         types = get_bitstruct_inst_all_classes( writer._dsl.const )
 
@@ -177,24 +266,17 @@ class GenDAGPass( BasePass ):
         wstr = repr(writer)
 
       else:
-        wstr = f"s.{repr(writer)[lca_len+1:]}"
+        wstr = f"s{get_relative_name( writer, wr_lca )}"
 
-      rstrs   = [ f"s.{repr(x)[lca_len+1:]}" for x in readers ]
+      body.append( f"x = {wstr}" )
+      # Sorted so that nets of identical subtrees have identical bodies
+      body.extend( sorted( f"s{get_relative_name( x, wr_lca )} @= x" for x in readers ) )
 
-      gen_src = """
+    gen_src = """
 def {}():
-  x = {}
-  {}""".format( genblk_name, wstr, '\n  '.join([ f"{rstr} @= x" for rstr in rstrs ]) )
+  {}""".format( genblk_name, '\n  '.join( body ) )
 
-      blk = compile_net_blk( _globals, gen_src, writer )
-
-      top._dag.genblks.add( blk )
-      if writer.is_signal():
-        top._dag.genblk_reads[ blk ] = [ writer ]
-      top._dag.genblk_writes[ blk ] = all_readers
-
-    # Get the final list of update blocks
-    top._dag.final_upblks = top.get_all_update_blocks() | top._dag.genblks
+    return _globals, gen_src
 
   def _process_value_constraints( self, top ):
 
@@ -590,3 +672,138 @@ def {}():
     for blocking_method in blocking_ifcs:
       for blk in method_blks[ blocking_method.method.method ]:
         top._dag.greenlet_upblks.add( blk )
+
+  #-----------------------------------------------------------------------
+  # Merge net blocks
+  #-----------------------------------------------------------------------
+
+  def _merge_net_blocks( self, top ):
+    """ _merge_net_blocks:
+    Merge the net blocks that copy slices of the same signal into one
+    block to reduce the number of blocks called every cycle.
+      >>> s.out[0:8]  //= s.a.out
+      >>> s.out[8:16] //= s.b.out
+
+    A set of blocks is only merged if no block can reach another one in
+    the constraint graph so that merging doesn't introduce a cycle. We
+    also don't merge blocks if one of them writes to the signal another
+    one reads from. """
+
+    dag = top._dag
+    update_ff = top.get_all_update_ff()
+
+    # The metadata of the merged blocks is kept for passes that handle
+    # each net separately (e.g. BatchSimPass)
+    dag.merged_genblks = {}
+
+    # Group the net blocks by the top-level signal of the first slice
+    groups = defaultdict(list)
+    for blk, copies in dag.genblk_copies.items():
+      if len(copies) == 1 and not isinstance( copies[0][0], Const ):
+        writer, readers = copies[0]
+        for x in [ writer ] + readers:
+          if x._dsl.slice is not None:
+            groups[ x.get_top_level_signal() ].append( blk )
+            break
+
+    succ = defaultdict(set)
+    pred = defaultdict(set)
+    for (u, v) in dag.all_constraints:
+      if u not in update_ff and v not in update_ff:
+        succ[u].add( v )
+        pred[v].add( u )
+
+    def get_reachable( u ):
+      visited = set()
+      stack   = list( succ[u] )
+      while stack:
+        v = stack.pop()
+        if v not in visited:
+          visited.add( v )
+          stack.extend( succ[v] )
+      return visited
+
+    def get_rw_tops( blk ):
+      return { x.get_top_level_signal() for x in dag.genblk_reads[ blk ] }, \
+             { x.get_top_level_signal() for x in dag.genblk_writes[ blk ] }
+
+    mapping = {}
+
+    for blks in groups.values():
+      # Merging a chunk changes the reachability of the rest, so we
+      # pick one chunk at a time from the remaining blocks
+      while len(blks) > 1:
+        reach = { x: get_reachable( x ) for x in blks }
+
+        chunk, rest = [], []
+        chunk_rds, chunk_wrs = set(), set()
+        for x in blks:
+          rds, wrs = get_rw_tops( x )
+          if all( x not in reach[y] and y not in reach[x] for y in chunk ) and \
+             ( chunk_rds | rds ).isdisjoint( chunk_wrs | wrs ):
+            chunk.append( x )
+            chunk_rds |= rds
+            chunk_wrs |= wrs
+          else:
+            rest.append( x )
+
+        blks = rest
+        if len(chunk) < 2:
+          continue
+
+        copies = [ c for x in chunk for c in dag.genblk_copies[ x ] ]
+        genblk_name = f"{chunk[0].__name__}__merged_{len(chunk)}"
+        _globals, gen_src = self._gen_net_blk_src( top, genblk_name, copies )
+        blk = self._compile_net_blk( _globals, gen_src, copies[0][0] )
+
+        dag.genblks.add( blk )
+        dag.genblk_src[ blk ]    = gen_src
+        dag.genblk_reads[ blk ]  = [ wr for wr, _ in copies ]
+        dag.genblk_writes[ blk ] = [ y for x in chunk for y in dag.genblk_writes[ x ] ]
+        dag.genblk_copies[ blk ] = copies
+        dag.merged_genblks[ blk ] = chunk
+
+        for x in chunk:
+          mapping[ x ] = blk
+          dag.genblks.discard( x )
+
+          # Redirect the edges of the member to the merged block
+          for v in succ.pop( x, () ):
+            pred[v].discard( x )
+            if v not in chunk:
+              succ[blk].add( v )
+              pred[v].add( blk )
+          for u in pred.pop( x, () ):
+            succ[u].discard( x )
+            if u not in chunk:
+              pred[blk].add( u )
+              succ[u].add( blk )
+
+    if mapping:
+      all_constraints = set()
+      constraint_objs = defaultdict(set)
+      for (u, v) in dag.all_constraints:
+        uu, vv = mapping.get( u, u ), mapping.get( v, v )
+        if uu is not vv:
+          all_constraints.add( (uu, vv) )
+      for (u, v), objs in dag.constraint_objs.items():
+        uu, vv = mapping.get( u, u ), mapping.get( v, v )
+        if uu is not vv:
+          constraint_objs[ (uu, vv) ] |= objs
+
+      dag.all_constraints = all_constraints
+      dag.constraint_objs = constraint_objs
+      dag.final_upblks    = top.get_all_update_blocks() | dag.genblks
+
+    # Net blocks that don't copy anything only convey the constraints
+    dag.empty_genblks = { x for x in dag.genblks if not dag.genblk_copies[ x ] }
+
+    num_nets = len( dag.net_genblks )
+    num_copy_blks = len( dag.genblks ) - len( dag.empty_genblks )
+    dag.net_genblk_stats = {
+      'nets'      : num_nets,
+      'shared'    : len( dag.empty_genblks ),
+      'merged'    : len( mapping ) - len( dag.merged_genblks ),
+      'copy_blks' : num_copy_blks,
+      'eliminated': num_nets - num_copy_blks,
+    }
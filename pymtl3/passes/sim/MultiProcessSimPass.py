@@ -0,0 +1,440 @@
+"""
+========================================================================
+MultiProcessSimPass.py
+========================================================================
+Simulate a pure RTL design in multiple processes. The component tree is
+cut into partitions either by the user (MultiProcessSimPass.partition
+metadata on components) or automatically at the children of top.
+Partition 0 is simulated in the main process and every other partition
+in a forked worker process. Each process only executes the update
+blocks of its own partition; net blocks are replicated.
+
+The cut has to be registered: a signal produced combinationally in one
+partition cannot be consumed by another partition. This way the only
+values that cross partitions are update_ff outputs, which are exchanged
+through shared memory once per cycle after the clock edge and the
+simulation stays cycle-exact.
+
+Note that the main process only keeps the state of partition 0 (plus
+the update_ff outputs that partition 0 consumes and the top-level
+output ports) up-to-date.
+
+Date   : Oct 16, 2026
+"""
+import multiprocessing
+import os
+import traceback
+from collections import defaultdict
+from threading import BrokenBarrierError
+
+from pymtl3.datatypes import b1, get_codec
+from pymtl3.dsl import Component, MetadataKey, MethodPort
+from pymtl3.extra.pypy import custom_exec
+from pymtl3.passes.errors import ModelTypeError, PassOrderError
+
+from .PrepareSimPass import PrepareSimPass
+
+_ALL = -1 # replicated in every partition
+
+class MultiProcessSimPass( PrepareSimPass ):
+
+  #: Partition id of a component subtree. A component belongs to the
+  #: partition of its nearest marked ancestor (including itself).
+  #: Unmarked components belong to partition 0 (the main process). If no
+  #: component is marked, the children of top are partitioned
+  #: automatically.
+  #:
+  #: Type: ``int``; input
+  partition = MetadataKey(int)
+
+  def __init__( self, nprocs=None, reset_active_high=True ):
+    super().__init__( print_line_trace=False, reset_active_high=reset_active_high )
+    self.nprocs = nprocs if nprocs is not None else os.cpu_count()
+    assert self.nprocs >= 1
+
+  def __call__( self, top ):
+    if not hasattr( top, "_sched" ):
+      raise PassOrderError( "_sched" )
+
+    if top.get_all_object_filter( lambda x: isinstance( x, MethodPort ) ) or \
+       top.get_all_update_once():
+      raise ModelTypeError( "pure RTL designs without method ports and update_once blocks" )
+
+    self.partition_blocks( top )
+    self.gen_exchange_funcs( top )
+
+    super().__call__( top )
+
+    top._sim.num_partitions = self.nparts
+    top._sim.blk_partition  = self.blk_part
+    top._sim.exported_signals = [ x for x, _ in self.exports ]
+
+    self.start_workers( top )
+
+  #-----------------------------------------------------------------------
+  # Partitioning
+  #-----------------------------------------------------------------------
+
+  def partition_blocks( self, top ):
+
+    # Assign each component to a unit. Units are the smallest pieces that
+    # are either given by the user or chosen by us.
+
+    marked = top.get_all_object_filter( lambda x: isinstance( x, Component ) and
+                                                  x.has_metadata( self.partition ) )
+    explicit = bool( marked )
+
+    comp_unit = {}
+    def get_unit( c ):
+      try:
+        return comp_unit[c]
+      except KeyError:
+        pass
+      if c is top:
+        u = top.get_metadata( self.partition ) if explicit and c in marked else 0
+      elif explicit and c in marked:
+        u = c.get_metadata( self.partition )
+      elif not explicit and c.get_parent_object() is top:
+        u = len(comp_unit) + 1
+      else:
+        u = get_unit( c.get_parent_object() )
+      comp_unit[c] = u
+      return u
+
+    if not explicit:
+      for c in top.get_child_components( repr ):
+        get_unit( c )
+
+    # Group top-level signals that may carry the same value through nets
+
+    uf = {}
+    def find( x ):
+      uf.setdefault( x, x )
+      root = x
+      while uf[root] is not root:
+        root = uf[root]
+      while uf[x] is not root:
+        uf[x], x = root, uf[x]
+      return root
+
+    for writer, signals in top.get_all_value_nets():
+      tops = [ x.get_top_level_signal() for x in signals if x.is_signal() ]
+      for x in tops[1:]:
+        uf[ find(x) ] = find( tops[0] )
+
+    upblk_reads, upblk_writes, _ = top.get_all_upblk_metadata()
+    update_ff = top.get_all_update_ff()
+    blk_unit  = { blk: get_unit( top.get_update_block_host_component( blk ) )
+                  for blk in upblk_reads }
+
+    comb_writers = defaultdict(set)
+    for blk, writes in upblk_writes.items():
+      if blk not in update_ff:
+        for x in writes:
+          comb_writers[ find( x.get_top_level_signal() ) ].add( blk )
+
+    # Each group a block reads. Top-level output ports are consumed by
+    # the main process.
+    blk_groups = { blk: { find( x.get_top_level_signal() ) for x in reads if x.is_signal() }
+                   for blk, reads in upblk_reads.items() }
+    outport_groups = { find(x) for x in top.get_output_value_ports() }
+
+    # Check if the cut is registered. We merge units that are connected
+    # combinationally in the automatic mode.
+
+    unit_uf = {}
+    def find_unit( u ):
+      while unit_uf.get( u, u ) != u:
+        u = unit_uf[u]
+      return u
+
+    def check_units( consumer_unit, groups, consumer ):
+      for g in groups:
+        for w in comb_writers.get( g, () ):
+          u, v = find_unit( consumer_unit ), find_unit( blk_unit[w] )
+          if u != v:
+            if explicit:
+              raise ValueError( f"{consumer} in partition {u} combinationally depends on "
+                                f"{w.__name__} in partition {v} through {g!r}. Only update_ff "
+                                f"outputs are allowed to cross partitions." )
+            unit_uf[ max(u, v) ] = min(u, v)
+
+    for blk, groups in blk_groups.items():
+      check_units( blk_unit[blk], groups, blk.__name__ )
+    check_units( 0, outport_groups, "top-level output port" )
+
+    # Map units to partitions
+
+    units = defaultdict(int)
+    for blk, u in blk_unit.items():
+      units[ find_unit(u) ] += 1
+    units[0] += 0
+
+    if explicit:
+      ids = sorted( units.keys() )
+      unit_part = { u: i for i, u in enumerate( ids ) }
+
+    else:
+      # Greedily put the largest unit into the least loaded partition.
+      # The main process also takes partition 0.
+      nparts = min( self.nprocs, len(units) )
+      loads  = [ units[0] ] + [ 0 ] * ( nparts - 1 )
+      unit_part = { 0: 0 }
+      for u in sorted( units, key=lambda u: (-units[u], u) ):
+        if u == 0: continue
+        p = min( range(nparts), key=lambda i: ( loads[i], i ) )
+        unit_part[u] = p
+        loads[p] += units[u]
+
+    self.nparts = max( unit_part.values() ) + 1
+
+    blk_part = { blk: unit_part[ find_unit(u) ] for blk, u in blk_unit.items() }
+    for blk in top._dag.genblks:
+      blk_part[ blk ] = _ALL
+
+    for blk, members in top._sched.scc_blocks.items():
+      parts = { blk_part[x] for x in members } - { _ALL }
+      assert len(parts) <= 1
+      blk_part[ blk ] = parts.pop() if parts else _ALL
+
+    self.blk_part = blk_part
+
+    # Export every update_ff output that is read by another partition
+
+    group_parts = defaultdict(set)
+    for blk, groups in blk_groups.items():
+      for g in groups:
+        group_parts[g].add( blk_part[blk] )
+    for g in outport_groups:
+      group_parts[g].add( 0 )
+
+    exports = []
+    for blk in sorted( update_ff, key=lambda x: ( blk_part[x], x.__name__ ) ):
+      p = blk_part[ blk ]
+      for x in sorted( upblk_writes[ blk ], key=repr ):
+        if group_parts[ find(x) ] - { p }:
+          exports.append( (x, p) )
+    self.exports = exports
+
+  #-----------------------------------------------------------------------
+  # Code generation
+  #-----------------------------------------------------------------------
+
+  def gen_exchange_funcs( self, top ):
+    """ Generate the functions that flip the update_ff outputs of each
+    partition and copy the exported values from/to the shared buffer. """
+
+    _, upblk_writes, _ = top.get_all_upblk_metadata()
+
+    flip_srcs = [ [] for _ in range(self.nparts) ]
+    for blk in top.get_all_update_ff():
+      p = self.blk_part[ blk ]
+      for x in sorted( upblk_writes[ blk ], key=repr ):
+        if x._dsl.needs_double_buffer:
+          flip_srcs[p].append( f"  {x!r}._flip()" )
+
+    pub_srcs = [ [] for _ in range(self.nparts) ]
+    imp_srcs = [ [] for _ in range(self.nparts) ]
+    _globals = { 's': top }
+    codec_names = {}
+
+    # The cached codec of each signal type converts a whole bitstruct
+    # from/to bytes in one call
+    def codec_name( Type ):
+      if Type not in codec_names:
+        codec_names[ Type ] = f"_codec{len(codec_names)}"
+        _globals[ codec_names[ Type ] ] = get_codec( Type )
+      return codec_names[ Type ]
+
+    offset = 0
+    for i, (x, p) in enumerate( self.exports ):
+      codec  = codec_name( x._dsl.Type )
+      nbytes = ( x._dsl.Type.nbits + 7 ) // 8
+      rng = f"{offset}:{offset+nbytes}"
+
+      pub_srcs[p].append( f"  buf[{rng}] = {codec}.to_bytes({x!r})" )
+      for q in range(self.nparts):
+        if q != p:
+          imp_srcs[q].append( f"  {x!r} @= {codec}.from_bytes(buf[{rng}])" )
+      offset += nbytes
+
+    self.buf_size = max( offset, 1 )
+
+    inports = sorted( [ x for x in top.get_input_value_ports() ], key=repr )
+
+    srcs = [ "def get_inports():",
+             f"  return ({''.join([ f'{codec_name( x._dsl.Type )}.to_int({x!r}), ' for x in inports ])})",
+             "def set_inports( values ):",
+             "  pass" ] + \
+           [ f"  {x!r} @= {codec_name( x._dsl.Type )}.from_int(values[{i}])" for i, x in enumerate(inports) ]
+
+    for p in range(self.nparts):
+      srcs += [ f"def flip_{p}():", "  pass" ] + flip_srcs[p]
+      srcs += [ f"def publish_{p}( buf ):", "  pass" ] + pub_srcs[p]
+      srcs += [ f"def import_{p}( buf ):", "  pass" ] + imp_srcs[p]
+
+    src = "\n".join( srcs )
+    _locals = {}
+    custom_exec( compile( src, filename="multiproc_exchange", mode="exec" ), _globals, _locals )
+    self.exchange_funcs = _locals
+
+  #-----------------------------------------------------------------------
+  # Simulation APIs
+  #-----------------------------------------------------------------------
+
+  def gen_partition_funcs( self, top, p ):
+    """ Return the (comb, cycle) function of partition p. """
+    comb = [ x for x in top._sched.update_schedule if self.blk_part.get( x, 0 ) in (p, _ALL) ]
+    ffs  = [ x for x in top._sched.schedule_ff if self.blk_part[x] == p ]
+
+    f = self.exchange_funcs
+    flip, publish, import_ = f[f"flip_{p}"], f[f"publish_{p}"], f[f"import_{p}"]
+
+    bufs    = self.bufs
+    barrier = self.barrier
+    parity  = [ 0 ]
+
+    def comb_func():
+      for blk in comb:
+        blk()
+
+    def cycle_func():
+      for blk in ffs:
+        blk()
+      flip()
+      buf = bufs[ parity[0] ]
+      parity[0] ^= 1
+      publish( buf )
+      barrier.wait()
+      import_( buf )
+
+    return comb_func, cycle_func
+
+  def start_workers( self, top ):
+    ctx = multiprocessing.get_context( "fork" )
+
+    conns   = []
+    workers = []
+    set_inports = self.exchange_funcs['set_inports']
+
+    for p in range( 1, self.nparts ):
+      comb, cycle = self.gen_partition_funcs( top, p )
+      parent_conn, child_conn = ctx.Pipe()
+
+      def worker_loop( conn=child_conn, comb=comb, cycle=cycle, barrier=self.barrier ):
+        try:
+          while True:
+            cmd, values = conn.recv()
+            if   cmd == 'eval':
+              set_inports( values )
+              comb()
+            elif cmd == 'cycle':
+              cycle()
+              comb()
+            elif cmd == 'stop':
+              break
+        except Exception:
+          conn.send( traceback.format_exc() )
+          barrier.abort()
+
+      proc = ctx.Process( target=worker_loop, daemon=True )
+      proc.start()
+      conns.append( parent_conn )
+      workers.append( proc )
+
+    top._sim.conns   = conns
+    top._sim.workers = workers
+
+    def stop_workers():
+      for conn in conns:
+        conn.send( ('stop', None) )
+      for proc in workers:
+        proc.join()
+      workers.clear()
+      conns.clear()
+
+    top.sim_stop_workers = stop_workers
+
+  def _create_main_funcs( self, top ):
+    try:
+      return self._main_funcs
+    except AttributeError:
+      pass
+
+    # Double-buffer the exchange so that a fast process never overwrites
+    # the values of the previous cycle before a slow process imports them
+    ctx  = multiprocessing.get_context( "fork" )
+    raw  = ctx.RawArray( 'B', self.buf_size * 2 )
+    view = memoryview( raw ).cast( 'B' )
+    self.barrier = ctx.Barrier( self.nparts )
+    self.bufs = [ view[:self.buf_size], view[self.buf_size:] ]
+
+    comb, cycle = self.gen_partition_funcs( top, 0 )
+    get_inports = self.exchange_funcs['get_inports']
+    advance_sim_cycle = self.create_advance_sim_cycle( top )
+
+    last = [ None ]
+    def check_worker_error():
+      for conn in top._sim.conns:
+        if conn.poll():
+          raise RuntimeError( f"Worker process failed:\n{conn.recv()}" )
+
+    def eval_comb():
+      values = get_inports()
+      if values != last[0]:
+        last[0] = values
+        for conn in top._sim.conns:
+          conn.send( ('eval', values) )
+      comb()
+
+    def cycle_all():
+      for conn in top._sim.conns:
+        conn.send( ('cycle', None) )
+      try:
+        cycle()
+      except BrokenBarrierError:
+        check_worker_error()
+        raise
+      advance_sim_cycle()
+
+    self._main_funcs = eval_comb, cycle_all
+    return self._main_funcs
+
+  def create_sim_eval_comb( self, top ):
+    eval_comb, _ = self._create_main_funcs( top )
+    check_inports = top._sim.check_top_level_inports
+
+    def sim_eval_combinational():
+      check_inports()
+      eval_comb()
+
+    top.sim_eval_combinational = sim_eval_combinational
+
+  def create_sim_tick( self, top ):
+    eval_comb, cycle = self._create_main_funcs( top )
+    check_inports = top._sim.check_top_level_inports
+
+    def sim_tick():
+      eval_comb()
+      cycle()
+      eval_comb()
+      check_inports()
+
+    top.sim_tick = sim_tick
+
+  def create_sim_reset( self, top ):
+    eval_comb, cycle = self._create_main_funcs( top )
+    active_high = self.reset_active_high
+
+    def sim_reset():
+      top.reset @= b1( active_high )
+      eval_comb()
+      cycle()
+      eval_comb()
+      cycle()
+      eval_comb()
+      cycle()
+      top.reset @= b1( not active_high )
+      eval_comb()
+
+    top.sim_reset = sim_reset
@@ -9,7 +9,7 @@ Date   : Jan 26, 2020
 
 import py
 
-from pymtl3.datatypes import Bits, b1
+from pymtl3.datatypes import Bits, b1, is_bitstruct_class
 from pymtl3.dsl.Component import Component
 from pymtl3.dsl.Connectable import Const, Interface, MethodPort, Signal
 from pymtl3.dsl.NamedObject import NamedObject
@@ -22,15 +22,34 @@ from pymtl3.passes.tracing.LineTraceParamPass import LineTraceParamPass
 from pymtl3.passes.tracing.PrintTextWavePass import PrintTextWavePass
 from pymtl3.passes.tracing.VcdGenerationPass import VcdGenerationPass
 
+from .GenDAGPass import get_net_sharing
+from .SimCheckpoint import restore_checkpoint, save_checkpoint
 from .SimpleTickPass import SimpleTickPass
+from .TimeSkip import fast_forward, get_time_skip_hooks
 
 
+def _get_type_depth( Type ):
+  """ Return how deep bitstruct types are nested in Type. """
+  if not is_bitstruct_class( Type ):
+    return 0
+  depth = 0
+  for field_type in Type.__bitstruct_fields__.values():
+    while isinstance( field_type, list ):
+      field_type = field_type[0]
+    depth = max( depth, _get_type_depth( field_type ) )
+  return depth + 1
+
 class PrepareSimPass( BasePass ):
-  def __init__( self, print_line_trace=True, reset_active_high=True ):
+
+  # Turns a schedule (a list of functions) into a single function
+  gen_tick_function = staticmethod( SimpleTickPass.gen_tick_function )
+
+  def __init__( self, print_line_trace=True, reset_active_high=True, time_skip=False ):
     assert reset_active_high in [ True, False ]
 
     self.print_line_trace  = print_line_trace
     self.reset_active_high = reset_active_high
+    self.time_skip         = time_skip
 
   def __call__( self, top ):
     if hasattr(top, "sim_reset"):
@@ -57,33 +76,44 @@ class PrepareSimPass( BasePass ):
     self.create_sim_eval_comb( top )
     self.create_sim_tick( top )
     self.create_sim_reset( top )
+    self.create_sim_checkpoint( top )
+    self.create_sim_fast_forward( top )
 
 
   def create_sim_eval_comb( self, top ):
     # Pure RTL design, add eval_combinational
     if len( top.get_all_object_filter( lambda x: isinstance( x, MethodPort ) ) ) == 0 and \
        len( top.get_all_update_once() ) == 0:
-      sim_eval_combinational = SimpleTickPass.gen_tick_function( [top._sim.check_top_level_inports] + top._sched.update_schedule )
+      sim_eval_combinational = self.gen_tick_function( [top._sim.check_top_level_inports] + self.get_update_schedule( top ) )
     else:
       def sim_eval_combinational():
         raise NotImplementedError(f"top is not a pure RTL design. {'top'+repr(list(method_ports)[0])[1:]} is a method port.")
 
     top.sim_eval_combinational = sim_eval_combinational
 
+  @staticmethod
+  def get_update_schedule( top ):
+    # The net blocks whose signals all share one object don't need to
+    # be called. They are only in the schedule to convey the constraints.
+    empty_genblks = getattr( getattr( top, "_dag", None ), "empty_genblks", () )
+    return [ x for x in top._sched.update_schedule if x not in empty_genblks ]
+
   def create_sim_tick( self, top ):
     final_schedule = []
 
     # Pure RTL -- tick update blocks first
     if len( top.get_all_object_filter( lambda x: isinstance( x, MethodPort ) ) ) == 0 and \
        len( top.get_all_update_once() ) == 0:
-      final_schedule = top._sched.update_schedule[::]
+      final_schedule = self.get_update_schedule( top )
 
     if self.print_line_trace and hasattr( top, 'line_trace' ):
       final_schedule.append( top.print_line_trace )
+    if self.time_skip:
+      final_schedule.append( self.create_skip_idle_cycles( top ) )
     final_schedule += self.collect_ff_funcs( top )
-    final_schedule += top._sched.update_schedule
+    final_schedule += self.get_update_schedule( top )
     final_schedule.append( top._sim.check_top_level_inports )
-    top.sim_tick = SimpleTickPass.gen_tick_function( final_schedule )
+    top.sim_tick = self.gen_tick_function( final_schedule )
 
   def collect_ff_funcs( self, top ):
     # ff_funcs summarizes the execution at the clock edge
@@ -110,8 +140,8 @@ class PrepareSimPass( BasePass ):
 
   # Simulation related APIs
   def create_sim_reset( self, top ):
-    ff = SimpleTickPass.gen_tick_function( self.collect_ff_funcs( top ) )
-    up = SimpleTickPass.gen_tick_function( top._sched.update_schedule )
+    ff = self.gen_tick_function( self.collect_ff_funcs( top ) )
+    up = self.gen_tick_function( top._sched.update_schedule )
 
     print_line_trace = self.print_line_trace and hasattr( top, 'line_trace' )
     active_high      = self.reset_active_high
@@ -142,6 +172,53 @@ class PrepareSimPass( BasePass ):
 
     top.sim_reset = sim_reset
 
+  @staticmethod
+  def create_sim_checkpoint( top ):
+    def sim_save_checkpoint( filename ):
+      save_checkpoint( top, filename )
+
+    def sim_restore_checkpoint( filename ):
+      restore_checkpoint( top, filename )
+      # The activity tracked by the event-driven schedule is stale now
+      if hasattr( top._sched, "event_driven_invalidate" ):
+        top._sched.event_driven_invalidate()
+
+    top.sim_save_checkpoint    = sim_save_checkpoint
+    top.sim_restore_checkpoint = sim_restore_checkpoint
+
+  @staticmethod
+  def create_sim_fast_forward( top ):
+    hooks = get_time_skip_hooks( top )
+
+    # We don't generate waveforms for the skipped cycles
+    if top.has_metadata( VcdGenerationPass.vcd_func ) or \
+       top.has_metadata( PrintTextWavePass.textwave_func ) or \
+       top.has_metadata( VerilogTBGenPass.vtbgen_hooks ):
+      hooks = None
+
+    def sim_fast_forward( max_cycles=None ):
+      if hooks is None:
+        return 0
+      ncycles = fast_forward( hooks, max_cycles )
+      if ncycles:
+        top._sim.simulated_cycles += ncycles
+        # The skip methods may have changed signals behind its back
+        if hasattr( top._sched, "event_driven_invalidate" ):
+          top._sched.event_driven_invalidate()
+      return ncycles
+
+    top.sim_fast_forward = sim_fast_forward
+
+  def create_skip_idle_cycles( self, top ):
+    print_line_trace = self.print_line_trace and hasattr( top, 'line_trace' )
+
+    def skip_idle_cycles():
+      ncycles = top.sim_fast_forward()
+      if ncycles and print_line_trace:
+        print( f"{'':3}  ... skipped {ncycles} idle cycles" )
+
+    return skip_idle_cycles
+
   def create_print_line_trace( self, top ):
     if self.print_line_trace and hasattr( top, 'line_trace' ):
       def print_line_trace():
@@ -217,43 +294,55 @@ class PrepareSimPass( BasePass ):
       # Swap all Signal objects with actual data
       nets = top.get_all_value_nets()
 
-      # First step is to consolidate all non-slice signals in the same net
-      # by pointing them to the same object
-      # TODO optimize for bitstruct fields. Essentially only sliced signals
-      # should be excluded.
-      for writer, signals in nets:
-        residence = None
-
-        # Find the residence value
-        if isinstance( writer, Const ) or writer.is_top_level_signal():
-          residence = writer
+      # Then we consolidate all non-slice signals in the same net, i.e.
+      # top-level signals and bitstruct fields, by pointing them to the
+      # same object. A field is replaced inside the object of its parent,
+      # so we process the nets of wider struct types first to make sure
+      # that the parent object of a field won't be replaced afterwards.
+
+      def get_value( x ):
+        if x.is_top_level_signal():
+          return signal_object_mapping[ x ][-1]
+        value = getattr( get_value( x.get_parent_object() ), x._dsl._my_name )
+        for i in x._dsl._my_indices:
+          value = value[i]
+        return value
+
+      def set_value( x, value ):
+        if x.is_top_level_signal():
+          current_obj, i, is_list, _ = signal_object_mapping[ x ]
+          signal_object_mapping[ x ] = (current_obj, i, is_list, value)
+
+          if is_list:
+            current_obj[i] = value
+          else:
+            setattr( current_obj, i, value )
         else:
-          for x in signals:
-            if x.is_top_level_signal():
-              residence = x
-              break
-
-        if residence is None:
-          continue # whole net is slice
+          parent = get_value( x.get_parent_object() )
+          indices = x._dsl._my_indices
+          if not indices:
+            setattr( parent, x._dsl._my_name, value )
+          else:
+            current_obj = getattr( parent, x._dsl._my_name )
+            for i in indices[:-1]:
+              current_obj = current_obj[i]
+            current_obj[ indices[-1] ] = value
+
+      def get_net_depth( net ):
+        return _get_type_depth( net[0]._dsl.Type )
+
+      for writer, signals in sorted( nets, key=get_net_depth, reverse=True ):
+        residence, members = get_net_sharing( writer, signals )
+        if not members:
+          continue
 
         if isinstance( residence, Const ):
           residence_value = residence._dsl.const
         else:
-          residence_value = signal_object_mapping[ residence ][-1]
-
-        # Replace top-level signals in the net with residence value
-
-        for x in signals:
-          if x is not residence and x.is_top_level_signal():
-            # swap old value with new residence value
-
-            current_obj, i, is_list, value = signal_object_mapping[ x ]
-            signal_object_mapping[ x ] = (current_obj, i, is_list, residence_value)
+          residence_value = get_value( residence )
 
-            if is_list:
-              current_obj[i] = residence_value
-            else:
-              setattr( current_obj, i, residence_value )
+        for x in members:
+          set_value( x, residence_value )
 
       top._sim.signal_object_mapping = signal_object_mapping
       top._sim.locked_simulation = True
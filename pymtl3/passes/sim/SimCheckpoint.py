@@ -0,0 +1,194 @@
+"""
+========================================================================
+SimCheckpoint.py
+========================================================================
+Save the full state of a simulator to a compact binary file and restore
+it into a freshly elaborated instance of the same design. PrepareSimPass
+exposes these as top.sim_save_checkpoint( filename ) and
+top.sim_restore_checkpoint( filename ).
+
+A checkpoint contains
+- the value of every signal, i.e. every Bits leaf of the locked-in
+  signal objects, and the pending value of <<= writes that haven't been
+  flipped yet,
+- the public python attributes of every component (e.g. counters, CL
+  queues, source/sink messages), and
+- the simulated cycle count.
+
+The python attributes are pickled together, so sharing between them is
+preserved. Components, interfaces, method ports and signals referenced
+by python state are saved by name and resolved in the new instance.
+Functions (including lambdas and bound methods) are part of the design,
+not its state, and are skipped. Private attributes (starting with _)
+are not saved.
+
+Date   : Oct 16, 2026
+"""
+import hashlib
+import io
+import pickle
+import types
+import zlib
+
+from pymtl3.datatypes import Bits, is_bitstruct_inst
+from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.passes.errors import CheckpointError
+
+_MAGIC   = b"PYMTLCKPT"
+_VERSION = 1
+
+_code_types = ( types.FunctionType, types.MethodType, types.BuiltinFunctionType,
+                types.ModuleType, type )
+
+def _get_leaves( value, leaves ):
+  if isinstance( value, Bits ):
+    leaves.append( value )
+  elif isinstance( value, list ):
+    for x in value:
+      _get_leaves( x, leaves )
+  else:
+    for name in value.__bitstruct_fields__:
+      _get_leaves( getattr( value, name ), leaves )
+
+def _collect_values( top ):
+  """ Return the list of distinct signal objects in a deterministic order
+  and the signature of the design. """
+  seen   = set()
+  values = []
+  names  = []
+  for signal, x in sorted( top._sim.signal_object_mapping.items(),
+                           key=lambda x: repr(x[0]) ):
+    value = x[-1]
+    # Nets driven by constants may be locked in as python ints
+    if id(value) in seen or not ( isinstance( value, Bits ) or is_bitstruct_inst( value ) ):
+      continue
+    seen.add( id(value) )
+    values.append( value )
+    names.append( f"{signal!r}:{value.__class__.__name__}" )
+
+  signature = hashlib.sha1( "\n".join( names ).encode() ).hexdigest()
+  return values, signature
+
+def _is_structure( obj, value_ids ):
+  if isinstance( obj, NamedObject ) or id(obj) in value_ids:
+    return True
+  if isinstance( obj, list ) and obj:
+    return all( _is_structure( x, value_ids ) for x in obj )
+  return False
+
+def _collect_py_state( top, value_ids ):
+  ret = {}
+  for c in sorted( top._dsl.all_components, key=lambda x: x._dsl.full_name ):
+    state = {}
+    for name, obj in c.__dict__.items():
+      if name[0] == '_' or isinstance( obj, _code_types ) or _is_structure( obj, value_ids ):
+        continue
+      state[ name ] = obj
+    if state:
+      ret[ c._dsl.full_name ] = state
+  return ret
+
+class _Pickler( pickle.Pickler ):
+
+  def __init__( s, f, value_ids ):
+    super().__init__( f, protocol=pickle.HIGHEST_PROTOCOL )
+    s.value_ids = value_ids
+
+  def persistent_id( s, obj ):
+    if isinstance( obj, NamedObject ):
+      return ( "obj", obj._dsl.full_name )
+    i = s.value_ids.get( id(obj) )
+    if i is not None:
+      return ( "value", i )
+    return None
+
+class _Unpickler( pickle.Unpickler ):
+
+  def __init__( s, f, named_objects, values ):
+    super().__init__( f )
+    s.named_objects = named_objects
+    s.values = values
+
+  def persistent_load( s, pid ):
+    kind, key = pid
+    if kind == "obj":
+      return s.named_objects[ key ]
+    return s.values[ key ]
+
+def save_checkpoint( top, filename ):
+  values, signature = _collect_values( top )
+  value_ids = { id(x): i for i, x in enumerate( values ) }
+
+  leaves = []
+  for x in values:
+    _get_leaves( x, leaves )
+
+  uints = [ int(x) for x in leaves ]
+  # Only save the pending <<= writes
+  nexts = {}
+  for i, x in enumerate( leaves ):
+    nxt = getattr( x, "_next", None )
+    if nxt is not None and nxt != uints[i]:
+      nexts[i] = int(nxt)
+
+  # Pickle the python state separately so that the signature can be
+  # checked before resolving any names
+  py_state = _collect_py_state( top, value_ids )
+  f = io.BytesIO()
+  try:
+    _Pickler( f, value_ids ).dump( py_state )
+  except Exception as e:
+    # Find the culprit to give a useful message
+    for cname, state in py_state.items():
+      for name, obj in state.items():
+        try:
+          _Pickler( io.BytesIO(), value_ids ).dump( obj )
+        except Exception as e2:
+          raise CheckpointError( filename, f"cannot save {cname}.{name}: {e2}" )
+    raise CheckpointError( filename, str(e) )
+
+  payload = {
+    "top"      : top.__class__.__name__,
+    "signature": signature,
+    "cycles"   : top._sim.simulated_cycles,
+    "uints"    : uints,
+    "nexts"    : nexts,
+    "py_state" : f.getvalue(),
+  }
+
+  with open( filename, "wb" ) as out:
+    out.write( _MAGIC + bytes([ _VERSION ]) )
+    out.write( zlib.compress( pickle.dumps( payload, protocol=pickle.HIGHEST_PROTOCOL ) ) )
+
+def restore_checkpoint( top, filename ):
+  with open( filename, "rb" ) as f:
+    data = f.read()
+
+  n = len(_MAGIC)
+  if data[:n] != _MAGIC or data[n:n+1] != bytes([ _VERSION ]):
+    raise CheckpointError( filename, "not a checkpoint of this PyMTL version" )
+  payload = pickle.loads( zlib.decompress( data[n+1:] ) )
+
+  values, signature = _collect_values( top )
+  if payload["top"] != top.__class__.__name__ or payload["signature"] != signature:
+    raise CheckpointError( filename, f"it was saved from a different design than {top.__class__.__name__}" )
+
+  named_objects = { x._dsl.full_name: x for x in top._dsl.all_named_objects }
+  py_state = _Unpickler( io.BytesIO( payload["py_state"] ), named_objects, values ).load()
+
+  leaves = []
+  for x in values:
+    _get_leaves( x, leaves )
+
+  nexts = payload["nexts"]
+  for i, ( x, v ) in enumerate( zip( leaves, payload["uints"] ) ):
+    x @= v
+    if hasattr( x, "_next" ):
+      x <<= nexts.get( i, v )
+
+  for cname, state in py_state.items():
+    c = named_objects[ cname ]
+    for name, obj in state.items():
+      setattr( c, name, obj )
+
+  top._sim.simulated_cycles = payload["cycles"]
@@ -16,6 +16,8 @@ from pymtl3.extra.pypy import custom_exec
 from pymtl3.passes.BasePass import BasePass, PassMetadata
 from pymtl3.passes.errors import PassOrderError
 
+from .BlockGraph import get_block_graph
+
 
 class SimpleSchedulePass( BasePass ):
   def __call__( self, top ):
@@ -33,40 +35,33 @@ class SimpleSchedulePass( BasePass ):
     if not hasattr( top, "_sched" ):
       raise Exception( "Please create top._sched pass metadata namespace first!" )
 
-    # Construct the intra-cycle graph based on normal update blocks
-
-    V   = top._dag.final_upblks - top.get_all_update_ff()
-    E   = set()
-    Es  = { v: [] for v in V }
-    InD = { v: 0  for v in V }
+    # The intra-cycle graph based on normal update blocks
 
-    for (u, v) in top._dag.all_constraints: # u -> v
-      if u in V and v in V:
-        InD[v] += 1
-        Es[u].append( v )
-        E.add( (u, v) )
+    graph = get_block_graph( top )
 
     import os
     if 'MAMBA_DAG' in os.environ:
-      dump_dag( top, V, E )
+      dump_dag( top, graph.blocks, graph.edges() )
 
     # Perform topological sort for a serial schedule.
 
     top._sched.update_schedule = update_schedule = []
 
-    Q = [ v for v in V if not InD[v] ]
+    blocks = graph.blocks
+    InD    = graph.in_degrees()
+    Q      = [ i for i in range(len(blocks)) if not InD[i] ]
 
     import random
     while Q:
       random.shuffle(Q)
       u = Q.pop()
-      update_schedule.append( u )
-      for v in Es[u]:
+      update_schedule.append( blocks[u] )
+      for v in graph.successors( u ):
         InD[v] -= 1
         if not InD[v]:
           Q.append( v )
 
-    check_schedule( top, update_schedule, V, E, InD )
+    check_schedule( top, update_schedule, graph, InD )
 
   def schedule_ff( self, top ):
 
@@ -187,13 +182,13 @@ def dump_dag( top, V, E ):
     dot.edge( x_name+"\\n@"+x_host, y_name+"\\n@"+y_host )
   dot.render( "/tmp/upblk-dag.gv", view=True )
 
-def check_schedule( top, schedule, V, E, in_degree ):
+def check_schedule( top, schedule, graph, in_degree ):
 
-  if len(schedule) != len(V):
-    V_leftovers = {  v for v in V if in_degree[v]  }
-    E_leftovers = {  (x,y) for (x,y) in E
-                         if x in V_leftovers and y in V_leftovers  }
-    dump_dag( top, V_leftovers, E_leftovers )
+  if len(schedule) != len(graph):
+    V_leftovers = { i for i in range(len(graph)) if in_degree[i] }
+    E_leftovers = { (graph.blocks[i], graph.blocks[j]) for i in V_leftovers
+                    for j in graph.successors( i ) if j in V_leftovers }
+    dump_dag( top, [ graph.blocks[i] for i in V_leftovers ], E_leftovers )
 
     raise UpblkCyclicError( """
 Update blocks have cyclic dependencies.
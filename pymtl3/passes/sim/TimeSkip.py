@@ -0,0 +1,71 @@
+"""
+========================================================================
+TimeSkip.py
+========================================================================
+Skip the cycles in which a design provably does nothing but advance
+internal counters, e.g. while a request sits in a long memory latency
+pipe. PrepareSimPass exposes this as top.sim_fast_forward( max_cycles ),
+and PrepareSimPass( time_skip=True ) calls it in every sim_tick right
+before the clock edge.
+
+Components opt in by implementing two methods:
+
+- sim_idle_cycles( s ) returns the number of upcoming cycles in which
+  the update blocks of the component neither call a method with side
+  effects (note that the rdy method of StallCL draws a random number),
+  nor write a signal, nor change what its own methods return to other
+  components. It returns 0 if the component will do
+  something in the next cycle, and None if it stays idle until another
+  component does something.
+
+- sim_skip_cycles( s, ncycles ) updates the internal state (e.g.
+  counters) as if ncycles of these idle cycles had been simulated.
+
+We can only skip if every component that has update blocks implements
+both methods. The number of skipped cycles is the minimum over all
+components, so every skipped cycle is idle for the whole design.
+
+The top-level inputs must not change while cycles are skipped, and
+waveforms are not generated for skipped cycles, so we never skip when
+VCD or text waveforms are enabled.
+
+Date   : Oct 17, 2026
+"""
+
+
+def get_time_skip_hooks( top ):
+  """ Return the ( sim_idle_cycles, sim_skip_cycles ) pairs of every
+  component with update blocks, or None if one of them doesn't implement
+  both methods. """
+  hooks = []
+  for c in sorted( top.get_all_components(), key=repr ):
+    if not c.get_update_blocks():
+      continue
+    idle = getattr( c, "sim_idle_cycles", None )
+    skip = getattr( c, "sim_skip_cycles", None )
+    if idle is None or skip is None:
+      return None
+    hooks.append( ( idle, skip ) )
+  return hooks
+
+def fast_forward( hooks, max_cycles=None ):
+  """ Skip the cycles in which all components are idle, but at most
+  max_cycles of them. If max_cycles is None, we only skip as many cycles
+  as some component is sure about. Return the number of skipped
+  cycles. """
+  ncycles = max_cycles
+  for idle, _ in hooks:
+    n = idle()
+    if n is None:
+      continue
+    if n <= 0:
+      return 0
+    if ncycles is None or n < ncycles:
+      ncycles = n
+
+  if not ncycles:
+    return 0
+
+  for _, skip in hooks:
+    skip( ncycles )
+  return ncycles
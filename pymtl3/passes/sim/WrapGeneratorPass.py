@@ -0,0 +1,368 @@
+"""
+========================================================================
+WrapGeneratorPass.py
+========================================================================
+Turn update blocks that call blocking methods into generators instead of
+wrapping them with greenlets.
+
+A blocking method waits for the next cycle by switching back to the
+parent greenlet:
+
+  while s.entry is None:
+    greenlet.getcurrent().parent.switch(0)
+
+Switching greenlets on every call is expensive, and PyPy cannot trace
+across the switches. This pass rewrites the AST of every such update
+block, and of the blocking methods it calls, into a generator function.
+The greenlet switch becomes a bare yield and a call to a blocking method
+becomes "yield from" its generator version. The block is then replaced
+by a ticker that resumes the generator once per call, which is what the
+greenlet ticker of WrapGreenletPass does.
+
+A call whose target cannot be resolved when the pass runs, e.g.
+s.ifc[i].read() where i is a local variable, is dispatched at runtime.
+A block is wrapped with a greenlet as before if it cannot be rewritten,
+e.g. if a blocking or unknown call is inside a lambda or comprehension,
+or the source of a blocking method it calls is not available.
+
+Date   : Oct 17, 2026
+"""
+import ast
+import builtins
+import copy
+import inspect
+import textwrap
+import types
+
+from pymtl3.dsl.Connectable import CalleeIfcFL, CallerIfcFL, MethodPort
+from pymtl3.dsl.NamedObject import NamedObject
+from pymtl3.extra.pypy import custom_exec
+
+from .WrapGreenletPass import WrapGreenletPass
+
+
+class _CannotConvert( Exception ):
+  pass
+
+def _is_greenlet_switch( node ):
+  """ Match greenlet.getcurrent().parent.switch(...) """
+  f = node.func
+  if not ( isinstance( f, ast.Attribute ) and f.attr == "switch" ):
+    return False
+  f = f.value
+  if not ( isinstance( f, ast.Attribute ) and f.attr == "parent" and
+           isinstance( f.value, ast.Call ) ):
+    return False
+  f = f.value.func
+  return ( isinstance( f, ast.Attribute ) and f.attr == "getcurrent" ) or \
+         ( isinstance( f, ast.Name ) and f.id == "getcurrent" )
+
+class _GeneratorTransformer( ast.NodeTransformer ):
+  """ Rewrite the body of func into the body of a generator function. """
+
+  def __init__( s, conv, func, self_name=None, self_obj=None ):
+    s.conv   = conv
+    s.func   = func
+    s.locals = set( func.__code__.co_varnames )
+
+    s.env = {}
+    for name, cell in zip( func.__code__.co_freevars, func.__closure__ or () ):
+      try:
+        s.env[ name ] = cell.cell_contents
+      except ValueError: # empty cell
+        raise _CannotConvert( f"free variable {name} of {func.__qualname__} is not bound" )
+
+    if self_name is not None:
+      s.locals.discard( self_name )
+      s.env[ self_name ] = self_obj
+
+    s.gens   = {} # name -> generator function called by the body
+    s.depth  = 0  # number of enclosing nested scopes
+    s.yields = False
+
+  def resolve( s, node ):
+    """ Return the object that the expression refers to, or raise an
+    exception if it depends on local variables. """
+    if isinstance( node, ast.Name ):
+      name = node.id
+      if name in s.env:
+        return s.env[ name ]
+      if name in s.locals:
+        raise KeyError( name )
+      try:
+        return s.func.__globals__[ name ]
+      except KeyError:
+        return getattr( builtins, name )
+
+    if isinstance( node, ast.Attribute ):
+      return getattr( s.resolve( node.value ), node.attr )
+    if isinstance( node, ast.Subscript ):
+      return s.resolve( node.value )[ s.resolve( node.slice ) ]
+    if isinstance( node, ast.Constant ):
+      return node.value
+    raise KeyError( type(node).__name__ )
+
+  def yield_from( s, name, args, node ):
+    s.yields = True
+    return ast.copy_location( ast.YieldFrom(
+      value=ast.Call( func=ast.Name( id=name, ctx=ast.Load() ),
+                      args=args, keywords=node.keywords ) ), node )
+
+  def visit_nested_scope( s, node ):
+    s.depth += 1
+    node = s.generic_visit( node )
+    s.depth -= 1
+    return node
+
+  visit_FunctionDef      = visit_nested_scope
+  visit_AsyncFunctionDef = visit_nested_scope
+  visit_Lambda           = visit_nested_scope
+  visit_ClassDef         = visit_nested_scope
+  visit_ListComp         = visit_nested_scope
+  visit_SetComp          = visit_nested_scope
+  visit_DictComp         = visit_nested_scope
+  visit_GeneratorExp     = visit_nested_scope
+
+  def visit_Call( s, node ):
+    node = s.generic_visit( node )
+
+    if _is_greenlet_switch( node ):
+      if s.depth:
+        raise _CannotConvert( f"greenlet switch in a nested scope of {s.func.__qualname__}" )
+      s.yields = True
+      return ast.copy_location( ast.Yield( value=None ), node )
+
+    try:
+      obj = s.resolve( node.func )
+    except Exception:
+      if s.depth:
+        raise _CannotConvert( f"unknown call in a nested scope of {s.func.__qualname__}" )
+      return s.yield_from( "_dynamic_call", [ node.func ] + node.args, node )
+
+    gen = s.conv.get_generator( obj )
+    if gen is None:
+      return node
+    if s.depth:
+      raise _CannotConvert( f"blocking call in a nested scope of {s.func.__qualname__}" )
+
+    name = f"_blocking{len(s.gens)}"
+    s.gens[ name ] = gen
+    return s.yield_from( name, node.args, node )
+
+def _record_calls( port, gen ):
+  """ Record the finished calls to the generator version of the method of
+  port for CLLineTracePass, which runs after this pass and wraps the
+  method itself. """
+  def traced_gen( *args, **kwargs ):
+    ret = yield from gen( *args, **kwargs )
+    record_call = getattr( port, "record_call", None )
+    if record_call is not None:
+      record_call( args, kwargs, ret )
+    return ret
+  return traced_gen
+
+def _make_cell( value ):
+  return ( lambda: value ).__closure__[0]
+
+class _Converter:
+  """ Create and cache the generator versions of update blocks and of
+  the blocking methods they call. """
+
+  def __init__( s, blocking_ports ):
+    s.blocking_ports = blocking_ports # id(port) -> the callee port of its net
+    s.gens       = {}
+    s.converting = set()
+
+  def get_generator( s, obj ):
+    """ Return the generator function to call instead of obj, or None if
+    calling obj never blocks. """
+
+    if isinstance( obj, ( CalleeIfcFL, CallerIfcFL ) ):
+      obj = obj.method
+
+    callee = None
+    if isinstance( obj, MethodPort ):
+      callee = s.blocking_ports.get( id(obj) )
+      if callee is None:
+        return None
+      func, must = callee.method, True
+
+    elif isinstance( obj, ( types.FunctionType, types.MethodType ) ):
+      # A plain function that switches greenlets has to be converted.
+      # A method of a component may call blocking methods of its ports.
+      func = obj
+      must = "getcurrent" in obj.__code__.co_names
+      if not must and not isinstance( getattr( obj, "__self__", None ), NamedObject ):
+        return None
+    else:
+      return None
+
+    key = ( getattr( func, "__func__", func ), id( getattr( func, "__self__", None ) ) )
+    try:
+      return s.gens[ key ]
+    except KeyError:
+      pass
+
+    if key in s.converting:
+      raise _CannotConvert( f"{func.__qualname__} is called recursively" )
+
+    s.converting.add( key )
+    try:
+      gen = s.convert_function( func )
+    except _CannotConvert:
+      if must:
+        raise
+      gen = None
+    finally:
+      s.converting.discard( key )
+
+    if gen is not None and callee is not None:
+      gen = _record_calls( callee, gen )
+
+    s.gens[ key ] = gen
+    return gen
+
+  def dynamic_call( s, f, *args, **kwargs ):
+    try:
+      gen = s.get_generator( f )
+    except _CannotConvert:
+      gen = None
+    if gen is None:
+      return f( *args, **kwargs )
+    return ( yield from gen( *args, **kwargs ) )
+
+  def convert_function( s, func ):
+    if not isinstance( func, ( types.FunctionType, types.MethodType ) ):
+      raise _CannotConvert( f"{func} is not a Python function" )
+
+    code_func = getattr( func, "__func__", func )
+    self_obj  = getattr( func, "__self__", None )
+
+    try:
+      lines, lineno = inspect.getsourcelines( code_func )
+      filename = inspect.getsourcefile( code_func )
+      tree = ast.parse( textwrap.dedent( "".join( lines ) ) )
+    except ( OSError, TypeError, SyntaxError ):
+      raise _CannotConvert( f"cannot parse the source of {code_func.__qualname__}" )
+
+    funcdef = tree.body[0]
+    if not isinstance( funcdef, ast.FunctionDef ) or funcdef.name != code_func.__name__:
+      raise _CannotConvert( f"cannot find the definition of {code_func.__qualname__}" )
+    ast.increment_lineno( funcdef, lineno - 1 )
+
+    self_name = None
+    if self_obj is not None:
+      if not funcdef.args.args:
+        raise _CannotConvert( f"{code_func.__qualname__} has no self argument" )
+      self_name = funcdef.args.args[0].arg
+
+    gen_func = s.compile( code_func, funcdef, filename, self_name, self_obj )
+    if gen_func is None or self_obj is None:
+      return gen_func
+    return types.MethodType( gen_func, self_obj )
+
+  def convert_block( s, host, blk ):
+    info = host.get_update_block_info( blk )
+    if info is None or info[0]:
+      raise _CannotConvert( f"{blk.__name__} is not a regular update block" )
+
+    _, _, lineno, filename, tree = info
+    funcdef = copy.deepcopy( tree.body[0] )
+    ast.increment_lineno( funcdef, lineno - 1 )
+    return s.compile( blk, funcdef, filename )
+
+  def compile( s, func, funcdef, filename, self_name=None, self_obj=None ):
+    """ Return the generator version of func, or None if it never yields.
+    The function is compiled inside a factory whose arguments are the
+    free variables of func and the generators called by it:
+
+      def _factory( s, ..., _blocking0, ..., _dynamic_call ):
+        def func( ... ):
+          ...
+        return func
+
+    The generator version is then created from the code of the inner
+    function with the cells of func, so that it sees the free variables
+    that other blocks rebind with nonlocal. """
+
+    t = _GeneratorTransformer( s, func, self_name, self_obj )
+    funcdef.body = [ t.visit( x ) for x in funcdef.body ]
+    if not t.yields:
+      return None
+
+    funcdef.decorator_list = []
+
+    freevars = func.__code__.co_freevars
+    args     = [ *freevars, *t.gens, "_dynamic_call" ]
+    factory  = ast.FunctionDef(
+      name="_factory",
+      args=ast.arguments( posonlyargs=[], args=[ ast.arg( arg=x ) for x in args ],
+                          vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[] ),
+      body=[ funcdef, ast.Return( value=ast.Name( id=funcdef.name, ctx=ast.Load() ) ) ],
+      decorator_list=[], returns=None,
+    )
+    module = ast.Module( body=[ factory ], type_ignores=[] )
+    ast.copy_location( factory, funcdef )
+    ast.fix_missing_locations( module )
+
+    _locals = {}
+    custom_exec( compile( module, filename, "exec" ), func.__globals__, _locals )
+
+    code = next( x for x in _locals["_factory"].__code__.co_consts
+                 if isinstance( x, types.CodeType ) and x.co_name == funcdef.name )
+
+    cells = dict( zip( freevars, func.__closure__ or () ) )
+    extra = dict( t.gens, _dynamic_call=s.dynamic_call )
+    closure = tuple( cells[x] if x in cells else _make_cell( extra[x] )
+                     for x in code.co_freevars )
+
+    gen_func = types.FunctionType( code, func.__globals__, func.__name__,
+                                   func.__defaults__, closure )
+    gen_func.__kwdefaults__ = func.__kwdefaults__
+    return gen_func
+
+class WrapGeneratorPass( WrapGreenletPass ):
+
+  def wrap_greenlet( self, top ):
+    blocking_ifcs = top.get_all_object_filter( lambda x: isinstance( x, (CalleeIfcFL, CallerIfcFL) ) )
+    blocking_ports = { id(x.method): x.method for x in blocking_ifcs }
+
+    # A caller port runs the method of the callee port that drives its net
+    for driver, net in top.get_all_method_nets():
+      if driver is not None:
+        for x in net:
+          if id(x) in blocking_ports:
+            blocking_ports[ id(x) ] = driver
+
+    self.converter = _Converter( blocking_ports )
+
+    top._dag.generator_upblks = set()
+    super().wrap_greenlet( top )
+
+  def wrap_blk( self, top, blk ):
+    host = top.get_update_block_host_component( blk )
+    try:
+      gen_blk = self.converter.convert_block( host, blk )
+    except _CannotConvert:
+      return super().wrap_blk( top, blk )
+
+    # None of the calls blocks
+    if gen_blk is None:
+      return blk
+
+    top._dag.generator_upblks.add( blk )
+
+    # Each call resumes the generator until the next blocking point. When
+    # the block finishes, the next call starts it again.
+    step = gen_blk().__next__
+
+    def generator_ticker():
+      nonlocal step
+      try:
+        step()
+      except StopIteration:
+        step = gen_blk().__next__
+
+    generator_ticker.__name__ = blk.__name__
+
+    return generator_ticker
@@ -22,6 +22,25 @@ class WrapGreenletPass( BasePass ):
 
     self.wrap_greenlet( top )
 
+  def wrap_blk( self, top, blk ):
+    """ Return the block that replaces blk, which calls blocking methods,
+    in the schedule. """
+
+    def greenlet_wrapper():
+      while True:
+        blk()
+        greenlet.getcurrent().parent.switch()
+
+    gl = greenlet( greenlet_wrapper )
+
+    def greenlet_ticker():
+      gl.switch()
+
+    # greenlet_ticker.greenlet = gl
+    greenlet_ticker.__name__ = blk.__name__
+
+    return greenlet_ticker
+
   def wrap_greenlet( self, top ):
 
     all_upblks      = top._dag.final_upblks
@@ -33,28 +52,11 @@ class WrapGreenletPass( BasePass ):
     if not greenlet_upblks:
       return
 
-    def wrap_greenlet( blk ):
-
-      def greenlet_wrapper():
-        while True:
-          blk()
-          greenlet.getcurrent().parent.switch()
-
-      gl = greenlet( greenlet_wrapper )
-
-      def greenlet_ticker():
-        gl.switch()
-
-      # greenlet_ticker.greenlet = gl
-      greenlet_ticker.__name__ = blk.__name__
-
-      return greenlet_ticker
-
     new_upblks  = set()
 
     for blk in all_upblks:
       if blk in greenlet_upblks:
-        wrapped = wrap_greenlet( blk )
+        wrapped = self.wrap_blk( top, blk )
         blk_greenlet_mapping[ blk ] = wrapped
         new_upblks.add( wrapped )
       else:
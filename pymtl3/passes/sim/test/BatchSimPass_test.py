@@ -0,0 +1,202 @@
+#=========================================================================
+# BatchSimPass_test.py
+#=========================================================================
+#
+# Date   : Oct 16, 2026
+
+import random
+
+import pytest
+
+from pymtl3 import *
+from pymtl3.passes.errors import ModelTypeError
+from pymtl3.passes.PassGroups import BatchPassGroup, DefaultPassGroup
+from pymtl3.passes.rtlir.errors import PyMTLSyntaxError
+
+np = pytest.importorskip("numpy")
+
+@bitstruct
+class Pair:
+  hi: Bits8
+  lo: Bits8
+
+class Datapath( Component ):
+
+  def construct( s ):
+    s.in_  = InPort( Bits16 )
+    s.sel  = InPort( Bits2 )
+    s.out  = OutPort( Bits16 )
+    s.out2 = OutPort( Bits32 )
+    s.acc  = OutPort( Bits32 )
+
+    s.pair = Wire( Pair )
+    s.regs = [ Wire( Bits16 ) for _ in range(4) ]
+    s.cnt  = Wire( Bits2 )
+    s.tmp  = Wire( Bits8 )
+
+    s.pair.hi //= s.in_[8:16]
+    s.pair.lo //= s.in_[0:8]
+    s.tmp[0:4] //= 5
+    s.tmp[4:8] //= s.in_[4:8]
+
+    @update
+    def up_out():
+      x = s.regs[s.sel]
+      if s.pair.hi > s.pair.lo:
+        s.out @= x + zext( s.pair.hi, 16 )
+      elif s.in_[3]:
+        s.out @= ~x
+      else:
+        s.out @= concat( s.pair.lo, s.tmp ) ^ sext( s.pair.lo, 16 )
+
+    @update
+    def up_out2():
+      s.out2 @= 0
+      for i in range(4):
+        if s.regs[i][0]:
+          s.out2[i*8:i*8+8] @= s.regs[i][0:8]
+      s.out2[31] @= reduce_xor( s.in_ )
+
+    @update_ff
+    def up_regs():
+      if s.reset:
+        s.cnt <<= 0
+        for i in range(4):
+          s.regs[i] <<= 0
+      else:
+        s.cnt <<= s.cnt + 1
+        s.regs[s.cnt] <<= s.in_ * 3 if s.sel == 2 else s.in_ >> zext( s.sel, 16 )
+
+    @update_ff
+    def up_acc():
+      if s.reset:
+        s.acc <<= 0
+      else:
+        s.acc <<= s.acc + zext( s.out, 32 ) - ( zext( s.in_, 32 ) << 1 )
+
+class Wrapper( Component ):
+
+  def construct( s ):
+    s.in_  = InPort( Bits16 )
+    s.sel  = InPort( Bits2 )
+    s.out  = OutPort( Bits16 )
+    s.out2 = OutPort( Bits32 )
+    s.acc  = OutPort( Bits32 )
+
+    s.dp = Datapath()
+    s.dp.in_ //= s.in_
+    s.dp.sel //= s.sel
+    s.dp.out2 //= s.out2
+    s.dp.acc //= s.acc
+
+    @update
+    def up_out():
+      s.out @= s.dp.out if s.sel[0] else s.dp.out2[0:16]
+
+def _stimulus( nlanes, ncycles ):
+  rng = random.Random(0xbeef)
+  return [ [ ( rng.randrange(1 << 16), rng.randrange(4) ) for _ in range(nlanes) ]
+           for _ in range(ncycles) ]
+
+def _run_ref( cls, stimulus, nlanes ):
+  ret = []
+  for lane in range(nlanes):
+    top = cls()
+    top.apply( DefaultPassGroup() )
+    top.sim_reset()
+    trace = []
+    for cycle in stimulus:
+      top.in_ @= cycle[lane][0]
+      top.sel @= cycle[lane][1]
+      top.sim_eval_combinational()
+      trace.append( ( int(top.out), int(top.out2), int(top.acc) ) )
+      top.sim_tick()
+    ret.append( trace )
+  return ret
+
+def _run_batch( cls, stimulus, nlanes ):
+  top = cls()
+  top.apply( BatchPassGroup( nlanes=nlanes ) )
+  top.sim_reset()
+  ret = [ [] for _ in range(nlanes) ]
+  for cycle in stimulus:
+    top.sim_set( top.in_, [ x[0] for x in cycle ] )
+    top.sim_set( top.sel, [ x[1] for x in cycle ] )
+    top.sim_eval_combinational()
+    outs = [ top.sim_get( x ) for x in ( top.out, top.out2, top.acc ) ]
+    for lane in range(nlanes):
+      ret[lane].append( tuple( int(x[lane]) for x in outs ) )
+    top.sim_tick()
+  return ret
+
+@pytest.mark.parametrize( "cls", [ Datapath, Wrapper ] )
+def test_batch_matches_scalar_sim( cls ):
+  nlanes = 16
+  stimulus = _stimulus( nlanes, 40 )
+  assert _run_batch( cls, stimulus, nlanes ) == _run_ref( cls, stimulus, nlanes )
+
+def test_sim_get_set_fields():
+  top = Datapath()
+  top.apply( BatchPassGroup( nlanes=4 ) )
+  top.sim_reset()
+  top.sim_set( top.in_, [ 0x1234, 0xabcd, 0, 0xffff ] )
+  top.sim_eval_combinational()
+  assert list( top.sim_get( top.pair.hi ) ) == [ 0x12, 0xab, 0, 0xff ]
+  assert list( top.sim_get( top.pair ) ) == [ 0x1234, 0xabcd, 0, 0xffff ]
+  assert list( top.sim_get( top.tmp ) ) == [ 0x35, 0xc5, 0x05, 0xf5 ]
+  assert top.sim_cycle_count() == 3
+
+def test_unsupported_designs():
+
+  class A( Component ):
+    def construct( s ):
+      s.out = OutPort( Bits8 )
+      s.count = 0
+      @update
+      def up():
+        s.count += 1
+        s.out @= s.count
+
+  # Update blocks have to be translatable
+  with pytest.raises( PyMTLSyntaxError ):
+    A().apply( BatchPassGroup( nlanes=4 ) )
+
+  class B( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits128 )
+      s.out = OutPort( Bits128 )
+      s.out //= s.in_
+
+  with pytest.raises( ModelTypeError ) as e:
+    B().apply( BatchPassGroup( nlanes=4 ) )
+  assert "at most 64 bits wide" in str(e.value)
+
+def test_combinational_loop():
+
+  class Loop( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.out = OutPort( Bits8 )
+      s.a = Wire( Bits8 )
+      s.b = Wire( Bits8 )
+
+      @update
+      def up_a():
+        s.a @= s.in_ | ( s.b & 0x0f )
+
+      @update
+      def up_b():
+        s.b @= s.a >> 1
+
+      s.out //= s.b
+
+  top = Loop()
+  top.apply( BatchPassGroup( nlanes=256 ) )
+  top.sim_set( top.in_, np.arange( 256 ) )
+  top.sim_eval_combinational()
+
+  for x in range(256):
+    a = x
+    while ( x | ( ( a >> 1 ) & 0x0f ) ) != a:
+      a = x | ( ( a >> 1 ) & 0x0f )
+    assert top.sim_get( top.out )[x] == a >> 1
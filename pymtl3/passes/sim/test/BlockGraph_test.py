@@ -0,0 +1,100 @@
+#=========================================================================
+# BlockGraph_test.py
+#=========================================================================
+#
+# Date   : Oct 17, 2026
+
+import random
+
+from pymtl3.datatypes import Bits8
+from pymtl3.dsl import *
+
+from ..BlockGraph import BlockGraph, get_block_graph
+from ..GenDAGPass import GenDAGPass
+
+
+def _reachable( succ, u ):
+  visited = { u }
+  stack   = [ u ]
+  while stack:
+    for v in succ[ stack.pop() ]:
+      if v not in visited:
+        visited.add( v )
+        stack.append( v )
+  return visited
+
+def test_csr_adjacency():
+  g = BlockGraph( "abcd", [ ("a", "b"), ("a", "c"), ("c", "b"), ("a", "b"), ("x", "a") ] )
+
+  assert g.num_edges == 3
+  a, b, c, d = ( g.ids[x] for x in "abcd" )
+  assert sorted( g.successors( a ) ) == [ b, c ]
+  assert sorted( g.predecessors( b ) ) == [ a, c ]
+  assert g.in_degrees() == [ 0, 2, 1, 0 ]
+  assert sorted( g.edges() ) == [ ("a", "b"), ("a", "c"), ("c", "b") ]
+
+def test_sccs_random():
+  rng = random.Random( 0xdead )
+  for _ in range(50):
+    n = rng.randint( 1, 40 )
+    edges = { ( rng.randrange(n), rng.randrange(n) ) for _ in range( rng.randint( 0, 3*n ) ) }
+    g = BlockGraph( range(n), edges )
+    sccs, scc_of = g.get_sccs()
+
+    succ = [ [] for _ in range(n) ]
+    for u, v in edges:
+      succ[u].append( v )
+    reach = [ _reachable( succ, u ) for u in range(n) ]
+
+    assert sorted( x for scc in sccs for x in scc ) == list(range(n))
+    for u in range(n):
+      assert sorted( sccs[ scc_of[u] ] ) == sorted( v for v in reach[u] if u in reach[v] )
+
+    # Components are in topological order
+    for u, v in edges:
+      assert scc_of[u] <= scc_of[v]
+
+    dag = g.condense( sccs, scc_of )
+    assert set( dag.edges() ) == { ( scc_of[u], scc_of[v] ) for u, v in edges
+                                   if scc_of[u] != scc_of[v] }
+
+def test_sccs_long_chain():
+  n = 20000
+  edges = [ (i, i+1) for i in range(n-1) ]
+  sccs, _ = BlockGraph( range(n), edges ).get_sccs()
+  assert sccs == [ [i] for i in range(n) ]
+
+  sccs, _ = BlockGraph( range(n), edges + [ (n-1, 0) ] ).get_sccs()
+  assert len( sccs ) == 1 and len( sccs[0] ) == n
+
+class Chain( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.out = OutPort( Bits8 )
+    s.w   = Wire( Bits8 )
+
+    @update
+    def up_w():
+      s.w @= s.in_ + 1
+
+    @update
+    def up_out():
+      s.out @= s.w + 1
+
+def test_graph_shared_by_schedule_passes():
+  top = Chain()
+  top.elaborate()
+  GenDAGPass()( top )
+
+  graph = top._dag.block_graph
+  assert get_block_graph( top ) is graph
+  ids = graph.ids
+  up_w, up_out = top._dsl.name_upblk['up_w'], top._dsl.name_upblk['up_out']
+  assert ids[ up_out ] in graph.successors( ids[ up_w ] )
+
+  # A pass that replaces the constraints gets a new graph
+  top._dag.all_constraints = set( top._dag.all_constraints ) - { (up_w, up_out) }
+  new_graph = get_block_graph( top )
+  assert new_graph is not graph
+  assert new_graph.num_edges == graph.num_edges - 1
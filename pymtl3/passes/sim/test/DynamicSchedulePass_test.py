@@ -5,10 +5,15 @@
 # Author : Shunning Jiang
 # Date   : Apr 19, 2019
 
+from collections import Counter
+
+import pytest
+
 from pymtl3.datatypes import Bits8, Bits32, bitstruct
 from pymtl3.dsl import *
 from pymtl3.dsl.errors import UpblkCyclicError
 
+from .. import DynamicSchedulePass as dynamic_schedule_module
 from ..DynamicSchedulePass import DynamicSchedulePass
 from ..GenDAGPass import GenDAGPass
 from ..PrepareSimPass import PrepareSimPass
@@ -315,3 +320,123 @@ def test_update_once():
     print(e)
     return
   raise Exception("Should've thrown UpblkCyclicError")
+
+def test_gen_dag_after_replace_component():
+
+  class Shift( Component ):
+    def construct( s, shamt=1 ):
+      s.in_ = InPort( Bits32 )
+      s.out = OutPort( Bits32 )
+      @update
+      def up_shift():
+        s.out @= s.in_ << shamt
+
+  class Add( Component ):
+    def construct( s, shamt=1 ):
+      s.in_ = InPort( Bits32 )
+      s.out = OutPort( Bits32 )
+      @update
+      def up_add():
+        s.out @= s.in_ + shamt
+
+  class Top( Component ):
+    def construct( s ):
+      s.in_ = InPort( Bits32 )
+      s.out = [ OutPort( Bits32 ) for _ in range(2) ]
+      s.w   = Wire( Bits32 )
+      s.w[0:8]   //= s.in_[0:8]
+      s.w[8:32]  //= 0
+      s.x   = Shift( 2 )
+      s.y   = Shift( 3 )
+      s.x.in_ //= s.w
+      s.y.in_ //= s.w
+      s.x.out //= s.out[0]
+      s.y.out //= s.out[1]
+
+  top = Top()
+  top.elaborate()
+  top.apply( GenDAGPass() )
+  prev = dict( top._dag.net_genblks )
+
+  top.replace_component( top.x, Add )
+  top.apply( GenDAGPass() )
+
+  # Only the nets connected to the replaced component get new blocks
+  reused = { k for k, v in top._dag.net_genblks.items() if prev.get( k ) == v }
+  assert reused == { k for k in prev if not any( repr(x).startswith("<deleted>") for x in k[1] ) }
+  assert ( top.y.out, frozenset([ top.y.out, top.out[1] ]) ) in reused
+
+  top.apply( DynamicSchedulePass() )
+  top.apply( PrepareSimPass() )
+  top.sim_reset()
+  top.in_ @= 0x105
+  top.sim_eval_combinational()
+  assert top.out[0] == 7
+  assert top.out[1] == 40
+
+def test_scc_reruns_only_dirty_blocks():
+  runs = Counter()
+
+  class Top(Component):
+
+    def construct( s ):
+      s.in_ = InPort( Bits8 )
+      s.a = Wire( Bits8 )
+      s.b = Wire( Bits8 )
+      s.c = Wire( Bits8 )
+
+      @update
+      def up_a():
+        runs['a'] += 1
+        s.a @= s.in_ | s.b | s.c
+
+      @update
+      def up_b():
+        runs['b'] += 1
+        s.b @= s.a & 0x0f
+
+      @update
+      def up_c():
+        runs['c'] += 1
+        s.c @= s.a & 0
+
+  top = Top()
+  top.elaborate()
+  top.apply( GenDAGPass() )
+  top.apply( DynamicSchedulePass() )
+  top.apply( PrepareSimPass( print_line_trace=False ) )
+  top.sim_reset()
+
+  # up_a changes s.a in the first sweep, which reruns up_b and up_c once.
+  # Only the change of s.b makes up_a run again.
+  runs.clear()
+  top.in_ @= 0x31
+  top.sim_eval_combinational()
+  assert top.a == 0x31 and top.b == 0x01 and top.c == 0
+  assert runs == { 'a': 2, 'b': 1, 'c': 1 }
+
+def test_oscillating_loop_diagnostic( monkeypatch ):
+  monkeypatch.setattr( dynamic_schedule_module, "max_scc_iters", 10 )
+
+  class Top(Component):
+
+    def construct( s ):
+      s.a = Wire( Bits8 )
+      s.b = Wire( Bits8 )
+
+      @update
+      def up_a():
+        s.a @= ~s.b
+
+      @update
+      def up_b():
+        s.b @= s.a
+
+  with pytest.raises( UpblkCyclicError ) as e:
+    _test_model( Top )
+
+  msg = str( e.value )
+  print( msg )
+  assert "after 10 iters" in msg
+  assert " - s.a: ff -> 00 -> ff -> 00" in msg
+  assert " - s.b: " in msg
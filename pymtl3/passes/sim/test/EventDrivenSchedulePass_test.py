@@ -0,0 +1,170 @@
+#=========================================================================
+# EventDrivenSchedulePass_test.py
+#=========================================================================
+#
+# Date   : Oct 16, 2026
+
+from pymtl3.datatypes import Bits8, Bits32, bitstruct, zext
+from pymtl3.dsl import *
+
+from ..EventDrivenSchedulePass import EventDrivenSchedulePass
+from ..GenDAGPass import GenDAGPass
+from ..PrepareSimPass import PrepareSimPass
+
+
+def _test_model( cls ):
+  A = cls()
+  A.elaborate()
+  A.apply( GenDAGPass() )
+  A.apply( EventDrivenSchedulePass() )
+  A.apply( PrepareSimPass(print_line_trace=False) )
+  A.sim_reset()
+  return A
+
+def test_skip_quiescent_blocks():
+
+  class Top(Component):
+
+    def construct( s ):
+      s.in_ = InPort(32)
+      s.out = OutPort(32)
+      s.tmp = Wire(32)
+
+      @update
+      def up_incr():
+        s.tmp @= s.in_ + 1
+
+      @update
+      def up_out():
+        s.out @= s.tmp + 1
+
+  A = _test_model( Top )
+  assert A._sched.event_driven_num_opaque == 0
+
+  # Count how many times the original blocks are executed
+  counts = { 'up_incr': 0, 'up_out': 0 }
+  schedule = A._sched.static_update_schedule
+  for i, blk in enumerate( schedule ):
+    def counted( blk=blk ):
+      counts[ blk.__name__ ] += 1
+      blk()
+    A._sched.update_schedule[0].__globals__[ f"blk{i}" ] = counted
+
+  A.in_ @= 10
+  A.sim_eval_combinational()
+  assert A.out == 12
+  assert counts == { 'up_incr': 1, 'up_out': 1 }
+
+  # Nothing changed, nothing is executed
+  for _ in range(5):
+    A.sim_tick()
+  assert A.out == 12
+  assert counts == { 'up_incr': 1, 'up_out': 1 }
+
+  A.in_ @= 20
+  A.sim_eval_combinational()
+  assert A.out == 22
+  assert counts == { 'up_incr': 2, 'up_out': 2 }
+
+def test_ff_and_python_state():
+
+  class Top(Component):
+
+    def construct( s ):
+      s.in_  = InPort(8)
+      s.out  = OutPort(8)
+      s.out2 = OutPort(8)
+      s.reg  = Wire(8)
+      s.count = 0
+
+      @update_ff
+      def up_reg():
+        s.reg <<= s.in_
+
+      @update
+      def up_out():
+        s.out @= s.reg + 1
+
+      # s.count is written by an update block so both are opaque
+      @update
+      def up_count():
+        s.count += 1
+
+      @update
+      def up_out2():
+        s.out2 @= s.count
+
+  A = _test_model( Top )
+  assert A._sched.event_driven_num_opaque == 2
+
+  for i in range(10):
+    A.in_ @= i
+    A.sim_tick()
+    assert A.out == i + 1
+
+  # Opaque blocks are executed in every evaluation
+  count = A.count
+  A.sim_eval_combinational()
+  A.sim_eval_combinational()
+  assert A.count == count + 2
+
+def test_slice_and_struct_nets():
+
+  @bitstruct
+  class SomeMsg:
+    a: Bits8
+    b: Bits32
+
+  class Top(Component):
+
+    def construct( s ):
+      s.in_  = InPort( SomeMsg )
+      s.out  = OutPort( Bits32 )
+      s.lo   = OutPort( Bits8 )
+      s.wire = Wire( Bits32 )
+
+      connect( s.in_.b, s.wire )
+      connect( s.wire[0:8], s.lo )
+
+      @update
+      def up_out():
+        s.out @= s.wire + zext( s.in_.a, 32 )
+
+  A = _test_model( Top )
+
+  for i in range(10):
+    A.in_ @= SomeMsg( i, i*0x101 )
+    A.sim_eval_combinational()
+    assert A.out == i*0x101 + i
+    assert A.lo  == ( i*0x101 ) & 0xff
+    A.sim_tick()
+
+def test_combinational_loop():
+
+  class Top(Component):
+
+    def construct( s ):
+      s.in_ = InPort(32)
+      s.out = OutPort(32)
+      s.a   = Wire(32)
+      s.b   = Wire(32)
+
+      @update
+      def up1():
+        s.a @= s.in_ if s.b > 100 else s.in_ + 1
+
+      @update
+      def up2():
+        s.b @= s.a
+
+      @update
+      def up3():
+        s.out @= s.b + 1
+
+  A = _test_model( Top )
+
+  for i in range(10):
+    A.in_ @= i
+    A.sim_eval_combinational()
+    assert A.out == i + 2
+    A.sim_tick()
@@ -0,0 +1,189 @@
+#=========================================================================
+# GenDAGPass_test.py
+#=========================================================================
+#
+# Date   : Oct 16, 2026
+
+import importlib
+
+import pytest
+
+from pymtl3 import *
+from pymtl3.passes.PassGroups import DefaultPassGroup, EventDrivenPassGroup
+
+# pymtl3.passes.sim.GenDAGPass is shadowed by the pass class
+gen_dag_module = importlib.import_module( "pymtl3.passes.sim.GenDAGPass" )
+
+
+@bitstruct
+class Inner:
+  x: Bits4
+  y: [ Bits4, Bits4 ]
+
+@bitstruct
+class Msg:
+  a:     Bits8
+  inner: Inner
+
+class Incr( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Msg )
+    s.out = OutPort( Msg )
+    s.a   = OutPort( Bits8 )
+
+    s.a //= s.in_.a
+
+    @update
+    def up_incr():
+      s.out @= s.in_
+      s.out.a @= s.in_.a + 1
+
+class FieldNets( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Msg )
+    s.out = OutPort( Msg )
+    s.cat = OutPort( Bits16 )
+
+    s.c = [ Incr() for _ in range(3) ]
+
+    s.c[0].in_.a     //= s.in_.a
+    s.c[0].in_.inner //= s.in_.inner
+    s.c[1].in_       //= s.c[0].out
+    s.c[2].in_.a     //= s.c[1].out.a
+    connect( s.c[2].in_.inner.x,    s.c[0].a[2:6] )
+    connect( s.c[2].in_.inner.y[0], s.c[1].out.a[0:4] )
+    connect( s.c[2].in_.inner.y[1], s.c[1].out.a[4:8] )
+    s.out //= s.c[2].out
+
+    s.cat[0:8]  //= s.c[2].a
+    s.cat[8:16] //= s.c[1].a
+
+def _ref_field_nets( msg ):
+  a0 = msg.a
+  a1 = a0 + 1
+  a2 = a1 + 1
+  out = Msg( a2 + 1, Inner( a0[2:6], [ a2[0:4], a2[4:8] ] ) )
+  return out, concat( a1, a2 )
+
+@pytest.mark.parametrize( "PassGroup", [ DefaultPassGroup, EventDrivenPassGroup ] )
+def test_field_nets_share_objects( PassGroup ):
+  top = FieldNets()
+  top.apply( PassGroup( linetrace=False ) )
+
+  # Whole signals and fields in the same net share one object
+  assert top.c[0].in_.a is top.in_.a
+  assert top.c[0].in_.inner is top.in_.inner
+  assert top.c[1].in_ is top.c[0].out
+  assert top.c[2].in_.a is top.c[1].out.a
+  assert top.c[2].a is top.c[1].out.a
+  assert top.out is top.c[2].out
+
+  stats = top._dag.net_genblk_stats
+  assert stats['nets'] == stats['eliminated'] + stats['copy_blks']
+  # The slices of s.c[1].out.a and s.cat are copied by one block each
+  assert stats['copy_blks'] == 3
+  assert stats['merged'] == 2
+
+  top.sim_reset()
+  for i in range(20):
+    msg = Msg( ( i * 37 ) & 0xff, Inner( i & 0xf, [ ( i + 1 ) & 0xf, ( i + 2 ) & 0xf ] ) )
+    top.in_ @= msg
+    top.sim_eval_combinational()
+    assert ( top.out, top.cat ) == _ref_field_nets( msg )
+    top.sim_tick()
+
+class SliceNets( Component ):
+
+  def construct( s, n=4 ):
+    s.in_ = [ InPort( Bits8 ) for _ in range(n) ]
+    s.out = OutPort( mk_bits( 8*n ) )
+    for i in range(n):
+      s.out[8*i:8*(i+1)] //= s.in_[i]
+
+def test_slice_nets_merged():
+  top = SliceNets()
+  top.apply( DefaultPassGroup( linetrace=False ) )
+
+  assert len( top._dag.merged_genblks ) == 1
+  assert top._dag.net_genblk_stats['merged'] == 3
+
+  top.sim_reset()
+  for i in range(4):
+    top.in_[i] @= i + 1
+  top.sim_eval_combinational()
+  assert top.out == 0x04030201
+
+class SliceLoop( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Bits4 )
+    s.out = OutPort( Bits8 )
+    s.tmp = Wire( Bits4 )
+
+    # mid[4:8] depends on mid[0:4] through up_tmp, so the two net blocks
+    # cannot be merged
+    s.out[0:4] //= s.in_
+    s.out[4:8] //= s.tmp
+
+    @update
+    def up_tmp():
+      s.tmp @= s.out[0:4] + 1
+
+def test_slice_nets_not_merged_across_path():
+  top = SliceLoop()
+  top.apply( DefaultPassGroup( linetrace=False ) )
+
+  assert top._dag.merged_genblks == {}
+  assert top._dag.net_genblk_stats['merged'] == 0
+
+  top.sim_reset()
+  top.in_ @= 5
+  top.sim_eval_combinational()
+  assert top.out == 0x65
+
+class Dup( Component ):
+
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.out = OutPort( Bits16 )
+    s.w   = Wire( Bits8 )
+    s.out[0:8]  //= s.w
+    s.out[8:16] //= s.w
+
+    @update
+    def up_w():
+      s.w @= s.in_ + 1
+
+class DupArray( Component ):
+
+  def construct( s, n=4 ):
+    s.in_ = InPort( Bits8 )
+    s.out = [ OutPort( Bits16 ) for _ in range(n) ]
+    s.c   = [ Dup() for _ in range(n) ]
+    for i in range(n):
+      s.c[i].in_ //= s.in_
+      s.out[i]   //= s.c[i].out
+
+def test_net_blocks_of_identical_children_share_code( monkeypatch ):
+  monkeypatch.setattr( gen_dag_module, "_net_blk_code", {} )
+
+  bodies = []
+  def _compile( src, *args, **kwargs ):
+    bodies.append( src )
+    return compile( src, *args, **kwargs )
+  monkeypatch.setattr( gen_dag_module, "compile", _compile, raising=False )
+
+  top = DupArray()
+  top.apply( DefaultPassGroup( linetrace=False ) )
+
+  blks = [ blk for blk in top._dag.genblks if blk.__name__.endswith( "__w__2_2" ) ]
+  assert len( blks ) == 4
+  assert len({ blk.__name__ for blk in blks }) == 4
+  assert sum( "s.out[0:8]" in x for x in bodies ) == 1
+
+  top.sim_reset()
+  top.in_ @= 0x5a
+  top.sim_eval_combinational()
+  assert top.out == [ 0x5b5b ] * 4
@@ -0,0 +1,96 @@
+#=========================================================================
+# MultiProcessSimPass_test.py
+#=========================================================================
+#
+# Date   : Oct 16, 2026
+
+import pytest
+
+from pymtl3 import *
+from pymtl3.passes.PassGroups import DefaultPassGroup, MultiProcessPassGroup
+
+from ..MultiProcessSimPass import MultiProcessSimPass
+
+
+class Tile( Component ):
+
+  def construct( s, i, registered=True ):
+    s.in_ = InPort(32)
+    s.out = OutPort(32)
+    s.acc = Wire(32)
+    s.nxt = Wire(32)
+
+    @update
+    def up_nxt():
+      s.nxt @= s.acc + s.in_ + i
+
+    @update_ff
+    def up_acc():
+      if s.reset: s.acc <<= 0
+      else:       s.acc <<= s.nxt
+
+    if registered: s.out //= s.acc
+    else:          s.out //= s.nxt
+
+class Chain( Component ):
+
+  def construct( s, n=4, registered=True ):
+    s.in_ = InPort(32)
+    s.out = OutPort(32)
+
+    s.tiles = [ Tile( i, registered ) for i in range(n) ]
+
+    s.tiles[0].in_ //= s.in_
+    for i in range(1, n):
+      s.tiles[i].in_ //= s.tiles[i-1].out
+    s.out //= s.tiles[n-1].out
+
+def _run( top, pass_group, ncycles=20 ):
+  top.elaborate()
+  top.apply( pass_group )
+  top.sim_reset()
+
+  outs = []
+  for i in range(ncycles):
+    top.in_ @= i
+    top.sim_tick()
+    outs.append( int(top.out) )
+
+  if hasattr( top, "sim_stop_workers" ):
+    top.sim_stop_workers()
+  return outs
+
+def test_auto_partition():
+  ref = _run( Chain(), DefaultPassGroup() )
+
+  top = Chain()
+  assert _run( top, MultiProcessPassGroup( nprocs=3 ) ) == ref
+  assert top._sim.num_partitions == 3
+
+def test_auto_partition_merge_comb_boundary():
+  ref = _run( Chain( registered=False ), DefaultPassGroup() )
+
+  # All tiles are connected combinationally so they end up in the main
+  # process
+  top = Chain( registered=False )
+  assert _run( top, MultiProcessPassGroup( nprocs=4 ) ) == ref
+  assert top._sim.num_partitions == 1
+
+def test_explicit_partition():
+  ref = _run( Chain(), DefaultPassGroup() )
+
+  top = Chain()
+  top.elaborate()
+  for i, tile in enumerate( top.tiles ):
+    tile.set_metadata( MultiProcessSimPass.partition, i % 2 )
+  assert _run( top, MultiProcessPassGroup() ) == ref
+  assert top._sim.num_partitions == 2
+
+def test_explicit_partition_comb_boundary():
+  top = Chain( registered=False )
+  top.elaborate()
+  top.tiles[1].set_metadata( MultiProcessSimPass.partition, 1 )
+
+  with pytest.raises( ValueError ) as e:
+    top.apply( MultiProcessPassGroup() )
+  assert "Only update_ff outputs are allowed to cross partitions" in str(e.value)
@@ -0,0 +1,109 @@
+#=========================================================================
+# TimeSkip_test.py
+#=========================================================================
+#
+# Date   : Oct 17, 2026
+
+from pymtl3 import *
+
+from ..TimeSkip import fast_forward, get_time_skip_hooks
+
+
+class Timer( Component ):
+  """ Fires every period cycles. """
+
+  def construct( s, period ):
+    s.period = period
+    s.count  = period
+    s.fired  = 0
+
+    @update_once
+    def up_timer():
+      s.count -= 1
+      if s.count == 0:
+        s.fired += 1
+        s.count = s.period
+
+  def sim_idle_cycles( s ):
+    return s.count - 1
+
+  def sim_skip_cycles( s, ncycles ):
+    s.count -= ncycles
+
+class Top( Component ):
+
+  def construct( s ):
+    s.t0 = Timer( 7 )
+    s.t1 = Timer( 10 )
+
+class TopNoHooks( Component ):
+
+  def construct( s ):
+    s.t0 = Timer( 7 )
+    s.x  = 0
+
+    @update_once
+    def up_x():
+      s.x += 1
+
+def _run( top, nfired, **kwargs ):
+  top.elaborate()
+  top.apply( DefaultPassGroup( **kwargs ) )
+  top.sim_reset()
+  nticks = 0
+  while top.t0.fired < nfired:
+    top.sim_tick()
+    nticks += 1
+  return nticks
+
+def test_fast_forward():
+  top = Top()
+  top.elaborate()
+  hooks = get_time_skip_hooks( top )
+  assert len( hooks ) == 2
+
+  # Bounded by the components
+  assert fast_forward( hooks ) == 6
+  assert ( top.t0.count, top.t1.count ) == ( 1, 4 )
+  assert fast_forward( hooks ) == 0
+
+  # Bounded by max_cycles
+  top.t0.count = 7
+  assert fast_forward( hooks, 2 ) == 2
+  assert ( top.t0.count, top.t1.count ) == ( 5, 2 )
+
+def test_time_skip_same_result():
+  ref = Top()
+  ref_ticks = _run( ref, 10 )
+
+  top = Top()
+  ticks = _run( top, 10, time_skip=True )
+  assert top.sim_cycle_count() == ref.sim_cycle_count()
+  assert top.t1.fired == ref.t1.fired
+  assert ticks < ref_ticks
+
+def test_sim_fast_forward():
+  top = Top()
+  top.elaborate()
+  top.apply( DefaultPassGroup() )
+  top.sim_reset()
+
+  cycle = top.sim_cycle_count()
+  fired = top.t0.fired
+  ncycles = top.sim_fast_forward( 3 )
+  assert 0 < ncycles <= 3
+  assert top.sim_cycle_count() == cycle + ncycles
+  assert top.t0.fired == fired
+
+def test_no_hooks_no_skip():
+  top = TopNoHooks()
+  ticks = _run( top, 5, time_skip=True )
+  assert top.x == ticks + 4 # sim_reset
+  assert top.sim_fast_forward() == 0
+
+def test_no_skip_with_waveform():
+  top = Top()
+  top.elaborate()
+  top.apply( DefaultPassGroup( textwave=True ) )
+  top.sim_reset()
+  assert top.sim_fast_forward() == 0
@@ -0,0 +1,144 @@
+#=========================================================================
+# WrapGeneratorPass_test.py
+#=========================================================================
+#
+# Date   : Oct 17, 2026
+
+import greenlet
+import pytest
+
+from pymtl3 import *
+from pymtl3.dsl import CallerIfcFL
+
+
+class Chan( Component ):
+
+  @blocking
+  def send( s, msg ):
+    while s.entry is not None:
+      greenlet.getcurrent().parent.switch(0)
+    s.entry = msg
+
+  @blocking
+  def recv( s ):
+    while s.entry is None:
+      greenlet.getcurrent().parent.switch(0)
+    ret = s.entry
+    s.entry = None
+    return ret
+
+  def construct( s ):
+    s.entry = None
+    s.add_constraints( M( s.send ) < M( s.recv ) )
+
+class Prod( Component ):
+
+  def construct( s, nports=1 ):
+    s.out = [ CallerIfcFL() for _ in range(nports) ]
+    s.i   = 0
+
+    @update_once
+    def up_prod():
+      # s.out[j] is dispatched at runtime
+      for j in range(nports):
+        s.out[j]( s.i + j )
+      s.i += 1
+
+class Cons( Component ):
+
+  def construct( s ):
+    s.inp  = [ CallerIfcFL() for _ in range(2) ]
+    s.recv = []
+
+    @update_once
+    def up_cons():
+      s.recv.append( s.inp[0]() + s.inp[1]() )
+
+class NestedCons( Component ):
+
+  def construct( s ):
+    s.inp  = [ CallerIfcFL() for _ in range(2) ]
+    s.recv = []
+
+    @update_once
+    def up_cons():
+      # Cannot yield inside a generator expression
+      s.recv.append( sum( s.inp[j]() for j in range(2) ) )
+
+class Top( Component ):
+
+  def construct( s, ConsType=Cons ):
+    s.prod = Prod( 2 )
+    s.cons = ConsType()
+    s.ch   = [ Chan() for _ in range(2) ]
+    for i in range(2):
+      s.prod.out[i] //= s.ch[i].send
+      s.cons.inp[i] //= s.ch[i].recv
+
+class CounterTop( Component ):
+
+  def construct( s ):
+    s.ch  = Chan()
+    s.out = CallerIfcFL()
+    s.inp = CallerIfcFL()
+    s.out //= s.ch.send
+    s.inp //= s.ch.recv
+    s.log = []
+    n = 0
+
+    @update_once
+    def up_prod():
+      nonlocal n
+      s.out( n )
+      n += 1
+
+    # Reads the counter that up_prod rebinds
+    @update_once
+    def up_cons():
+      msg = s.inp()
+      s.log.append( ( msg, n ) )
+
+def _run( top, blocking, ncycles=10 ):
+  top.elaborate()
+  top.apply( DefaultPassGroup( blocking=blocking ) )
+  top.sim_reset()
+  trace = []
+  for _ in range(ncycles):
+    top.sim_tick()
+    trace.append( ( top.prod.i, list( top.cons.recv ), [ x.entry for x in top.ch ],
+                    [ f"{x.send}|{x.recv}" for x in top.ch ] ) )
+  return trace
+
+def test_same_behavior_as_greenlet():
+  ref = _run( Top(), "greenlet" )
+
+  top = Top()
+  assert _run( top, "generator" ) == ref
+  assert top.cons.recv[:3] == [ 1, 3, 5 ]
+  assert { x.__name__ for x in top._dag.generator_upblks } == { "up_prod", "up_cons" }
+
+def test_fallback_to_greenlet():
+  ref = _run( Top(), "greenlet" )
+
+  top = Top( NestedCons )
+  assert _run( top, "generator" ) == ref
+  assert { x.__name__ for x in top._dag.generator_upblks } == { "up_prod" }
+
+def test_rebound_free_variable():
+  logs = []
+  for blocking in [ "greenlet", "generator" ]:
+    top = CounterTop()
+    top.elaborate()
+    top.apply( DefaultPassGroup( blocking=blocking ) )
+    top.sim_reset()
+    for _ in range(5):
+      top.sim_tick()
+    logs.append( top.log )
+
+  assert logs[1] == logs[0]
+  assert logs[1][:3] == [ ( 0, 1 ), ( 1, 2 ), ( 2, 3 ) ]
+  assert { x.__name__ for x in top._dag.generator_upblks } == { "up_prod", "up_cons" }
+
+def test_bad_option():
+  with pytest.raises( ValueError ):
+    DefaultPassGroup( blocking="thread" )
@@ -44,18 +44,23 @@ class CLLineTracePass( BasePass ):
     # which can be used for composing the line trace.
     # The wrapped method also need to update the saved arguments and
     # return value of all the methods this callee port is driving.
+    # [record_call] is also exposed so that WrapGeneratorPass can record
+    # the calls to blocking methods that it turned into generators.
     def wrap_callee_method( mport, net ):
       mport.raw_method = mport.method
-      def wrapped_method( self, *args, **kwargs ):
-        # If it has greenlet i.e. blocking ... we need to make sure
-        # we record everything after the method is successfully invoked
-        ret = self.raw_method( *args, **kwargs )
+      def record_call( args, kwargs, ret ):
         for m in net:
           m.called = True
           m.saved_args = args
           m.saved_kwargs = kwargs
           m.saved_ret = ret
+      def wrapped_method( self, *args, **kwargs ):
+        # If it has greenlet i.e. blocking ... we need to make sure
+        # we record everything after the method is successfully invoked
+        ret = self.raw_method( *args, **kwargs )
+        record_call( args, kwargs, ret )
         return ret
+      mport.record_call = record_call
       mport.method = lambda *args, **kwargs : wrapped_method( mport, *args, **kwargs )
 
     # [wrap_caller_method] wraps the original method in a caller port
@@ -3,18 +3,26 @@
 VcdGenerationPass.py
 ========================================================================
 
+Only the nets whose value changed in a cycle are sent to the writer,
+which buffers them and writes them on a background thread. Set
+vcd_binary to write the compact binary format instead, which can be
+converted to VCD with VcdWriter.convert_binary_vcd.
+
 Author : Shunning Jiang, Yanghui Ou, Peitian Pan
 Date   : Sep 8, 2019
 """
 
+import io
 import time
 from collections import defaultdict
 
-from pymtl3.datatypes import Bits, concat
+from pymtl3.datatypes import Bits, concat, get_codec
 from pymtl3.dsl import Const, MetadataKey
 from pymtl3.passes.BasePass import BasePass
 from pymtl3.passes.errors import PassOrderError
 
+from .VcdWriter import BinaryVcdWriter, VcdWriter
+
 
 class VcdGenerationPass( BasePass ):
 
@@ -27,8 +35,21 @@ class VcdGenerationPass( BasePass ):
   #: Default value: ""
   vcd_file_name = MetadataKey(str)
 
+  #: Write the compact binary format to <vcd_file_name>.vcdb instead
+  #:
+  #: Type: ``bool``; input
+  #:
+  #: Default value: False
+  vcd_binary = MetadataKey(bool)
+
   vcd_func = MetadataKey()
 
+  #: The writer of the dumped file. Call its flush() to make sure
+  #: everything dumped so far is on disk, or close() to finish the file.
+  #:
+  #: Type: ``VcdWriter``; output
+  vcd_writer = MetadataKey()
+
   def __call__( self, top ):
     if top.has_metadata( self.vcd_file_name ):
       vcd_file_name = top.get_metadata( self.vcd_file_name )
@@ -39,12 +60,17 @@ class VcdGenerationPass( BasePass ):
 
   def make_vcd_func( self, top, vcd_file_name ):
     assert vcd_file_name is not None
+
+    binary = top.has_metadata( self.vcd_binary ) and top.get_metadata( self.vcd_binary )
+    suffix = ".vcdb" if binary else ".vcd"
+
     if vcd_file_name != "":
-      vcd_file_name = str(vcd_file_name) + ".vcd"
+      vcd_file_name = str(vcd_file_name) + suffix
     else:
-      vcd_file_name = str(top.__class__.__name__) + ".vcd"
+      vcd_file_name = str(top.__class__.__name__) + suffix
 
-    vcd_file = open( vcd_file_name, "w" )
+    # The header is generated in memory and handed to the writer
+    vcd_file = io.StringIO()
 
     # Get vcd timescale
 
@@ -131,7 +157,7 @@ class VcdGenerationPass( BasePass ):
       return name.replace('[','(').replace(']',')').replace(':', '__')
 
     def recurse_models( m, spaces ):
-      nonlocal vcd_clock_net_idx, vcd_sim_ncycles
+      nonlocal vcd_clock_net_idx
 
       # Special case the top level "s" to "top"
 
@@ -195,24 +221,13 @@ class VcdGenerationPass( BasePass ):
     # nets in the design.
     print( "$enddefinitions $end\n", file=vcd_file )
 
-    # last_values is an array of values from the previous cycle
-
-    last_values = [0 for _ in range(len(trimmed_value_nets))]
+    # Convert everything to Bits to get around lack of bit struct support.
+    # The first cycle VCD contains the default value
 
     for i, net in enumerate(trimmed_value_nets):
-      # Convert everything to Bits to get around lack of bit struct support.
-      # The first cycle VCD contains the default value
       bin_str = net[0]._dsl.Type().to_bits().bin()
-
       print( f"b{bin_str} {net_symbol_mapping[i]}", file=vcd_file )
 
-      # Set this to be the last cycle value str
-      last_values[i] = bin_str
-
-    # Now we create per-cycle signal value collect functions
-
-    vcd_sim_ncycles = 0
-
     # Separate clock net from normal nets ahead of time
     clock_symbol = net_symbol_mapping[ vcd_clock_net_idx ]
 
@@ -221,48 +236,64 @@ class VcdGenerationPass( BasePass ):
                       if i != vcd_clock_net_idx ]
 
     # Flip clock for the first cycle
-    print( '\n#0\nb0b1 {}\n'.format( clock_symbol ), file=vcd_file, flush=True )
-
-    # Returns a dump_vcd function that is ready to be appended to _sched.
-    # TODO: type check?
-
-    # Adding this 's' argument is for eval to correctly evaluate 's.x'...
-    # Python 3 destroys a lot of our hacks .. sigh
-
-    def dump_vcd_inner( s ):
-      nonlocal vcd_sim_ncycles
-
-      for i, (signal, symbol) in enumerate( net_details ):
-
-        # If we encounter a BitStruct then dump it as a concatenation of
-        # all fields.
-        # TODO: treat each field in a BitStruct as a separate signal?
-
+    print( '\n#0\nb0b1 {}\n'.format( clock_symbol ), file=vcd_file )
+
+    writer_cls = BinaryVcdWriter if binary else VcdWriter
+    writer = writer_cls( vcd_file_name, vcd_file.getvalue(),
+                         [ ( signal._dsl.Type.nbits, symbol ) for signal, symbol in net_details ],
+                         clock_symbol )
+    top.set_metadata( self.vcd_writer, writer )
+
+    # We generate a function that reads all nets at once and compare the
+    # integer values against last cycle's. Only when something changed,
+    # we find out which nets changed and hand them to the writer.
+    # If we encounter a BitStruct then dump it as a concatenation of all
+    # fields.
+    # TODO: treat each field in a BitStruct as a separate signal?
+
+    reads    = []
+    _globals = {}
+    codec_names = {}
+    for signal, _ in net_details:
+      Type = signal._dsl.Type
+      if issubclass( Type, Bits ):
+        reads.append( f"int({signal!r})" )
+      else:
+        # The cached codec concatenates all fields in one call
+        if Type not in codec_names:
+          codec_names[ Type ] = f"_codec{len(codec_names)}"
+          _globals[ codec_names[ Type ] ] = get_codec( Type )
+        reads.append( f"{codec_names[ Type ]}.to_int({signal!r})" )
+
+    src = "def sample_nets( s ):\n  return [ {} ]\n".format( ", ".join( reads ) )
+    _locals = {}
+    exec( compile( src, filename="vcd_sample_nets", mode="exec" ), _globals, _locals )
+    sample_nets = _locals['sample_nets']
+
+    # The first cycle VCD contains the default value
+    last_values = [ int( signal._dsl.Type().to_bits() ) for signal, _ in net_details ]
+    nnets       = len(last_values)
+    dump        = writer.dump
+
+    def report_type_error( s ):
+      for signal, _ in net_details:
         try:
-          net_bits_bin = eval(repr(signal)).to_bits()
+          eval(repr(signal)).to_bits()
         except Exception as e:
           raise TypeError(f'{e}\n - {signal} becomes another type. Please check your code.')
 
-        net_bits_bin_str = net_bits_bin.bin()
-        # `last_value` is the string form of a Bits object in binary
-        # e.g. '0b000' == Bits3(0).bin()
-        # We store strings instead of values ...
-        if last_values[i] != net_bits_bin_str:
-          last_values[i] = net_bits_bin_str
-          print( f'b{net_bits_bin_str} {symbol}', file=vcd_file )
-
-      # Flop clock at the end of cycle
-      next_neg_edge = 100 * vcd_sim_ncycles + 50
-      print( f'\n#{next_neg_edge}\nb0b0 {clock_symbol}', file=vcd_file )
-
-      # Flip clock of the next cycle
-      next_pos_edge = next_neg_edge + 50
-      print( f'#{next_pos_edge}\nb0b1 {clock_symbol}\n', file=vcd_file, flush=True )
-      vcd_sim_ncycles += 1
-
-    def gen_dump_vcd( s ):
-      def dump_vcd():
-        dump_vcd_inner( s )
-      return dump_vcd
-
-    return gen_dump_vcd( top )
+    def dump_vcd():
+      nonlocal last_values
+      try:
+        values = sample_nets( top )
+      except Exception:
+        report_type_error( top )
+        raise
+
+      if values != last_values:
+        dump( [ (i, values[i]) for i in range(nnets) if values[i] != last_values[i] ] )
+        last_values = values
+      else:
+        dump( None )
+
+    return dump_vcd
@@ -0,0 +1,309 @@
+"""
+========================================================================
+VcdWriter.py
+========================================================================
+Buffered writers for the value changes collected by VcdGenerationPass.
+
+The simulator only hands the writer the nets whose value changed in a
+cycle as ( net index, int value ) pairs. The writer buffers them and a
+shared background thread formats and writes whole chunks to the file, so
+the simulation loop never does string formatting or file I/O itself.
+
+VcdWriter writes a normal text VCD file. BinaryVcdWriter writes a compact
+binary file (.vcdb) which stores the VCD header as is, followed by
+zlib-compressed chunks of binary-packed value changes. Use
+convert_binary_vcd to convert it to the same VCD file VcdWriter would
+have written.
+
+Date   : Oct 16, 2026
+"""
+import atexit
+import queue
+import struct
+import threading
+import weakref
+import zlib
+
+_BINARY_MAGIC   = b"PYMTLVCDB"
+_BINARY_VERSION = 1
+
+#-------------------------------------------------------------------------
+# Background I/O thread
+#-------------------------------------------------------------------------
+# All writers share one daemon thread. The queue is bounded so that a
+# simulation that produces changes faster than the disk can take them
+# is throttled instead of buffering everything in memory.
+
+_io_queue  = queue.Queue( maxsize=64 )
+_io_thread = None
+_io_lock   = threading.Lock()
+
+def _io_loop():
+  while True:
+    func, args = _io_queue.get()
+    try:
+      func( *args )
+    finally:
+      _io_queue.task_done()
+
+def _submit( func, *args ):
+  global _io_thread
+  if _io_thread is None:
+    with _io_lock:
+      if _io_thread is None:
+        _io_thread = threading.Thread( target=_io_loop, name="pymtl-vcd-writer",
+                                       daemon=True )
+        _io_thread.start()
+  _io_queue.put( (func, args) )
+
+#-------------------------------------------------------------------------
+# VCD text formatting
+#-------------------------------------------------------------------------
+
+def _format_vcd_chunk( fmts, clock_symbol, start, end, records ):
+  """ Format the changes of cycles [start, end) as VCD text. records is
+  a list of ( cycle, [ ( net index, value ) ] ) sorted by cycle. """
+  out = []
+  j, n = 0, len(records)
+  for cycle in range( start, end ):
+    if j < n and records[j][0] == cycle:
+      for i, v in records[j][1]:
+        out.append( fmts[i].format( v ) )
+      j += 1
+    t = 100 * cycle
+    out.append( f"\n#{t+50}\nb0b0 {clock_symbol}\n#{t+100}\nb0b1 {clock_symbol}\n\n" )
+  return "".join( out )
+
+def _mk_fmts( nets ):
+  return [ f"b0b{{:0{nbits}b}} {symbol}\n" for nbits, symbol in nets ]
+
+#-------------------------------------------------------------------------
+# VcdWriter
+#-------------------------------------------------------------------------
+
+class VcdWriter:
+  """ Write value changes to a text VCD file.
+
+  header is the text of the VCD file up to the first simulated cycle.
+  nets is a list of ( nbits, symbol ) and the clock net is toggled
+  every cycle. Changes are buffered for chunk_cycles cycles. """
+
+  chunk_cycles = 1024
+
+  def __init__( s, filename, header, nets, clock_symbol ):
+    s.filename     = filename
+    s.nets         = nets
+    s.clock_symbol = clock_symbol
+
+    s.fmts     = _mk_fmts( nets )
+    s.file     = open( filename, s._mode )
+    s.records  = []
+    s.start    = 0
+    s.ncycles  = 0
+    s.closed   = False
+    s.error    = None
+
+    # The header is written right away so that the definitions are
+    # available on disk even if the simulation never finishes
+    s._write_header( header )
+    s.file.flush()
+
+    # Make sure the buffered changes reach the file when the interpreter
+    # exits. See also __del__.
+    _open_writers.add( s )
+
+  _mode = "w"
+
+  def _write_header( s, header ):
+    s.file.write( header )
+
+  def _write_chunk( s, start, end, records ):
+    s.file.write( _format_vcd_chunk( s.fmts, s.clock_symbol, start, end, records ) )
+
+  def _safe_write_chunk( s, start, end, records ):
+    if s.error is None:
+      try:
+        s._write_chunk( start, end, records )
+      except Exception as e:
+        s.error = e
+
+  def _check_error( s ):
+    if s.error is not None:
+      e, s.error = s.error, None
+      raise OSError( f"Failed to write {s.filename}: {e}" ) from e
+
+  def dump( s, changes ):
+    """ Record the changes of the current cycle and advance the cycle. """
+    if changes:
+      s.records.append( ( s.ncycles, changes ) )
+    s.ncycles += 1
+    if s.ncycles - s.start >= s.chunk_cycles:
+      s._submit_chunk()
+
+  def _submit_chunk( s ):
+    if s.ncycles > s.start:
+      _submit( s._safe_write_chunk, s.start, s.ncycles, s.records )
+      s.records = []
+      s.start   = s.ncycles
+
+  def flush( s ):
+    """ Block until all changes so far are written to the file. """
+    if s.closed:
+      return
+    s._submit_chunk()
+    done = threading.Event()
+    _submit( done.set )
+    done.wait()
+    s.file.flush()
+    s._check_error()
+
+  def close( s ):
+    if s.closed:
+      return
+    s.flush()
+    s._close_file()
+    s.closed = True
+    _open_writers.discard( s )
+
+  def _close_file( s ):
+    s.file.close()
+
+  def __del__( s ):
+    # Queued chunks hold a reference to the writer, so there is no
+    # pending I/O here and we can write the rest synchronously.
+    if not getattr( s, "closed", True ) and s.error is None:
+      s._write_chunk( s.start, s.ncycles, s.records )
+      s._close_file()
+      s.closed = True
+
+#-------------------------------------------------------------------------
+# BinaryVcdWriter
+#-------------------------------------------------------------------------
+# File layout (little endian):
+#
+#   magic "PYMTLVCDB", version (u8)
+#   header length (u32), VCD header text (utf-8)
+#   number of nets (u32), clock symbol length (u16), clock symbol
+#   for each net: nbits (u32), symbol length (u16), symbol
+#   chunks until EOF: compressed length (u32), zlib( chunk )
+#   trailer: compressed length 0 (u32), number of cycles (u64)
+#
+# A chunk is start cycle (u64), end cycle (u64), number of records (u32)
+# followed by the records. Each record is cycle (u64), number of changes
+# (u32), and for each change the net index (u32) and the value in
+# ceil(nbits/8) bytes.
+
+class BinaryVcdWriter( VcdWriter ):
+  """ Write value changes to a compact binary file that can be converted
+  to VCD offline with convert_binary_vcd. """
+
+  _mode = "wb"
+
+  def _write_header( s, header ):
+    f = s.file
+    f.write( _BINARY_MAGIC + bytes([ _BINARY_VERSION ]) )
+    header = header.encode()
+    f.write( struct.pack( "<I", len(header) ) + header )
+    clock_symbol = s.clock_symbol.encode()
+    f.write( struct.pack( "<IH", len(s.nets), len(clock_symbol) ) + clock_symbol )
+    for nbits, symbol in s.nets:
+      symbol = symbol.encode()
+      f.write( struct.pack( "<IH", nbits, len(symbol) ) + symbol )
+
+    s.nbytes = [ (nbits + 7) // 8 for nbits, _ in s.nets ]
+
+  def _write_chunk( s, start, end, records ):
+    nbytes = s.nbytes
+    pack   = struct.pack
+    out = [ pack( "<QQI", start, end, len(records) ) ]
+    for cycle, changes in records:
+      out.append( pack( "<QI", cycle, len(changes) ) )
+      for i, v in changes:
+        out.append( pack( "<I", i ) )
+        out.append( v.to_bytes( nbytes[i], "little" ) )
+    data = zlib.compress( b"".join( out ) )
+    s.file.write( pack( "<I", len(data) ) + data )
+
+  def _close_file( s ):
+    s.file.write( struct.pack( "<IQ", 0, s.ncycles ) )
+    s.file.close()
+
+def convert_binary_vcd( src, dst ):
+  """ Convert a binary VCD file written by BinaryVcdWriter to a VCD text
+  file. Files of simulations that did not finish are converted up to the
+  last complete chunk. """
+
+  with open( src, "rb" ) as f:
+    data = f.read()
+
+  n = len(_BINARY_MAGIC)
+  if data[:n] != _BINARY_MAGIC or data[n:n+1] != bytes([ _BINARY_VERSION ]):
+    raise ValueError( f"{src} is not a binary VCD file of this PyMTL version" )
+  pos = n + 1
+
+  def read( fmt ):
+    nonlocal pos
+    ret = struct.unpack_from( fmt, data, pos )
+    pos += struct.calcsize( fmt )
+    return ret
+
+  def read_str( length ):
+    nonlocal pos
+    ret = data[pos:pos+length].decode()
+    pos += length
+    return ret
+
+  header = read_str( *read( "<I" ) )
+  nnets, clock_len = read( "<IH" )
+  clock_symbol = read_str( clock_len )
+  nets = []
+  for _ in range(nnets):
+    nbits, symbol_len = read( "<IH" )
+    nets.append( ( nbits, read_str( symbol_len ) ) )
+
+  nbytes = [ (nbits + 7) // 8 for nbits, _ in nets ]
+  fmts   = _mk_fmts( nets )
+  from_bytes = int.from_bytes
+
+  with open( dst, "w" ) as out:
+    out.write( header )
+
+    while pos + 4 <= len(data):
+      length, = read( "<I" )
+      if length == 0:
+        break
+      if pos + length > len(data):
+        break
+      chunk = zlib.decompress( data[pos:pos+length] )
+      pos  += length
+
+      start, end, nrecords = struct.unpack_from( "<QQI", chunk, 0 )
+      cpos = 20
+      records = []
+      for _ in range(nrecords):
+        cycle, nchanges = struct.unpack_from( "<QI", chunk, cpos )
+        cpos += 12
+        changes = []
+        for _ in range(nchanges):
+          i, = struct.unpack_from( "<I", chunk, cpos )
+          cpos += 4
+          changes.append( ( i, from_bytes( chunk[cpos:cpos+nbytes[i]], "little" ) ) )
+          cpos += nbytes[i]
+        records.append( ( cycle, changes ) )
+
+      out.write( _format_vcd_chunk( fmts, clock_symbol, start, end, records ) )
+
+#-------------------------------------------------------------------------
+# Flush at exit
+#-------------------------------------------------------------------------
+
+_open_writers = weakref.WeakSet()
+
+def _close_all_writers():
+  for writer in list( _open_writers ):
+    try:
+      writer.close()
+    except Exception:
+      pass
+
+atexit.register( _close_all_writers )
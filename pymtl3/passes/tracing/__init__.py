@@ -1,2 +1,3 @@
 from .PrintTextWavePass import PrintTextWavePass
 from .VcdGenerationPass import VcdGenerationPass
+from .VcdWriter import convert_binary_vcd
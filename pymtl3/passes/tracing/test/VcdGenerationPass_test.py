@@ -11,11 +11,14 @@
 # Author: Peitian Pan
 # Date:   Nov 1, 2019
 
+from collections import defaultdict
+
 from pymtl3.datatypes import *
 from pymtl3.dsl import *
 from pymtl3.passes.PassGroups import DefaultPassGroup
 
 from ..VcdGenerationPass import VcdGenerationPass
+from ..VcdWriter import VcdWriter, convert_binary_vcd
 
 
 def run_test( dut, tv, tv_in, tv_out ):
@@ -89,3 +92,77 @@ def test_bitstruct_signals():
     [  bs(0, -1), b32(0), b32(-1), ],
     [  bs(0, 42), b32(42), b32(84), ],
   ], tv_in, tv_out )
+
+# Parse a VCD file into { signal name: [ (time, value) ] }. Only value
+# changes are kept because the net symbols depend on the set order.
+def parse_vcd( file_name ):
+  names = {}
+  scope = []
+  waves = defaultdict(list)
+  time  = None
+  with open(file_name) as fd:
+    for line in fd:
+      w = line.split()
+      if not w:
+        continue
+      if w[0] == "$scope":
+        scope.append( w[2] )
+      elif w[0] == "$upscope":
+        scope.pop()
+      elif w[0] == "$var":
+        names.setdefault( w[3], [] ).append( ".".join( scope + [ w[4] ] ) )
+      elif w[0][0] == "#":
+        time = int( w[0][1:] )
+      elif w[0][0] == "b":
+        for name in names[ w[1] ]:
+          if not waves[name] or waves[name][-1][1] != w[0]:
+            waves[name].append( (time, w[0]) )
+  return waves
+
+class Acc( Component ):
+  def construct( s ):
+    s.in_ = InPort( Bits8 )
+    s.out = OutPort( Bits16 )
+    s.cnt = Wire( Bits4 )
+
+    @update_ff
+    def up_acc():
+      s.cnt <<= s.cnt + 1
+      if s.cnt[0]:
+        s.out <<= s.out + zext( s.in_, 16 )
+
+def run_acc( vcd_file_name, binary, ncycles ):
+  dut = Acc()
+  dut.set_metadata( VcdGenerationPass.vcd_file_name, vcd_file_name )
+  dut.set_metadata( VcdGenerationPass.vcd_binary, binary )
+  dut.apply( DefaultPassGroup() )
+  dut.sim_reset()
+  for i in range(ncycles):
+    dut.in_ @= ( i * 3 ) & 0xff
+    dut.sim_tick()
+  return dut
+
+def test_binary_vcd_matches_text( tmpdir ):
+  text_name   = str( tmpdir.join( "acc_text" ) )
+  binary_name = str( tmpdir.join( "acc_binary" ) )
+
+  # Span a few chunks
+  ncycles = VcdWriter.chunk_cycles * 2 + 100
+  run_acc( text_name, False, ncycles ).get_metadata( VcdGenerationPass.vcd_writer ).close()
+  run_acc( binary_name, True, ncycles ).get_metadata( VcdGenerationPass.vcd_writer ).close()
+
+  convert_binary_vcd( binary_name + ".vcdb", binary_name + ".vcd" )
+  text = parse_vcd( text_name + ".vcd" )
+  assert text == parse_vcd( binary_name + ".vcd" )
+  assert len( text["top.out"] ) > ncycles // 4
+  assert text["top.clk"][-1][0] == ( ncycles + 3 ) * 100
+
+def test_vcd_flush( tmpdir ):
+  vcd_file_name = str( tmpdir.join( "acc" ) )
+  dut = run_acc( vcd_file_name, False, 10 )
+
+  # Value changes are buffered until flushed
+  dut.get_metadata( VcdGenerationPass.vcd_writer ).flush()
+  waves = parse_vcd( vcd_file_name + ".vcd" )
+  assert waves["top.in_"][-1] == ( 1200, "b0b00011011" )
+  assert waves["top.clk"][-1][0] == 1300
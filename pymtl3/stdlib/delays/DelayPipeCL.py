@@ -67,6 +67,21 @@ class DelayPipeDeqCL( Component ):
         U(up_delay) < M(s.enq.rdy),
       )
 
+  # Time skipping (see pymtl3/passes/sim/TimeSkip.py)
+
+  def sim_idle_cycles( s ):
+    if s.pipeline[-1] is not None: # wait for deq
+      return None
+    if s.pipeline[0] is not None:  # enq becomes ready
+      return 0
+    for j in range( s.delay-1, -1, -1 ):
+      if s.pipeline[j] is not None:
+        return s.delay - j - 1     # deq becomes ready after that
+    return None
+
+  def sim_skip_cycles( s, ncycles ):
+    s.pipeline.rotate( ncycles )
+
   def line_trace( s ):
     return "[{}]".format( "".join( [ " " if x is None else "*" for x in list(s.pipeline)[:-1] ] ) )
 
@@ -108,6 +123,21 @@ class DelayPipeSendCL( Component ):
         M(s.enq.rdy) > U(up_delay),  # pipe behavior
       )
 
+  # Time skipping (see pymtl3/passes/sim/TimeSkip.py)
+
+  def sim_idle_cycles( s ):
+    if s.pipeline[-1] is not None: # try to send
+      return 0
+    if s.pipeline[0] is not None:  # enq becomes ready
+      return 0
+    for j in range( s.delay-2, -1, -1 ):
+      if s.pipeline[j] is not None:
+        return s.delay - j - 1     # send after that
+    return None
+
+  def sim_skip_cycles( s, ncycles ):
+    s.pipeline.rotate( ncycles )
+
   def line_trace( s ):
     if s.delay > 0:
       return "[{}]".format( "".join( [ " " if x is None else "*" for x in s.pipeline ] ) )
@@ -106,3 +106,36 @@ def test_delay_pipe_send( test_params, cmdline_opts ):
   run_sim( TestHarness( DelayPipeSendCL, msgs[::2], msgs[1::2],
                            test_params.lat,
                            test_params.src_lat, test_params.sink_lat ) )
+
+#-------------------------------------------------------------------------
+# Time skipping
+#-------------------------------------------------------------------------
+
+def _run_time_skip( dut_class, lat, src_lat, sink_lat, time_skip ):
+  msgs = basic_msgs()
+  th = TestHarness( dut_class, msgs[::2], msgs[1::2], lat, src_lat, sink_lat )
+  th.elaborate()
+  th.apply( DefaultPassGroup( time_skip=time_skip ) )
+  th.sim_reset()
+
+  nticks = 0
+  while not th.done():
+    th.sim_tick()
+    nticks += 1
+  return th.sim_cycle_count(), th.sink.cycle_count, nticks
+
+@pytest.mark.parametrize( "lat, src_lat, sink_lat", [
+  (1, 0, 0), (4, 3, 14), (50, 0, 0), (50, 30, 3), (50, 3, 30),
+])
+def test_delay_pipe_send_time_skip( lat, src_lat, sink_lat ):
+  ref = _run_time_skip( DelayPipeSendCL, lat, src_lat, sink_lat, False )
+  ret = _run_time_skip( DelayPipeSendCL, lat, src_lat, sink_lat, True )
+  assert ret[:2] == ref[:2]
+  assert ret[2] <= ref[2]
+  if lat >= 50:
+    assert ret[2] < ref[2]
+
+def test_delay_pipe_deq_no_time_skip():
+  # up_adapt of the harness doesn't implement the time skipping hooks
+  ref = _run_time_skip( DelayPipeDeqCL, 50, 0, 0, False )
+  assert _run_time_skip( DelayPipeDeqCL, 50, 0, 0, True ) == ref
@@ -141,6 +141,21 @@ class MagicMemoryCL( Component ):
 
           s.resp_qs[i].enq( resp )
 
+  #-----------------------------------------------------------------------
+  # Time skipping
+  #-----------------------------------------------------------------------
+  # up_mem only acts when a request is ready. The request queues tell the
+  # simulator when that happens (see pymtl3/passes/sim/TimeSkip.py).
+
+  def sim_idle_cycles( s ):
+    for i in range(s.nports):
+      if s.req_qs[i].pipeline[-1] is not None:
+        return 0
+    return None
+
+  def sim_skip_cycles( s, ncycles ):
+    pass
+
   #-----------------------------------------------------------------------
   # line_trace
   #-----------------------------------------------------------------------
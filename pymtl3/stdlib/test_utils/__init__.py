@@ -7,5 +7,5 @@ from .test_helpers import (
     run_test_vector_sim,
 )
 from .test_masters import TestMasterCL
-from .test_sinks import TestSinkCL
+from .test_sinks import TestSinkCL, UnorderedTestSinkCL
 from .test_srcs import TestSrcCL
@@ -12,7 +12,13 @@ import pytest
 from pymtl3 import *
 
 from ..test_helpers import run_sim
-from ..test_sinks import PyMTLTestSinkError, TestSinkCL, TestSinkRTL
+from ..test_sinks import (
+    PyMTLTestSinkError,
+    TestSinkCL,
+    TestSinkRTL,
+    UnorderedTestSinkCL,
+    UnorderedTestSinkRTL,
+)
 from ..test_srcs import TestSrcCL, TestSrcRTL
 
 #-------------------------------------------------------------------------
@@ -229,3 +235,67 @@ def test_customized_cmp():
   )
   th.set_param( 'top.sink.construct', cmp_fn=lambda a, b: a[0:2] == b[0:2] )
   run_sim( th )
+
+#-------------------------------------------------------------------------
+# Unordered sink test
+#-------------------------------------------------------------------------
+
+@bitstruct
+class MemResp:
+  opaque : Bits8
+  data   : Bits32
+
+resp_msgs = [ MemResp( i % 4, i * 0x1001 ) for i in range(16) ]
+
+@pytest.mark.parametrize(
+  ('SrcType', 'SinkType', 'sink_init', 'sink_intv'),
+  [
+    ( TestSrcCL,  UnorderedTestSinkCL,  0, 0 ),
+    ( TestSrcCL,  UnorderedTestSinkCL,  3, 2 ),
+    ( TestSrcRTL, UnorderedTestSinkRTL, 0, 0 ),
+    ( TestSrcRTL, UnorderedTestSinkRTL, 5, 1 ),
+  ]
+)
+def test_unordered( SrcType, SinkType, sink_init, sink_intv ):
+  src_msgs = resp_msgs[1::2] + resp_msgs[::2]
+  th = TestHarnessSimple( MemResp, SrcType, SinkType, src_msgs, resp_msgs )
+  th.set_param( "top.sink.construct",
+    initial_delay  = sink_init,
+    interval_delay = sink_intv,
+  )
+  run_sim( th )
+
+def test_unordered_duplicates_and_ints():
+  th = TestHarnessSimple(
+    Bits16, TestSrcCL, UnorderedTestSinkCL,
+    src_msgs  = [ b16(3), b16(1), b16(3), b16(2) ],
+    sink_msgs = [ 1, 2, 3, 3 ],
+  )
+  run_sim( th )
+
+def test_unordered_key_fn():
+  th = TestHarnessSimple(
+    MemResp, TestSrcCL, UnorderedTestSinkCL,
+    src_msgs  = [ MemResp( 1, 5 ), MemResp( 0, 7 ) ],
+    sink_msgs = [ MemResp( 0, 0 ), MemResp( 1, 0 ) ],
+  )
+  th.set_param( 'top.sink.construct', key_fn=lambda x: int(x.opaque) )
+  run_sim( th )
+
+def test_unordered_error_wrong_msg():
+  th = TestHarnessSimple(
+    Bits16, TestSrcCL, UnorderedTestSinkCL,
+    src_msgs  = [ b16(0xface), b16(0xface) ],
+    sink_msgs = [ b16(0xdead), b16(0xface) ],
+  )
+  with pytest.raises( PyMTLTestSinkError, match="UNEXPECTED" ):
+    run_sim( th )
+
+def test_unordered_error_more_msg():
+  th = TestHarnessSimple(
+    Bits16, TestSrcCL, UnorderedTestSinkCL,
+    src_msgs  = [ b16(0xface), b16(0xface) ],
+    sink_msgs = [ b16(0xface) ],
+  )
+  with pytest.raises( PyMTLTestSinkError, match="more msgs" ):
+    run_sim( th )
@@ -110,6 +110,20 @@ class TestSinkCL( Component ):
       s.idx += 1
       s.recv_called = True
 
+  # Time skipping (see pymtl3/passes/sim/TimeSkip.py)
+
+  def sim_idle_cycles( s ):
+    if s.error_msg or s.recv_called or s.reset or \
+       ( s.idx >= len( s.msgs ) and not s.done_flag ):
+      return 0
+    if s.count > 0:
+      return s.count - 1 # recv becomes ready after that
+    return None
+
+  def sim_skip_cycles( s, ncycles ):
+    s.count        = max( 0, s.count - ncycles )
+    s.cycle_count += ncycles
+
   def done( s ):
     return s.done_flag
 
@@ -117,6 +131,58 @@ class TestSinkCL( Component ):
   def line_trace( s ):
     return "{}".format( s.recv )
 
+#-------------------------------------------------------------------------
+# UnorderedTestSinkCL
+#-------------------------------------------------------------------------
+# A scoreboard that accepts the expected messages in any order, e.g. the
+# responses of a memory system that reorders requests. The expected
+# messages that are not received yet are counted in a dictionary indexed
+# by key_fn( msg ), so matching a message takes constant time. By default
+# the key of a Bits message is its integer (so that the expected messages
+# can be ints), and the key of a bitstruct is the message itself, which
+# is hashed and compared by its to_bits() integer. Messages that should
+# match must have the same key.
+
+class UnorderedTestSinkCL( TestSinkCL ):
+
+  def construct( s, Type, msgs, initial_delay=0, interval_delay=0, key_fn=None ):
+    super().construct( Type, msgs, initial_delay, interval_delay )
+
+    if key_fn is None:
+      key_fn = int if issubclass( Type, Bits ) else ( lambda x: x )
+    s.key_fn = key_fn
+
+    s.pending = {}
+    for msg in s.msgs:
+      key = key_fn( msg )
+      s.pending[ key ] = s.pending.get( key, 0 ) + 1
+
+  @non_blocking( lambda s: s.count==0 )
+  def recv( s, msg ):
+    assert s.count == 0, "Invalid en/rdy transaction! Sink is stalled (not ready), but receives a message."
+
+    # Sanity check
+    if s.idx >= len( s.msgs ):
+      s.error_msg = ( 'Test Sink received more msgs than expected!\n'
+                      f'Received : {msg}' )
+      return
+
+    key = s.key_fn( msg )
+    n   = s.pending.get( key, 0 )
+    if n == 0:
+      s.error_msg = (
+        f'Test sink {s} received UNEXPECTED message!\n'
+        f'Received : { msg }\n'
+        f'Expecting {len( s.msgs ) - s.idx} more messages'
+      )
+    else:
+      if n == 1:
+        del s.pending[ key ]
+      else:
+        s.pending[ key ] = n - 1
+      s.idx += 1
+      s.recv_called = True
+
 #-------------------------------------------------------------------------
 # TestSinkRTL
 #-------------------------------------------------------------------------
@@ -146,3 +212,31 @@ class TestSinkRTL( Component ):
 
   def line_trace( s ):
     return "{}".format( s.recv )
+
+#-------------------------------------------------------------------------
+# UnorderedTestSinkRTL
+#-------------------------------------------------------------------------
+
+class UnorderedTestSinkRTL( Component ):
+
+  def construct( s, Type, msgs, initial_delay=0, interval_delay=0, key_fn=None ):
+
+    # Interface
+
+    s.recv = RecvIfcRTL( Type )
+
+    # Components
+
+    s.sink    = UnorderedTestSinkCL( Type, msgs, initial_delay, interval_delay, key_fn )
+    s.adapter = RecvRTL2SendCL( Type )
+
+    connect( s.recv,         s.adapter.recv )
+    connect( s.adapter.send, s.sink.recv    )
+
+  def done( s ):
+    return s.sink.done()
+
+  # Line trace
+
+  def line_trace( s ):
+    return "{}".format( s.recv )
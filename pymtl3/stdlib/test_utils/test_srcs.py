@@ -38,6 +38,18 @@ class TestSrcCL( Component ):
   def done( s ):
     return not s.msgs
 
+  # Time skipping (see pymtl3/passes/sim/TimeSkip.py)
+
+  def sim_idle_cycles( s ):
+    if s.count > 0:
+      return s.count
+    if s.reset or s.msgs:
+      return 0
+    return None
+
+  def sim_skip_cycles( s, ncycles ):
+    s.count = max( 0, s.count - ncycles )
+
   # Line trace
 
   def line_trace( s ):